@@ -50,6 +50,15 @@ FAILMODE_STANDALONE = 'standalone'
 # special values for cookies
 COOKIE_ANY = object()
 
+# flow_mod commands of the lines of a bundled flow file, per (action, strict)
+BUNDLE_FLOW_COMMANDS = {
+    ('add', False): 'add',
+    ('mod', False): 'modify',
+    ('mod', True): 'modify_strict',
+    ('del', False): 'delete',
+    ('del', True): 'delete_strict',
+}
+
 ovs_conf.register_ovs_agent_opts()
 
 LOG = logging.getLogger(__name__)
@@ -384,23 +393,7 @@ class OVSBridge(BaseOVS):
         strict = kwargs_list[0].get('strict', False)
 
         for kw in kwargs_list:
-            if action is 'del':
-                if kw.get('cookie') == COOKIE_ANY:
-                    # special value COOKIE_ANY was provided, unset
-                    # cookie to match flows whatever their cookie is
-                    kw.pop('cookie')
-                    if kw.get('cookie_mask'):  # non-zero cookie mask
-                        raise Exception("cookie=COOKIE_ANY but cookie_mask "
-                                        "set to %s" % kw.get('cookie_mask'))
-                elif 'cookie' in kw:
-                    # a cookie was specified, use it
-                    kw['cookie'] = check_cookie_mask(kw['cookie'])
-                else:
-                    # nothing was specified about cookies, use default
-                    kw['cookie'] = "%d/-1" % self._default_cookie
-            else:
-                if 'cookie' not in kw:
-                    kw['cookie'] = self._default_cookie
+            self._set_flow_cookie(action, kw)
 
             if action in ('mod', 'del'):
                 if kw.pop('strict', False) != strict:
@@ -424,6 +417,44 @@ class OVSBridge(BaseOVS):
             self.run_ofctl('%s-flows' % action, strict_param + ['-'],
                            '\n'.join(flow_strs))
 
+    def _set_flow_cookie(self, action, kw):
+        if action == 'del':
+            if kw.get('cookie') == COOKIE_ANY:
+                # special value COOKIE_ANY was provided, unset
+                # cookie to match flows whatever their cookie is
+                kw.pop('cookie')
+                if kw.get('cookie_mask'):  # non-zero cookie mask
+                    raise Exception("cookie=COOKIE_ANY but cookie_mask "
+                                    "set to %s" % kw.get('cookie_mask'))
+            elif 'cookie' in kw:
+                # a cookie was specified, use it
+                kw['cookie'] = check_cookie_mask(kw['cookie'])
+            else:
+                # nothing was specified about cookies, use default
+                kw['cookie'] = "%d/-1" % self._default_cookie
+        else:
+            if 'cookie' not in kw:
+                kw['cookie'] = self._default_cookie
+
+    def do_action_flows_bundle(self, action_flow_tuples):
+        """Apply a list of (action, kwargs) flow changes as one bundle.
+
+        The changes are committed atomically by ovs-vswitchd. Unlike
+        do_action_flows, actions and strict and non-strict matches can be
+        mixed, as every line of the flow file carries its own command.
+        """
+        flow_strs = []
+        for action, kw in action_flow_tuples:
+            self._set_flow_cookie(action, kw)
+            strict = kw.pop('strict', False)
+            if strict and action == 'add':
+                msg = "cannot use 'strict' with 'add' action"
+                raise exceptions.InvalidInput(error_message=msg)
+            flow_strs.append('%s %s' % (
+                BUNDLE_FLOW_COMMANDS[(action, strict)],
+                _build_flow_expr_str(kw, action, strict)))
+        self.run_ofctl('add-flows', ['--bundle', '-'], '\n'.join(flow_strs))
+
     def add_flow(self, **kwargs):
         self.do_action_flows('add', [kwargs])
 
@@ -922,17 +953,22 @@ class DeferredOVSBridge(object):
     ALLOWED_PASSTHROUGHS = 'add_port', 'add_tunnel_port', 'delete_port'
 
     def __init__(self, br, full_ordered=False,
-                 order=('add', 'mod', 'del')):
+                 order=('add', 'mod', 'del'), use_bundle=False):
         '''Constructor.
 
         :param br: wrapped bridge
         :param full_ordered: Optional, disable flow reordering (slower)
         :param order: Optional, define in which order flow are applied
+        :param use_bundle: Optional, apply the flows atomically as one
+                           OpenFlow bundle (requires OpenFlow 1.4)
         '''
 
         self.br = br
         self.full_ordered = full_ordered
         self.order = order
+        self.use_bundle = use_bundle
+        if self.use_bundle:
+            self.br.use_at_least_protocol(constants.OPENFLOW14)
         if not self.full_ordered:
             self.weights = dict((y, x) for x, y in enumerate(self.order))
         self.action_flow_tuples = []
@@ -960,6 +996,10 @@ class DeferredOVSBridge(object):
         if not self.full_ordered:
             action_flow_tuples.sort(key=lambda af: self.weights[af[0]])
 
+        if self.use_bundle:
+            self.br.do_action_flows_bundle(action_flow_tuples)
+            return
+
         grouped = itertools.groupby(action_flow_tuples,
                                     key=operator.itemgetter(0))
         itemgetter_1 = operator.itemgetter(1)
@@ -15,6 +15,7 @@
 
 import collections
 import os
+import time
 
 import eventlet
 from neutron_lib.agent import constants as agent_consts
@@ -32,6 +33,7 @@ from oslo_utils import importutils
 import six
 
 from neutron._i18n import _
+from neutron.agent.dhcp import network_processing_queue as queue
 from neutron.agent.linux import dhcp
 from neutron.agent.linux import external_process
 from neutron.agent.metadata import driver as metadata_driver
@@ -45,6 +47,12 @@ from neutron import manager
 LOG = logging.getLogger(__name__)
 _SYNC_STATE_LOCK = lockutils.ReaderWriterLock()
 
+DHCP_PROCESS_GREENLET_MAX = 8
+# A change of these fields of a subnet changes the dnsmasq command line, the
+# agent's port or the metadata proxy, the network is then fetched again
+SUBNET_REFRESH_FIELDS = ('cidr', 'enable_dhcp', 'gateway_ip', 'ip_version',
+                         'segment_id')
+
 
 def _sync_lock(f):
     """Decorator to block all operations for a global sync call."""
@@ -70,6 +78,95 @@ def _net_lock(network_id):
     return lockutils.lock(lock_name, runtime.SYNCHRONIZED_PREFIX)
 
 
+class NetworkSyncScheduler(object):
+    """Configure the networks of a sync concurrently.
+
+    The networks having ports being built are configured first. The number
+    of networks configured at the same time starts at num_sync_threads and,
+    when max_num_sync_threads is larger, is adapted to the time the network
+    configurations take, which is mostly spent waiting for subprocesses: it
+    grows as long as this latency stays close to the best one measured and
+    shrinks when it degrades.
+    """
+
+    # a latency degraded by more than this factor shrinks the pool
+    LATENCY_TOLERANCE = 1.5
+
+    def __init__(self, conf):
+        self.min_size = conf.num_sync_threads
+        self.max_size = max(conf.max_num_sync_threads, self.min_size)
+        self.size = self.min_size
+        self.pool = eventlet.GreenPool(self.size)
+        self._latencies = []
+        self._best_latency = None
+        self.total = 0
+        self.done = 0
+        self.started_at = None
+
+    @staticmethod
+    def _priority(network):
+        if any(port.status == constants.PORT_STATUS_BUILD
+               for port in network.ports):
+            return 0
+        return 1
+
+    def run(self, networks, configure_network):
+        networks = sorted(networks, key=self._priority)
+        self.total = len(networks)
+        self.done = 0
+        self.started_at = time.time()
+        for network in networks:
+            self.pool.spawn(self._configure, configure_network, network)
+        self.pool.waitall()
+
+    def _configure(self, configure_network, network):
+        start = time.time()
+        try:
+            configure_network(network)
+        finally:
+            self.done += 1
+            self._adapt_size(time.time() - start)
+
+    def _adapt_size(self, latency):
+        if self.max_size == self.min_size:
+            return
+        # judge a size once as many networks as it allows were configured
+        self._latencies.append(latency)
+        if len(self._latencies) < self.size:
+            return
+        average = sum(self._latencies) / len(self._latencies)
+        self._latencies = []
+        if self._best_latency is None or average < self._best_latency:
+            self._best_latency = average
+        if average <= self._best_latency * self.LATENCY_TOLERANCE:
+            size = min(self.size + 1, self.max_size)
+        else:
+            size = max(self.size - 1, self.min_size)
+        if size != self.size:
+            LOG.debug("Resizing the sync pool from %(old)d to %(new)d "
+                      "threads, network configuration latency %(latency).3f "
+                      "seconds, best %(best).3f seconds",
+                      {'old': self.size, 'new': size, 'latency': average,
+                       'best': self._best_latency})
+            self.size = size
+            self.pool.resize(size)
+
+    def get_state(self):
+        """Return the progress of the last sync for the state report."""
+        if not self.total:
+            return {}
+        remaining = self.total - self.done
+        eta = 0
+        if remaining:
+            elapsed = time.time() - self.started_at
+            eta = (int(elapsed * remaining / self.done) if self.done
+                   else None)
+        return {'sync_progress': {'networks': self.total,
+                                  'configured': self.done,
+                                  'threads': self.size,
+                                  'eta': eta}}
+
+
 class DhcpAgent(manager.Manager):
     """DHCP agent service manager.
 
@@ -78,8 +175,12 @@ class DhcpAgent(manager.Manager):
     neutron.api.rpc.agentnotifiers.dhcp_rpc_agent_api.DhcpAgentNotifyApi as the
     client side to execute the methods here.  For more information about
     changing rpc interfaces, see doc/source/contributor/internals/rpc_api.rst.
+
+    API version history:
+        1.0 - Initial version.
+        1.1 - Added networks_added_to_agent
     """
-    target = oslo_messaging.Target(version='1.0')
+    target = oslo_messaging.Target(version='1.1')
 
     def __init__(self, host=None, conf=None):
         super(DhcpAgent, self).__init__(host=host)
@@ -89,6 +190,8 @@ class DhcpAgent(manager.Manager):
         self.cache = NetworkCache()
         self.dhcp_driver_cls = importutils.import_class(self.conf.dhcp_driver)
         self.plugin_rpc = DhcpPluginApi(topics.PLUGIN, self.conf.host)
+        self._sync_scheduler = NetworkSyncScheduler(self.conf)
+        self._queue = queue.NetworkProcessingQueue()
         # create dhcp dir to store dhcp info
         dhcp_dir = os.path.dirname("/%s/dhcp/" % self.conf.state_path)
         fileutils.ensure_tree(dhcp_dir, mode=0o755)
@@ -128,6 +231,7 @@ class DhcpAgent(manager.Manager):
         """Activate the DHCP agent."""
         self.periodic_resync()
         self.start_ready_ports_loop()
+        self.start_process_loop()
 
     def call_driver(self, action, network, **action_kwargs):
         """Invoke an action on a DHCP driver instance."""
@@ -169,6 +273,53 @@ class DhcpAgent(manager.Manager):
                 LOG.exception('Unable to %(action)s dhcp for %(net_id)s.',
                               {'net_id': network.id, 'action': action})
 
+    def start_process_loop(self):
+        """Spawn a thread to process the queued network updates."""
+        eventlet.spawn_n(self._process_loop)
+
+    def _process_loop(self):
+        LOG.debug("Starting _process_loop")
+        pool = eventlet.GreenPool(size=DHCP_PROCESS_GREENLET_MAX)
+        while True:
+            pool.spawn_n(self._process_network_update)
+
+    @utils.exception_logger()
+    def _process_network_update(self):
+        update = self._queue.pop()
+        self._process_update(update)
+
+    @_wait_if_syncing
+    def _process_update(self, update):
+        """Take the actions merged into a network update.
+
+        The driver is given the state of the network in the cache at the
+        time the update is processed, which includes all the changes
+        notified while the network was waiting in the queue.
+        """
+        LOG.debug("Processing network %(net)s update, actions %(actions)s",
+                  {'net': update.id, 'actions': sorted(update.actions)})
+        with _net_lock(update.id):
+            if queue.DELETE_NETWORK in update.actions:
+                self.disable_dhcp_helper(update.id)
+                return
+            if queue.DISABLE in update.actions:
+                # the agent's port was deleted, the network is resynced
+                network = self.cache.get_network_by_id(update.id)
+                if network:
+                    self.call_driver('disable', network)
+                return
+            if queue.REFRESH in update.actions:
+                self.refresh_dhcp_helper(update.id)
+            network = self.cache.get_network_by_id(update.id)
+            if not network:
+                return
+            if queue.RESTART in update.actions:
+                self.call_driver('restart', network)
+            elif (queue.RELOAD_ALLOCATIONS in update.actions and
+                    queue.REFRESH not in update.actions):
+                self.call_driver('reload_allocations', network)
+        self.dhcp_ready_ports |= update.ready_ports
+
     def schedule_resync(self, reason, network_id=None):
         """Schedule a resync for a given network and reason. If no network is
         specified, resync all networks.
@@ -182,7 +333,6 @@ class DhcpAgent(manager.Manager):
         """
         only_nets = set([] if (not networks or None in networks) else networks)
         LOG.info('Synchronizing state')
-        pool = eventlet.GreenPool(self.conf.num_sync_threads)
         known_network_ids = set(self.cache.get_network_ids())
 
         try:
@@ -197,12 +347,13 @@ class DhcpAgent(manager.Manager):
                     LOG.exception('Unable to sync network state on '
                                   'deleted network %s', deleted_id)
 
-            for network in active_networks:
+            networks_to_sync = [
+                network for network in active_networks
                 if (not only_nets or  # specifically resync all
-                        network.id not in known_network_ids or  # missing net
-                        network.id in only_nets):  # specific network to sync
-                    pool.spawn(self.safe_configure_dhcp_for_network, network)
-            pool.waitall()
+                    network.id not in known_network_ids or  # missing net
+                    network.id in only_nets)]  # specific network to sync
+            self._sync_scheduler.run(networks_to_sync,
+                                     self.safe_configure_dhcp_for_network)
             # we notify all ports in case some were created while the agent
             # was down
             self.dhcp_ready_ports |= set(self.cache.get_port_ids(only_nets))
@@ -362,29 +513,96 @@ class DhcpAgent(manager.Manager):
         with _net_lock(network_id):
             self.enable_dhcp_helper(network_id)
 
+    @_wait_if_syncing
+    def networks_added_to_agent(self, context, payload):
+        """Handle the networks rescheduled to this agent at once.
+
+        They are configured by the next resync, which fetches them all with
+        a single RPC call.
+        """
+        for network_id in payload['network_ids']:
+            self.schedule_resync("Network added to agent", network_id)
+
     @_wait_if_syncing
     def network_update_end(self, context, payload):
         """Handle the network.update.end notification event."""
-        network_id = payload['network']['id']
+        updated_network = payload['network']
+        network_id = updated_network['id']
         with _net_lock(network_id):
-            if payload['network']['admin_state_up']:
-                self.enable_dhcp_helper(network_id)
-            else:
+            if not updated_network['admin_state_up']:
                 self.disable_dhcp_helper(network_id)
+                return
+            network = self.cache.get_network_by_id(network_id)
+            if not network or self._network_update_needs_refresh(
+                    network, updated_network):
+                self.enable_dhcp_helper(network_id)
+                return
+            if self.cache.is_network_message_stale(updated_network):
+                LOG.debug("Discarding stale network update: %s", network_id)
+                return
+            # the attributes of the network are applied to the cached one,
+            # its subnets and ports are kept up to date by their own events
+            self.cache.update_network(updated_network)
+        self._queue.add(queue.NetworkUpdate(network_id,
+                                            queue.PRIORITY_NETWORK_UPDATE,
+                                            [queue.RESTART]))
+
+    @staticmethod
+    def _network_update_needs_refresh(network, updated_network):
+        """Whether the network has to be fetched from the server again.
+
+        The server lists the ids of the subnets of a network in the updated
+        network. If they are not the ones of the cached network, a subnet
+        event was missed and the cached network cannot be trusted.
+        """
+        if 'subnets' not in updated_network:
+            return False
+        non_local_subnets = getattr(network, 'non_local_subnets', [])
+        cached_ids = {s.id for s in network.subnets + non_local_subnets}
+        return set(updated_network['subnets']) != cached_ids
 
     @_wait_if_syncing
     def network_delete_end(self, context, payload):
         """Handle the network.delete.end notification event."""
         network_id = payload['network_id']
-        with _net_lock(network_id):
-            self.disable_dhcp_helper(network_id)
+        self._queue.add(queue.NetworkUpdate(network_id,
+                                            queue.PRIORITY_NETWORK_DELETE,
+                                            [queue.DELETE_NETWORK]))
 
     @_wait_if_syncing
     def subnet_update_end(self, context, payload):
         """Handle the subnet.update.end notification event."""
-        network_id = payload['subnet']['network_id']
+        updated_subnet = payload['subnet']
+        network_id = updated_subnet['network_id']
         with _net_lock(network_id):
-            self.refresh_dhcp_helper(network_id)
+            if self.cache.is_subnet_message_stale(updated_subnet):
+                LOG.debug("Discarding stale subnet update: %s",
+                          updated_subnet['id'])
+                return
+            if self._subnet_update_needs_refresh(updated_subnet):
+                action = queue.REFRESH
+            else:
+                self.cache.put_subnet(updated_subnet)
+                action = queue.RELOAD_ALLOCATIONS
+        self._queue.add(queue.NetworkUpdate(network_id,
+                                            queue.PRIORITY_NETWORK_UPDATE,
+                                            [action]))
+
+    def _subnet_update_needs_refresh(self, updated_subnet):
+        """Whether the network has to be fetched from the server again.
+
+        An update of a cached subnet which leaves the fields in
+        SUBNET_REFRESH_FIELDS alone only changes the options and hosts given
+        to the clients, and is applied to the cached network. A new subnet,
+        or a change of the subnets served by the agent's port, requires the
+        whole network.
+        """
+        subnet = self.cache.get_subnet_by_id(updated_subnet.get('id'))
+        if not subnet:
+            return True
+        return any(field in updated_subnet and
+                   updated_subnet[field] != subnet.get(field)
+                   for field in SUBNET_REFRESH_FIELDS)
 
     # Use the update handler for the subnet create event.
     subnet_create_end = subnet_update_end
@@ -396,11 +614,15 @@ class DhcpAgent(manager.Manager):
         network = self.cache.get_network_by_subnet_id(subnet_id)
         if not network:
             return
-        with _net_lock(network.id):
-            network = self.cache.get_network_by_subnet_id(subnet_id)
-            if not network:
-                return
-            self.refresh_dhcp_helper(network.id)
+        self._queue.add(queue.NetworkUpdate(network.id,
+                                            queue.PRIORITY_NETWORK_UPDATE,
+                                            [queue.REFRESH]))
+
+    @staticmethod
+    def _port_update_priority(port):
+        if port.get('device_owner') == constants.DEVICE_OWNER_DHCP:
+            return queue.PRIORITY_DHCP_PORT
+        return queue.PRIORITY_NETWORK_UPDATE
 
     @_wait_if_syncing
     def port_update_end(self, context, payload):
@@ -415,7 +637,7 @@ class DhcpAgent(manager.Manager):
                 return
             LOG.info("Trigger reload_allocations for port %s",
                      updated_port)
-            driver_action = 'reload_allocations'
+            action = queue.RELOAD_ALLOCATIONS
             if self._is_port_on_this_agent(updated_port):
                 orig = self.cache.get_port_by_id(updated_port['id'])
                 # assume IP change if not in cache
@@ -436,10 +658,11 @@ class DhcpAgent(manager.Manager):
                 elif old_ips != new_ips:
                     LOG.debug("Agent IPs on network %s changed from %s to %s",
                               network.id, old_ips, new_ips)
-                    driver_action = 'restart'
+                    action = queue.RESTART
             self.cache.put_port(updated_port)
-            self.call_driver(driver_action, network)
-            self.dhcp_ready_ports.add(updated_port.id)
+            self._queue.add(queue.NetworkUpdate(
+                network.id, self._port_update_priority(updated_port),
+                [action], [updated_port.id]))
 
     def _is_port_on_this_agent(self, port):
         thishost = utils.get_dhcp_agent_device_id(
@@ -466,10 +689,13 @@ class DhcpAgent(manager.Manager):
                 # the agent's port has been deleted. disable the service
                 # and add the network to the resync list to create
                 # (or acquire a reserved) port.
-                self.call_driver('disable', network)
+                self._queue.add(queue.NetworkUpdate(
+                    network.id, queue.PRIORITY_DHCP_PORT, [queue.DISABLE]))
                 self.schedule_resync("Agent port was deleted", port.network_id)
             else:
-                self.call_driver('reload_allocations', network)
+                self._queue.add(queue.NetworkUpdate(
+                    network.id, self._port_update_priority(port),
+                    [queue.RELOAD_ALLOCATIONS]))
 
     def update_isolated_metadata_proxy(self, network):
         """Spawn or kill metadata proxy.
@@ -611,7 +837,12 @@ class DhcpPluginApi(object):
 
 
 class NetworkCache(object):
-    """Agent cache of the current network state."""
+    """Agent cache of the current network state.
+
+    The ports of the cached networks are stored as dhcp.PortModel records,
+    which only keep the fields used by the agent and its drivers and are
+    much smaller than the dicts received from the server.
+    """
     def __init__(self):
         self.cache = {}
         self.subnet_lookup = {}
@@ -644,10 +875,18 @@ class NetworkCache(object):
     def get_network_by_port_id(self, port_id):
         return self.cache.get(self.port_lookup.get(port_id))
 
+    @staticmethod
+    def _compact_network(network):
+        compact = dhcp.NetModel(network)
+        compact.ports = [dhcp.PortModel(port) for port in network.ports]
+        return compact
+
     def put(self, network):
         if network.id in self.cache:
             self.remove(self.cache[network.id])
 
+        network = self._compact_network(network)
+
         self.cache[network.id] = network
 
         non_local_subnets = getattr(network, 'non_local_subnets', [])
@@ -668,6 +907,7 @@ class NetworkCache(object):
             del self.port_lookup[port.id]
 
     def put_port(self, port):
+        port = dhcp.PortModel(port)
         network = self.get_network_by_id(port.network_id)
         for index in range(len(network.ports)):
             if network.ports[index].id == port.id:
@@ -682,7 +922,7 @@ class NetworkCache(object):
         network = self.get_network_by_port_id(port.id)
 
         for index in range(len(network.ports)):
-            if network.ports[index] == port:
+            if network.ports[index].id == port.id:
                 del network.ports[index]
                 del self.port_lookup[port.id]
                 break
@@ -694,6 +934,43 @@ class NetworkCache(object):
                 if port.id == port_id:
                     return port
 
+    def is_subnet_message_stale(self, payload):
+        orig = self.get_subnet_by_id(payload.get('id')) or {}
+        return (orig.get('revision_number', 0) >
+                payload.get('revision_number', 0))
+
+    def get_subnet_by_id(self, subnet_id):
+        network = self.get_network_by_subnet_id(subnet_id)
+        if network:
+            for subnet in network.subnets:
+                if subnet.id == subnet_id:
+                    return subnet
+
+    def put_subnet(self, subnet):
+        """Apply the fields of subnet to the cached subnet of the same id."""
+        network = self.get_network_by_subnet_id(subnet['id'])
+        for index in range(len(network.subnets)):
+            if network.subnets[index].id == subnet['id']:
+                updated = dict(network.subnets[index])
+                updated.update(subnet)
+                network.subnets[index] = dhcp.DictModel(updated)
+                break
+
+    def is_network_message_stale(self, payload):
+        orig = self.get_network_by_id(payload['id']) or {}
+        return (orig.get('revision_number', 0) >
+                payload.get('revision_number', 0))
+
+    def update_network(self, network):
+        """Apply the attributes of network to the cached network.
+
+        The subnets and ports of the cached network are left as they are.
+        """
+        cached = self.get_network_by_id(network['id'])
+        for key, value in network.items():
+            if key not in ('subnets', 'non_local_subnets', 'ports'):
+                cached[key] = value
+
     def get_state(self):
         net_ids = self.get_network_ids()
         num_nets = len(net_ids)
@@ -722,7 +999,8 @@ class DhcpAgentWithStateReport(DhcpAgent):
             'configurations': {
                 'dhcp_driver': self.conf.dhcp_driver,
                 'dhcp_lease_duration': self.conf.dhcp_lease_duration,
-                'log_agent_heartbeats': self.conf.AGENT.log_agent_heartbeats},
+                'log_agent_heartbeats': self.conf.AGENT.log_agent_heartbeats,
+                'bulk_network_notifications': True},
             'start_flag': True,
             'agent_type': constants.AGENT_TYPE_DHCP}
         report_interval = self.conf.AGENT.report_interval
@@ -735,6 +1013,8 @@ class DhcpAgentWithStateReport(DhcpAgent):
         try:
             self.agent_state.get('configurations').update(
                 self.cache.get_state())
+            self.agent_state.get('configurations').update(
+                self._sync_scheduler.get_state())
             ctx = context.get_admin_context_without_session()
             agent_status = self.state_rpc.report_state(
                 ctx, self.agent_state, True)
@@ -0,0 +1,96 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_utils import timeutils
+from six.moves import queue as Queue
+
+# Lower value is higher priority
+PRIORITY_NETWORK_DELETE = 0
+PRIORITY_DHCP_PORT = 1
+PRIORITY_NETWORK_UPDATE = 2
+
+# Actions to take on a network, several of them can be pending at once
+RELOAD_ALLOCATIONS = 'reload_allocations'
+RESTART = 'restart'
+REFRESH = 'refresh'
+DISABLE = 'disable'
+DELETE_NETWORK = 'delete_network'
+
+
+class NetworkUpdate(object):
+    """Encapsulates the pending update of a network
+
+    An instance of this object carries the actions to take on a network and
+    the ports to report as ready once they are taken. Updates of the same
+    network are merged while it waits in the queue.
+    """
+    def __init__(self, network_id, priority, actions=(), ready_ports=(),
+                 timestamp=None):
+        self.id = network_id
+        self.priority = priority
+        self.actions = set(actions)
+        self.ready_ports = set(ready_ports)
+        self.timestamp = timestamp or timeutils.utcnow()
+
+    def __lt__(self, other):
+        """Implements priority among updates
+
+        Lower numerical priority always gets precedence. When comparing two
+        updates of the same priority then the one with the earlier timestamp
+        gets precedence.
+        """
+        if self.priority != other.priority:
+            return self.priority < other.priority
+        if self.timestamp != other.timestamp:
+            return self.timestamp < other.timestamp
+        return self.id < other.id
+
+
+class NetworkProcessingQueue(object):
+    """Manager of the queue of networks to process
+
+    A network is queued at most once: an update of a network which is
+    already waiting is merged into the pending one, which then takes the
+    highest of their priorities. A burst of port notifications on a network
+    thus results in a single driver call made with the newest state of the
+    network. The entries superseded by an update of higher priority are left
+    in the priority queue and skipped when they reach its front.
+    """
+    def __init__(self):
+        self._queue = Queue.PriorityQueue()
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, update):
+        pending = self._pending.get(update.id)
+        if not pending:
+            self._pending[update.id] = update
+            self._queue.put(update)
+            return
+        pending.actions |= update.actions
+        pending.ready_ports |= update.ready_ports
+        if update.priority < pending.priority:
+            merged = NetworkUpdate(pending.id, update.priority,
+                                   pending.actions, pending.ready_ports,
+                                   pending.timestamp)
+            self._pending[update.id] = merged
+            self._queue.put(merged)
+
+    def pop(self):
+        """Waits for the next network to process and returns its update"""
+        while True:
+            update = self._queue.get()
+            if self._pending.get(update.id) is update:
+                del self._pending[update.id]
+                return update
@@ -519,6 +519,41 @@ class L3NATAgent(ha.AgentMixin,
         router_update.router = None  # Force the agent to resync the router
         self._queue.add(router_update)
 
+    def _fetch_router_for_update(self, update):
+        """Fetch the router of an update along with the pending ones
+
+        The routers of the next updates waiting in the queue without router
+        data are fetched with the same RPC call, and these updates are put
+        back in the queue with the fetched data for the workers to process
+        them. The routers which were not returned are not hosted by the agent
+        anymore, their updates are turned into deletions.
+        """
+        pending = self._queue.pop_updates_to_fetch(
+            self.sync_routers_chunk_size - 1)
+        router_ids = [update.id]
+        router_ids.extend(set(u.id for u in pending) - {update.id})
+        timestamp = timeutils.utcnow()
+        update.timestamp = timestamp
+        try:
+            routers = self.plugin_rpc.get_routers(self.context, router_ids)
+        except Exception:
+            for pending_update in pending:
+                self._queue.readd(pending_update)
+            raise
+        routers = {router['id']: router for router in routers}
+        if pending:
+            LOG.debug("Fetched %(count)d routers of pending updates along "
+                      "with router %(router)s",
+                      {'count': len(router_ids) - 1, 'router': update.id})
+        for pending_update in pending:
+            # the data was fetched after the update was received
+            pending_update.timestamp = timestamp
+            pending_update.router = routers.get(pending_update.id)
+            if not pending_update.router:
+                pending_update.action = queue.DELETE_ROUTER
+            self._queue.readd(pending_update)
+        return routers.get(update.id)
+
     def _process_router_update(self):
         for rp, update in self._queue.each_update_to_next_router():
             LOG.debug("Starting router update for %s, action %s, priority %s",
@@ -530,18 +565,13 @@ class L3NATAgent(ha.AgentMixin,
             router = update.router
             if update.action != queue.DELETE_ROUTER and not router:
                 try:
-                    update.timestamp = timeutils.utcnow()
-                    routers = self.plugin_rpc.get_routers(self.context,
-                                                          [update.id])
+                    router = self._fetch_router_for_update(update)
                 except Exception:
                     msg = "Failed to fetch router information for '%s'"
                     LOG.exception(msg, update.id)
                     self._resync_router(update)
                     continue
 
-                if routers:
-                    router = routers[0]
-
             if not router:
                 removed = self._safe_router_removed(update.id)
                 if not removed:
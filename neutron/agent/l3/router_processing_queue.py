@@ -150,6 +150,34 @@ class RouterProcessingQueue(object):
         update.tries -= 1
         self._queue.put(update)
 
+    def readd(self, update):
+        """Puts back an update taken from the queue without processing it"""
+        self._queue.put(update)
+
+    def pop_updates_to_fetch(self, max_updates):
+        """Takes the next updates which need their router to be fetched
+
+        Up to max_updates updates without router data, and which are not
+        deletions, are removed from the queue in priority order so that their
+        routers can be fetched together. The caller is responsible for
+        putting them back with readd().
+        """
+        updates = []
+        skipped = []
+        try:
+            while len(updates) < max_updates:
+                update = self._queue.get_nowait()
+                if (update.router or
+                        update.action in (DELETE_ROUTER, PD_UPDATE)):
+                    skipped.append(update)
+                else:
+                    updates.append(update)
+        except Queue.Empty:
+            pass
+        for update in skipped:
+            self._queue.put(update)
+        return updates
+
     def each_update_to_next_router(self):
         """Grabs the next router from the queue and processes
 
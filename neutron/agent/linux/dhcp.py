@@ -15,6 +15,7 @@
 
 import abc
 import collections
+import hashlib
 import os
 import re
 import shutil
@@ -31,6 +32,7 @@ from oslo_utils import excutils
 from oslo_utils import fileutils
 from oslo_utils import uuidutils
 import six
+from six import moves
 
 from neutron._i18n import _
 from neutron.agent.common import utils as agent_common_utils
@@ -106,6 +108,104 @@ class DictModel(dict):
         return ', '.join(sorted(pairs))
 
 
+def _intern(value):
+    if isinstance(value, str):
+        return moves.intern(value)
+    return value
+
+
+class SlotsModel(object):
+    """A compact model with the attribute and item access of a DictModel.
+
+    The fields are stored in slots rather than in a dict, and the ones
+    listed in _interned share their value with the other models. A field
+    missing from the mapping the model is built from is left unset, so
+    that reading it raises AttributeError or KeyError as it would on a
+    DictModel, and the keys of the mapping that are not slots are dropped.
+    """
+    __slots__ = ()
+    _interned = ()
+    # fields holding a list of dicts, converted to a tuple of these models
+    _nested = {}
+
+    def __init__(self, d):
+        for field in self.__slots__:
+            try:
+                value = d[field]
+            except KeyError:
+                continue
+            if field in self._nested and value is not None:
+                value = tuple(self._nested[field](item) for item in value)
+            elif field in self._interned:
+                value = _intern(value)
+            setattr(self, field, value)
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError as e:
+            raise KeyError(e)
+
+    def __setitem__(self, name, value):
+        setattr(self, name, value)
+
+    def __contains__(self, name):
+        return name in self.__slots__ and hasattr(self, name)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    def keys(self):
+        return [field for field in self.__slots__ if hasattr(self, field)]
+
+    def items(self):
+        return [(field, getattr(self, field)) for field in self.keys()]
+
+    def __eq__(self, other):
+        if isinstance(other, SlotsModel):
+            return (type(self) is type(other) and
+                    self.items() == other.items())
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __str__(self):
+        pairs = ['%s=%s' % (k, v) for k, v in self.items()]
+        return ', '.join(sorted(pairs))
+
+
+class FixedIPModel(SlotsModel):
+    __slots__ = ('subnet_id', 'ip_address')
+    _interned = ('subnet_id',)
+
+
+class DNSAssignmentModel(SlotsModel):
+    __slots__ = ('hostname', 'ip_address', 'fqdn')
+
+
+class ExtraDhcpOptModel(SlotsModel):
+    __slots__ = ('opt_name', 'opt_value', 'ip_version')
+    _interned = ('opt_name',)
+
+
+class PortModel(SlotsModel):
+    """The fields of a port the DHCP agent and its drivers use."""
+    __slots__ = ('id', 'network_id', 'mac_address', 'fixed_ips', 'device_id',
+                 'device_owner', 'status', 'admin_state_up',
+                 'revision_number', 'dns_assignment', 'extra_dhcp_opts')
+    _interned = ('network_id', 'device_owner', 'status')
+    _nested = {'fixed_ips': FixedIPModel,
+               'dns_assignment': DNSAssignmentModel,
+               'extra_dhcp_opts': ExtraDhcpOptModel}
+
+
 class NetModel(DictModel):
 
     def __init__(self, d):
@@ -176,6 +276,9 @@ class DhcpBase(object):
 @six.add_metaclass(abc.ABCMeta)
 class DhcpLocalProcess(DhcpBase):
     PORTS = []
+    # digests of the config files as last written by any instance, the
+    # drivers being instantiated on every call of the agent
+    _config_file_digests = {}
 
     def __init__(self, conf, network, process_monitor, version=None,
                  plugin=None):
@@ -195,6 +298,23 @@ class DhcpLocalProcess(DhcpBase):
 
     def _remove_config_files(self):
         shutil.rmtree(self.network_conf_dir, ignore_errors=True)
+        prefix = self.network_conf_dir + os.sep
+        for filename in list(self._config_file_digests):
+            if filename.startswith(prefix):
+                del self._config_file_digests[filename]
+
+    def _replace_config_file(self, filename, contents):
+        """Write a config file unless it already holds the given contents.
+
+        Returns True if the file was written.
+        """
+        digest = hashlib.sha1(contents.encode('utf-8')).hexdigest()
+        if (self._config_file_digests.get(filename) == digest and
+                os.path.exists(filename)):
+            return False
+        file_utils.replace_file(filename, contents)
+        self._config_file_digests[filename] = digest
+        return True
 
     @staticmethod
     def _get_all_subnets(network):
@@ -452,12 +572,16 @@ class Dnsmasq(DhcpLocalProcess):
         or it's reloaded if the process is not running.
         """
 
-        self._output_config_files()
+        changed = self._output_config_files()
 
         pm = self._get_process_manager(
             cmd_callback=self._build_cmdline_callback)
 
-        pm.enable(reload_cfg=reload_with_HUP)
+        if reload_with_HUP and not changed and pm.active:
+            LOG.debug('Config files of network %s are unchanged, not '
+                      'reloading dnsmasq', self.network.id)
+        else:
+            pm.enable(reload_cfg=reload_with_HUP)
 
         self.process_monitor.register(uuid=self.network.id,
                                       service_name=DNSMASQ_SERVICE_NAME,
@@ -494,9 +618,18 @@ class Dnsmasq(DhcpLocalProcess):
                         'Reason: %(e)s', {'cmd': cmd, 'e': e})
 
     def _output_config_files(self):
+        """Write the config files, only the ones whose contents changed.
+
+        Returns True if any file was written.
+        """
+        filenames = [self.get_conf_file_name(kind)
+                     for kind in ('host', 'addn_hosts', 'opts')]
+        old_digests = [self._config_file_digests.get(f) for f in filenames]
         self._output_hosts_file()
         self._output_addn_hosts_file()
         self._output_opts_file()
+        return old_digests != [self._config_file_digests.get(f)
+                               for f in filenames]
 
     def reload_allocations(self):
         """Rebuild the dnsmasq config and signal the dnsmasq to reload."""
@@ -725,7 +858,7 @@ class Dnsmasq(DhcpLocalProcess):
                 buf.write('%s,%s,%s\n' %
                           (port.mac_address, name, ip_address))
 
-        file_utils.replace_file(filename, buf.getvalue())
+        self._replace_config_file(filename, buf.getvalue())
         LOG.debug('Done building host file %s', filename)
         return filename
 
@@ -864,7 +997,7 @@ class Dnsmasq(DhcpLocalProcess):
             if alloc:
                 buf.write('%s\t%s %s\n' % (alloc.ip_address, fqdn, hostname))
         addn_hosts = self.get_conf_file_name('addn_hosts')
-        file_utils.replace_file(addn_hosts, buf.getvalue())
+        self._replace_config_file(addn_hosts, buf.getvalue())
         return addn_hosts
 
     def _output_opts_file(self):
@@ -873,7 +1006,7 @@ class Dnsmasq(DhcpLocalProcess):
         options += self._generate_opts_per_port(subnet_index_map)
 
         name = self.get_conf_file_name('opts')
-        file_utils.replace_file(name, '\n'.join(options))
+        self._replace_config_file(name, '\n'.join(options))
         return name
 
     def _generate_opts_per_subnet(self):
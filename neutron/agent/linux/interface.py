@@ -139,15 +139,15 @@ class LinuxInterfaceDriver(object):
 
         # Clean up any old addresses.  This must be done first since there
         # could be a dynamic address being replaced with a static one.
-        for ip_cidr in remove_ips:
-            if clean_connections:
+        if clean_connections:
+            for ip_cidr in remove_ips:
                 device.delete_addr_and_conntrack_state(ip_cidr)
-            else:
-                device.addr.delete(ip_cidr)
+        elif remove_ips:
+            device.addr.delete_multiple(remove_ips)
 
         # add any new addresses
-        for ip_cidr in cidrs:
-            device.addr.add(ip_cidr)
+        if cidrs:
+            device.addr.add_multiple(cidrs)
 
     def init_router_port(self,
                          device_name,
@@ -181,13 +181,15 @@ class LinuxInterfaceDriver(object):
         v6_onlink = device.route.list_onlink_routes(constants.IP_VERSION_6)
         existing_onlink_cidrs = set(r['cidr'] for r in v4_onlink + v6_onlink)
 
-        for route in new_onlink_cidrs - existing_onlink_cidrs:
-            LOG.debug("adding onlink route(%s)", route)
-            device.route.add_onlink_route(route)
-        for route in (existing_onlink_cidrs - new_onlink_cidrs -
-                      set(preserve_ips or [])):
-            LOG.debug("deleting onlink route(%s)", route)
-            device.route.delete_onlink_route(route)
+        add_onlink_cidrs = new_onlink_cidrs - existing_onlink_cidrs
+        if add_onlink_cidrs:
+            LOG.debug("adding onlink routes(%s)", add_onlink_cidrs)
+            device.route.add_onlink_routes(add_onlink_cidrs)
+        delete_onlink_cidrs = (existing_onlink_cidrs - new_onlink_cidrs -
+                               set(preserve_ips or []))
+        if delete_onlink_cidrs:
+            LOG.debug("deleting onlink routes(%s)", delete_onlink_cidrs)
+            device.route.delete_onlink_routes(delete_onlink_cidrs)
 
     def add_ipv6_addr(self, device_name, v6addr, namespace, scope='global'):
         device = ip_lib.IPDevice(device_name,
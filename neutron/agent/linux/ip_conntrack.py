@@ -11,10 +11,12 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import collections
 import re
 
 import eventlet
 import netaddr
+from neutron_lib import constants
 from oslo_concurrency import lockutils
 from oslo_log import log as logging
 from six.moves import queue as Queue
@@ -22,12 +24,40 @@ from six.moves import queue as Queue
 from neutron.agent.linux import utils as linux_utils
 from neutron.common import constants as n_const
 from neutron.common import exceptions as n_exc
+from neutron.privileged.agent.linux import netlink_lib as nl_lib
 
 LOG = logging.getLogger(__name__)
 CONTRACK_MGRS = {}
 MAX_CONNTRACK_ZONES = 65535
 ZONE_START = 4097
 
+# protocols of the conntrack entries the netlink library can delete
+NETLINK_PROTOCOLS = {
+    constants.IP_VERSION_4: {constants.PROTO_NAME_TCP,
+                             constants.PROTO_NAME_UDP,
+                             constants.PROTO_NAME_ICMP},
+    constants.IP_VERSION_6: {constants.PROTO_NAME_TCP,
+                             constants.PROTO_NAME_UDP,
+                             constants.PROTO_NAME_IPV6_ICMP_LEGACY},
+}
+PROTOCOL_NAMES = {str(number): name
+                  for name, number in constants.IP_PROTOCOL_MAP.items()}
+
+
+def _get_netlink_protocol(protocol, ip_version):
+    """Return the name of a rule protocol in the netlink conntrack entries
+
+    None is returned when the entries of the protocol can't be handled with
+    the netlink library.
+    """
+    protocol = PROTOCOL_NAMES.get(str(protocol), str(protocol).lower())
+    if (ip_version == constants.IP_VERSION_6 and
+            protocol in (constants.PROTO_NAME_ICMP,
+                         constants.PROTO_NAME_IPV6_ICMP)):
+        protocol = constants.PROTO_NAME_IPV6_ICMP_LEGACY
+    if protocol in NETLINK_PROTOCOLS[ip_version]:
+        return protocol
+
 
 class IpConntrackUpdate(object):
     """Encapsulates a conntrack update
@@ -81,6 +111,8 @@ class IpConntrackManager(object):
         self.filtered_ports = filtered_ports
         self.unfiltered_ports = unfiltered_ports
         self.zone_per_port = zone_per_port  # zone per port vs per network
+        # the netlink socket is opened in the namespace of the privsep daemon
+        self._use_netlink = namespace is None
         self._populate_initial_zone_map()
         self._queue = IpConntrackProcessingQueue()
         self.start_process_queue()
@@ -95,7 +127,10 @@ class IpConntrackManager(object):
             pool.spawn_n(self._process_queue)
 
     def _process_queue(self):
-        for update in self._queue.updates():
+        updates = list(self._queue.updates())
+        if updates and self._use_netlink:
+            updates = self._delete_conntrack_entries(updates)
+        for update in updates:
             if update.remote_ips:
                 for remote_ip in update.remote_ips:
                     self._delete_conntrack_state(
@@ -164,6 +199,109 @@ class IpConntrackManager(object):
             except RuntimeError:
                 LOG.exception("Failed execute conntrack command %s", cmd)
 
+    def _get_conntrack_filters(self, device_info_list, rule, remote_ip=None):
+        """Return the filters selecting the entries of a rule, by zone
+
+        A filter is a (protocol, remote network) tuple, indexed by the
+        (ip version, direction, port address) of the entries it applies to.
+        None is returned when the rule protocol is not supported by the
+        netlink library.
+        """
+        ethertype = rule.get('ethertype')
+        direction = rule.get('direction')
+        protocol = rule.get('protocol')
+        filters = collections.defaultdict(set)
+        for device_info in device_info_list:
+            zone_id = self.get_device_zone(device_info, create=False)
+            if not zone_id:
+                LOG.debug("No zone for device %(dev)s. Will not try to "
+                          "clear conntrack state. Zone map: %(zm)s",
+                          {'dev': device_info['device'],
+                           'zm': self._device_zone_map})
+                continue
+            for ip in device_info.get('fixed_ips', []):
+                net = netaddr.IPNetwork(ip)
+                if str(net.version) not in ethertype:
+                    continue
+                entry_protocol = None
+                if protocol:
+                    entry_protocol = _get_netlink_protocol(protocol,
+                                                           net.version)
+                    if not entry_protocol:
+                        return None
+                remote_net = None
+                if remote_ip:
+                    remote_net = netaddr.IPNetwork(remote_ip)
+                    if str(remote_net.version) not in ethertype:
+                        remote_net = None
+                filters[(zone_id, net.version, direction, net.ip)].add(
+                    (entry_protocol, remote_net))
+        return filters
+
+    @staticmethod
+    def _entry_matches(entry, zone_filters):
+        # entries are (ip version, protocol, ..., src, dst, ..., zone)
+        ip_version, protocol, src, dst = entry[0], entry[1], entry[4], entry[5]
+        for direction, port_ip, remote_ip in (('ingress', dst, src),
+                                              ('egress', src, dst)):
+            key = (ip_version, direction, netaddr.IPAddress(port_ip))
+            for filter_protocol, remote_net in zone_filters.get(key, ()):
+                if (filter_protocol in (None, protocol) and
+                        (remote_net is None or
+                         netaddr.IPAddress(remote_ip) in remote_net)):
+                    return True
+        return False
+
+    def _delete_conntrack_entries(self, updates):
+        """Delete the conntrack entries of updates with the netlink library
+
+        Each zone the updates apply to is dumped once, and all the matching
+        entries are deleted with a single privileged call.
+
+        :return: the updates which must be processed with the conntrack
+                 command instead.
+        """
+        filters_by_zone = collections.defaultdict(
+            lambda: collections.defaultdict(set))
+        updates_by_zone = collections.defaultdict(list)
+        remaining = []
+        for update in updates:
+            update_filters = [
+                self._get_conntrack_filters(update.device_info_list,
+                                            update.rule, remote_ip)
+                for remote_ip in update.remote_ips or [None]]
+            if None in update_filters:
+                remaining.append(update)
+                continue
+            for filters in update_filters:
+                for (zone, ip_version, direction, port_ip), value in (
+                        filters.items()):
+                    filters_by_zone[zone][
+                        (ip_version, direction, port_ip)] |= value
+                    if update not in updates_by_zone[zone]:
+                        updates_by_zone[zone].append(update)
+        try:
+            entries = []
+            for zone, zone_filters in filters_by_zone.items():
+                zone_entries = [entry for entry in nl_lib.list_entries(zone)
+                                if self._entry_matches(entry, zone_filters)]
+                if any(entry[1] not in nl_lib.ATTR_POSITIONS
+                       for entry in zone_entries):
+                    # Only the conntrack command can delete the entries of
+                    # the protocols the netlink library can't parse, which
+                    # the rules without protocol match
+                    remaining.extend(update for update in updates_by_zone[zone]
+                                     if update not in remaining)
+                    continue
+                entries.extend(zone_entries)
+            if entries:
+                nl_lib.delete_entries(entries)
+        except Exception:
+            LOG.exception("Failed to delete conntrack entries with netlink, "
+                          "falling back to the conntrack command")
+            return updates
+        return remaining
+
     def delete_conntrack_state_by_rule(self, device_info_list, rule):
         self._process(device_info_list, rule)
 
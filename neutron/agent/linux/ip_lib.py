@@ -25,6 +25,7 @@ from neutron_lib import exceptions
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import excutils
+from pyroute2.netlink.rtnl import ifinfmsg
 from pyroute2 import netns
 import six
 
@@ -60,6 +61,22 @@ def remove_interface_suffix(interface):
     return interface.partition("@")[0]
 
 
+def _use_netlink():
+    try:
+        return cfg.CONF.AGENT.use_netlink_for_ip_lib
+    except cfg.NoSuchOptError:
+        # Only the agents registering the root helper options can switch
+        # to the netlink commands.
+        return False
+
+
+def _get_command_class(command_class):
+    """Return the netlink flavor of an ip command class when enabled."""
+    if _use_netlink():
+        return _NETLINK_COMMAND_CLASSES.get(command_class, command_class)
+    return command_class
+
+
 class AddressNotReady(exceptions.NeutronException):
     message = _("Failure waiting for address %(address)s to "
                 "become ready: %(reason)s")
@@ -161,7 +178,7 @@ class IPWrapper(SubProcessBase):
         if not ip:
             return None
 
-        addr = IpAddrCommand(self)
+        addr = _get_command_class(IpAddrCommand)(self)
         devices = addr.get_devices_with_ip(to=ip)
         if devices:
             return IPDevice(devices[0]['name'], namespace=self.namespace)
@@ -268,9 +285,9 @@ class IPDevice(SubProcessBase):
     def __init__(self, name, namespace=None):
         super(IPDevice, self).__init__(namespace=namespace)
         self._name = name
-        self.link = IpLinkCommand(self)
-        self.addr = IpAddrCommand(self)
-        self.route = IpRouteCommand(self)
+        self.link = _get_command_class(IpLinkCommand)(self)
+        self.addr = _get_command_class(IpAddrCommand)(self)
+        self.route = _get_command_class(IpRouteCommand)(self)
         self.neigh = IpNeighCommand(self)
 
     def __eq__(self, other):
@@ -369,7 +386,7 @@ class IpCommandBase(object):
 class IPRule(SubProcessBase):
     def __init__(self, namespace=None):
         super(IPRule, self).__init__(namespace=namespace)
-        self.rule = IpRuleCommand(self)
+        self.rule = _get_command_class(IpRuleCommand)(self)
 
 
 class IpRuleCommand(IpCommandBase):
@@ -479,8 +496,11 @@ class IpRuleCommand(IpCommandBase):
         canonical_kwargs = self._make_canonical(ip_version, kwargs)
 
         if not self._exists(ip_version, **canonical_kwargs):
-            args_tuple = self._make__flat_args_tuple('add', **canonical_kwargs)
-            self._as_root([ip_version], args_tuple)
+            self._add_rule(ip_version, canonical_kwargs)
+
+    def _add_rule(self, ip_version, settings):
+        args_tuple = self._make__flat_args_tuple('add', **settings)
+        self._as_root([ip_version], args_tuple)
 
     def delete(self, ip, **kwargs):
         ip_version = common_utils.get_ip_version(ip)
@@ -488,8 +508,10 @@ class IpRuleCommand(IpCommandBase):
         # TODO(Carl) ip ignored in delete, okay in general?
 
         canonical_kwargs = self._make_canonical(ip_version, kwargs)
+        self._delete_rule(ip_version, canonical_kwargs)
 
-        args_tuple = self._make__flat_args_tuple('del', **canonical_kwargs)
+    def _delete_rule(self, ip_version, settings):
+        args_tuple = self._make__flat_args_tuple('del', **settings)
         self._as_root([ip_version], args_tuple)
 
 
@@ -590,6 +612,14 @@ class IpAddrCommand(IpDeviceCommandBase):
                       ('del', cidr,
                        'dev', self.name))
 
+    def add_multiple(self, cidrs, scope='global', add_broadcast=True):
+        for cidr in cidrs:
+            self.add(cidr, scope=scope, add_broadcast=add_broadcast)
+
+    def delete_multiple(self, cidrs):
+        for cidr in cidrs:
+            self.delete(cidr)
+
     def flush(self, ip_version):
         self._as_root([ip_version], ('flush', self.name))
 
@@ -686,7 +716,7 @@ class IpRouteCommand(IpDeviceCommandBase):
 
     def table(self, table):
         """Return an instance of IpRouteCommand which works on given table"""
-        return IpRouteCommand(self._parent, table)
+        return type(self)(self._parent, table)
 
     def _table_args(self, override=None):
         if override:
@@ -764,6 +794,14 @@ class IpRouteCommand(IpDeviceCommandBase):
     def delete_onlink_route(self, cidr):
         self.delete_route(cidr, scope='link')
 
+    def add_onlink_routes(self, cidrs):
+        for cidr in cidrs:
+            self.add_onlink_route(cidr)
+
+    def delete_onlink_routes(self, cidrs):
+        for cidr in cidrs:
+            self.delete_onlink_route(cidr)
+
     def get_gateway(self, scope=None, filters=None, ip_version=None):
         options = [ip_version] if ip_version else []
 
@@ -827,7 +865,242 @@ class IPRoute(SubProcessBase):
     def __init__(self, namespace=None, table=None):
         super(IPRoute, self).__init__(namespace=namespace)
         self.name = None
-        self.route = IpRouteCommand(self, table=table)
+        self.route = _get_command_class(IpRouteCommand)(self, table=table)
+
+
+class NetlinkIpRuleCommand(IpRuleCommand):
+    """IpRuleCommand sending netlink requests through privsep."""
+
+    def list_rules(self, ip_version):
+        return [self._make_canonical(ip_version, settings) for settings in
+                privileged.list_ip_rules(self._parent.namespace, ip_version)]
+
+    def _add_rule(self, ip_version, settings):
+        privileged.add_ip_rule(self._parent.namespace, ip_version, settings)
+
+    def _delete_rule(self, ip_version, settings):
+        privileged.delete_ip_rule(self._parent.namespace, ip_version,
+                                  settings)
+
+
+class NetlinkIpLinkCommand(IpLinkCommand):
+    """IpLinkCommand sending netlink requests through privsep."""
+
+    def _set(self, **attributes):
+        privileged.set_link_attribute(self.name, self._parent.namespace,
+                                      **attributes)
+
+    def set_address(self, mac_address):
+        self._set(address=mac_address)
+
+    def set_allmulticast_on(self):
+        privileged.set_link_flags(self.name, self._parent.namespace,
+                                  ifinfmsg.IFF_ALLMULTI)
+
+    def set_mtu(self, mtu_size):
+        self._set(mtu=int(mtu_size))
+
+    def set_up(self):
+        self._set(state='up')
+
+    def set_down(self):
+        self._set(state='down')
+
+    def set_netns(self, namespace):
+        self._set(net_ns_fd=namespace)
+        self._parent.namespace = namespace
+
+    def set_name(self, name):
+        self._set(ifname=name)
+        self._parent.name = name
+
+    def set_alias(self, alias_name):
+        self._set(ifalias=alias_name)
+
+    def delete(self):
+        privileged.delete_link(self.name, self._parent.namespace)
+
+    @property
+    def attributes(self):
+        attributes = privileged.get_link_attributes(self.name,
+                                                    self._parent.namespace)
+        return {k: v for k, v in attributes.items() if v is not None}
+
+
+class NetlinkIpAddrCommand(IpAddrCommand):
+    """IpAddrCommand sending netlink requests through privsep."""
+
+    def _call(self, function, *args, **kwargs):
+        try:
+            return function(*args, **kwargs)
+        except privileged.NetworkInterfaceNotFound:
+            raise exceptions.DeviceNotFoundError(device_name=self.name)
+
+    def _address_args(self, cidr):
+        net = netaddr.IPNetwork(cidr)
+        return {'ip_version': net.version,
+                'address': str(net.ip),
+                'prefixlen': net.prefixlen,
+                'device': self.name}
+
+    def _add_args(self, cidr, scope, add_broadcast):
+        args = self._address_args(cidr)
+        args['scope'] = scope
+        net = netaddr.IPNetwork(cidr)
+        if add_broadcast and net.version == 4:
+            args['broadcast'] = str(net[-1])
+        return args
+
+    def add(self, cidr, scope='global', add_broadcast=True):
+        self._call(privileged.add_ip_address,
+                   namespace=self._parent.namespace,
+                   **self._add_args(cidr, scope, add_broadcast))
+
+    def delete(self, cidr):
+        self._call(privileged.delete_ip_address,
+                   namespace=self._parent.namespace,
+                   **self._address_args(cidr))
+
+    def add_multiple(self, cidrs, scope='global', add_broadcast=True):
+        changes = [('add_ip_address',
+                    self._add_args(cidr, scope, add_broadcast))
+                   for cidr in cidrs]
+        if changes:
+            self._call(privileged.apply_ip_changes, self._parent.namespace,
+                       changes)
+
+    def delete_multiple(self, cidrs):
+        changes = [('delete_ip_address', self._address_args(cidr))
+                   for cidr in cidrs]
+        if changes:
+            self._call(privileged.apply_ip_changes, self._parent.namespace,
+                       changes)
+
+    def flush(self, ip_version):
+        self._call(privileged.flush_ip_addresses, ip_version, self.name,
+                   self._parent.namespace)
+
+    def get_devices_with_ip(self, name=None, scope=None, to=None,
+                            filters=None, ip_version=None):
+        if filters:
+            # the filters are given in the syntax of the ip command
+            return super(NetlinkIpAddrCommand, self).get_devices_with_ip(
+                name=name, scope=scope, to=to, filters=filters,
+                ip_version=ip_version)
+        addresses = privileged.get_ip_addresses(
+            self._parent.namespace, device=name, ip_version=ip_version,
+            scope=scope)
+        if to:
+            to_net = netaddr.IPNetwork(to)
+            addresses = [a for a in addresses
+                         if netaddr.IPNetwork(a['cidr']).ip in to_net]
+        return addresses
+
+
+class NetlinkIpRouteCommand(IpRouteCommand):
+    """IpRouteCommand sending netlink requests through privsep.
+
+    The routes are selected by the arguments below, the other ones given in
+    the syntax of the ip command make the calls fall back to it.
+    """
+
+    ROUTE_ARGS = frozenset(['scope', 'metric', 'proto'])
+
+    def _call(self, function, *args, **kwargs):
+        try:
+            return function(self._parent.namespace, *args, **kwargs)
+        except privileged.NetworkInterfaceNotFound:
+            raise exceptions.DeviceNotFoundError(device_name=self.name)
+
+    def add_gateway(self, gateway, metric=None, table=None):
+        ip_version = common_utils.get_ip_version(gateway)
+        self._call(privileged.add_ip_route, ip_version,
+                   constants.IP_ANY[ip_version], device=self.name,
+                   via=gateway, table=table or self._table, metric=metric)
+
+    def delete_gateway(self, gateway, table=None):
+        ip_version = common_utils.get_ip_version(gateway)
+        self._call(privileged.delete_ip_route, ip_version,
+                   constants.IP_ANY[ip_version], device=self.name,
+                   via=gateway, table=table or self._table)
+
+    def list_routes(self, ip_version, **kwargs):
+        if not set(kwargs) <= self.ROUTE_ARGS | set(['via']):
+            return super(NetlinkIpRouteCommand, self).list_routes(
+                ip_version, **kwargs)
+        routes = self._call(privileged.list_ip_routes, ip_version,
+                            device=self.name, table=self._table,
+                            scope=kwargs.get('scope'),
+                            proto=kwargs.get('proto'),
+                            via=kwargs.get('via'))
+        for route in routes:
+            if self._table:
+                route['table'] = self._table
+            route.update(kwargs)
+        return routes
+
+    def get_gateway(self, scope=None, filters=None, ip_version=None):
+        if filters:
+            return super(NetlinkIpRouteCommand, self).get_gateway(
+                scope=scope, filters=filters, ip_version=ip_version)
+        ip_version = ip_version or constants.IP_VERSION_4
+        for route in self._call(privileged.list_ip_routes, ip_version,
+                                device=self.name, table=self._table,
+                                scope=scope):
+            if route['cidr'] == constants.IP_ANY[ip_version]:
+                gateway = {}
+                if 'via' in route:
+                    gateway['gateway'] = route['via']
+                if 'metric' in route:
+                    gateway['metric'] = int(route['metric'])
+                return gateway
+
+    def flush(self, ip_version, table=None, **kwargs):
+        if kwargs:
+            return super(NetlinkIpRouteCommand, self).flush(
+                ip_version, table=table, **kwargs)
+        privileged.flush_ip_routes(self._parent.namespace, ip_version,
+                                   table=table or self._table)
+
+    def _route_args(self, cidr, via, table, kwargs):
+        return dict(kwargs, ip_version=common_utils.get_ip_version(cidr),
+                    cidr=cidr, device=self.name, via=via,
+                    table=table or self._table)
+
+    def add_route(self, cidr, via=None, table=None, **kwargs):
+        if not set(kwargs) <= self.ROUTE_ARGS:
+            return super(NetlinkIpRouteCommand, self).add_route(
+                cidr, via=via, table=table, **kwargs)
+        self._call(privileged.add_ip_route,
+                   **self._route_args(cidr, via, table, kwargs))
+
+    def delete_route(self, cidr, via=None, table=None, **kwargs):
+        if not set(kwargs) <= self.ROUTE_ARGS:
+            return super(NetlinkIpRouteCommand, self).delete_route(
+                cidr, via=via, table=table, **kwargs)
+        self._call(privileged.delete_ip_route,
+                   **self._route_args(cidr, via, table, kwargs))
+
+    def _apply_onlink_routes(self, operation, cidrs):
+        changes = [(operation, self._route_args(cidr, None, None,
+                                                {'scope': 'link'}))
+                   for cidr in cidrs]
+        if changes:
+            self._call(privileged.apply_ip_changes, changes)
+
+    def add_onlink_routes(self, cidrs):
+        self._apply_onlink_routes('add_ip_route', cidrs)
+
+    def delete_onlink_routes(self, cidrs):
+        self._apply_onlink_routes('delete_ip_route', cidrs)
+
+
+_NETLINK_COMMAND_CLASSES = {
+    IpRuleCommand: NetlinkIpRuleCommand,
+    IpLinkCommand: NetlinkIpLinkCommand,
+    IpAddrCommand: NetlinkIpAddrCommand,
+    IpRouteCommand: NetlinkIpRouteCommand,
+}
 
 
 class IpNeighCommand(IpDeviceCommandBase):
@@ -15,9 +15,12 @@ import copy
 
 import netaddr
 from neutron_lib.utils import runtime
+from oslo_log import log as logging
+from oslo_utils import excutils
 
 from neutron.agent.linux import utils as linux_utils
 
+LOG = logging.getLogger(__name__)
 IPSET_ADD_BULK_THRESHOLD = 5
 NET_PREFIX = 'N'
 SWAP_SUFFIX = '-n'
@@ -29,12 +32,22 @@ class IpsetManager(object):
 
        Keeps track of ip addresses per set, using bulk
        or single ip add/remove for smaller changes.
+
+       While the changes are deferred, the set creations, member changes
+       and swaps are gathered and applied by defer_apply_off in a single
+       ipset restore transaction.
     """
 
     def __init__(self, execute=None, namespace=None):
         self.execute = execute or linux_utils.execute
         self.namespace = namespace
         self.ipset_sets = {}
+        # names of the sets found in the system by load_system_sets, None
+        # as long as they are unknown
+        self._system_sets = None
+        self._defer_apply = False
+        self._pending_input = []
+        self._pending_sets = set()
 
     def _sanitize_addresses(self, addresses):
         """This method converts any address to ipset format.
@@ -84,18 +97,106 @@ class IpsetManager(object):
         return add_ips, del_ips
 
     @runtime.synchronized('ipset', external=True)
+    def load_system_sets(self):
+        """Gather the members of the sets already in the system.
+
+        The sets of a previous run of the agent are then updated with only
+        their member changes, and the other sets are created with a plain
+        restore.
+        """
+        try:
+            output = self._apply(['ipset', 'save'], return_output=True)
+        except RuntimeError:
+            LOG.warning("Failed to list the ipsets of the system, their "
+                        "initial creation will be done with swaps")
+            return
+        self._system_sets = set()
+        for line in output.splitlines():
+            words = line.split()
+            if len(words) < 2 or not words[1].startswith(NET_PREFIX):
+                continue
+            set_name = words[1]
+            if words[0] == 'create' and not set_name.endswith(SWAP_SUFFIX):
+                self._system_sets.add(set_name)
+                self.ipset_sets[set_name] = []
+            elif words[0] == 'add' and set_name in self._system_sets:
+                self.ipset_sets[set_name].append(
+                    str(netaddr.IPNetwork(words[2])))
+        LOG.debug("Found %d ipsets in the system", len(self._system_sets))
+
+    def defer_apply_on(self):
+        self._defer_apply = True
+
+    def defer_apply_off(self):
+        self._defer_apply = False
+        if self._pending_input:
+            self._apply_pending()
+
+    @runtime.synchronized('ipset', external=True)
+    def _apply_pending(self):
+        process_input, self._pending_input = self._pending_input, []
+        set_names, self._pending_sets = self._pending_sets, set()
+        try:
+            self._restore_sets(process_input)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                # the content of these sets is unknown, have them refreshed
+                # by the next update
+                for set_name in set_names:
+                    self.ipset_sets.pop(set_name, None)
+        finally:
+            if self._system_sets is not None:
+                self._system_sets |= set_names
+
+    def _set_members_deferred(self, set_name, ethertype, member_ips):
+        self._pending_sets.add(set_name)
+        if not self.set_name_exists(set_name):
+            self._pending_input.append(
+                self._get_create_input(set_name, ethertype))
+            if self._is_missing_from_system(set_name):
+                self._pending_input.extend(
+                    "add %s %s" % (set_name, ip) for ip in member_ips)
+            else:
+                self._pending_input.extend(
+                    self._get_refresh_input(set_name, member_ips, ethertype))
+        else:
+            add_ips = self._get_new_set_ips(set_name, member_ips)
+            del_ips = self._get_deleted_set_ips(set_name, member_ips)
+            if len(add_ips) + len(del_ips) < IPSET_ADD_BULK_THRESHOLD:
+                self._pending_input.extend(
+                    "add %s %s" % (set_name, ip) for ip in add_ips)
+                self._pending_input.extend(
+                    "del %s %s" % (set_name, ip) for ip in del_ips)
+            else:
+                self._pending_input.extend(
+                    self._get_refresh_input(set_name, member_ips, ethertype))
+        self.ipset_sets[set_name] = copy.copy(member_ips)
+
     def set_members_mutate(self, set_name, ethertype, member_ips):
+        if self._defer_apply:
+            self._set_members_deferred(set_name, ethertype, member_ips)
+        else:
+            self._set_members_mutate(set_name, ethertype, member_ips)
+
+    @runtime.synchronized('ipset', external=True)
+    def _set_members_mutate(self, set_name, ethertype, member_ips):
         if not self.set_name_exists(set_name):
+            if self._is_missing_from_system(set_name):
+                # a normal restore is enough for the initial creation
+                process_input = [self._get_create_input(set_name,
+                                                        ethertype)]
+                process_input.extend("add %s %s" % (set_name, ip)
+                                     for ip in member_ips)
+                self._restore_sets(process_input)
+                self._system_sets.add(set_name)
+                self.ipset_sets[set_name] = copy.copy(member_ips)
+                return
             # The initial creation is handled with create/refresh to
             # avoid any downtime for existing sets (i.e. avoiding
             # a flush/restore), as the restore operation of ipset is
             # additive to the existing set.
             self._create_set(set_name, ethertype)
             self._refresh_set(set_name, member_ips, ethertype)
-            # TODO(majopela,shihanzhang,haleyb): Optimize this by
-            # gathering the system ipsets at start. So we can determine
-            # if a normal restore is enough for initial creation.
-            # That should speed up agent boot up time.
         else:
             add_ips = self._get_new_set_ips(set_name, member_ips)
             del_ips = self._get_deleted_set_ips(set_name, member_ips)
@@ -108,8 +209,17 @@ class IpsetManager(object):
     @runtime.synchronized('ipset', external=True)
     def destroy(self, id, ethertype, forced=False):
         set_name = self.get_name(id, ethertype)
+        if set_name in self._pending_sets:
+            self._drop_pending(set_name)
         self._destroy(set_name, forced)
 
+    def _drop_pending(self, set_name):
+        """Drop the deferred changes of a set which is being destroyed."""
+        self._pending_sets.discard(set_name)
+        names = (set_name, set_name + SWAP_SUFFIX)
+        self._pending_input = [line for line in self._pending_input
+                               if line.split()[1] not in names]
+
     def _add_member_to_set(self, set_name, member_ip):
         cmd = ['ipset', 'add', '-exist', set_name, member_ip]
         self._apply(cmd)
@@ -128,6 +238,26 @@ class IpsetManager(object):
         self._destroy(new_set_name, True)
         self.ipset_sets[set_name] = copy.copy(member_ips)
 
+    def _get_create_input(self, set_name, ethertype):
+        return "create %s hash:net family %s" % (
+            set_name, self._get_ipset_set_type(ethertype))
+
+    def _get_refresh_input(self, set_name, member_ips, ethertype):
+        """Return the restore input replacing the members of a set."""
+        new_set_name = set_name + SWAP_SUFFIX
+        # the swap set may be left over by a failed refresh
+        process_input = [self._get_create_input(new_set_name, ethertype),
+                         "flush %s" % new_set_name]
+        process_input.extend("add %s %s" % (new_set_name, ip)
+                             for ip in member_ips)
+        process_input += ["swap %s %s" % (new_set_name, set_name),
+                          "destroy %s" % new_set_name]
+        return process_input
+
+    def _is_missing_from_system(self, set_name):
+        return (self._system_sets is not None and
+                set_name not in self._system_sets)
+
     def _del_member_from_set(self, set_name, member_ip):
         cmd = ['ipset', 'del', set_name, member_ip]
         self._apply(cmd, fail_on_errors=False)
@@ -139,14 +269,17 @@ class IpsetManager(object):
         self._apply(cmd)
         self.ipset_sets[set_name] = []
 
-    def _apply(self, cmd, input=None, fail_on_errors=True):
+    def _apply(self, cmd, input=None, fail_on_errors=True,
+               return_output=False):
         input = '\n'.join(input) if input else None
         cmd_ns = []
         if self.namespace:
             cmd_ns.extend(['ip', 'netns', 'exec', self.namespace])
         cmd_ns.extend(cmd)
-        self.execute(cmd_ns, run_as_root=True, process_input=input,
-                     check_exit_code=fail_on_errors)
+        output = self.execute(cmd_ns, run_as_root=True, process_input=input,
+                              check_exit_code=fail_on_errors)
+        if return_output:
+            return output
 
     def _get_new_set_ips(self, set_name, expected_ips):
         new_member_ips = (set(expected_ips) -
@@ -184,3 +317,5 @@ class IpsetManager(object):
             cmd = ['ipset', 'destroy', set_name]
             self._apply(cmd, fail_on_errors=False)
             self.ipset_sets.pop(set_name, None)
+            if self._system_sets is not None:
+                self._system_sets.discard(set_name)
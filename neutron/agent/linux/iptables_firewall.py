@@ -83,6 +83,7 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
             lambda: collections.defaultdict(list))
         self.pre_sg_members = None
         self.enable_ipset = cfg.CONF.SECURITYGROUP.enable_ipset
+        self._system_ipsets_loaded = False
         self.updated_rule_sg_ids = set()
         self.updated_sg_members = set()
         self.devices_with_updated_sg_members = collections.defaultdict(list)
@@ -119,6 +120,9 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
             self._update_ipset_members(sg_id, sg_members)
 
     def _update_ipset_members(self, sg_id, sg_members):
+        if not self._system_ipsets_loaded:
+            self.ipset.load_system_sets()
+            self._system_ipsets_loaded = True
         devices = self.devices_with_updated_sg_members.pop(sg_id, None)
         for ip_version, current_ips in sg_members.items():
             add_ips, del_ips = self.ipset.set_members(
@@ -689,6 +693,7 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
     def filter_defer_apply_on(self):
         if not self._defer_apply:
             self.iptables.defer_apply_on()
+            self.ipset.defer_apply_on()
             self._pre_defer_filtered_ports = dict(self.filtered_ports)
             self._pre_defer_unfiltered_ports = dict(self.unfiltered_ports)
             self.pre_sg_members = dict(self.sg_members)
@@ -852,11 +857,15 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
                                       self._pre_defer_unfiltered_ports)
             self._setup_chains_apply(self.filtered_ports,
                                      self.unfiltered_ports)
-            self.iptables.defer_apply_off()
-            self._remove_conntrack_entries_from_sg_updates()
-            self._remove_unused_security_group_info()
-            self._pre_defer_filtered_ports = None
-            self._pre_defer_unfiltered_ports = None
+            try:
+                # the sets must exist before the rules matching them
+                self.ipset.defer_apply_off()
+            finally:
+                self.iptables.defer_apply_off()
+                self._remove_conntrack_entries_from_sg_updates()
+                self._remove_unused_security_group_info()
+                self._pre_defer_filtered_ports = None
+                self._pre_defer_unfiltered_ports = None
 
 
 class OVSHybridIptablesFirewallDriver(IptablesFirewallDriver):
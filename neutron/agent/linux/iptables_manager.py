@@ -24,6 +24,7 @@ import difflib
 import os
 import re
 import sys
+import time
 
 from neutron_lib.utils import runtime
 from oslo_concurrency import lockutils
@@ -315,6 +316,11 @@ class IptablesManager(object):
         self.namespace = namespace
         self.iptables_apply_deferred = False
         self.wrap_name = binary_name[:16]
+        # rules of each table as of the last apply, by iptables command, used
+        # to avoid running iptables-save when iptables_full_resync_interval
+        # is set
+        self._applied_rules = {}
+        self._applied_rules_time = {}
 
         self.ipv4 = {'filter': IptablesTable(binary_name=self.wrap_name)}
         self.ipv6 = {'filter': IptablesTable(binary_name=self.wrap_name)}
@@ -545,61 +551,149 @@ class IptablesManager(object):
             s += [('ip6tables', self.ipv6)]
         all_commands = []  # variable to keep track all commands for return val
         for cmd, tables in s:
-            args = ['%s-save' % (cmd,)]
-            if self.namespace:
-                args = ['ip', 'netns', 'exec', self.namespace] + args
-            try:
-                save_output = self.execute(args, run_as_root=True)
-            except RuntimeError:
-                # We could be racing with a cron job deleting namespaces.
-                # It is useless to try to apply iptables rules over and
-                # over again in a endless loop if the namespace does not
-                # exist.
-                with excutils.save_and_reraise_exception() as ctx:
-                    if (self.namespace and not
-                            ip_lib.network_namespace_exists(self.namespace)):
-                        ctx.reraise = False
-                        LOG.error("Namespace %s was deleted during IPTables "
-                                  "operations.", self.namespace)
-                        return []
-            all_lines = save_output.split('\n')
-            commands = []
-            # Traverse tables in sorted order for predictable dump output
-            for table_name in sorted(tables):
-                table = tables[table_name]
-                # isolate the lines of the table we are modifying
-                start, end = self._find_table(all_lines, table_name)
-                old_rules = all_lines[start:end]
-                # generate the new table state we want
-                new_rules = self._modify_rules(old_rules, table, table_name)
-                # generate the iptables commands to get between the old state
-                # and the new state
-                changes = _generate_path_between_rules(old_rules, new_rules)
-                if changes:
-                    # if there are changes to the table, we put on the header
-                    # and footer that iptables-save needs
-                    commands += (['# Generated by iptables_manager'] +
-                                 ['*%s' % table_name] + changes +
-                                 ['COMMIT', '# Completed by iptables_manager'])
-            if not commands:
-                continue
+            commands = None
+            if self._use_applied_rules(cmd):
+                commands = self._apply_from_applied_rules(cmd, tables)
+            if commands is None:
+                commands = self._apply_from_saved_rules(cmd, tables)
+            if commands is None:
+                # namespace was deleted
+                return []
             all_commands += commands
 
-            # always end with a new line
-            commands.append('')
+        LOG.debug("IPTablesManager.apply completed with success. %d iptables "
+                  "commands were issued", len(all_commands))
+        return all_commands
 
-            args = ['%s-restore' % (cmd,), '-n']
-            if self.namespace:
-                args = ['ip', 'netns', 'exec', self.namespace] + args
+    def _use_applied_rules(self, cmd):
+        interval = cfg.CONF.AGENT.iptables_full_resync_interval
+        if (interval <= 0 or cfg.CONF.AGENT.debug_iptables_rules or
+                cmd not in self._applied_rules):
+            return False
+        return time.time() - self._applied_rules_time[cmd] < interval
+
+    def _apply_from_saved_rules(self, cmd, tables):
+        """Apply the rules computing the changes from iptables-save.
 
-            err = self._run_restore(args, commands)
+        Returns the list of commands issued or None if the namespace of the
+        manager was deleted in the meantime.
+        """
+        args = ['%s-save' % (cmd,)]
+        if self.namespace:
+            args = ['ip', 'netns', 'exec', self.namespace] + args
+        try:
+            save_output = self.execute(args, run_as_root=True)
+        except RuntimeError:
+            # We could be racing with a cron job deleting namespaces.
+            # It is useless to try to apply iptables rules over and
+            # over again in a endless loop if the namespace does not
+            # exist.
+            with excutils.save_and_reraise_exception() as ctx:
+                if (self.namespace and not
+                        ip_lib.network_namespace_exists(self.namespace)):
+                    ctx.reraise = False
+                    LOG.error("Namespace %s was deleted during IPTables "
+                              "operations.", self.namespace)
+                    return
+        all_lines = save_output.split('\n')
+        old_rules_by_table = {}
+        for table_name in tables:
+            # isolate the lines of the table we are modifying
+            start, end = self._find_table(all_lines, table_name)
+            old_rules_by_table[table_name] = all_lines[start:end]
+        commands, new_rules_by_table = self._generate_commands(
+            tables, old_rules_by_table)
+        if commands:
+            err = self._run_restore(self._get_restore_args(cmd), commands)
             if err:
+                self._applied_rules.pop(cmd, None)
                 self._log_restore_err(err, commands)
                 raise err
+        if cfg.CONF.AGENT.iptables_full_resync_interval > 0:
+            self._applied_rules[cmd] = new_rules_by_table
+            self._applied_rules_time[cmd] = time.time()
+        return commands[:-1] if commands else []
+
+    def _apply_from_applied_rules(self, cmd, tables):
+        """Apply the rules computing the changes from the last applied ones.
+
+        iptables-save is not run, only the chains which changed since the
+        last apply are sent to iptables-restore. Returns None when the
+        changes can't be applied this way, either because they touch chains
+        which are not owned by this manager and might have been changed by
+        someone else or because iptables-restore failed, which suggests
+        that the system rules drifted from the in-memory copy. The caller
+        then falls back to a full resync.
+        """
+        # _modify_rules consumes the pending removals, keep them around in
+        # case we need to fall back to a full resync
+        removals = {name: (set(table.remove_chains), list(table.remove_rules))
+                    for name, table in tables.items()}
+        commands, new_rules_by_table = self._generate_commands(
+            tables, self._applied_rules[cmd])
+        if commands:
+            foreign = [c for c in commands
+                       if not self._is_own_chain_statement(c)]
+            err = None
+            if not foreign:
+                err = self._run_restore(self._get_restore_args(cmd),
+                                        commands)
+            if foreign or err:
+                if err:
+                    LOG.warning("Failed to apply iptables changes computed "
+                                "from the in-memory rules, falling back to "
+                                "a full resync: %s", err)
+                for name, table in tables.items():
+                    table.remove_chains, table.remove_rules = removals[name]
+                del self._applied_rules[cmd]
+                return
+        self._applied_rules[cmd] = new_rules_by_table
+        return commands[:-1] if commands else []
+
+    def _is_own_chain_statement(self, statement):
+        if statement.startswith(':'):
+            chain = statement[1:].split(' ', 1)[0]
+        elif statement.startswith(('-D ', '-I ', '-X ')):
+            chain = statement.split(' ', 2)[1]
+        else:
+            # table headers and footers
+            return True
+        return chain.startswith(self.wrap_name + '-')
 
-        LOG.debug("IPTablesManager.apply completed with success. %d iptables "
-                  "commands were issued", len(all_commands))
-        return all_commands
+    def _get_restore_args(self, cmd):
+        args = ['%s-restore' % (cmd,), '-n']
+        if self.namespace:
+            args = ['ip', 'netns', 'exec', self.namespace] + args
+        return args
+
+    def _generate_commands(self, tables, old_rules_by_table):
+        """Generate the iptables-restore input to apply the tables.
+
+        Returns the commands, ending with an empty line, and the new rules
+        of every table.
+        """
+        commands = []
+        new_rules_by_table = {}
+        # Traverse tables in sorted order for predictable dump output
+        for table_name in sorted(tables):
+            table = tables[table_name]
+            old_rules = old_rules_by_table.get(table_name, [])
+            # generate the new table state we want
+            new_rules = self._modify_rules(old_rules, table, table_name)
+            new_rules_by_table[table_name] = new_rules
+            # generate the iptables commands to get between the old state
+            # and the new state
+            changes = _generate_path_between_rules(old_rules, new_rules)
+            if changes:
+                # if there are changes to the table, we put on the header
+                # and footer that iptables-save needs
+                commands += (['# Generated by iptables_manager'] +
+                             ['*%s' % table_name] + changes +
+                             ['COMMIT', '# Completed by iptables_manager'])
+        if commands:
+            # always end with a new line
+            commands.append('')
+        return commands, new_rules_by_table
 
     def _find_table(self, lines, table_name):
         if len(lines) < 3:
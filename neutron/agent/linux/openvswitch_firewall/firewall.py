@@ -17,7 +17,11 @@ import collections
 import copy
 
 import netaddr
+from neutron_lib.callbacks import events as callback_events
+from neutron_lib.callbacks import registry
+from neutron_lib.callbacks import resources as callback_resources
 from neutron_lib import constants as lib_const
+from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import netutils
 
@@ -60,6 +64,11 @@ def create_reg_numbers(flow_params):
         flow_params, ovsfw_consts.REG_REMOTE_GROUP, 'reg_remote_group')
 
 
+def _flow_match_key(flow):
+    """Return a hashable key of the match and priority of the given flow."""
+    return frozenset((k, v) for k, v in flow.items() if k != 'actions')
+
+
 def get_tag_from_other_config(bridge, port_name):
     """Return tag stored in OVSDB other_config metadata.
 
@@ -115,6 +124,7 @@ class SecurityGroup(object):
 class OFPort(object):
     def __init__(self, port_dict, ovs_port, vlan_tag):
         self.id = port_dict['device']
+        self.name = ovs_port.port_name
         self.vlan_tag = vlan_tag
         self.mac = ovs_port.vif_mac
         self.lla_address = str(netutils.get_ipv6_addr_by_EUI64(
@@ -298,18 +308,35 @@ class ConjIPFlowManager(object):
 
     def _update_flows_for_vlan_subr(self, direction, ethertype, vlan_tag,
                                     flow_state, addr_to_conj):
-        """Do the actual flow updates for given direction and ethertype."""
+        """Do the actual flow updates for given direction and ethertype.
+
+        Only the flows of the addresses whose conj_ids changed are
+        touched, and of those only the flows whose actions changed are
+        installed again.
+        """
         current_ips = set(flow_state.keys())
         self.driver.delete_flows_for_ip_addresses(
             current_ips - set(addr_to_conj.keys()),
             direction, ethertype, vlan_tag)
         for addr, conj_ids in addr_to_conj.items():
             conj_ids.sort()
-            if flow_state.get(addr) == conj_ids:
+            old_conj_ids = flow_state.get(addr)
+            if old_conj_ids == conj_ids:
                 continue
+            old_flows = {}
+            if old_conj_ids:
+                old_flows = {
+                    _flow_match_key(flow): flow
+                    for flow in rules.create_flows_for_ip_address(
+                        addr, direction, ethertype, vlan_tag, old_conj_ids)}
             for flow in rules.create_flows_for_ip_address(
                     addr, direction, ethertype, vlan_tag, conj_ids):
-                self.driver._add_flow(**flow)
+                if old_flows.pop(_flow_match_key(flow), None) != flow:
+                    self.driver._add_flow(**flow)
+            # The priorities for which no conj_id is left
+            for flow in old_flows.values():
+                del flow['actions']
+                self.driver._strict_delete_flow(**flow)
 
     def update_flows_for_vlan(self, vlan_tag):
         """Install action=conjunction(conj_id, 1/2) flows,
@@ -394,12 +421,28 @@ class OVSFirewallDriver(firewall.FirewallDriver):
         self.sg_port_map = SGPortMap()
         self.sg_to_delete = set()
         self._deferred = False
+        # The flows installed for each filtered port along with the port tag
+        # stored in OVSDB when they were installed, indexed like:
+        #     self._port_flows[port_id] = (vlan_tag, flows)
+        #     flows[_flow_match_key(flow)] = flow
+        self._port_flows = {}
+        # While not None, _add_flow collects the flows in this list instead
+        # of installing them
+        self._compiled_flows = None
+        self._vlans_to_update = set()
         self._drop_all_unmatched_flows()
         self._initialize_third_party_tables()
         self.conj_ip_manager = ConjIPFlowManager(self)
 
         self.iptables_helper = iptables.Helper(self.int_br.br)
         self.iptables_helper.load_driver_if_needed()
+        registry.subscribe(self._reset_port_flows,
+                           callback_resources.AGENT,
+                           callback_events.OVS_RESTARTED)
+
+    def _reset_port_flows(self, resource, event, trigger, **kwargs):
+        """Forget the installed port flows, they are gone with OVS."""
+        self._port_flows.clear()
 
     def security_group_updated(self, action_type, sec_group_ids,
                                device_ids=None):
@@ -418,7 +461,9 @@ class OVSFirewallDriver(firewall.FirewallDriver):
         create_reg_numbers(kwargs)
         if isinstance(dl_type, int):
             kwargs['dl_type'] = "0x{:04x}".format(dl_type)
-        if self._deferred:
+        if self._compiled_flows is not None:
+            self._compiled_flows.append(kwargs)
+        elif self._deferred:
             self.int_br.add_flow(**kwargs)
         else:
             self.int_br.br.add_flow(**kwargs)
@@ -433,15 +478,21 @@ class OVSFirewallDriver(firewall.FirewallDriver):
     def _strict_delete_flow(self, **kwargs):
         """Delete given flow right away even if bridge is deferred.
 
-        Delete command will use strict delete.
+        Delete command will use strict delete. When the deferred flows are
+        applied as one bundle, which can mix strict and non-strict deletes,
+        the deletion is deferred too.
         """
         create_reg_numbers(kwargs)
-        self.int_br.br.delete_flows(strict=True, **kwargs)
+        if self._deferred and cfg.CONF.OVS.use_openflow_bundles:
+            self.int_br.delete_flows(strict=True, **kwargs)
+        else:
+            self.int_br.br.delete_flows(strict=True, **kwargs)
 
     @staticmethod
     def initialize_bridge(int_br):
         int_br.add_protocols(*OVSFirewallDriver.REQUIRED_PROTOCOLS)
-        return int_br.deferred(full_ordered=True)
+        return int_br.deferred(full_ordered=True,
+                               use_bundle=cfg.CONF.OVS.use_openflow_bundles)
 
     def _drop_all_unmatched_flows(self):
         for table in ovs_consts.OVS_FIREWALL_TABLES:
@@ -529,18 +580,78 @@ class OVSFirewallDriver(firewall.FirewallDriver):
 
     def _set_port_filters(self, port, old_port_expected):
         old_of_port = self.get_ofport(port)
-        # Make sure delete old allowed_address_pair MACs because
-        # allowed_address_pair MACs will be updated in
-        # self.get_or_create_ofport(port)
+        # Only an update of a port installs the delta of its flows, all the
+        # flows of a port being prepared are deleted and added again
+        vlan_tag, old_port_flows = self._port_flows.pop(
+            port['device'], (None, {}))
+        if not old_port_expected:
+            old_port_flows = {}
         if old_of_port:
             if not old_port_expected:
                 LOG.info("Initializing port %s that was already "
                          "initialized.", port['device'])
-            self.delete_all_port_flows(old_of_port)
+            # Make sure delete old allowed_address_pair MACs because
+            # allowed_address_pair MACs will be updated in
+            # self.get_or_create_ofport(port)
+            if not old_port_flows:
+                self.delete_all_port_flows(old_of_port)
         # TODO(jlibosva): Handle firewall blink
-        of_port = self.get_or_create_ofport(port)
-        self.initialize_port_flows(of_port)
-        self.add_flows_from_rules(of_port)
+        try:
+            of_port = self.get_or_create_ofport(port)
+        except exceptions.OVSFWPortNotFound:
+            self._install_port_flows({}, old_port_flows)
+            raise
+        port_flows = self._compile_port_flows(of_port)
+        if old_of_port:
+            new_vlan_tag = self._get_installed_vlan_tag(of_port)
+        else:
+            new_vlan_tag = of_port.vlan_tag
+        # The agent deletes all the flows matching the in_port of a port
+        # when it changes the tag of the port, so add all of them again
+        add_all = vlan_tag is None or vlan_tag != new_vlan_tag
+        self._install_port_flows(port_flows, old_port_flows, add_all=add_all)
+        self._port_flows[of_port.id] = (new_vlan_tag, port_flows)
+        self._update_flows_for_vlan(of_port.vlan_tag)
+
+    def _get_installed_vlan_tag(self, port):
+        try:
+            return self._get_port_vlan_tag(port.name)
+        except exceptions.OVSFWTagNotFound:
+            return None
+
+    def _compile_port_flows(self, port):
+        """Return the flows of the given port, indexed by their match."""
+        self._compiled_flows = []
+        try:
+            self.initialize_port_flows(port)
+            self.add_flows_from_rules(port)
+            flows = self._compiled_flows
+        finally:
+            self._compiled_flows = None
+        return {_flow_match_key(flow): flow for flow in flows}
+
+    def _install_port_flows(self, port_flows, old_port_flows, add_all=False):
+        """Install the delta between the old and the new flows of a port.
+
+        Flows whose match is gone are strictly deleted, and only the flows
+        which are new or whose actions changed are added, unless add_all is
+        set.
+        """
+        for key in set(old_port_flows) - set(port_flows):
+            flow = dict(key)
+            self._strict_delete_flow(**flow)
+        for key, flow in port_flows.items():
+            if add_all or old_port_flows.get(key) != flow:
+                self._add_flow(**flow)
+
+    def _update_flows_for_vlan(self, vlan_tag):
+        """Update the conjunction flows of the vlan, once per deferred
+        application when the bridge is deferred.
+        """
+        if self._deferred:
+            self._vlans_to_update.add(vlan_tag)
+        else:
+            self.conj_ip_manager.update_flows_for_vlan(vlan_tag)
 
     def remove_port_filter(self, port):
         """Remove port from firewall
@@ -551,6 +662,7 @@ class OVSFirewallDriver(firewall.FirewallDriver):
         """
         if self.is_port_managed(port):
             of_port = self.get_ofport(port)
+            self._port_flows.pop(of_port.id, None)
             self.delete_all_port_flows(of_port)
             self.sg_port_map.remove_port(of_port)
             for sec_group in of_port.sec_groups:
@@ -606,6 +718,10 @@ class OVSFirewallDriver(firewall.FirewallDriver):
     def filter_defer_apply_off(self):
         if self._deferred:
             self._cleanup_stale_sg()
+            vlans_to_update = self._vlans_to_update
+            self._vlans_to_update = set()
+            for vlan_tag in vlans_to_update:
+                self.conj_ip_manager.update_flows_for_vlan(vlan_tag)
             self.int_br.apply_flows()
             self._deferred = False
 
@@ -1098,8 +1214,6 @@ class OVSFirewallDriver(firewall.FirewallDriver):
 
         self._add_non_ip_conj_flows(port)
 
-        self.conj_ip_manager.update_flows_for_vlan(port.vlan_tag)
-
     def _create_rules_generator_for_port(self, port):
         for sec_group in port.sec_groups:
             for rule in sec_group.raw_rules:
@@ -12,11 +12,18 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import threading
+
+from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
+from ovs.db import idl
+from ovsdbapp.backend.ovs_idl import connection
 
+from neutron.agent.common import ovs_lib
 from neutron.agent.linux import async_process
 from neutron.agent.ovsdb import api as ovsdb
+from neutron.agent.ovsdb.native import connection as n_connection
 from neutron.agent.ovsdb.native import helpers
 from neutron.common import utils
 
@@ -122,3 +129,83 @@ class SimpleInterfaceMonitor(OvsdbMonitor):
         super(SimpleInterfaceMonitor, self).start()
         if block:
             utils.wait_until_true(self.is_active)
+
+
+class SimpleInterfaceIdlMonitor(object):
+    """Monitors the Interface table of the local host's ovsdb for changes.
+
+    It reports the same events as SimpleInterfaceMonitor, which it can be
+    used in place of, but receives them from the change notifications of an
+    OVSDB IDL of the Interface table rather than from the output of an
+    'ovsdb-client monitor' process. There is no process to spawn or respawn
+    and no output to parse, and the IDL reconnects by itself, reporting all
+    the interfaces as added once it does.
+    """
+
+    def __init__(self, ovsdb_timeout=None):
+        self._ovsdb_timeout = ovsdb_timeout or cfg.CONF.OVS.ovsdb_timeout
+        self._connection = None
+        # the IDL notifies the changes from the thread of its connection
+        self._lock = threading.Lock()
+        self.new_events = {'added': [], 'removed': []}
+
+    @staticmethod
+    def _device(row):
+        return {'name': row.name,
+                'ofport': (row.ofport[0] if row.ofport else
+                           ovs_lib.UNASSIGNED_OFPORT),
+                'external_ids': dict(row.external_ids)}
+
+    def _notify(self, event, row, updates=None):
+        with self._lock:
+            if event == idl.ROW_CREATE:
+                self.new_events['added'].append(self._device(row))
+            elif event == idl.ROW_DELETE:
+                self.new_events['removed'].append(self._device(row))
+            elif event == idl.ROW_UPDATE:
+                # update any added interface with the ofport it got since
+                device = self._device(row)
+                for added in self.new_events['added']:
+                    if added['name'] == device['name']:
+                        added['ofport'] = device['ofport']
+
+    def is_active(self):
+        return self._connection is not None
+
+    @property
+    def has_updates(self):
+        """Indicate whether the ovsdb Interface table has been updated."""
+        if not self.is_active():
+            LOG.error("Interface monitor is not active")
+        with self._lock:
+            return bool(self.new_events['added'] or
+                        self.new_events['removed'])
+
+    def get_events(self):
+        with self._lock:
+            events = self.new_events
+            self.new_events = {'added': [], 'removed': []}
+        return events
+
+    def start(self, block=False, timeout=5):
+        """Connect to ovsdb, the interfaces present are reported as added.
+
+        The connection is always established before returning, block and
+        timeout are accepted for compatibility with SimpleInterfaceMonitor.
+        """
+        if self._connection:
+            return
+        monitor_idl = n_connection.monitor_idl_factory(
+            'Interface', ['name', 'ofport', 'external_ids'], self._notify)
+        self._connection = connection.Connection(
+            idl=monitor_idl, timeout=self._ovsdb_timeout)
+        self._connection.start()
+
+    def stop(self, block=False):
+        """Disconnect from ovsdb and discard the events not yet consumed."""
+        if not self._connection:
+            return
+        self._connection.stop()
+        self._connection = None
+        with self._lock:
+            self.new_events = {'added': [], 'removed': []}
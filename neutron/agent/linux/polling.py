@@ -51,9 +51,12 @@ class InterfacePollingMinimizer(base_polling.BasePollingManager):
             ovsdb_monitor_respawn_interval=constants.DEFAULT_OVSDBMON_RESPAWN):
 
         super(InterfacePollingMinimizer, self).__init__()
-        self._monitor = ovsdb_monitor.SimpleInterfaceMonitor(
-            respawn_interval=ovsdb_monitor_respawn_interval,
-            ovsdb_connection=cfg.CONF.OVS.ovsdb_connection)
+        if cfg.CONF.OVS.ovsdb_interface == 'native':
+            self._monitor = ovsdb_monitor.SimpleInterfaceIdlMonitor()
+        else:
+            self._monitor = ovsdb_monitor.SimpleInterfaceMonitor(
+                respawn_interval=ovsdb_monitor_respawn_interval,
+                ovsdb_connection=cfg.CONF.OVS.ovsdb_connection)
 
     def start(self):
         self._monitor.start(block=True)
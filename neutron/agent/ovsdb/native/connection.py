@@ -50,9 +50,7 @@ def configure_ssl_conn():
     Stream.ssl_set_ca_cert_file(req_ssl_opts['ssl_ca_cert_file'])
 
 
-def idl_factory():
-    conn = cfg.CONF.OVS.ovsdb_connection
-    schema_name = 'Open_vSwitch'
+def _get_schema_helper(conn, schema_name='Open_vSwitch'):
     if conn.startswith('ssl:'):
         configure_ssl_conn()
     try:
@@ -68,6 +66,36 @@ def idl_factory():
 
         helper = do_get_schema_helper()
 
+    return helper
+
+
+def idl_factory():
+    conn = cfg.CONF.OVS.ovsdb_connection
+    helper = _get_schema_helper(conn)
     # TODO(twilson) We should still select only the tables/columns we use
     helper.register_all()
     return idl.Idl(conn, helper)
+
+
+class NotifyingIdl(idl.Idl):
+    """An IDL which passes the changes of its rows to a callback.
+
+    The callback is called as callback(event, row, updates) from the thread
+    running the IDL, for every row created, updated or deleted, including
+    the rows of the initial contents of the monitored tables.
+    """
+
+    def __init__(self, remote, schema_helper, notify_callback):
+        super(NotifyingIdl, self).__init__(remote, schema_helper)
+        self._notify_callback = notify_callback
+
+    def notify(self, event, row, updates=None):
+        self._notify_callback(event, row, updates)
+
+
+def monitor_idl_factory(table, columns, notify_callback):
+    """Return an IDL of some columns of a table reporting their changes."""
+    conn = cfg.CONF.OVS.ovsdb_connection
+    helper = _get_schema_helper(conn)
+    helper.register_columns(table, columns)
+    return NotifyingIdl(conn, helper, notify_callback)
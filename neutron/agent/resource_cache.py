@@ -31,11 +31,17 @@ class RemoteResourceCache(object):
     """Retrieves and stashes logical resources in their OVO format.
 
     This is currently only compatible with OVO objects that have an ID.
+
+    Secondary indexes can be declared for attributes of a resource type with
+    add_index. They are used by get_resources to avoid scanning every cached
+    object when all the filters are on indexed attributes.
     """
     def __init__(self, resource_types):
         self.resource_types = resource_types
         self._cache_by_type_and_id = {rt: {} for rt in self.resource_types}
         self._deleted_ids_by_type = {rt: set() for rt in self.resource_types}
+        # rtype -> attribute -> value -> set of IDs
+        self._indexes_by_type = {rt: {} for rt in self.resource_types}
         # track everything we've asked the server so we don't ask again
         self._satisfied_server_queries = set()
         self._puller = resources_rpc.ResourcesPullRpcApi()
@@ -45,6 +51,66 @@ class RemoteResourceCache(object):
             raise RuntimeError("Resource cache not tracking %s" % rtype)
         return self._cache_by_type_and_id[rtype]
 
+    def add_index(self, rtype, attribute):
+        """Declare a secondary index on an attribute of a resource type.
+
+        If the attribute is a list, a tuple or a set, each of its values is
+        indexed. Attribute values must be hashable.
+        """
+        index = self._indexes_by_type[rtype].setdefault(attribute, {})
+        for resource in self._type_cache(rtype).values():
+            self._add_to_index(index, attribute, resource)
+
+    @staticmethod
+    def _get_index_values(attribute, resource):
+        try:
+            attr = getattr(resource, attribute)
+        except (AttributeError, NotImplementedError):
+            # unset fields are not indexed
+            return ()
+        if isinstance(attr, (list, tuple, set)):
+            return attr
+        return (attr, )
+
+    def _add_to_index(self, index, attribute, resource):
+        for value in self._get_index_values(attribute, resource):
+            index.setdefault(value, set()).add(resource.id)
+
+    def _remove_from_index(self, index, attribute, resource):
+        for value in self._get_index_values(attribute, resource):
+            ids = index.get(value)
+            if ids is None:
+                continue
+            ids.discard(resource.id)
+            if not ids:
+                del index[value]
+
+    def _update_indexes(self, rtype, existing, resource):
+        for attribute, index in self._indexes_by_type[rtype].items():
+            if existing:
+                self._remove_from_index(index, attribute, existing)
+            if resource:
+                self._add_to_index(index, attribute, resource)
+
+    def _get_indexed_ids(self, rtype, filters):
+        """Returns IDs of resources matching the indexed filters.
+
+        Returns None if none of the filter keys is indexed.
+        """
+        indexes = self._indexes_by_type[rtype]
+        result = None
+        for key, values in filters.items():
+            index = indexes.get(key)
+            if index is None:
+                continue
+            ids = set()
+            for value in values:
+                ids.update(index.get(value, ()))
+            result = ids if result is None else result & ids
+            if not result:
+                break
+        return result
+
     def start_watcher(self):
         self._watcher = RemoteResourceWatcher(self)
 
@@ -134,11 +200,21 @@ class RemoteResourceCache(object):
                     # no match found for this key
                     return False
             return True
-        return self.match_resources_with_func(rtype, match)
+
+        indexed_ids = self._get_indexed_ids(rtype, filters)
+        if indexed_ids is None:
+            return self.match_resources_with_func(rtype, match)
+        type_cache = self._type_cache(rtype)
+        unindexed_keys = set(filters) - set(self._indexes_by_type[rtype])
+        if not unindexed_keys:
+            return [type_cache[obj_id] for obj_id in indexed_ids]
+        candidates = (type_cache[obj_id] for obj_id in indexed_ids)
+        return [r for r in candidates if match(r)]
 
     def match_resources_with_func(self, rtype, matcher):
         """Returns a list of all resources satisfying func matcher."""
-        # TODO(kevinbenton): this is O(N), offer better lookup functions
+        # NOTE: this is O(N), get_resources uses the declared indexes when
+        # the filters allow it.
         return [r for r in self._type_cache(rtype).values()
                 if matcher(r)]
 
@@ -171,6 +247,7 @@ class RemoteResourceCache(object):
             return
         existing = self._type_cache(rtype).get(resource.id)
         self._type_cache(rtype)[resource.id] = resource
+        self._update_indexes(rtype, existing, resource)
         changed_fields = self._get_changed_fields(existing, resource)
         if not changed_fields:
             LOG.debug("Received resource %s update without any changes: %s",
@@ -202,6 +279,7 @@ class RemoteResourceCache(object):
             return
         self._deleted_ids_by_type[rtype].add(resource_id)
         existing = self._type_cache(rtype).pop(resource_id, None)
+        self._update_indexes(rtype, existing, None)
         # local notification for agent internals to subscribe to
         registry.notify(rtype, events.AFTER_DELETE, self, context=context,
                         existing=existing, resource_id=resource_id)
@@ -169,6 +169,8 @@ def create_cache_for_l2_agent():
         resources.SUBNET
     ]
     rcache = resource_cache.RemoteResourceCache(resource_types)
+    rcache.add_index(resources.PORT, 'security_group_ids')
+    rcache.add_index(resources.SECURITYGROUPRULE, 'security_group_id')
     rcache.start_watcher()
     return rcache
 
@@ -207,6 +207,12 @@ class DhcpAgentNotifyAPI(object):
         self._cast_message(context, 'network_create_end',
                            {'network': {'id': network_id}}, host)
 
+    def networks_added_to_agent(self, context, network_ids, host):
+        cctxt = self.client.prepare(topic=topics.DHCP_AGENT, server=host,
+                                    version='1.1')
+        cctxt.cast(context, 'networks_added_to_agent',
+                   payload={'network_ids': network_ids})
+
     def agent_updated(self, context, admin_state_up, host):
         self._cast_message(context, 'agent_updated',
                            {'admin_state_up': admin_state_up}, host)
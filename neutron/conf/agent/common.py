@@ -99,6 +99,13 @@ ROOT_HELPER_OPTS = [
                       "in the hypervisor of XenServer, this item should be "
                       "set to 'xenapi_root_helper', so that it will keep a "
                       "XenAPI session to pass commands to Dom0.")),
+    cfg.BoolOpt('use_netlink_for_ip_lib',
+                default=False,
+                help=_("Configure the links, addresses, routes and rules "
+                       "of the devices with netlink requests sent through "
+                       "the privsep daemon instead of spawning an 'ip' "
+                       "command for each change. Batches of changes are "
+                       "then applied with a single privileged call.")),
 ]
 
 AGENT_STATE_OPTS = [
@@ -128,6 +135,15 @@ IPTABLES_OPTS = [
                        "of iptables-save. This option should not be turned "
                        "on for production systems because it imposes a "
                        "performance penalty.")),
+    cfg.IntOpt('iptables_full_resync_interval', default=0, min=0,
+               help=_("Interval in seconds between full resyncs of the "
+                      "iptables rules. In between, changes are computed "
+                      "against the rules applied last instead of the output "
+                      "of iptables-save and only the changed chains of the "
+                      "agent are sent to iptables-restore. Changes touching "
+                      "chains not owned by the agent or failing to apply "
+                      "always trigger a full resync. Set to 0 to run "
+                      "iptables-save on every apply.")),
 ]
 
 PROCESS_MONITOR_OPTS = [
@@ -19,6 +19,16 @@ AGENT_OPTS = [
                help=_("Seconds to regard the agent is down; should be at "
                       "least twice report_interval, to be sure the "
                       "agent is down for good.")),
+    cfg.IntOpt('agent_heartbeat_flush_interval', default=0, min=0,
+               help=_("Seconds between the writes of the buffered agent "
+                      "heartbeats to the database. When greater than 0, a "
+                      "state report of an agent that is alive and whose "
+                      "state has not changed only updates the heartbeat "
+                      "timestamp of the agent, and the timestamps received "
+                      "by a server process are written together every "
+                      "agent_heartbeat_flush_interval seconds. Should be "
+                      "much lower than agent_down_time. 0 writes every "
+                      "state report as it is received.")),
     cfg.StrOpt('dhcp_load_type', default='networks',
                choices=['networks', 'subnets', 'ports'],
                help=_('Representing the resource type whose load is being '
@@ -58,7 +58,16 @@ DHCP_AGENT_OPTS = [
     cfg.IntOpt('num_sync_threads', default=4,
                help=_('Number of threads to use during sync process. '
                       'Should not exceed connection pool size configured on '
-                      'server.'))
+                      'server.')),
+    cfg.IntOpt('max_num_sync_threads', default=0, min=0,
+               help=_('Maximum number of threads to use during sync '
+                      'process. When larger than num_sync_threads, the '
+                      'number of threads starts at num_sync_threads and is '
+                      'adapted to the time the networks take to be '
+                      'configured: it grows as long as this time stays '
+                      'close to the best one measured and shrinks when it '
+                      'degrades. Should not exceed connection pool size '
+                      'configured on server.')),
 ]
 
 DHCP_OPTS = [
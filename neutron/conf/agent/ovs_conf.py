@@ -27,6 +27,13 @@ OPTS = [
                help=_('Timeout in seconds for ovsdb commands. '
                       'If the timeout expires, ovsdb commands will fail with '
                       'ALARMCLOCK error.')),
+    cfg.BoolOpt('use_openflow_bundles', default=False,
+                help=_('Apply the flow changes that the agents gather, like '
+                       'the ones of the openvswitch firewall or of an '
+                       'iteration of the OVS agent with the native '
+                       'of_interface, as one OpenFlow bundle per bridge, so '
+                       'that they take effect atomically. Requires Open '
+                       'vSwitch 2.6 or newer.')),
 ]
 
 
@@ -113,7 +113,11 @@ core_opts = [
     cfg.StrOpt('ipam_driver', default='internal',
                help=_("Neutron IPAM (IP address management) driver to use. "
                       "By default, the reference implementation of the "
-                      "Neutron IPAM driver is used.")),
+                      "Neutron IPAM driver is used. The 'internal_range' "
+                      "driver is a flavour of the reference implementation "
+                      "which keeps an index of the free address ranges of "
+                      "each subnet, making address allocation independent "
+                      "of the number of allocated addresses.")),
     cfg.BoolOpt('vlan_transparent', default=False,
                 help=_('If True, then allow plugins that support it to '
                        'create VLAN transparent networks.')),
@@ -0,0 +1,32 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_config import cfg
+
+from neutron._i18n import _
+
+
+SG_MEMBER_IPS_CACHE_OPTS = [
+    cfg.BoolOpt('cache_sg_member_ips',
+                default=False,
+                help=_("Cache in each server process the IP addresses of "
+                       "the members of the remote security groups used to "
+                       "answer the security group RPC calls of the agents. "
+                       "The cached addresses of a group are reused as long "
+                       "as its member generation, stored in the database "
+                       "and incremented on every change of its member "
+                       "ports, is unchanged.")),
+]
+
+
+def register_db_securitygroups_rpc_opts(conf=cfg.CONF):
+    conf.register_opts(SG_MEMBER_IPS_CACHE_OPTS)
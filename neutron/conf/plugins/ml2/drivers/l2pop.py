@@ -22,6 +22,13 @@ l2_population_options = [
     cfg.IntOpt('agent_boot_time', default=180,
                help=_('Delay within which agent is expected to update '
                       'existing ports when it restarts')),
+    cfg.FloatOpt('notification_batch_interval', default=0.5, min=0,
+                 help=_('Time in seconds during which the FDB entries to '
+                        'add or remove notified to the L2 agents are '
+                        'gathered, so that the consecutive notifications '
+                        'of the same kind to the same agents are merged '
+                        'and sent as one. 0 sends every notification as '
+                        'soon as it is made.')),
 ]
 
 
@@ -61,6 +61,22 @@ core_quota_opts = [
                 help=_('Keep in track in the database of current resource '
                        'quota usage. Plugins which do not leverage the '
                        'neutron database should set this flag to False.')),
+    cfg.IntOpt('quota_limit_cache_ttl',
+               default=0, min=0,
+               help=_('Number of seconds the quota limits of a tenant are '
+                      'cached by every API worker of the database quota '
+                      'driver. Changes to the limits invalidate the caches '
+                      'of all the workers within '
+                      'quota_limit_cache_generation_interval seconds. Set to '
+                      '0 to disable the cache.')),
+    cfg.IntOpt('quota_limit_cache_generation_interval',
+               default=1, min=0,
+               help=_('Number of seconds between the checks, done by every '
+                      'API worker, of the database generation counter of '
+                      'the quota limits, which is changed whenever a limit '
+                      'changes. This is the maximum time for a worker to '
+                      'notice limits changed on another one. Only used when '
+                      'quota_limit_cache_ttl is set.')),
 ]
 
 # security_group_quota_opts from neutron/extensions/securitygroup.py
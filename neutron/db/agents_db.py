@@ -14,6 +14,7 @@
 #    under the License.
 
 import datetime
+import os
 
 from eventlet import greenthread
 from neutron_lib.agent import constants as agent_consts
@@ -31,8 +32,10 @@ from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging
 from oslo_serialization import jsonutils
+from oslo_service import loopingcall
 from oslo_utils import importutils
 from oslo_utils import timeutils
+import sqlalchemy as sa
 
 from neutron.agent.common import utils
 from neutron.api.rpc.callbacks import version_manager
@@ -57,6 +60,158 @@ agents_db.register_db_agents_opts()
 DOWNTIME_VERSIONS_RATIO = 2
 
 
+class AgentHeartbeatBuffer(object):
+    """Write-behind buffer of the heartbeats of the agents.
+
+    The state of an agent written to the database by this server process is
+    remembered along with the time of its last heartbeat. While a state
+    report of the agent brings the same state, the agent only needs its
+    heartbeat_timestamp updated, which is buffered and written with the ones
+    of the other agents every agent_heartbeat_flush_interval seconds.
+
+    A heartbeat is only buffered if this process received the previous one
+    recently enough for the agent to still be alive, so that an agent being
+    revived always has its state fully written. The heartbeat is only
+    written if the state in the database is still the one of the report,
+    the report is fully written otherwise, as another server process wrote
+    a different state of the agent meanwhile.
+    """
+
+    def __init__(self, write_state):
+        # the function fully writing a state report:
+        #     write_state(context, agent_state, state, heartbeat)
+        self._write_state = write_state
+        # (agent_type, host) -> (agent id, state, heartbeat_timestamp)
+        self._agents = {}
+        # agent id -> (heartbeat_timestamp, state, agent_state) to write
+        self._pending = {}
+        self._flush_loop_pid = None
+
+    def remember(self, state, agent_id, heartbeat):
+        """Record the state of an agent that has just been written."""
+        self._agents[(state['agent_type'], state['host'])] = (
+            agent_id, state, heartbeat)
+        # the state was written along with a newer heartbeat
+        self._pending.pop(agent_id, None)
+
+    def forget(self, agent_id):
+        for key, (cached_id, __, __) in list(self._agents.items()):
+            if cached_id == agent_id:
+                del self._agents[key]
+        self._pending.pop(agent_id, None)
+
+    def buffer_heartbeat(self, state, agent_state, heartbeat):
+        """Buffer the heartbeat of an agent if its state is unchanged.
+
+        Returns False if the state of the agent has to be written instead.
+        """
+        key = (state['agent_type'], state['host'])
+        cached = self._agents.get(key)
+        if not cached:
+            return False
+        agent_id, cached_state, last_heartbeat = cached
+        interval = cfg.CONF.agent_heartbeat_flush_interval
+        if (cached_state != state or timeutils.is_older_than(
+                last_heartbeat, cfg.CONF.agent_down_time - interval)):
+            return False
+        self._agents[key] = (agent_id, cached_state, heartbeat)
+        self._pending[agent_id] = (heartbeat, state, dict(agent_state))
+        self._start_flush_loop(interval)
+        return True
+
+    def _start_flush_loop(self, interval):
+        # the loop of the process which created the buffer does not run in
+        # the workers forked since
+        if self._flush_loop_pid == os.getpid():
+            return
+        self._flush_loop_pid = os.getpid()
+        loop = loopingcall.FixedIntervalLoopingCall(self.flush)
+        loop.start(interval=interval, initial_delay=interval)
+
+    def flush(self):
+        """Write the buffered heartbeats to the database."""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        agents_table = agent_model.Agent.__table__
+        states = [state for __, state, __ in pending.values()]
+        columns = sorted(set().union(*states))
+        # a single statement conditioned on the state of each agent, the
+        # columns not in the state of every agent are only compared for
+        # the agents whose state has them
+        conditions = [agents_table.c.id == sa.bindparam('agent_id')]
+        for column in columns:
+            condition = (agents_table.c[column] ==
+                         sa.bindparam('state_' + column))
+            if not all(column in state for state in states):
+                condition = sa.or_(
+                    sa.bindparam('skip_' + column, type_=sa.Boolean),
+                    condition)
+            conditions.append(condition)
+        update = agents_table.update().where(sa.and_(*conditions)).values(
+            heartbeat_timestamp=sa.bindparam('heartbeat'))
+        params = []
+        for agent_id, (heartbeat, state, __) in pending.items():
+            values = {'agent_id': agent_id, 'heartbeat': heartbeat}
+            for column in columns:
+                values['state_' + column] = state.get(column)
+                values['skip_' + column] = column not in state
+            params.append(values)
+        stale_ids = []
+        try:
+            admin_context = context.get_admin_context()
+            with db_api.context_manager.writer.using(admin_context):
+                result = admin_context.session.execute(update, params)
+                if result.rowcount != len(params):
+                    stale_ids = self._get_stale_agent_ids(
+                        admin_context, pending, columns)
+        except Exception:
+            LOG.exception("Failed to write the heartbeats of %d agents, "
+                          "they will be written with the next ones",
+                          len(pending))
+            for agent_id, entry in pending.items():
+                self._pending.setdefault(agent_id, entry)
+            return
+        LOG.debug("Wrote the heartbeats of %d agents",
+                  len(pending) - len(stale_ids))
+        # the agents whose state was written by another server process, or
+        # which were deleted, meanwhile have their report fully written
+        for agent_id in stale_ids:
+            heartbeat, state, agent_state = pending[agent_id]
+            self.forget(agent_id)
+            try:
+                self._write_state(admin_context, agent_state, dict(state),
+                                  heartbeat)
+            except Exception:
+                LOG.exception("Failed to write the state of the %(type)s "
+                              "agent on host %(host)s, it will be written "
+                              "with its next report",
+                              {'type': state['agent_type'],
+                               'host': state['host']})
+
+    @staticmethod
+    def _get_stale_agent_ids(context, pending, columns):
+        """Return the IDs of the agents whose heartbeat was not written.
+
+        The update only gives the number of rows written, the agents not
+        written are the ones whose state in the database does not match the
+        one of their buffered heartbeat, as the update compared them.
+        """
+        agents_table = agent_model.Agent.__table__
+        query = context.session.query(
+            agents_table.c.id, *[agents_table.c[column] for column in columns])
+        rows = dict((row[0], dict(zip(columns, row[1:]))) for row in
+                    query.filter(agents_table.c.id.in_(list(pending))))
+        stale_ids = []
+        for agent_id, (__, state, __) in pending.items():
+            row = rows.get(agent_id)
+            # NULL never matches in the update
+            if row is None or any(value is None or row[column] != value
+                                  for column, value in state.items()):
+                stale_ids.append(agent_id)
+        return stale_ids
+
+
 def get_availability_zones_by_agent_type(context, agent_type,
                                          availability_zones):
     """Get list of availability zones based on agent type"""
@@ -207,6 +362,9 @@ class AgentDbMixin(ext_agent.AgentPluginBase, AgentAvailabilityZoneMixin):
         registry.notify(resources.AGENT, events.BEFORE_DELETE, self,
                         context=context, agent=agent)
         agent.delete()
+        heartbeat_buffer = self._get_heartbeat_buffer()
+        if heartbeat_buffer:
+            heartbeat_buffer.forget(id)
 
     @db_api.retry_if_session_inactive()
     def update_agent(self, context, id, agent):
@@ -293,6 +451,20 @@ class AgentDbMixin(ext_agent.AgentPluginBase, AgentAvailabilityZoneMixin):
         """
         return candidate_hosts
 
+    def filter_hosts_with_networks_access(
+            self, context, network_ids, candidate_hosts):
+        """Filter hosts with access to each network of network_ids.
+
+        This method returns a dict of the subsets of candidate_hosts with
+        network access to each network, keyed by network ID.
+
+        A plugin can overload this method to filter the hosts of several
+        networks more efficiently than one network at a time.
+        """
+        return dict((network_id, self.filter_hosts_with_network_access(
+                     context, network_id, candidate_hosts))
+                    for network_id in network_ids)
+
     def _log_heartbeat(self, state, agent_db, agent_conf):
         if agent_conf.get('log_agent_heartbeats'):
             delta = timeutils.utcnow() - agent_db.heartbeat_timestamp
@@ -303,6 +475,14 @@ class AgentDbMixin(ext_agent.AgentPluginBase, AgentAvailabilityZoneMixin):
                       'uuid': state.get('uuid'),
                       'delta': delta})
 
+    def _get_heartbeat_buffer(self):
+        if not cfg.CONF.agent_heartbeat_flush_interval:
+            return None
+        if not getattr(self, '_heartbeat_buffer', None):
+            self._heartbeat_buffer = AgentHeartbeatBuffer(
+                self._write_agent_state)
+        return self._heartbeat_buffer
+
     @db_api.retry_if_session_inactive()
     def create_or_update_agent(self, context, agent_state):
         """Registers new agent in the database or updates existing.
@@ -310,21 +490,38 @@ class AgentDbMixin(ext_agent.AgentPluginBase, AgentAvailabilityZoneMixin):
         Returns tuple of agent status and state.
         Status is from server point of view: alive, new or revived.
         It could be used by agent to do some sync with the server if needed.
+
+        With agent_heartbeat_flush_interval set, the state report of an
+        alive agent whose state is unchanged only has its heartbeat buffered
+        and does not notify the AGENT AFTER_UPDATE event.
         """
         status = agent_consts.AGENT_ALIVE
+        res_keys = ['agent_type', 'binary', 'host', 'topic']
+        res = dict((k, agent_state[k]) for k in res_keys)
+        if 'availability_zone' in agent_state:
+            res['availability_zone'] = agent_state['availability_zone']
+        configurations_dict = agent_state.get('configurations', {})
+        res['configurations'] = jsonutils.dumps(configurations_dict)
+        resource_versions_dict = agent_state.get('resource_versions')
+        if resource_versions_dict:
+            res['resource_versions'] = jsonutils.dumps(
+                resource_versions_dict)
+        res['load'] = self._get_agent_load(agent_state)
+        current_time = timeutils.utcnow()
+        heartbeat_buffer = self._get_heartbeat_buffer()
+        if (heartbeat_buffer and not agent_state.get('start_flag') and
+                not configurations_dict.get('log_agent_heartbeats') and
+                heartbeat_buffer.buffer_heartbeat(dict(res), agent_state,
+                                                  current_time)):
+            return status, agent_state
+        return self._write_agent_state(context, agent_state, res,
+                                       current_time)
+
+    def _write_agent_state(self, context, agent_state, res, current_time):
+        status = agent_consts.AGENT_ALIVE
+        state = dict(res)
+        configurations_dict = agent_state.get('configurations', {})
         with context.session.begin(subtransactions=True):
-            res_keys = ['agent_type', 'binary', 'host', 'topic']
-            res = dict((k, agent_state[k]) for k in res_keys)
-            if 'availability_zone' in agent_state:
-                res['availability_zone'] = agent_state['availability_zone']
-            configurations_dict = agent_state.get('configurations', {})
-            res['configurations'] = jsonutils.dumps(configurations_dict)
-            resource_versions_dict = agent_state.get('resource_versions')
-            if resource_versions_dict:
-                res['resource_versions'] = jsonutils.dumps(
-                    resource_versions_dict)
-            res['load'] = self._get_agent_load(agent_state)
-            current_time = timeutils.utcnow()
             try:
                 agent = self._get_agent_by_type_and_host(
                     context, agent_state['agent_type'], agent_state['host'])
@@ -359,6 +556,9 @@ class AgentDbMixin(ext_agent.AgentPluginBase, AgentAvailabilityZoneMixin):
                 status = agent_consts.AGENT_NEW
             greenthread.sleep(0)
 
+        heartbeat_buffer = self._get_heartbeat_buffer()
+        if heartbeat_buffer:
+            heartbeat_buffer.remember(state, agent.id, current_time)
         registry.notify(resources.AGENT, event_type, self, context=context,
                         host=agent_state['host'], plugin=self,
                         agent=agent_state)
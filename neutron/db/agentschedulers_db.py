@@ -218,34 +218,43 @@ class DhcpAgentSchedulerDbMixin(dhcpagentscheduler
                              additional_time)
         return agent_expected_up > timeutils.utcnow()
 
-    def _schedule_network(self, context, network_id, dhcp_notifier):
-        LOG.info("Scheduling unhosted network %s", network_id)
+    def _schedule_networks(self, context, network_ids, dhcp_notifier):
+        LOG.info("Scheduling %d unhosted networks", len(network_ids))
         try:
-            # TODO(enikanorov): have to issue redundant db query
-            # to satisfy scheduling interface
-            network = self.get_network(context, network_id)
-            agents = self.schedule_network(context, network)
-            if not agents:
-                LOG.info("Failed to schedule network %s, "
-                         "no eligible agents or it might be "
-                         "already scheduled by another server",
-                         network_id)
-                return
-            if not dhcp_notifier:
-                return
-            for agent in agents:
-                LOG.info("Adding network %(net)s to agent "
-                         "%(agent)s on host %(host)s",
-                         {'net': network_id,
-                          'agent': agent.id,
-                          'host': agent.host})
-                dhcp_notifier.network_added_to_agent(
-                    context, network_id, agent.host)
+            networks = self.get_networks(context,
+                                         filters={'id': list(network_ids)})
+            agent_networks = self.schedule_networks(context, networks) or []
         except Exception:
-            # catching any exception during scheduling
-            # so if _schedule_network is invoked in the loop it could
-            # continue in any case
-            LOG.exception("Failed to schedule network %s", network_id)
+            LOG.exception("Failed to schedule networks %s", network_ids)
+            return
+        unscheduled_ids = set(network_ids)
+        for agent, agent_network_ids in agent_networks:
+            unscheduled_ids -= set(agent_network_ids)
+        if unscheduled_ids:
+            LOG.info("Failed to schedule networks %s, "
+                     "no eligible agents or they might be "
+                     "already scheduled by another server",
+                     list(unscheduled_ids))
+        if not dhcp_notifier:
+            return
+        for agent, agent_network_ids in agent_networks:
+            LOG.info("Adding networks %(nets)s to agent "
+                     "%(agent)s on host %(host)s",
+                     {'nets': agent_network_ids,
+                      'agent': agent.id,
+                      'host': agent.host})
+            try:
+                if agent.configurations.get('bulk_network_notifications'):
+                    dhcp_notifier.networks_added_to_agent(
+                        context, agent_network_ids, agent.host)
+                    continue
+                # agents not advertising it predate the bulk notification
+                for network_id in agent_network_ids:
+                    dhcp_notifier.network_added_to_agent(
+                        context, network_id, agent.host)
+            except Exception:
+                LOG.exception("Failed to notify agent %s of the networks "
+                              "scheduled to it", agent.id)
 
     def _filter_bindings(self, context, bindings):
         """Skip bindings for which the agent is dead, but starting up."""
@@ -303,6 +312,7 @@ class DhcpAgentSchedulerDbMixin(dhcpagentscheduler
                 LOG.warning("No DHCP agents available, "
                             "skipping rescheduling")
                 return
+            network_ids = set()
             for binding in dead_bindings:
                 LOG.warning("Removing network %(network)s from agent "
                             "%(agent)s because the agent did not report "
@@ -335,9 +345,12 @@ class DhcpAgentSchedulerDbMixin(dhcpagentscheduler
                                   "%(agent)s",
                                   saved_binding)
 
-                if cfg.CONF.network_auto_schedule:
-                    self._schedule_network(
-                        context, saved_binding['net'], dhcp_notifier)
+                network_ids.add(saved_binding['net'])
+
+            # the networks are scheduled together, so that the agents and
+            # their load are looked up once and each agent is notified once
+            if cfg.CONF.network_auto_schedule and network_ids:
+                self._schedule_networks(context, network_ids, dhcp_notifier)
         except Exception:
             # we want to be thorough and catch whatever is raised
             # to avoid loop abortion
@@ -466,6 +479,11 @@ class DhcpAgentSchedulerDbMixin(dhcpagentscheduler
             return self.network_scheduler.schedule(
                 self, context, created_network)
 
+    def schedule_networks(self, context, networks):
+        if self.network_scheduler:
+            return self.network_scheduler.schedule_networks(
+                self, context, networks)
+
     def auto_schedule_networks(self, context, host):
         if self.network_scheduler:
             self.network_scheduler.auto_schedule_networks(self, context, host)
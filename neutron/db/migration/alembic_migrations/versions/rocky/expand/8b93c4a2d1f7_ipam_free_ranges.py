@@ -0,0 +1,40 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""ipam free ranges
+
+Revision ID: 8b93c4a2d1f7
+Revises: 594422d373ee
+Create Date: 2018-01-15 10:21:43.118347
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '8b93c4a2d1f7'
+down_revision = '594422d373ee'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'ipamfreeranges',
+        sa.Column('ipam_subnet_id', sa.String(length=36),
+                  sa.ForeignKey('ipamsubnets.id', ondelete='CASCADE'),
+                  nullable=False),
+        sa.Column('first_ip', sa.String(length=32), nullable=False),
+        sa.Column('last_ip', sa.String(length=32), nullable=False),
+        sa.PrimaryKeyConstraint('ipam_subnet_id', 'first_ip'))
+    op.create_index('ix_ipamfreeranges_ipam_subnet_id_last_ip',
+                    'ipamfreeranges', ['ipam_subnet_id', 'last_ip'])
@@ -0,0 +1,36 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""quota generation
+
+Revision ID: c1d4e7f3a9b2
+Revises: 8b93c4a2d1f7
+Create Date: 2018-01-22 14:37:05.664021
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'c1d4e7f3a9b2'
+down_revision = '8b93c4a2d1f7'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'quotagenerations',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('generation', sa.BigInteger(), server_default='0',
+                  nullable=False),
+        sa.PrimaryKeyConstraint('id'))
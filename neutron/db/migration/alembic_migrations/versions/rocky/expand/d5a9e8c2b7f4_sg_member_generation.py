@@ -0,0 +1,39 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""security group member generation
+
+Revision ID: d5a9e8c2b7f4
+Revises: c1d4e7f3a9b2
+Create Date: 2018-02-05 10:12:41.318270
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'd5a9e8c2b7f4'
+down_revision = 'c1d4e7f3a9b2'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'securitygroupmembergenerations',
+        sa.Column('security_group_id', sa.String(length=36), nullable=False),
+        sa.Column('generation', sa.BigInteger(), server_default='0',
+                  nullable=False),
+        sa.ForeignKeyConstraint(['security_group_id'],
+                                ['securitygroups.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('security_group_id'))
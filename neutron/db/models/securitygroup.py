@@ -95,3 +95,21 @@ class SecurityGroupRule(standard_attr.HasStandardAttributes, model_base.BASEV2,
         backref=orm.backref('source_rules', cascade='all,delete'),
         primaryjoin="SecurityGroup.id==SecurityGroupRule.remote_group_id")
     api_collections = [sg.SECURITYGROUPRULES]
+
+
+class SecurityGroupMemberGeneration(model_base.BASEV2):
+    """Generation of the member ports of a security group.
+
+    It is bumped whenever a port joins or leaves the group or the addresses
+    of one of its member ports change, for the neutron servers caching the
+    member IP addresses to find out when their cache entry is outdated.
+    """
+
+    __tablename__ = 'securitygroupmembergenerations'
+
+    security_group_id = sa.Column(sa.String(36),
+                                  sa.ForeignKey("securitygroups.id",
+                                                ondelete="CASCADE"),
+                                  primary_key=True)
+    generation = sa.Column(sa.BigInteger, nullable=False,
+                           server_default="0")
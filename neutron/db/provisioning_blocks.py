@@ -141,6 +141,44 @@ def provisioning_complete(context, object_id, object_type, entity):
                         context=context, object_id=object_id)
 
 
+@db_api.retry_if_session_inactive()
+def provisioning_complete_bulk(context, object_ids, object_type, entity):
+    """Mark that the provisioning for many objects has been completed.
+
+    Bulk version of 'provisioning_complete'. The standard attribute IDs of
+    all objects are looked up, the provisioning components for entity are
+    removed and the remaining ones are checked with a constant number of
+    queries. A PROVISIONING_COMPLETE callback is then triggered for every
+    object that has no remaining provisioning components.
+
+    :param context: neutron api request context
+    :param object_ids: IDs of the objects that have been provisioned
+    :param object_type: callback resource type of the objects
+    :param entity: The entity that has provisioned the objects
+    """
+    # this can't be called in a transaction to avoid REPEATABLE READ
+    # tricking us into thinking there are remaining provisioning components
+    if context.session.is_active:
+        raise RuntimeError("Must not be called in a transaction")
+    std_attr_ids = _get_standard_attr_ids(context, object_ids, object_type)
+    if not std_attr_ids:
+        return
+    pb_obj.ProvisioningBlock.delete_objects(
+        context, standard_attr_id=list(std_attr_ids.values()), entity=entity)
+    blocked = {block.standard_attr_id for block in
+               pb_obj.ProvisioningBlock.get_objects(
+                   context, standard_attr_id=list(std_attr_ids.values()))}
+    for object_id, standard_attr_id in std_attr_ids.items():
+        if standard_attr_id in blocked:
+            continue
+        LOG.debug("Provisioning complete for %(otype)s %(oid)s triggered by "
+                  "entity %(entity)s.",
+                  {'oid': object_id, 'entity': entity, 'otype': object_type})
+        registry.notify(object_type, PROVISIONING_COMPLETE,
+                        'neutron.db.provisioning_blocks',
+                        context=context, object_id=object_id)
+
+
 @db_api.retry_if_session_inactive()
 def is_object_blocked(context, object_id, object_type):
     """Return boolean indicating if object has a provisioning block.
@@ -158,13 +196,18 @@ def is_object_blocked(context, object_id, object_type):
         context, standard_attr_id=standard_attr_id)
 
 
-def _get_standard_attr_id(context, object_id, object_type):
+def _get_model_for_resource(object_type):
     model = _RESOURCE_TO_MODEL_MAP.get(object_type)
     if not model:
         raise RuntimeError("Could not find model for %s. If you are "
                            "adding provisioning blocks for a new resource "
                            "you must call add_model_for_resource during "
                            "initialization for your type." % object_type)
+    return model
+
+
+def _get_standard_attr_id(context, object_id, object_type):
+    model = _get_model_for_resource(object_type)
     obj = (context.session.query(model).enable_eagerloads(False).
            filter_by(id=object_id).first())
     if not obj:
@@ -172,3 +215,13 @@ def _get_standard_attr_id(context, object_id, object_type):
         LOG.debug("Could not find standard attr ID for object %s.", object_id)
         return
     return obj.standard_attr_id
+
+
+def _get_standard_attr_ids(context, object_ids, object_type):
+    model = _get_model_for_resource(object_type)
+    if not object_ids:
+        return {}
+    query = (context.session.query(model.id, model.standard_attr_id).
+             enable_eagerloads(False).filter(model.id.in_(object_ids)))
+    return {object_id: standard_attr_id
+            for object_id, standard_attr_id in query}
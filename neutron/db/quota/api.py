@@ -16,8 +16,12 @@ import collections
 import datetime
 
 from neutron.db import api as db_api
+from neutron.db.quota import models as quota_models
 from neutron.objects import quota as quota_obj
 
+# The quota limits generation is stored in a single row
+QUOTA_GENERATION_ID = 1
+
 
 # Wrapper for utcnow - needed for mocking it in unit tests
 def utcnow():
@@ -53,6 +57,27 @@ def get_quota_usage_by_resource_and_tenant(context, resource, tenant_id):
                           result.dirty)
 
 
+@db_api.retry_if_session_inactive()
+def get_quota_usage_by_resources_and_tenant(context, resources, tenant_id):
+    """Return usage info for multiple resources of a tenant.
+
+    :param context: Request context
+    :param resources: Names of the resources
+    :param tenant_id: Tenant identifier
+    :returns: a dictionary mapping resource names to QuotaUsageInfo
+              instances. Resources without usage info are not included.
+    """
+    if not resources:
+        return {}
+    objs = quota_obj.QuotaUsage.get_objects_dirty_protected(
+        context, resource=list(resources), project_id=tenant_id)
+    return dict((item.resource, QuotaUsageInfo(item.resource,
+                                               item.project_id,
+                                               item.in_use,
+                                               item.dirty))
+                for item in objs)
+
+
 @db_api.retry_if_session_inactive()
 def get_quota_usage_by_resource(context, resource):
     objs = quota_obj.QuotaUsage.get_objects(context, resource=resource)
@@ -235,3 +260,36 @@ def get_reservations_for_resources(context, tenant_id, resources,
 @db_api.context_manager.writer
 def remove_expired_reservations(context, tenant_id=None):
     return quota_obj.Reservation.delete_expired(context, utcnow(), tenant_id)
+
+
+@db_api.retry_if_session_inactive()
+def get_quota_generation(context):
+    """Return the current generation of the quota limits.
+
+    :param context: Neutron context with db session
+    :returns: an integer which changes whenever a quota limit changes
+    """
+    with db_api.context_manager.reader.using(context):
+        generation = context.session.query(
+            quota_models.QuotaGeneration.generation).filter_by(
+                id=QUOTA_GENERATION_ID).scalar()
+    return generation or 0
+
+
+@db_api.retry_if_session_inactive()
+def bump_quota_generation(context):
+    """Increment the generation of the quota limits.
+
+    This must be called whenever quota limits are changed, within the same
+    transaction, for the caches of the neutron servers to be invalidated.
+
+    :param context: Neutron context with db session
+    """
+    model = quota_models.QuotaGeneration
+    with db_api.context_manager.writer.using(context):
+        updated = context.session.query(model).filter_by(
+            id=QUOTA_GENERATION_ID).update(
+                {'generation': model.generation + 1},
+                synchronize_session=False)
+        if not updated:
+            context.session.add(model(id=QUOTA_GENERATION_ID, generation=1))
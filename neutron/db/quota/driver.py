@@ -13,10 +13,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import time
+
 from neutron_lib.api import attributes
 from neutron_lib import exceptions
 from neutron_lib.plugins import constants
 from neutron_lib.plugins import directory
+from oslo_config import cfg
 from oslo_log import log
 
 from neutron.common import exceptions as n_exc
@@ -28,6 +31,69 @@ from neutron.quota import resource as res
 LOG = log.getLogger(__name__)
 
 
+class QuotaLimitCache(object):
+    """Per process cache of the quota limits of tenants.
+
+    Entries expire after quota_limit_cache_ttl seconds. The whole cache is
+    also cleared when the generation of the quota limits stored in the
+    database changes, which is checked at most once every
+    quota_limit_cache_generation_interval seconds.
+    """
+
+    def __init__(self):
+        self._limits = {}
+        self._generation = None
+        self._generation_checked_at = None
+
+    @property
+    def enabled(self):
+        return cfg.CONF.QUOTAS.quota_limit_cache_ttl > 0
+
+    def _check_generation(self, context, now):
+        interval = cfg.CONF.QUOTAS.quota_limit_cache_generation_interval
+        if (self._generation_checked_at is not None and
+                now - self._generation_checked_at < interval):
+            return
+        generation = quota_api.get_quota_generation(context)
+        if generation != self._generation:
+            LOG.debug("Quota limits generation changed from %(old)s to "
+                      "%(new)s, clearing the quota limit cache",
+                      {'old': self._generation, 'new': generation})
+            self._limits.clear()
+            self._generation = generation
+        else:
+            # take the chance to evict the expired entries
+            ttl = cfg.CONF.QUOTAS.quota_limit_cache_ttl
+            for tenant_id, (cached_at, _limits) in list(self._limits.items()):
+                if now - cached_at >= ttl:
+                    del self._limits[tenant_id]
+        self._generation_checked_at = now
+
+    def get(self, context, tenant_id):
+        """Return the cached limits of a tenant and the cache generation.
+
+        The limits are None when they are not cached. The generation must be
+        passed to set() when caching the limits loaded from the database.
+        """
+        now = time.time()
+        self._check_generation(context, now)
+        entry = self._limits.get(tenant_id)
+        if entry and now - entry[0] < cfg.CONF.QUOTAS.quota_limit_cache_ttl:
+            return entry[1], self._generation
+        return None, self._generation
+
+    def set(self, tenant_id, limits, generation):
+        # limits loaded before the cache was last cleared might be stale
+        if generation == self._generation:
+            self._limits[tenant_id] = (time.time(), limits)
+
+    def invalidate(self, tenant_id):
+        self._limits.pop(tenant_id, None)
+
+
+_LIMIT_CACHE = QuotaLimitCache()
+
+
 class DbQuotaDriver(object):
     """Driver to perform necessary checks to enforce quotas and obtain quota
     information.
@@ -69,12 +135,26 @@ class DbQuotaDriver(object):
                             for key, resource in resources.items())
 
         # update with tenant specific limits
-        quota_objs = quota_obj.Quota.get_objects(context, project_id=tenant_id)
-        for item in quota_objs:
-            tenant_quota[item['resource']] = item['limit']
+        tenant_quota.update(DbQuotaDriver._get_tenant_limits(
+            context, tenant_id))
 
         return tenant_quota
 
+    @staticmethod
+    def _get_tenant_limits(context, tenant_id):
+        """Return the quota limits specific to a tenant, possibly cached."""
+        generation = None
+        if _LIMIT_CACHE.enabled:
+            limits, generation = _LIMIT_CACHE.get(context, tenant_id)
+            if limits is not None:
+                return limits
+        quota_objs = quota_obj.Quota.get_objects(context, project_id=tenant_id)
+        limits = dict((item['resource'], item['limit'])
+                      for item in quota_objs)
+        if _LIMIT_CACHE.enabled:
+            _LIMIT_CACHE.set(tenant_id, limits, generation)
+        return limits
+
     @staticmethod
     @db_api.retry_if_session_inactive()
     def get_detailed_tenant_quotas(context, resources, tenant_id):
@@ -87,11 +167,14 @@ class DbQuotaDriver(object):
         """
         res_reserve_info = quota_api.get_reservations_for_resources(
             context, tenant_id, resources.keys())
+        tracked_used = res.count_used_tracked_resources(
+            context, tenant_id,
+            [resource for resource in resources.values()
+             if isinstance(resource, res.TrackedResource)])
         tenant_quota_ext = {}
         for key, resource in resources.items():
             if isinstance(resource, res.TrackedResource):
-                used = resource.count_used(context, tenant_id,
-                                           resync_usage=False)
+                used = tracked_used[key]
             else:
                 # NOTE(ihrachys) .count won't use the plugin we pass, but we
                 # pass it regardless to keep the quota driver API intact
@@ -119,10 +202,13 @@ class DbQuotaDriver(object):
         Raise a "not found" error if the quota for the given tenant was
         never defined.
         """
-        if quota_obj.Quota.delete_objects(
-            context, project_id=tenant_id) < 1:
-            # No record deleted means the quota was not found
-            raise n_exc.TenantQuotaNotFound(tenant_id=tenant_id)
+        with db_api.context_manager.writer.using(context):
+            if quota_obj.Quota.delete_objects(
+                context, project_id=tenant_id) < 1:
+                # No record deleted means the quota was not found
+                raise n_exc.TenantQuotaNotFound(tenant_id=tenant_id)
+            quota_api.bump_quota_generation(context)
+        _LIMIT_CACHE.invalidate(tenant_id)
 
     @staticmethod
     @db_api.retry_if_session_inactive()
@@ -160,14 +246,17 @@ class DbQuotaDriver(object):
     @staticmethod
     @db_api.retry_if_session_inactive()
     def update_quota_limit(context, tenant_id, resource, limit):
-        tenant_quotas = quota_obj.Quota.get_objects(
-            context, project_id=tenant_id, resource=resource)
-        if tenant_quotas:
-            tenant_quotas[0].limit = limit
-            tenant_quotas[0].update()
-        else:
-            quota_obj.Quota(context, project_id=tenant_id, resource=resource,
-                            limit=limit).create()
+        with db_api.context_manager.writer.using(context):
+            tenant_quotas = quota_obj.Quota.get_objects(
+                context, project_id=tenant_id, resource=resource)
+            if tenant_quotas:
+                tenant_quotas[0].limit = limit
+                tenant_quotas[0].update()
+            else:
+                quota_obj.Quota(context, project_id=tenant_id,
+                                resource=resource, limit=limit).create()
+            quota_api.bump_quota_generation(context)
+        _LIMIT_CACHE.invalidate(tenant_id)
 
     def _get_quotas(self, context, tenant_id, resources):
         """Retrieves the quotas for specific resources.
@@ -223,17 +312,27 @@ class DbQuotaDriver(object):
                       ",".join(unlimited_resources))
             requested_resources = (set(requested_resources) -
                                    unlimited_resources)
-            # Gather current usage information
-            # TODO(salv-orlando): calling count() for every resource triggers
-            # multiple queries on quota usage. This should be improved, however
-            # this is not an urgent matter as the REST API currently only
-            # allows allocation of a resource at a time
+            # Gather current usage information. Usage and reservations of
+            # tracked resources are fetched for all of them at once, the other
+            # resources are counted one at a time
+            tracked_resources = [
+                resource for resource in requested_resources
+                if isinstance(resources[resource], res.TrackedResource)]
+            current_usages = res.count_used_tracked_resources(
+                context, tenant_id,
+                [resources[resource] for resource in tracked_resources])
+            if tracked_resources:
+                reserved = quota_api.get_reservations_for_resources(
+                    context, tenant_id, tracked_resources)
+                for resource in tracked_resources:
+                    current_usages[resource] += reserved.get(resource, 0)
             # NOTE: pass plugin too for compatibility with CountableResource
             # instances
-            current_usages = dict(
+            current_usages.update(
                 (resource, resources[resource].count(
                     context, plugin, tenant_id, resync_usage=False)) for
-                resource in requested_resources)
+                resource in requested_resources
+                if resource not in current_usages)
             # Adjust for expired reservations. Apparently it is cheaper than
             # querying every time for active reservations and counting overall
             # quantity of resources reserved
@@ -59,3 +59,15 @@ class QuotaUsage(model_base.BASEV2, model_base.HasProjectPrimaryKeyIndex):
                        server_default="0")
     reserved = sa.Column(sa.Integer, nullable=False,
                          server_default="0")
+
+
+class QuotaGeneration(model_base.BASEV2):
+    """Generation of the quota limits, bumped whenever a limit changes.
+
+    Neutron servers caching quota limits poll this value to find out when
+    their cache must be invalidated.
+    """
+
+    id = sa.Column(sa.Integer, primary_key=True, autoincrement=False)
+    generation = sa.Column(sa.BigInteger, nullable=False,
+                           server_default="0")
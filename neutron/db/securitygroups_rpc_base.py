@@ -14,13 +14,17 @@
 #    under the License.
 
 import netaddr
+from neutron_lib.api.definitions import allowedaddresspairs as addr_apidef
 from neutron_lib.callbacks import events
 from neutron_lib.callbacks import registry
 from neutron_lib.callbacks import resources
 from neutron_lib import constants as const
 from neutron_lib.utils import helpers
+from oslo_config import cfg
+from oslo_db import exception as db_exc
 
 from neutron._i18n import _
+from neutron.conf.db import securitygroups_rpc_base as sg_rpc_conf
 from neutron.db import api as db_api
 from neutron.db.models import allowed_address_pair as aap_models
 from neutron.db.models import securitygroup as sg_models
@@ -34,6 +38,15 @@ DIRECTION_IP_PREFIX = {'ingress': 'source_ip_prefix',
 
 DHCP_RULE_PORT = {4: (67, 68, const.IPv4), 6: (547, 546, const.IPv6)}
 
+sg_rpc_conf.register_db_securitygroups_rpc_opts()
+
+
+def _get_port_ips(port):
+    ips = set(ip['ip_address'] for ip in port.get('fixed_ips') or [])
+    ips.update(pair['ip_address']
+               for pair in port.get(addr_apidef.ADDRESS_PAIRS) or [])
+    return ips
+
 
 @registry.has_registry_receivers
 class SecurityGroupServerNotifierRpcMixin(sg_db.SecurityGroupDbMixin):
@@ -352,10 +365,74 @@ class SecurityGroupInfoAPIMixin(object):
         raise NotImplementedError()
 
 
+@registry.has_registry_receivers
 class SecurityGroupServerRpcMixin(SecurityGroupInfoAPIMixin,
                                   SecurityGroupServerNotifierRpcMixin):
     """Server-side RPC mixin using DB for SG notifications and responses."""
 
+    @property
+    def _sg_member_ips_cache(self):
+        # created on demand since the mixin has no constructor, it maps
+        # the group IDs to their member generation and member IP addresses
+        try:
+            return self._sg_member_ips_cache_dict
+        except AttributeError:
+            self._sg_member_ips_cache_dict = {}
+            return self._sg_member_ips_cache_dict
+
+    @registry.receives(resources.PORT, [events.PRECOMMIT_CREATE,
+                                        events.PRECOMMIT_UPDATE,
+                                        events.PRECOMMIT_DELETE])
+    def bump_sg_member_generations(self, resource, event, trigger, context,
+                                   port, **kwargs):
+        """Bump the member generation of the groups of a changed port.
+
+        This is done within the transaction of the port change, so that no
+        server keeps on using member IPs cached before the change once it
+        is committed.
+        """
+        sg_ids = set(port.get(ext_sg.SECURITYGROUPS) or [])
+        original_port = kwargs.get('original_port')
+        if original_port is not None:
+            original_sg_ids = set(
+                original_port.get(ext_sg.SECURITYGROUPS) or [])
+            if (sg_ids == original_sg_ids and
+                    _get_port_ips(port) == _get_port_ips(original_port)):
+                return
+            sg_ids |= original_sg_ids
+        if sg_ids:
+            self._bump_sg_member_generations(context, sg_ids)
+
+    @registry.receives(resources.SECURITY_GROUP, [events.AFTER_DELETE])
+    def evict_sg_member_ips(self, resource, event, trigger,
+                            security_group_id, **kwargs):
+        self._sg_member_ips_cache.pop(security_group_id, None)
+
+    def _bump_sg_member_generations(self, context, sg_ids):
+        model = sg_models.SecurityGroupMemberGeneration
+        with db_api.context_manager.writer.using(context):
+            query = context.session.query(model).filter(
+                model.security_group_id.in_(sg_ids))
+            updated = query.update({'generation': model.generation + 1},
+                                   synchronize_session=False)
+            if updated == len(sg_ids):
+                return
+            # the rows are created on the first change of the group members
+            existing = set(sg_id for sg_id, in context.session.query(
+                model.security_group_id).filter(
+                    model.security_group_id.in_(sg_ids)))
+            for sg_id in set(sg_ids) - existing:
+                context.session.add(
+                    model(security_group_id=sg_id, generation=1))
+
+    def _get_sg_member_generations(self, context, sg_ids):
+        model = sg_models.SecurityGroupMemberGeneration
+        generations = dict.fromkeys(sg_ids, 0)
+        query = context.session.query(model.security_group_id,
+                                      model.generation)
+        generations.update(query.filter(model.security_group_id.in_(sg_ids)))
+        return generations
+
     @db_api.retry_if_session_inactive()
     def _select_sg_ids_for_ports(self, context, ports):
         if not ports:
@@ -384,6 +461,35 @@ class SecurityGroupServerRpcMixin(SecurityGroupInfoAPIMixin,
 
     @db_api.retry_if_session_inactive()
     def _select_ips_for_remote_group(self, context, remote_group_ids):
+        if not remote_group_ids or not cfg.CONF.cache_sg_member_ips:
+            return self._select_ips_for_remote_group_from_db(
+                context, remote_group_ids)
+        cache = self._sg_member_ips_cache
+        ips_by_group = {}
+        outdated = {}
+        with db_api.context_manager.reader.using(context):
+            # The generations are read before the addresses: the addresses
+            # of a port change committed in between are cached with the
+            # older generation and reloaded on the next call.
+            generations = self._get_sg_member_generations(
+                context, set(remote_group_ids))
+            for sg_id, generation in generations.items():
+                entry = cache.get(sg_id)
+                if entry and entry[0] == generation:
+                    ips_by_group[sg_id] = entry[1]
+                else:
+                    outdated[sg_id] = generation
+            if outdated:
+                loaded = self._select_ips_for_remote_group_from_db(
+                    context, list(outdated))
+                for sg_id, ips in loaded.items():
+                    ips = frozenset(ips)
+                    cache[sg_id] = (outdated[sg_id], ips)
+                    ips_by_group[sg_id] = ips
+        return ips_by_group
+
+    def _select_ips_for_remote_group_from_db(self, context,
+                                             remote_group_ids):
         ips_by_group = {}
         if not remote_group_ids:
             return ips_by_group
@@ -214,6 +214,11 @@ class L3AgentSchedulerPluginBase(object):
         """Override this method to conditionally schedule routers."""
         return True
 
+    def routers_supporting_scheduling(self, context, router_ids):
+        """Return the ids of the given routers which can be scheduled."""
+        return [router_id for router_id in router_ids
+                if self.router_supports_scheduling(context, router_id)]
+
 
 def notify(context, action, router_id, agent_id):
     info = {'id': agent_id, 'router_id': router_id}
@@ -13,11 +13,30 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import netaddr
+from oslo_db import exception as db_exc
 from oslo_utils import uuidutils
 
 from neutron.common import constants as const
+from neutron.db import api as db_api
+from neutron.ipam.drivers.neutrondb_ipam import db_models
 from neutron.objects import ipam as ipam_objs
 
+
+def _int_to_key(value):
+    """Convert an integer IP address into a sortable free range key."""
+    return '%032x' % value
+
+
+def _key_to_int(key):
+    return int(key, 16)
+
+
+# Key of the marker row recording that the free range index of a subnet has
+# been built. It sorts after the keys of every address so that it is only
+# returned as the first free range when no address is left.
+_INDEX_BUILT_KEY = 'x'
+
 # Database operations for Neutron's DB-backed IPAM driver
 
 
@@ -138,3 +157,152 @@ class IpamSubnetManager(object):
             context,
             ipam_subnet_id=self._ipam_subnet_id,
             ip_address=ip_address)
+
+    def _free_ranges_query(self, context, *columns):
+        return (context.session.query(*columns).
+                filter_by(ipam_subnet_id=self._ipam_subnet_id))
+
+    def rebuild_free_ranges(self, context, pools):
+        """Rebuild the free range index of the subnet.
+
+        The free ranges are computed from the allocation pools minus the
+        current allocations. A marker row is stored along with them so that
+        an exhausted subnet can be told apart from a subnet whose index was
+        never built.
+
+        :param context: neutron api request context
+        :param pools: list of netaddr.IPRange allocation pools
+        """
+        free_set = netaddr.IPSet()
+        for pool in pools:
+            free_set.add(pool)
+        for allocation in self.list_allocations(context):
+            free_set.remove(allocation.ip_address)
+        with db_api.context_manager.writer.using(context):
+            self._free_ranges_query(context, db_models.IpamFreeRange).delete(
+                synchronize_session=False)
+            # NOTE: rows are inserted without being attached to the session
+            # since they are only ever modified with query level updates
+            context.session.bulk_insert_mappings(
+                db_models.IpamFreeRange,
+                [{'ipam_subnet_id': self._ipam_subnet_id,
+                  'first_ip': _int_to_key(free_range.first),
+                  'last_ip': _int_to_key(free_range.last)}
+                 for free_range in free_set.iter_ipranges()] +
+                [{'ipam_subnet_id': self._ipam_subnet_id,
+                  'first_ip': _INDEX_BUILT_KEY,
+                  'last_ip': _INDEX_BUILT_KEY}])
+
+    def get_first_free_range(self, context):
+        """Return the lowest free range of the subnet.
+
+        :param context: neutron api request context
+        :returns: a (first, last) tuple of integer IP addresses, an empty
+            tuple if there are no free ranges left or None if the free range
+            index of the subnet has not been built.
+        """
+        model = db_models.IpamFreeRange
+        free_range = (self._free_ranges_query(
+            context, model.first_ip, model.last_ip).
+            order_by(model.first_ip).first())
+        if not free_range:
+            return None
+        if free_range[0] == _INDEX_BUILT_KEY:
+            return ()
+        return _key_to_int(free_range[0]), _key_to_int(free_range[1])
+
+    def _get_free_range_with_ip(self, context, ip_int):
+        model = db_models.IpamFreeRange
+        key = _int_to_key(ip_int)
+        free_range = (self._free_ranges_query(
+            context, model.first_ip, model.last_ip).
+            filter(model.first_ip <= key).
+            order_by(model.first_ip.desc()).first())
+        if free_range and free_range[1] >= key:
+            return free_range
+
+    def _update_free_range(self, context, first_ip, last_ip, values=None):
+        """Update or delete a free range if it was not changed meanwhile.
+
+        The range is matched on both its boundaries, so that concurrent
+        writers which changed it in the meantime make the statement match
+        no rows. In that case the whole operation is retried.
+        """
+        query = self._free_ranges_query(
+            context, db_models.IpamFreeRange).filter_by(first_ip=first_ip,
+                                                        last_ip=last_ip)
+        if values is None:
+            count = query.delete(synchronize_session=False)
+        else:
+            count = query.update(values, synchronize_session=False)
+        if not count:
+            raise db_exc.RetryRequest(
+                Exception("Free range %(first)s-%(last)s of IPAM subnet "
+                          "%(subnet)s was concurrently modified" %
+                          {'first': first_ip, 'last': last_ip,
+                           'subnet': self._ipam_subnet_id}))
+
+    def remove_from_free_ranges(self, context, ip_address):
+        """Remove an IP address from the free range containing it.
+
+        :param context: neutron api request context
+        :param ip_address: the IP address which is being allocated
+        :returns: True if the address was in a free range, False otherwise
+        """
+        ip_int = int(netaddr.IPAddress(ip_address))
+        key = _int_to_key(ip_int)
+        with db_api.context_manager.writer.using(context):
+            free_range = self._get_free_range_with_ip(context, ip_int)
+            if not free_range:
+                return False
+            first_ip, last_ip = free_range
+            if first_ip == last_ip:
+                self._update_free_range(context, first_ip, last_ip)
+            elif key == first_ip:
+                self._update_free_range(context, first_ip, last_ip,
+                                        {'first_ip': _int_to_key(ip_int + 1)})
+            else:
+                self._update_free_range(context, first_ip, last_ip,
+                                        {'last_ip': _int_to_key(ip_int - 1)})
+                if key != last_ip:
+                    context.session.bulk_insert_mappings(
+                        db_models.IpamFreeRange,
+                        [{'ipam_subnet_id': self._ipam_subnet_id,
+                          'first_ip': _int_to_key(ip_int + 1),
+                          'last_ip': last_ip}])
+        return True
+
+    def add_to_free_ranges(self, context, ip_address):
+        """Give back an IP address to the free ranges of the subnet.
+
+        The address is merged with the adjacent free ranges, if any.
+
+        :param context: neutron api request context
+        :param ip_address: the IP address which has been deallocated
+        """
+        model = db_models.IpamFreeRange
+        ip_int = int(netaddr.IPAddress(ip_address))
+        key = _int_to_key(ip_int)
+        with db_api.context_manager.writer.using(context):
+            if self._get_free_range_with_ip(context, ip_int):
+                return
+            prev_key = _int_to_key(ip_int - 1) if ip_int else None
+            next_key = _int_to_key(ip_int + 1)
+            left = prev_key and self._free_ranges_query(
+                context, model.first_ip).filter_by(last_ip=prev_key).first()
+            right = self._free_ranges_query(
+                context, model.last_ip).filter_by(first_ip=next_key).first()
+            if left and right:
+                self._update_free_range(context, next_key, right[0])
+                self._update_free_range(context, left[0], prev_key,
+                                        {'last_ip': right[0]})
+            elif left:
+                self._update_free_range(context, left[0], prev_key,
+                                        {'last_ip': key})
+            elif right:
+                self._update_free_range(context, next_key, right[0],
+                                        {'first_ip': key})
+            else:
+                context.session.bulk_insert_mappings(
+                    model, [{'ipam_subnet_id': self._ipam_subnet_id,
+                             'first_ip': key, 'last_ip': key}])
@@ -69,3 +69,26 @@ class IpamAllocation(model_base.BASEV2):
                                              ondelete="CASCADE"),
                                primary_key=True,
                                nullable=False)
+
+
+class IpamFreeRange(model_base.BASEV2):
+    """Range of addresses which are available for allocation on a subnet.
+
+    Free ranges are only maintained by the range indexed flavour of the
+    driver. Addresses are stored as zero padded hexadecimal integers so that
+    ranges of both IP versions can be ordered and compared in SQL. Each
+    subnet with an index also has a marker row, keyed after every address,
+    which tells an exhausted subnet apart from a subnet without index.
+    """
+    ipam_subnet_id = sa.Column(sa.String(36),
+                               sa.ForeignKey('ipamsubnets.id',
+                                             ondelete="CASCADE"),
+                               primary_key=True,
+                               nullable=False)
+    first_ip = sa.Column(sa.String(32), nullable=False, primary_key=True)
+    last_ip = sa.Column(sa.String(32), nullable=False)
+    __table_args__ = (
+        sa.Index('ix_ipamfreeranges_ipam_subnet_id_last_ip',
+                 'ipam_subnet_id', 'last_ip'),
+        model_base.BASEV2.__table_args__
+    )
@@ -251,6 +251,72 @@ class NeutronDbSubnet(ipam_base.Subnet):
             self._cidr, self._gateway_ip, self._pools)
 
 
+class NeutronDbRangeSubnet(NeutronDbSubnet):
+    """Manage IP addresses with an index of free address ranges.
+
+    Rather than computing the available addresses from all the allocations
+    of the subnet on every request, this flavour of the Neutron DB IPAM
+    subnet persists the free ranges of the subnet and updates them on
+    allocation and deallocation, so that generating an address only
+    requires an indexed lookup.
+    """
+
+    @classmethod
+    def create_allocation_pools(cls, subnet_manager, context, pools, cidr):
+        super(NeutronDbRangeSubnet, cls).create_allocation_pools(
+            subnet_manager, context, pools, cidr)
+        subnet_manager.rebuild_free_ranges(context, pools)
+
+    def _rebuild_free_ranges(self, context):
+        pools = [netaddr.IPRange(pool.first_ip, pool.last_ip)
+                 for pool in self.subnet_manager.list_pools(context)]
+        self.subnet_manager.rebuild_free_ranges(context, pools)
+
+    def _generate_ip(self, context, prefer_next=False):
+        """Generate an IP address from the free range index."""
+        ip_version = netaddr.IPNetwork(self._cidr).version
+        while True:
+            free_range = self.subnet_manager.get_first_free_range(context)
+            if free_range is None:
+                # NOTE: the subnet was created by another driver, build its
+                # index from the allocations
+                self._rebuild_free_ranges(context)
+                continue
+            if not free_range:
+                raise ipam_exc.IpAddressGenerationFailure(
+                    subnet_id=self.subnet_manager.neutron_id)
+            first, last = free_range
+            if prefer_next:
+                window = 1
+            else:
+                # Compute a value for the selection window
+                window = min(last - first + 1, 10)
+            ip_address = str(netaddr.IPAddress(
+                first + random.randint(0, window - 1), ip_version))
+            self.subnet_manager.remove_from_free_ranges(context, ip_address)
+            # An address allocated behind the index back (e.g. by another
+            # driver) is just dropped from it and another one is picked.
+            if self.subnet_manager.check_unique_allocation(context,
+                                                           ip_address):
+                return ip_address, None
+
+    def allocate(self, address_request):
+        ip_address = super(NeutronDbRangeSubnet, self).allocate(
+            address_request)
+        if isinstance(address_request, ipam_req.SpecificAddressRequest):
+            self.subnet_manager.remove_from_free_ranges(self._context,
+                                                        ip_address)
+        return ip_address
+
+    def deallocate(self, address):
+        super(NeutronDbRangeSubnet, self).deallocate(address)
+        ip_address = netaddr.IPAddress(address)
+        # Only addresses from the allocation pools are given back, fixed IPs
+        # requested outside of the pools were never in the index
+        if any(ip_address in pool for pool in self._pools or []):
+            self.subnet_manager.add_to_free_ranges(self._context, address)
+
+
 class NeutronDbPool(subnet_alloc.SubnetAllocator):
     """Subnet pools backed by Neutron Database.
 
@@ -258,13 +324,15 @@ class NeutronDbPool(subnet_alloc.SubnetAllocator):
     operations are either trivial or no-ops.
     """
 
+    subnet_class = NeutronDbSubnet
+
     def get_subnet(self, subnet_id):
         """Retrieve an IPAM subnet.
 
         :param subnet_id: Neutron subnet identifier
         :returns: a NeutronDbSubnet instance
         """
-        return NeutronDbSubnet.load(subnet_id, self._context)
+        return self.subnet_class.load(subnet_id, self._context)
 
     def allocate_subnet(self, subnet_request):
         """Create an IPAMSubnet object for the provided cidr.
@@ -283,8 +351,8 @@ class NeutronDbPool(subnet_alloc.SubnetAllocator):
         if not isinstance(subnet_request, ipam_req.SpecificSubnetRequest):
             raise ipam_exc.InvalidSubnetRequestType(
                 subnet_type=type(subnet_request))
-        return NeutronDbSubnet.create_from_subnet_request(subnet_request,
-                                                          self._context)
+        return self.subnet_class.create_from_subnet_request(subnet_request,
+                                                            self._context)
 
     def update_subnet(self, subnet_request):
         """Update subnet info the in the IPAM driver.
@@ -301,7 +369,8 @@ class NeutronDbPool(subnet_alloc.SubnetAllocator):
                       "new allocation pools, there is nothing to do",
                       subnet_request.subnet_id)
             return
-        subnet = NeutronDbSubnet.load(subnet_request.subnet_id, self._context)
+        subnet = self.subnet_class.load(subnet_request.subnet_id,
+                                        self._context)
         cidr = netaddr.IPNetwork(subnet._cidr)
         subnet.update_allocation_pools(subnet_request.allocation_pools, cidr)
         return subnet
@@ -321,3 +390,14 @@ class NeutronDbPool(subnet_alloc.SubnetAllocator):
 
     def needs_rollback(self):
         return False
+
+
+class NeutronDbRangePool(NeutronDbPool):
+    """Subnet pools backed by Neutron Database and a free range index.
+
+    Subnets allocated by this driver keep track of their free address
+    ranges, which makes address generation independent of the number of
+    allocations on the subnet.
+    """
+
+    subnet_class = NeutronDbRangeSubnet
@@ -148,3 +148,18 @@ class QuotaUsage(base.NeutronDbObject):
         res = query.first()
         if res:
             return cls._load_object(context, res)
+
+    @classmethod
+    def get_objects_dirty_protected(cls, context, **kwargs):
+        query = context.session.query(cls.db_model)
+        for key, value in cls.modify_fields_to_db(kwargs).items():
+            column = getattr(cls.db_model, key)
+            if isinstance(value, (list, set, tuple)):
+                query = query.filter(column.in_(value))
+            else:
+                query = query.filter(column == value)
+        # NOTE(manjeets) as lock mode was just for protecting dirty bits
+        # an update on dirty will prevent the race.
+        query.filter_by(dirty=True).update({'dirty': True},
+                                           synchronize_session=False)
+        return [cls._load_object(context, db_obj) for db_obj in query]
@@ -39,6 +39,7 @@ import neutron.conf.db.l3_agentschedulers_db
 import neutron.conf.db.l3_dvr_db
 import neutron.conf.db.l3_gwmode_db
 import neutron.conf.db.l3_hamode_db
+import neutron.conf.db.securitygroups_rpc_base
 import neutron.conf.extensions.allowedaddresspairs
 import neutron.conf.plugins.ml2.config
 import neutron.conf.plugins.ml2.drivers.agent
@@ -118,7 +119,9 @@ def list_db_opts():
              neutron.conf.db.dvr_mac_db.DVR_MAC_ADDRESS_OPTS,
              neutron.conf.db.l3_dvr_db.ROUTER_DISTRIBUTED_OPTS,
              neutron.conf.db.l3_agentschedulers_db.L3_AGENTS_SCHEDULER_OPTS,
-             neutron.conf.db.l3_hamode_db.L3_HA_OPTS)
+             neutron.conf.db.l3_hamode_db.L3_HA_OPTS,
+             neutron.conf.db.securitygroups_rpc_base
+                    .SG_MEMBER_IPS_CACHE_OPTS)
          ),
         ('database',
          neutron.db.migration.cli.get_engine_config())
@@ -38,6 +38,9 @@ class L2populationMechanismDriver(api.MechanismDriver):
     def __init__(self):
         super(L2populationMechanismDriver, self).__init__()
         self.L2populationAgentNotify = l2pop_rpc.L2populationAgentNotifyAPI()
+        # host -> (agent started_at, ids of the networks whose whole fdb was
+        # sent to the agent since it started)
+        self._agent_fdb_networks = {}
 
     def initialize(self):
         LOG.debug("Experimental L2 population driver")
@@ -278,10 +281,17 @@ class L2populationMechanismDriver(api.MechanismDriver):
             segment, agent_ip, network_id)
         other_fdb_ports = other_fdb_entries[network_id]['ports']
 
-        if agent_active_ports == 1 or (l2pop_db.get_agent_uptime(agent) <
-                                       cfg.CONF.l2pop.agent_boot_time):
-            # First port activated on current agent in this network,
-            # we have to provide it with the whole list of fdb entries
+        if agent_active_ports == 1 or (
+                l2pop_db.get_agent_uptime(agent) <
+                cfg.CONF.l2pop.agent_boot_time and
+                not self._agent_fdb_sent(agent, network_id)):
+            # First port activated on current agent in this network, or
+            # first one since the agent restarted, we have to provide it
+            # with the whole list of fdb entries. The other ports the agent
+            # activates while booting only need their own entries sent to
+            # the other agents, the ports coming up on the other agents are
+            # notified to it as they do.
+            self._set_agent_fdb_sent(agent, network_id)
             agent_fdb_entries = self._create_agent_fdb(port_context,
                                                        agent,
                                                        segment,
@@ -303,6 +313,20 @@ class L2populationMechanismDriver(api.MechanismDriver):
         self.L2populationAgentNotify.add_fdb_entries(self.rpc_ctx,
                                                      other_fdb_entries)
 
+    def _agent_fdb_sent(self, agent, network_id):
+        started_at, network_ids = self._agent_fdb_networks.get(
+            agent.host, (None, ()))
+        return started_at == agent.started_at and network_id in network_ids
+
+    def _set_agent_fdb_sent(self, agent, network_id):
+        started_at, network_ids = self._agent_fdb_networks.get(
+            agent.host, (None, None))
+        if started_at != agent.started_at:
+            network_ids = set()
+            self._agent_fdb_networks[agent.host] = (agent.started_at,
+                                                    network_ids)
+        network_ids.add(network_id)
+
     def _get_agent_fdb(self, context, segment, port, agent_host):
         if not agent_host:
             return
@@ -14,21 +14,63 @@
 #    under the License.
 
 import collections
+import copy
 
+import eventlet
+from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging
 
 from neutron.common import rpc as n_rpc
 from neutron.common import topics
+from neutron.conf.plugins.ml2.drivers import l2pop as config
 
 
 LOG = logging.getLogger(__name__)
 
+config.register_l2_population_opts()
+
 
 PortInfo = collections.namedtuple("PortInfo", "mac_address ip_address")
 
 
+# the notifications whose fdb_entries can be merged
+MERGEABLE_METHODS = ('add_fdb_entries', 'remove_fdb_entries')
+
+
+def _merge_fdb_entries(merged, fdb_entries):
+    """Merge fdb_entries into merged, both in the add/remove format.
+
+    Nothing is merged and False is returned if a network of fdb_entries is
+    in merged with another segment.
+    """
+    for network_id, entry in fdb_entries.items():
+        merged_entry = merged.get(network_id)
+        if merged_entry and (
+                merged_entry['segment_id'] != entry['segment_id'] or
+                merged_entry['network_type'] != entry['network_type']):
+            return False
+    for network_id, entry in fdb_entries.items():
+        merged_entry = merged.setdefault(
+            network_id, {'segment_id': entry['segment_id'],
+                         'network_type': entry['network_type'],
+                         'ports': {}})
+        for agent_ip, ports in entry['ports'].items():
+            merged_ports = merged_entry['ports'].setdefault(agent_ip, [])
+            merged_ports.extend(p for p in ports if p not in merged_ports)
+    return True
+
+
 class L2populationAgentNotifyAPI(object):
+    """Client side of the l2population agent RPC API.
+
+    The add and remove notifications are gathered for
+    [l2pop] notification_batch_interval seconds. The consecutive ones with
+    the same method and target are merged into one, so that a burst of port
+    changes, like the ones of an agent restarting, costs a message per
+    network rather than a message per port. The notifications are sent in
+    the order they were made.
+    """
 
     def __init__(self, topic=topics.AGENT):
         self.topic = topic
@@ -37,6 +79,45 @@ class L2populationAgentNotifyAPI(object):
                                                         topics.UPDATE)
         target = oslo_messaging.Target(topic=topic, version='1.0')
         self.client = n_rpc.get_client(target)
+        # list of [context, method, fdb_entries, host] waiting to be sent
+        self._pending = []
+        self._flush_scheduled = False
+
+    def _notify(self, context, method, fdb_entries, host):
+        if host:
+            self._notification_host(context, method, fdb_entries, host)
+        else:
+            self._notification_fanout(context, method, fdb_entries)
+
+    def _queue_notification(self, context, method, fdb_entries, host):
+        interval = cfg.CONF.l2pop.notification_batch_interval
+        if not interval and not self._pending:
+            self._notify(context, method, fdb_entries, host)
+            return
+        if self._pending and method in MERGEABLE_METHODS:
+            __, last_method, last_entries, last_host = self._pending[-1]
+            if (last_method == method and last_host == host and
+                    _merge_fdb_entries(last_entries, fdb_entries)):
+                return
+        if method in MERGEABLE_METHODS:
+            # the entries of the notifications merged into this one are
+            # added to it, don't change the dict of the caller
+            fdb_entries = copy.deepcopy(fdb_entries)
+        self._pending.append([context, method, fdb_entries, host])
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            eventlet.spawn_after(interval, self._flush)
+
+    def _flush(self):
+        pending, self._pending = self._pending, []
+        self._flush_scheduled = False
+        for context, method, fdb_entries, host in pending:
+            try:
+                self._notify(context, method, fdb_entries, host)
+            except Exception:
+                LOG.exception('Failed to notify l2population agents of '
+                              '%(method)s with %(fdb_entries)s',
+                              {'method': method, 'fdb_entries': fdb_entries})
 
     def _notification_fanout(self, context, method, fdb_entries):
         LOG.debug('Fanout notify l2population agents at %(topic)s '
@@ -61,27 +142,15 @@ class L2populationAgentNotifyAPI(object):
 
     def add_fdb_entries(self, context, fdb_entries, host=None):
         if fdb_entries:
-            if host:
-                self._notification_host(context, 'add_fdb_entries',
-                                        fdb_entries, host)
-            else:
-                self._notification_fanout(context, 'add_fdb_entries',
-                                          fdb_entries)
+            self._queue_notification(context, 'add_fdb_entries',
+                                     fdb_entries, host)
 
     def remove_fdb_entries(self, context, fdb_entries, host=None):
         if fdb_entries:
-            if host:
-                self._notification_host(context, 'remove_fdb_entries',
-                                        fdb_entries, host)
-            else:
-                self._notification_fanout(context, 'remove_fdb_entries',
-                                          fdb_entries)
+            self._queue_notification(context, 'remove_fdb_entries',
+                                     fdb_entries, host)
 
     def update_fdb_entries(self, context, fdb_entries, host=None):
         if fdb_entries:
-            if host:
-                self._notification_host(context, 'update_fdb_entries',
-                                        fdb_entries, host)
-            else:
-                self._notification_fanout(context, 'update_fdb_entries',
-                                          fdb_entries)
+            self._queue_notification(context, 'update_fdb_entries',
+                                     fdb_entries, host)
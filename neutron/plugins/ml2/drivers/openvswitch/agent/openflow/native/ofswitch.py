@@ -14,6 +14,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import itertools
+
 import eventlet
 import netaddr
 from oslo_config import cfg
@@ -48,8 +50,15 @@ class OpenFlowSwitchMixin(object):
             return (str(n.ip), str(n.netmask))
         return str(n.ip)
 
+    # NOTE: bundle ids only need to be unique among the bundles open on the
+    # same switch connection.
+    _bundle_ids = itertools.count(1)
+
     def __init__(self, *args, **kwargs):
         self._app = kwargs.pop('ryu_app')
+        # The flow mods gathered into a bundle, by the greenthread which
+        # started it
+        self._bundle_msgs = {}
         super(OpenFlowSwitchMixin, self).__init__(*args, **kwargs)
 
     def _get_dp_by_dpid(self, dpid_int):
@@ -99,6 +108,76 @@ class OpenFlowSwitchMixin(object):
                   {"request": msg, "result": result})
         return result
 
+    def start_bundle(self):
+        """Gather the flow mods sent from now on into a bundle.
+
+        Only the flow mods sent by the calling greenthread are gathered,
+        the ones sent concurrently, like by the RPC handlers, are still
+        applied right away. The gathered flow mods are applied when
+        commit_bundle is called, atomically and in order, so that the
+        datapath never sees a partial update.
+        """
+        self._bundle_msgs[eventlet.getcurrent()] = []
+
+    def discard_bundle(self):
+        """Drop the flow mods gathered since start_bundle."""
+        self._bundle_msgs.pop(eventlet.getcurrent(), None)
+
+    def commit_bundle(self):
+        """Apply the flow mods gathered since start_bundle as one bundle.
+
+        The OpenFlow 1.3 bundle extension is used, which has the semantics
+        of the OpenFlow 1.4 bundles. Returns the number of flow mods and
+        the time in seconds it took to commit them.
+        """
+        msgs = self._bundle_msgs.pop(eventlet.getcurrent(), None)
+        if not msgs:
+            return 0, 0
+        (dp, ofp, ofpp) = self._get_dp()
+        bundle_id = next(self._bundle_ids) & 0xffffffff
+        flags = ofp.ONF_BF_ATOMIC | ofp.ONF_BF_ORDERED
+        start_time = timeutils.now()
+        self._send_bundle_ctrl(bundle_id, ofp.ONF_BCT_OPEN_REQUEST, flags)
+        try:
+            # NOTE: the switch processes the messages in order, so the
+            # barrier which follows the commit request covers the adds too.
+            for msg in msgs:
+                self._send_msg_nowait(
+                    dp, ofpp.ONFBundleAddMsg(dp, bundle_id, flags, msg, []))
+            self._send_bundle_ctrl(bundle_id, ofp.ONF_BCT_COMMIT_REQUEST,
+                                   flags)
+        except RuntimeError:
+            with excutils.save_and_reraise_exception():
+                try:
+                    self._send_bundle_ctrl(
+                        bundle_id, ofp.ONF_BCT_DISCARD_REQUEST, flags)
+                except RuntimeError:
+                    # The error has already been logged and the switch
+                    # drops the bundle when the connection is closed.
+                    pass
+        return len(msgs), timeutils.now() - start_time
+
+    def _send_flow_mod(self, msg):
+        bundle_msgs = self._bundle_msgs.get(eventlet.getcurrent())
+        if bundle_msgs is not None:
+            bundle_msgs.append(msg)
+        else:
+            self._send_msg(msg)
+
+    @staticmethod
+    def _send_msg_nowait(dp, msg):
+        """Queue the message to the switch without waiting for a reply."""
+        if not dp.send_msg(msg):
+            m = _("ofctl request %(request)s not sent, the switch "
+                  "connection is closed") % {"request": msg}
+            LOG.error(m)
+            raise RuntimeError(m)
+
+    def _send_bundle_ctrl(self, bundle_id, type_, flags):
+        (dp, _ofp, ofpp) = self._get_dp()
+        msg = ofpp.ONFBundleCtrlMsg(dp, bundle_id, type_, flags, [])
+        return self._send_msg(msg, reply_cls=ofpp.ONFBundleCtrlMsg)
+
     @staticmethod
     def _match(_ofp, ofpp, match, **match_kwargs):
         if match is not None:
@@ -135,7 +214,7 @@ class OpenFlowSwitchMixin(object):
                               priority=priority,
                               out_group=ofp.OFPG_ANY,
                               out_port=ofp.OFPP_ANY)
-        self._send_msg(msg)
+        self._send_flow_mod(msg)
 
     def dump_flows(self, table_id=None):
         (dp, ofp, ofpp) = self._get_dp()
@@ -211,7 +290,7 @@ class OpenFlowSwitchMixin(object):
                               match=match,
                               priority=priority,
                               instructions=instructions)
-        self._send_msg(msg)
+        self._send_flow_mod(msg)
 
     def install_apply_actions(self, actions,
                               table_id=0, priority=0,
@@ -43,6 +43,17 @@ class OpenFlowSwitchMixin(object):
     def dump_flows(self, table_id):
         return self.dump_flows_for_table(table_id)
 
+    # NOTE: the ofctl driver applies the flows as they are sent, bundles
+    # are only supported by the native driver.
+    def start_bundle(self):
+        pass
+
+    def discard_bundle(self):
+        pass
+
+    def commit_bundle(self):
+        return 0, 0
+
     def dump_flows_all_tables(self):
         return self.dump_all_flows()
 
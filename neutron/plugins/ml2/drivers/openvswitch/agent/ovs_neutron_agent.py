@@ -15,6 +15,7 @@
 
 import base64
 import collections
+import contextlib
 import functools
 import hashlib
 import signal
@@ -35,6 +36,7 @@ from oslo_log import log as logging
 import oslo_messaging
 from oslo_service import loopingcall
 from oslo_service import systemd
+from oslo_utils import excutils
 from oslo_utils import netutils
 from osprofiler import profiler
 from six import moves
@@ -289,6 +291,8 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
             heartbeat.start(interval=report_interval)
         # Initialize iteration counter
         self.iter_num = 0
+        # The flow bundles committed by the current iteration
+        self._bundle_stats = collections.Counter()
         self.run_daemon_loop = True
 
         self.catch_sigterm = False
@@ -1573,7 +1577,8 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
         return failed_devices
 
     def treat_devices_removed(self, devices):
-        self.sg_agent.remove_devices_filter(devices)
+        with self._flow_bundles():
+            self.sg_agent.remove_devices_filter(devices)
         LOG.info("Ports %s removed", devices)
         devices_down = self.plugin_rpc.update_device_list(self.context,
                                                           [],
@@ -1617,7 +1622,62 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
         if failed_devices:
             LOG.debug("Port down failed for %s", failed_devices)
 
+    def _get_bridges_for_bundles(self):
+        bridges = [self.int_br] + list(self.phys_brs.values())
+        if self.enable_tunneling:
+            bridges.append(self.tun_br)
+        return bridges
+
+    @contextlib.contextmanager
+    def _flow_bundles(self):
+        """Apply the flow mods sent to the bridges in the context as one
+        atomic bundle per bridge when OpenFlow bundles are enabled.
+
+        The flow mods sent concurrently by the RPC handlers are not part of
+        the bundles, they are applied right away. The bundles are committed
+        when the context exits, so the ports must only be reported up or
+        down to the server after it.
+        """
+        if not cfg.CONF.OVS.use_openflow_bundles:
+            yield
+            return
+        bridges = self._get_bridges_for_bundles()
+        for bridge in bridges:
+            bridge.start_bundle()
+        try:
+            yield
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                for bridge in bridges:
+                    bridge.discard_bundle()
+        try:
+            for bridge in bridges:
+                count, elapsed = bridge.commit_bundle()
+                if count:
+                    self._bundle_stats['bundles'] += 1
+                    self._bundle_stats['flow_mods'] += count
+                    self._bundle_stats['elapsed'] += elapsed
+        finally:
+            # Do not let a failed commit leave the other bridges gathering
+            # flow mods
+            for bridge in bridges:
+                bridge.discard_bundle()
+
     def process_network_ports(self, port_info, ovs_restarted):
+        self._bundle_stats.clear()
+        try:
+            return self._process_network_ports(port_info, ovs_restarted)
+        finally:
+            if self._bundle_stats['bundles']:
+                LOG.info("process_network_ports - iteration:%(iter_num)d - "
+                         "committed %(flow_mods)d flow mods in %(bundles)d "
+                         "bundles. Elapsed:%(elapsed).3f",
+                         {'iter_num': self.iter_num,
+                          'flow_mods': self._bundle_stats['flow_mods'],
+                          'bundles': self._bundle_stats['bundles'],
+                          'elapsed': self._bundle_stats['elapsed']})
+
+    def _process_network_ports(self, port_info, ovs_restarted):
         failed_devices = {'added': set(), 'removed': set()}
         # TODO(salv-orlando): consider a solution for ensuring notifications
         # are processed exactly in the same order in which they were
@@ -1634,32 +1694,34 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
                                  port_info.get('updated', set()))
         need_binding_devices = []
         skipped_devices = set()
-        if devices_added_updated:
-            start = time.time()
-            (skipped_devices, need_binding_devices,
-            failed_devices['added']) = (
-                self.treat_devices_added_or_updated(
-                    devices_added_updated, ovs_restarted))
-            LOG.debug("process_network_ports - iteration:%(iter_num)d - "
-                      "treat_devices_added_or_updated completed. "
-                      "Skipped %(num_skipped)d devices of "
-                      "%(num_current)d devices currently available. "
-                      "Time elapsed: %(elapsed).3f",
-                      {'iter_num': self.iter_num,
-                       'num_skipped': len(skipped_devices),
-                       'num_current': len(port_info['current']),
-                       'elapsed': time.time() - start})
-            # Update the list of current ports storing only those which
-            # have been actually processed.
-            skipped_devices = set(skipped_devices)
-            port_info['current'] = (port_info['current'] - skipped_devices)
-
-        # TODO(salv-orlando): Optimize avoiding applying filters
-        # unnecessarily, (eg: when there are no IP address changes)
-        added_ports = port_info.get('added', set()) - skipped_devices
-        self._add_port_tag_info(need_binding_devices)
-        self.sg_agent.setup_port_filters(added_ports,
-                                         port_info.get('updated', set()))
+        with self._flow_bundles():
+            if devices_added_updated:
+                start = time.time()
+                (skipped_devices, need_binding_devices,
+                failed_devices['added']) = (
+                    self.treat_devices_added_or_updated(
+                        devices_added_updated, ovs_restarted))
+                LOG.debug("process_network_ports - iteration:%(iter_num)d - "
+                          "treat_devices_added_or_updated completed. "
+                          "Skipped %(num_skipped)d devices of "
+                          "%(num_current)d devices currently available. "
+                          "Time elapsed: %(elapsed).3f",
+                          {'iter_num': self.iter_num,
+                           'num_skipped': len(skipped_devices),
+                           'num_current': len(port_info['current']),
+                           'elapsed': time.time() - start})
+                # Update the list of current ports storing only those which
+                # have been actually processed.
+                skipped_devices = set(skipped_devices)
+                port_info['current'] = (port_info['current'] - skipped_devices)
+
+            # TODO(salv-orlando): Optimize avoiding applying filters
+            # unnecessarily, (eg: when there are no IP address changes)
+            added_ports = port_info.get('added', set()) - skipped_devices
+            self._add_port_tag_info(need_binding_devices)
+            self.sg_agent.setup_port_filters(added_ports,
+                                             port_info.get('updated', set()))
+        # The flows of the ports are committed, they can be reported up
         failed_devices['added'] |= self._bind_devices(need_binding_devices)
 
         if 'removed' in port_info and port_info['removed']:
@@ -664,6 +664,43 @@ class MechanismManager(stevedore.named.NamedExtensionManager):
         """
         self._call_on_drivers("create_port_postcommit", context)
 
+    def create_port_postcommit_bulk(self, contexts):
+        """Notify all mechanism drivers of the creation of multiple ports.
+
+        :raises: neutron.plugins.ml2.common.MechanismDriverError
+        if any mechanism driver create_port_postcommit call fails.
+
+        Mechanism drivers implementing the optional
+        create_port_postcommit_bulk method are called once with the
+        PortContexts of all the ports, so that they can act on all of
+        them at once. create_port_postcommit is called for every port on
+        the other mechanism drivers. As for create_port_postcommit, errors
+        are left to propagate to the caller, where the ports will be
+        deleted.
+        """
+        errors = []
+        for driver in self.ordered_mech_drivers:
+            bulk_method = getattr(driver.obj, 'create_port_postcommit_bulk',
+                                  None)
+            try:
+                if bulk_method:
+                    bulk_method(contexts)
+                else:
+                    for context in contexts:
+                        driver.obj.create_port_postcommit(context)
+            except Exception as e:
+                LOG.exception(
+                    "Mechanism driver '%(name)s' failed in %(method)s",
+                    {'name': driver.name, 'method': 'create_port_postcommit'}
+                )
+                errors.append(e)
+                break
+        if errors:
+            raise ml2_exc.MechanismDriverError(
+                method='create_port_postcommit',
+                errors=errors
+            )
+
     def update_port_precommit(self, context):
         """Notify all mechanism drivers during port update.
 
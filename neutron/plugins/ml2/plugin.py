@@ -372,12 +372,14 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
 
     @db_api.retry_db_errors
     def _bind_port_if_needed(self, context, allow_notify=False,
-                             need_notify=False):
+                             need_notify=False, tries_done=0):
         if not context.network.network_segments:
             LOG.debug("Network %s has no segments, skipping binding",
                       context.network.current['id'])
             return context
-        for count in range(1, MAX_BIND_TRIES + 1):
+        # tries_done are the attempts already made to bind the port by the
+        # caller, counted towards MAX_BIND_TRIES
+        for count in range(tries_done + 1, MAX_BIND_TRIES + 1):
             if count > 1:
                 # yield for binding retries so that we give other threads a
                 # chance to do their work
@@ -481,105 +483,15 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
             # mechanism driver update_port_*commit() calls.
             try:
                 port_db = self._get_port(plugin_context, port_id)
-                cur_binding = port_db.port_binding
             except exc.PortNotFound:
-                port_db, cur_binding = None, None
-            if not port_db or not cur_binding:
-                # The port has been deleted concurrently, so just
-                # return the unbound result from the initial
-                # transaction that completed before the deletion.
-                LOG.debug("Port %s has been deleted concurrently", port_id)
-                return orig_context, False, False
-            # Since the mechanism driver bind_port() calls must be made
-            # outside a DB transaction locking the port state, it is
-            # possible (but unlikely) that the port's state could change
-            # concurrently while these calls are being made. If another
-            # thread or process succeeds in binding the port before this
-            # thread commits its results, the already committed results are
-            # used. If attributes such as binding:host_id, binding:profile,
-            # or binding:vnic_type are updated concurrently, the try_again
-            # flag is returned to indicate that the commit was unsuccessful.
-            oport = self._make_port_dict(port_db)
-            port = self._make_port_dict(port_db)
-            network = bind_context.network.current
-            if port['device_owner'] == const.DEVICE_OWNER_DVR_INTERFACE:
-                # REVISIT(rkukura): The PortBinding instance from the
-                # ml2_port_bindings table, returned as cur_binding
-                # from port_db.port_binding above, is
-                # currently not used for DVR distributed ports, and is
-                # replaced here with the DistributedPortBinding instance from
-                # the ml2_distributed_port_bindings table specific to the host
-                # on which the distributed port is being bound. It
-                # would be possible to optimize this code to avoid
-                # fetching the PortBinding instance in the DVR case,
-                # and even to avoid creating the unused entry in the
-                # ml2_port_bindings table. But the upcoming resolution
-                # for bug 1367391 will eliminate the
-                # ml2_distributed_port_bindings table, use the
-                # ml2_port_bindings table to store non-host-specific
-                # fields for both distributed and non-distributed
-                # ports, and introduce a new ml2_port_binding_hosts
-                # table for the fields that need to be host-specific
-                # in the distributed case. Since the PortBinding
-                # instance will then be needed, it does not make sense
-                # to optimize this code to avoid fetching it.
-                cur_binding = db.get_distributed_port_binding_by_host(
-                    plugin_context, port_id, orig_binding.host)
-            cur_context = driver_context.PortContext(
-                self, plugin_context, port, network, cur_binding, None,
-                original_port=oport)
-
-            # Commit our binding results only if port has not been
-            # successfully bound concurrently by another thread or
-            # process and no binding inputs have been changed.
-            commit = ((cur_binding.vif_type in
-                       [portbindings.VIF_TYPE_UNBOUND,
-                        portbindings.VIF_TYPE_BINDING_FAILED]) and
-                      orig_binding.host == cur_binding.host and
-                      orig_binding.vnic_type == cur_binding.vnic_type and
-                      orig_binding.profile == cur_binding.profile)
-
-            if commit:
-                # Update the port's binding state with our binding
-                # results.
-                cur_binding.vif_type = new_binding.vif_type
-                cur_binding.vif_details = new_binding.vif_details
-                db.clear_binding_levels(plugin_context, port_id,
-                                        cur_binding.host)
-                db.set_binding_levels(plugin_context,
-                                      bind_context._binding_levels)
-                # refresh context with a snapshot of updated state
-                cur_context._binding = driver_context.InstanceSnapshot(
-                    cur_binding)
-                cur_context._binding_levels = bind_context._binding_levels
-
-                # Update PortContext's port dictionary to reflect the
-                # updated binding state.
-                self._update_port_dict_binding(port, cur_binding)
-
-                # Update the port status if requested by the bound driver.
-                if (bind_context._binding_levels and
-                    bind_context._new_port_status):
-                    port_db.status = bind_context._new_port_status
-                    port['status'] = bind_context._new_port_status
-
-                # Call the mechanism driver precommit methods, commit
-                # the results, and call the postcommit methods.
-                self.mechanism_manager.update_port_precommit(cur_context)
+                port_db = None
+            result = self._commit_port_binding_db(orig_context, bind_context,
+                                                  port_db)
+        if not result:
+            return orig_context, False, False
+        cur_context, oport, commit = result
         if commit:
-            # Continue, using the port state as of the transaction that
-            # just finished, whether that transaction committed new
-            # results or discovered concurrent port state changes.
-            # Also, Trigger notification for successful binding commit.
-            kwargs = {
-                'context': plugin_context,
-                'port': self._make_port_dict(port_db),  # ensure latest state
-                'mac_address_updated': False,
-                'original_port': oport,
-            }
-            registry.notify(resources.PORT, events.AFTER_UPDATE,
-                            self, **kwargs)
-            self.mechanism_manager.update_port_postcommit(cur_context)
+            self._after_port_binding_commit(cur_context, port_db, oport)
             need_notify = True
             try_again = False
         else:
@@ -587,6 +499,193 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
 
         return cur_context, need_notify, try_again
 
+    def _commit_port_binding_db(self, orig_context, bind_context, port_db):
+        """Commit the binding results of a port within a transaction.
+
+        :returns: None if the port has been deleted concurrently, otherwise
+                  a (context, original port dict, committed) tuple.
+        """
+        port_id = orig_context.current['id']
+        plugin_context = orig_context._plugin_context
+        orig_binding = orig_context._binding
+        new_binding = bind_context._binding
+        cur_binding = port_db.port_binding if port_db else None
+        if not port_db or not cur_binding:
+            # The port has been deleted concurrently, so just
+            # return the unbound result from the initial
+            # transaction that completed before the deletion.
+            LOG.debug("Port %s has been deleted concurrently", port_id)
+            return
+        # Since the mechanism driver bind_port() calls must be made
+        # outside a DB transaction locking the port state, it is
+        # possible (but unlikely) that the port's state could change
+        # concurrently while these calls are being made. If another
+        # thread or process succeeds in binding the port before this
+        # thread commits its results, the already committed results are
+        # used. If attributes such as binding:host_id, binding:profile,
+        # or binding:vnic_type are updated concurrently, the try_again
+        # flag is returned to indicate that the commit was unsuccessful.
+        oport = self._make_port_dict(port_db)
+        port = self._make_port_dict(port_db)
+        network = bind_context.network.current
+        if port['device_owner'] == const.DEVICE_OWNER_DVR_INTERFACE:
+            # REVISIT(rkukura): The PortBinding instance from the
+            # ml2_port_bindings table, returned as cur_binding
+            # from port_db.port_binding above, is
+            # currently not used for DVR distributed ports, and is
+            # replaced here with the DistributedPortBinding instance from
+            # the ml2_distributed_port_bindings table specific to the host
+            # on which the distributed port is being bound. It
+            # would be possible to optimize this code to avoid
+            # fetching the PortBinding instance in the DVR case,
+            # and even to avoid creating the unused entry in the
+            # ml2_port_bindings table. But the upcoming resolution
+            # for bug 1367391 will eliminate the
+            # ml2_distributed_port_bindings table, use the
+            # ml2_port_bindings table to store non-host-specific
+            # fields for both distributed and non-distributed
+            # ports, and introduce a new ml2_port_binding_hosts
+            # table for the fields that need to be host-specific
+            # in the distributed case. Since the PortBinding
+            # instance will then be needed, it does not make sense
+            # to optimize this code to avoid fetching it.
+            cur_binding = db.get_distributed_port_binding_by_host(
+                plugin_context, port_id, orig_binding.host)
+        cur_context = driver_context.PortContext(
+            self, plugin_context, port, network, cur_binding, None,
+            original_port=oport)
+
+        # Commit our binding results only if port has not been
+        # successfully bound concurrently by another thread or
+        # process and no binding inputs have been changed.
+        commit = ((cur_binding.vif_type in
+                   [portbindings.VIF_TYPE_UNBOUND,
+                    portbindings.VIF_TYPE_BINDING_FAILED]) and
+                  orig_binding.host == cur_binding.host and
+                  orig_binding.vnic_type == cur_binding.vnic_type and
+                  orig_binding.profile == cur_binding.profile)
+
+        if commit:
+            # Update the port's binding state with our binding
+            # results.
+            cur_binding.vif_type = new_binding.vif_type
+            cur_binding.vif_details = new_binding.vif_details
+            db.clear_binding_levels(plugin_context, port_id,
+                                    cur_binding.host)
+            db.set_binding_levels(plugin_context,
+                                  bind_context._binding_levels)
+            # refresh context with a snapshot of updated state
+            cur_context._binding = driver_context.InstanceSnapshot(
+                cur_binding)
+            cur_context._binding_levels = bind_context._binding_levels
+
+            # Update PortContext's port dictionary to reflect the
+            # updated binding state.
+            self._update_port_dict_binding(port, cur_binding)
+
+            # Update the port status if requested by the bound driver.
+            if (bind_context._binding_levels and
+                bind_context._new_port_status):
+                port_db.status = bind_context._new_port_status
+                port['status'] = bind_context._new_port_status
+
+            # Call the mechanism driver precommit methods, commit
+            # the results, and call the postcommit methods.
+            self.mechanism_manager.update_port_precommit(cur_context)
+        return cur_context, oport, commit
+
+    def _after_port_binding_commit(self, cur_context, port_db, oport):
+        # Continue, using the port state as of the transaction that
+        # just finished, whether that transaction committed new
+        # results or discovered concurrent port state changes.
+        # Also, Trigger notification for successful binding commit.
+        kwargs = {
+            'context': cur_context._plugin_context,
+            'port': self._make_port_dict(port_db),  # ensure latest state
+            'mac_address_updated': False,
+            'original_port': oport,
+        }
+        registry.notify(resources.PORT, events.AFTER_UPDATE,
+                        self, **kwargs)
+        self.mechanism_manager.update_port_postcommit(cur_context)
+
+    def _bind_ports_if_needed(self, contexts):
+        """Bind multiple ports, committing all the results at once.
+
+        The mechanism drivers bind every port on its own, as the results
+        might be specific to each port, but the results of all the ports
+        are committed in a single transaction. Ports for which the binding
+        failed or could not be committed, including all the ports of a
+        transaction aborted by a retriable DB error, go through
+        _bind_port_if_needed, which retries them with the attempt made here
+        counted towards MAX_BIND_TRIES.
+
+        :param contexts: list of PortContexts of the ports to bind
+        :returns: the list of the resulting PortContexts, in the same order
+        """
+        results = list(contexts)
+        bindings = []
+        retries = []
+        for index, context in enumerate(contexts):
+            if (not context.network.network_segments or
+                    not self._should_bind_port(context)):
+                continue
+            bind_context = self._bind_port(context)
+            if bind_context.vif_type == portbindings.VIF_TYPE_BINDING_FAILED:
+                retries.append(index)
+            else:
+                bindings.append((index, bind_context))
+        if bindings:
+            plugin_context = contexts[bindings[0][0]]._plugin_context
+            for index, bind_context in bindings:
+                orig_context = contexts[index]
+                registry.notify(resources.PORT, events.BEFORE_UPDATE, self,
+                                context=plugin_context,
+                                port=orig_context.current,
+                                original_port=orig_context.current,
+                                orig_binding=orig_context._binding,
+                                new_binding=bind_context._binding)
+            committed = []
+            not_committed = []
+            try:
+                with db_api.context_manager.writer.using(plugin_context):
+                    port_dbs = dict(
+                        (port_db.id, port_db) for port_db in
+                        self._get_ports_query(plugin_context, filters={
+                            'id': [contexts[index].current['id']
+                                   for index, _bind_context in bindings]}))
+                    for index, bind_context in bindings:
+                        orig_context = contexts[index]
+                        port_db = port_dbs.get(orig_context.current['id'])
+                        result = self._commit_port_binding_db(
+                            orig_context, bind_context, port_db)
+                        if not result:
+                            continue
+                        cur_context, oport, commit = result
+                        if commit:
+                            committed.append(
+                                (index, cur_context, port_db, oport))
+                        else:
+                            not_committed.append(index)
+            except Exception as e:
+                if not db_api.is_retriable(e):
+                    raise
+                # NOTE: nothing was committed, bind the ports one at a time
+                # so that each of them is retried on its own
+                LOG.debug("Committing the bindings of %(count)d ports "
+                          "failed, binding them one at a time: %(err)s",
+                          {'count': len(bindings), 'err': e})
+                committed = []
+                not_committed = [index for index, _bind_context in bindings]
+            retries.extend(not_committed)
+            for index, cur_context, port_db, oport in committed:
+                self._after_port_binding_commit(cur_context, port_db, oport)
+                results[index] = cur_context
+        for index in sorted(retries):
+            results[index] = self._bind_port_if_needed(contexts[index],
+                                                       tries_done=1)
+        return results
+
     def _update_port_dict_binding(self, port, binding):
         port[portbindings.VNIC_TYPE] = binding.vnic_type
         port[portbindings.PROFILE] = self._get_profile(binding)
@@ -712,6 +811,21 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
                                 "the %(resource)s:%(item)s"),
                             {'resource': resource, 'item': item})
 
+        bulk_postcommit_op = getattr(self, '_after_create_%s_bulk' % resource,
+                                     None)
+        if bulk_postcommit_op:
+            try:
+                bulk_postcommit_op(context, objects)
+            except Exception:
+                with excutils.save_and_reraise_exception():
+                    resource_ids = [res['result']['id'] for res in objects]
+                    LOG.exception("ML2 _after_create_%(res)s_bulk failed. "
+                                  "Deleting %(res)ss %(resource_ids)s",
+                                  {'res': resource,
+                                   'resource_ids': ', '.join(resource_ids)})
+                    self._delete_objects(context, resource, objects)
+            return objects
+
         postcommit_op = getattr(self, '_after_create_%s' % resource)
         for obj in objects:
             try:
@@ -1235,6 +1349,19 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
 
         return bound_context.current
 
+    def _after_create_port_bulk(self, context, objects):
+        mech_contexts = [obj['mech_context'] for obj in objects]
+        for obj in objects:
+            # notify any plugin that is interested in port create events
+            kwargs = {'context': context, 'port': obj['result']}
+            registry.notify(resources.PORT, events.AFTER_CREATE, self,
+                            **kwargs)
+
+        # on failure, the caller deletes all the ports
+        self.mechanism_manager.create_port_postcommit_bulk(mech_contexts)
+        bound_contexts = self._bind_ports_if_needed(mech_contexts)
+        return [bound_context.current for bound_context in bound_contexts]
+
     @utils.transaction_guard
     @db_api.retry_if_session_inactive()
     def create_port_bulk(self, context, ports):
@@ -1897,6 +2024,28 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
         return self.mechanism_manager.filter_hosts_with_segment_access(
             context, segments, candidate_hosts, self.get_agents)
 
+    def filter_hosts_with_networks_access(
+            self, context, network_ids, candidate_hosts):
+        segments_by_network = segments_db.get_networks_segments(
+            context, network_ids)
+        # the agents of the candidate hosts are loaded once for all the
+        # networks, on the first call of a driver
+        agents = []
+
+        def agent_getter(context, filters=None):
+            if not agents:
+                agents.append(self.get_agents(
+                    context, filters={'host': list(candidate_hosts)}))
+            return [agent for agent in agents[0]
+                    if all(agent[key] in values
+                           for key, values in (filters or {}).items())]
+
+        return dict(
+            (network_id,
+             self.mechanism_manager.filter_hosts_with_segment_access(
+                 context, segments, candidate_hosts, agent_getter))
+            for network_id, segments in segments_by_network.items())
+
     def check_segment_for_agent(self, segment, agent):
         for mech_driver in self.mechanism_manager.ordered_mech_drivers:
             driver_agent_type = getattr(mech_driver.obj, 'agent_type', None)
@@ -313,6 +313,12 @@ class RpcCallbacks(type_tunnel.TunnelRpcCallbackMixin):
         if not port_context:
             # port deleted
             return
+        self._notify_l2pop_port_context(l2pop_driver, rpc_context,
+                                        port_context, status, host)
+
+    @staticmethod
+    def _notify_l2pop_port_context(l2pop_driver, rpc_context, port_context,
+                                   status, host):
         port = port_context.current
         if (status == n_const.PORT_STATUS_ACTIVE and
             port[portbindings.HOST_ID] != host and
@@ -330,6 +336,166 @@ class RpcCallbacks(type_tunnel.TunnelRpcCallbackMixin):
         else:
             l2pop_driver.obj.update_port_down(port_context)
 
+    def _notify_l2pop_ports_wiring(self, rpc_context, port_ids, status,
+                                   host):
+        """Bulk version of notify_l2pop_port_wiring.
+
+        Only non-distributed ports are expected here. The port contexts are
+        fetched with a single lookup. Returns the set of port IDs for which
+        the notification failed.
+        """
+        plugin = directory.get_plugin()
+        l2pop_driver = plugin.mechanism_manager.mech_drivers.get(
+                'l2population')
+        if not l2pop_driver or not port_ids:
+            return set()
+        try:
+            port_contexts = plugin.get_bound_ports_contexts(rpc_context,
+                                                            port_ids)
+        except Exception:
+            LOG.exception("Failed to get port contexts for l2pop "
+                          "notification of ports %s", port_ids)
+            return set(port_ids)
+        failed = set()
+        for port_id, port_context in port_contexts.items():
+            if not port_context:
+                # port deleted
+                continue
+            try:
+                self._notify_l2pop_port_context(l2pop_driver, rpc_context,
+                                                port_context, status, host)
+            except Exception:
+                LOG.exception("Failed to notify l2pop of port %(port)s "
+                              "status %(status)s",
+                              {'port': port_id, 'status': status})
+                failed.add(port_id)
+        return failed
+
+    def _get_devices_bound_to_host(self, rpc_context, devices, host):
+        """Return the port DB objects of devices bound to host.
+
+        Only non-distributed ports are returned since those are the only
+        ones that can be processed in bulk; the lookup takes a constant
+        number of queries regardless of the number of devices.
+        """
+        if not host or not devices:
+            return {}
+        plugin = directory.get_plugin()
+        dev_to_port_id = {device: plugin._device_to_port_id(rpc_context,
+                                                            device)
+                          for device in devices}
+        full_ids = ml2_db.partial_port_ids_to_full_ids(
+            rpc_context, list(set(dev_to_port_id.values())))
+        if not full_ids:
+            return {}
+        port_dbs = ml2_db.get_port_db_objects(
+            rpc_context, list(set(full_ids.values())))
+        result = {}
+        for device, port_id in dev_to_port_id.items():
+            port_db = port_dbs.get(full_ids.get(port_id))
+            if (not port_db or
+                    port_db.device_owner ==
+                    n_const.DEVICE_OWNER_DVR_INTERFACE or
+                    not port_db.port_binding or
+                    port_db.port_binding.host != host):
+                continue
+            result[device] = port_db
+        return result
+
+    def _update_devices_up(self, rpc_context, devices, **kwargs):
+        """Set devices up, processing those bound to the host in bulk.
+
+        Devices that are not bound to the agent host (e.g. live migration)
+        or are distributed ports go through update_device_up one by one.
+        Returns a tuple with the list of updated and failed devices.
+        """
+        host = kwargs.get('host')
+        bound = self._get_devices_bound_to_host(rpc_context, devices, host)
+        failed = set()
+        for device in devices:
+            if device in bound:
+                continue
+            try:
+                self.update_device_up(rpc_context, device=device, **kwargs)
+            except Exception:
+                failed.add(device)
+                LOG.error("Failed to update device %s up", device)
+
+        if bound:
+            port_ids = list({port_db.id for port_db in bound.values()})
+            try:
+                provisioning_blocks.provisioning_complete_bulk(
+                    rpc_context, port_ids, resources.PORT,
+                    provisioning_blocks.L2_AGENT_ENTITY)
+            except Exception:
+                LOG.exception("Failed to complete provisioning of ports %s",
+                              port_ids)
+                failed_ports = set(port_ids)
+            else:
+                failed_ports = self._notify_l2pop_ports_wiring(
+                    rpc_context, port_ids, n_const.PORT_STATUS_ACTIVE, host)
+            for device, port_db in bound.items():
+                if port_db.id in failed_ports:
+                    failed.add(device)
+                    LOG.error("Failed to update device %s up", device)
+
+        return ([d for d in devices if d not in failed],
+                [d for d in devices if d in failed])
+
+    def _update_devices_down(self, rpc_context, devices, **kwargs):
+        """Set devices down, processing those bound to the host in bulk.
+
+        The status of all the ports bound to the host is written with a
+        single update_port_statuses call. Should that fail, the devices are
+        retried one by one so that failures are reported per device.
+        Returns a tuple with the list of results and failed devices.
+        """
+        host = kwargs.get('host')
+        bound = self._get_devices_bound_to_host(rpc_context, devices, host)
+        results = {}
+        failed = set()
+
+        def _update_device_down(device):
+            try:
+                results[device] = self.update_device_down(
+                    rpc_context, device=device, **kwargs)
+            except Exception:
+                failed.add(device)
+                LOG.error("Failed to update device %s down", device)
+
+        for device in devices:
+            if device not in bound:
+                _update_device_down(device)
+
+        if bound:
+            plugin = directory.get_plugin()
+            port_statuses = {port_db.id: n_const.PORT_STATUS_DOWN
+                             for port_db in bound.values()}
+            try:
+                updated = plugin.update_port_statuses(rpc_context,
+                                                      port_statuses, host)
+            except Exception:
+                LOG.warning("Failed to update status of ports %s in bulk, "
+                            "retrying one by one", list(port_statuses))
+                for device in bound:
+                    _update_device_down(device)
+            else:
+                existing = [port_id for port_id, res in updated.items()
+                            if res]
+                failed_ports = self._notify_l2pop_ports_wiring(
+                    rpc_context, existing, n_const.PORT_STATUS_DOWN, host)
+                for device, port_db in bound.items():
+                    if port_db.id in failed_ports:
+                        failed.add(device)
+                        LOG.error("Failed to update device %s down", device)
+                    else:
+                        results[device] = {
+                            'device': device,
+                            'exists': bool(updated.get(port_db.id))}
+
+        return ([results[d] for d in devices if d not in failed],
+                [d for d in devices if d in failed])
+
     def update_device_list(self, rpc_context, **kwargs):
         devices_up = []
         failed_devices_up = []
@@ -337,31 +503,13 @@ class RpcCallbacks(type_tunnel.TunnelRpcCallbackMixin):
         failed_devices_down = []
         devices = kwargs.get('devices_up')
         if devices:
-            for device in devices:
-                try:
-                    self.update_device_up(
-                        rpc_context,
-                        device=device,
-                        **kwargs)
-                except Exception:
-                    failed_devices_up.append(device)
-                    LOG.error("Failed to update device %s up", device)
-                else:
-                    devices_up.append(device)
+            devices_up, failed_devices_up = self._update_devices_up(
+                rpc_context, devices, **kwargs)
 
         devices = kwargs.get('devices_down')
         if devices:
-            for device in devices:
-                try:
-                    dev = self.update_device_down(
-                        rpc_context,
-                        device=device,
-                        **kwargs)
-                except Exception:
-                    failed_devices_down.append(device)
-                    LOG.error("Failed to update device %s down", device)
-                else:
-                    devices_down.append(dev)
+            devices_down, failed_devices_down = self._update_devices_down(
+                rpc_context, devices, **kwargs)
 
         return {'devices_up': devices_up,
                 'failed_devices_up': failed_devices_up,
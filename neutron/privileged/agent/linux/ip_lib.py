@@ -10,11 +10,14 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import contextlib
 import errno
 import socket
 
 import pyroute2
 from pyroute2.netlink import rtnl
+from pyroute2.netlink.rtnl import fibmsg
+from pyroute2.netlink.rtnl import ifaddrmsg
 from pyroute2.netlink.rtnl import ndmsg
 from pyroute2 import NetlinkError
 from pyroute2 import netns
@@ -25,6 +28,14 @@ from neutron import privileged
 
 _IP_VERSION_FAMILY_MAP = {4: socket.AF_INET, 6: socket.AF_INET6}
 
+# names used by the ip command, which differ from the pyroute2 ones
+_SCOPE_NAME_MAP = {'global': 'universe'}
+_ROUTE_TABLES = {'default': 253, 'main': 254, 'local': 255}
+_RULE_TYPES = {'unicast': fibmsg.FR_ACT_TO_TBL,
+               'blackhole': fibmsg.FR_ACT_BLACKHOLE,
+               'unreachable': fibmsg.FR_ACT_UNREACHABLE,
+               'prohibit': fibmsg.FR_ACT_PROHIBIT}
+
 
 def _get_scope_name(scope):
     """Return the name of the scope (given as a number), or the scope number
@@ -33,6 +44,35 @@ def _get_scope_name(scope):
     return rtnl.rt_scope.get(scope, scope)
 
 
+def _get_scope_number(scope):
+    """Return the number of a scope given by the name the ip command uses."""
+    if scope is None or isinstance(scope, int):
+        return scope
+    return rtnl.rt_scope[_SCOPE_NAME_MAP.get(scope, scope)]
+
+
+def _get_ip_scope_name(scope):
+    """Return the name the ip command uses for a scope number."""
+    name = _get_scope_name(scope)
+    return 'global' if name == 'universe' else name
+
+
+def _get_table_number(table):
+    if table is None:
+        return None
+    try:
+        return int(table)
+    except ValueError:
+        return _ROUTE_TABLES[table]
+
+
+def _get_table_name(table):
+    for name, number in _ROUTE_TABLES.items():
+        if number == table:
+            return name
+    return str(table)
+
+
 class NetworkNamespaceNotFound(RuntimeError):
     message = _("Network namespace %(netns_name)s could not be found.")
 
@@ -45,6 +85,10 @@ class NetworkInterfaceNotFound(RuntimeError):
     pass
 
 
+class IpCommandFailed(RuntimeError):
+    """A netlink request failed, like the ip command would have."""
+
+
 @privileged.default.entrypoint
 def get_routing_table(ip_version, namespace=None):
     """Return a list of dictionaries, each representing a route.
@@ -207,3 +251,423 @@ def list_netns(**kwargs):
     Caller requires raised priveleges to list namespaces
     """
     return netns.listnetns(**kwargs)
+
+
+@contextlib.contextmanager
+def _iproute(namespace):
+    """Return a netlink socket opened in a namespace, translating errors."""
+    try:
+        with _get_iproute(namespace) as ip:
+            yield ip
+    except OSError as e:
+        if e.errno == errno.ENOENT:
+            raise NetworkNamespaceNotFound(netns_name=namespace)
+        raise
+    except NetlinkError as e:
+        raise IpCommandFailed(_("Netlink request failed in namespace "
+                                "%(namespace)s: %(error)s") %
+                              {'namespace': namespace, 'error': e})
+
+
+def _get_link_id(ip, device, namespace):
+    try:
+        return ip.link_lookup(ifname=device)[0]
+    except IndexError:
+        msg = _("Network interface %(device)s not found in namespace "
+                "%(namespace)s.") % {'device': device,
+                                     'namespace': namespace}
+        raise NetworkInterfaceNotFound(msg)
+
+
+def _get_link_names(ip):
+    return {link['index']: link.get_attr('IFLA_IFNAME')
+            for link in ip.get_links()}
+
+
+def _set_link_attribute(ip, namespace, device, **attributes):
+    ip.link('set', index=_get_link_id(ip, device, namespace), **attributes)
+
+
+def _set_link_flags(ip, namespace, device, flags):
+    index = _get_link_id(ip, device, namespace)
+    link = ip.link('get', index=index)[0]
+    ip.link('set', index=index, flags=link['flags'] | flags)
+
+
+def _delete_link(ip, namespace, device):
+    ip.link('del', index=_get_link_id(ip, device, namespace))
+
+
+def _add_ip_address(ip, namespace, ip_version, address, prefixlen, device,
+                    scope='global', broadcast=None):
+    kwargs = {'broadcast': broadcast} if broadcast else {}
+    ip.addr('add', index=_get_link_id(ip, device, namespace),
+            address=address, mask=prefixlen,
+            family=_IP_VERSION_FAMILY_MAP[ip_version],
+            scope=_get_scope_number(scope), **kwargs)
+
+
+def _delete_ip_address(ip, namespace, ip_version, address, prefixlen,
+                       device):
+    try:
+        ip.addr('del', index=_get_link_id(ip, device, namespace),
+                address=address, mask=prefixlen,
+                family=_IP_VERSION_FAMILY_MAP[ip_version])
+    except NetlinkError as e:
+        # like "ip addr del", deleting a missing address is an error, but
+        # with a message the callers can recognize
+        if e.code == errno.EADDRNOTAVAIL:
+            raise IpCommandFailed(_("Cannot assign requested address "
+                                    "%(address)s/%(prefixlen)s on "
+                                    "%(device)s") %
+                                  {'address': address,
+                                   'prefixlen': prefixlen,
+                                   'device': device})
+        raise
+
+
+def _flush_ip_addresses(ip, namespace, ip_version, device):
+    ip.flush_addr(index=_get_link_id(ip, device, namespace),
+                  family=_IP_VERSION_FAMILY_MAP[ip_version])
+
+
+def _make_route_args(ip, namespace, ip_version, cidr, device=None, via=None,
+                     table=None, metric=None, scope=None, proto=None):
+    dst, _sep, dst_len = cidr.partition('/')
+    args = {'family': _IP_VERSION_FAMILY_MAP[ip_version],
+            'dst': dst,
+            'dst_len': int(dst_len or (32 if ip_version == 4 else 128))}
+    if device:
+        args['oif'] = _get_link_id(ip, device, namespace)
+    if via:
+        args['gateway'] = via
+    if table:
+        args['table'] = _get_table_number(table)
+    if metric:
+        args['priority'] = int(metric)
+    if scope:
+        args['scope'] = _get_scope_number(scope)
+    if proto:
+        args['proto'] = proto
+    if not args['dst_len']:
+        # default route
+        del args['dst']
+    return args
+
+
+def _get_routes(ip, namespace, ip_version, table=None, device=None):
+    """Yield the unicast routes of a table, "main" by default."""
+    table = _get_table_number(table) or _ROUTE_TABLES['main']
+    index = _get_link_id(ip, device, namespace) if device else None
+    for route in ip.route('dump', family=_IP_VERSION_FAMILY_MAP[ip_version]):
+        if (route['type'] == rtnl.rt_type['unicast'] and
+                (route.get_attr('RTA_TABLE') or route['table']) == table and
+                (index is None or route.get_attr('RTA_OIF') == index)):
+            yield route
+
+
+def _add_ip_route(ip, namespace, ip_version, cidr, **kwargs):
+    args = _make_route_args(ip, namespace, ip_version, cidr, **kwargs)
+    # the protocol the ip command sets by default
+    args.setdefault('proto', 'boot')
+    ip.route('replace', **args)
+
+
+def _delete_ip_route(ip, namespace, ip_version, cidr, **kwargs):
+    args = _make_route_args(ip, namespace, ip_version, cidr, **kwargs)
+    # the routes are matched on the given attributes only
+    args.pop('proto', None)
+    ip.route('del', **args)
+
+
+def _make_rule_args(ip_version, settings):
+    """Translate the canonical settings of IpRuleCommand to pyroute2 ones."""
+    args = {'family': _IP_VERSION_FAMILY_MAP[ip_version],
+            'action': _RULE_TYPES[settings.get('type', 'unicast')]}
+    for key, value in settings.items():
+        if key in ('from', 'to'):
+            address, _sep, prefixlen = value.partition('/')
+            prefixlen = int(prefixlen or (32 if ip_version == 4 else 128))
+            if prefixlen:
+                prefix = 'src' if key == 'from' else 'dst'
+                args[prefix] = address
+                args[prefix + '_len'] = prefixlen
+        elif key == 'priority':
+            args['priority'] = int(value)
+        elif key in ('table', 'lookup'):
+            args['table'] = _get_table_number(value)
+        elif key == 'iif':
+            args['iifname'] = value
+        elif key == 'oif':
+            args['oifname'] = value
+        elif key == 'fwmark':
+            fwmark, _sep, fwmask = value.partition('/')
+            args['fwmark'] = int(fwmark, 0)
+            if fwmask:
+                args['fwmask'] = int(fwmask, 0)
+        elif key != 'type':
+            raise ValueError(_("Unsupported rule setting: %s") % key)
+    return args
+
+
+def _add_ip_rule(ip, namespace, ip_version, settings):
+    ip.rule('add', **_make_rule_args(ip_version, settings))
+
+
+def _delete_ip_rule(ip, namespace, ip_version, settings):
+    ip.rule('del', **_make_rule_args(ip_version, settings))
+
+
+_BATCH_OPERATIONS = {
+    'set_link_attribute': _set_link_attribute,
+    'add_ip_address': _add_ip_address,
+    'delete_ip_address': _delete_ip_address,
+    'add_ip_route': _add_ip_route,
+    'delete_ip_route': _delete_ip_route,
+    'add_ip_rule': _add_ip_rule,
+    'delete_ip_rule': _delete_ip_rule,
+}
+
+
+@privileged.default.entrypoint
+def set_link_attribute(device, namespace, **attributes):
+    """Set link attributes, e.g. state='up', mtu=1450 or ifname='new'."""
+    with _iproute(namespace) as ip:
+        _set_link_attribute(ip, namespace, device, **attributes)
+
+
+@privileged.default.entrypoint
+def set_link_flags(device, namespace, flags):
+    """Add flags (IFF_*) to the ones of a link."""
+    with _iproute(namespace) as ip:
+        _set_link_flags(ip, namespace, device, flags)
+
+
+@privileged.default.entrypoint
+def delete_link(device, namespace):
+    with _iproute(namespace) as ip:
+        _delete_link(ip, namespace, device)
+
+
+@privileged.default.entrypoint
+def get_link_attributes(device, namespace):
+    """Return the attributes of a link the way "ip -o link show" does.
+
+    :return: a dictionary with the keys mtu, qdisc, state, qlen, link/ether
+             and alias, whose values are None when not set.
+    """
+    with _iproute(namespace) as ip:
+        index = _get_link_id(ip, device, namespace)
+        link = ip.link('get', index=index)[0]
+        return {'mtu': link.get_attr('IFLA_MTU'),
+                'qdisc': link.get_attr('IFLA_QDISC'),
+                'state': link.get_attr('IFLA_OPERSTATE'),
+                'qlen': link.get_attr('IFLA_TXQLEN'),
+                'link/ether': link.get_attr('IFLA_ADDRESS'),
+                'alias': link.get_attr('IFLA_IFALIAS')}
+
+
+@privileged.default.entrypoint
+def add_ip_address(ip_version, address, prefixlen, device, namespace,
+                   scope='global', broadcast=None):
+    with _iproute(namespace) as ip:
+        _add_ip_address(ip, namespace, ip_version, address, prefixlen,
+                        device, scope=scope, broadcast=broadcast)
+
+
+@privileged.default.entrypoint
+def delete_ip_address(ip_version, address, prefixlen, device, namespace):
+    with _iproute(namespace) as ip:
+        _delete_ip_address(ip, namespace, ip_version, address, prefixlen,
+                           device)
+
+
+@privileged.default.entrypoint
+def flush_ip_addresses(ip_version, device, namespace):
+    with _iproute(namespace) as ip:
+        _flush_ip_addresses(ip, namespace, ip_version, device)
+
+
+@privileged.default.entrypoint
+def get_ip_addresses(namespace, device=None, ip_version=None, scope=None):
+    """Return the IP addresses of a namespace, or of a device in it.
+
+    :return: a list of dictionaries with the keys name, cidr, scope,
+             dynamic, tentative and dadfailed, like the ones parsed from
+             "ip addr show" by neutron.agent.linux.ip_lib.
+    """
+    kwargs = {}
+    if ip_version:
+        kwargs['family'] = _IP_VERSION_FAMILY_MAP[ip_version]
+    with _iproute(namespace) as ip:
+        if device:
+            kwargs['index'] = _get_link_id(ip, device, namespace)
+        names = _get_link_names(ip)
+        addresses = []
+        for address in ip.get_addr(**kwargs):
+            address_scope = _get_ip_scope_name(address['scope'])
+            if scope and address_scope != scope:
+                continue
+            flags = address.get_attr('IFA_FLAGS') or address['flags']
+            addresses.append({
+                'name': names.get(address['index']),
+                'cidr': '%s/%s' % (address.get_attr('IFA_ADDRESS'),
+                                   address['prefixlen']),
+                'scope': address_scope,
+                'dynamic': not flags & ifaddrmsg.IFA_F_PERMANENT,
+                'tentative': bool(flags & ifaddrmsg.IFA_F_TENTATIVE),
+                'dadfailed': bool(flags & ifaddrmsg.IFA_F_DADFAILED)})
+        return addresses
+
+
+@privileged.default.entrypoint
+def add_ip_route(namespace, ip_version, cidr, device=None, via=None,
+                 table=None, metric=None, scope=None, proto=None):
+    """Add or replace a route, like "ip route replace"."""
+    with _iproute(namespace) as ip:
+        _add_ip_route(ip, namespace, ip_version, cidr, device=device,
+                      via=via, table=table, metric=metric, scope=scope,
+                      proto=proto)
+
+
+@privileged.default.entrypoint
+def delete_ip_route(namespace, ip_version, cidr, device=None, via=None,
+                    table=None, metric=None, scope=None, proto=None):
+    with _iproute(namespace) as ip:
+        _delete_ip_route(ip, namespace, ip_version, cidr, device=device,
+                         via=via, table=table, metric=metric, scope=scope,
+                         proto=proto)
+
+
+@privileged.default.entrypoint
+def list_ip_routes(namespace, ip_version, device=None, table=None,
+                   scope=None, proto=None, via=None):
+    """Return the unicast routes of a table, "main" by default.
+
+    :return: a list of dictionaries with the keys "ip route list" outputs:
+             cidr and dev, and when they are set via, metric, src, proto
+             (unless boot) and scope (unless global).
+    """
+    with _iproute(namespace) as ip:
+        names = _get_link_names(ip)
+        routes = []
+        for route in _get_routes(ip, namespace, ip_version, table, device):
+            oif = route.get_attr('RTA_OIF')
+            if (scope is not None and
+                    _get_ip_scope_name(route['scope']) != scope):
+                continue
+            if (proto is not None and
+                    rtnl.rt_proto.get(route['proto']) != proto):
+                continue
+            gateway = route.get_attr('RTA_GATEWAY')
+            if via is not None and gateway != via:
+                continue
+            if not route['dst_len']:
+                cidr = '0.0.0.0/0' if ip_version == 4 else '::/0'
+            elif route['dst_len'] == (32 if ip_version == 4 else 128):
+                # host routes are shown without their prefix length
+                cidr = route.get_attr('RTA_DST')
+            else:
+                cidr = '%s/%s' % (route.get_attr('RTA_DST'),
+                                  route['dst_len'])
+            entry = {'cidr': cidr, 'dev': names.get(oif)}
+            if gateway:
+                entry['via'] = gateway
+            metric = route.get_attr('RTA_PRIORITY')
+            if metric is not None:
+                entry['metric'] = str(metric)
+            src = route.get_attr('RTA_PREFSRC')
+            if src:
+                entry['src'] = src
+            route_proto = rtnl.rt_proto.get(route['proto'], route['proto'])
+            if route_proto != 'boot':
+                entry['proto'] = str(route_proto)
+            if route['scope'] != rtnl.rt_scope['universe']:
+                entry['scope'] = _get_ip_scope_name(route['scope'])
+            routes.append(entry)
+        return routes
+
+
+@privileged.default.entrypoint
+def flush_ip_routes(namespace, ip_version, table=None, device=None):
+    """Delete the routes of a table, "main" by default."""
+    with _iproute(namespace) as ip:
+        for route in list(_get_routes(ip, namespace, ip_version, table,
+                                      device)):
+            args = {'family': route['family'],
+                    'dst_len': route['dst_len'],
+                    'table': route.get_attr('RTA_TABLE') or route['table'],
+                    'scope': route['scope'],
+                    'oif': route.get_attr('RTA_OIF'),
+                    'gateway': route.get_attr('RTA_GATEWAY')}
+            if route['dst_len']:
+                args['dst'] = route.get_attr('RTA_DST')
+            ip.route('del', **args)
+
+
+@privileged.default.entrypoint
+def list_ip_rules(namespace, ip_version):
+    """Return the rules with the settings "ip rule show" outputs.
+
+    :return: a list of dictionaries with the keys priority, from, table and
+             type, and when they are set to, iif, oif and fwmark.
+    """
+    rules = []
+    with _iproute(namespace) as ip:
+        for rule in ip.get_rules(family=_IP_VERSION_FAMILY_MAP[ip_version]):
+            settings = {'priority': str(rule.get_attr('FRA_PRIORITY') or 0),
+                        'table': _get_table_name(
+                            rule.get_attr('FRA_TABLE') or rule['table'])}
+            for key, attr, length in (('from', 'FRA_SRC', 'src_len'),
+                                      ('to', 'FRA_DST', 'dst_len')):
+                if rule[length]:
+                    full = 32 if ip_version == 4 else 128
+                    address = rule.get_attr(attr)
+                    settings[key] = (address if rule[length] == full else
+                                     '%s/%s' % (address, rule[length]))
+                elif key == 'from':
+                    settings[key] = 'all'
+            for key, attr in (('iif', 'FRA_IIFNAME'),
+                              ('oif', 'FRA_OIFNAME')):
+                if rule.get_attr(attr):
+                    settings[key] = rule.get_attr(attr)
+            fwmark = rule.get_attr('FRA_FWMARK')
+            if fwmark:
+                fwmask = rule.get_attr('FRA_FWMASK')
+                settings['fwmark'] = ('%#x/%#x' % (fwmark, fwmask)
+                                      if fwmask is not None else
+                                      '%#x' % fwmark)
+            for name, action in _RULE_TYPES.items():
+                if rule['action'] == action:
+                    settings['type'] = name
+            rules.append(settings)
+    return rules
+
+
+@privileged.default.entrypoint
+def add_ip_rule(namespace, ip_version, settings):
+    """Add a rule given with the canonical settings of IpRuleCommand."""
+    with _iproute(namespace) as ip:
+        _add_ip_rule(ip, namespace, ip_version, settings)
+
+
+@privileged.default.entrypoint
+def delete_ip_rule(namespace, ip_version, settings):
+    with _iproute(namespace) as ip:
+        _delete_ip_rule(ip, namespace, ip_version, settings)
+
+
+@privileged.default.entrypoint
+def apply_ip_changes(namespace, changes):
+    """Apply several link, address, route and rule changes in a namespace.
+
+    The changes are applied in order with a single netlink socket, the first
+    failure stops the batch.
+
+    :param changes: a list of (operation, kwargs) tuples, the operations
+                    being the names of the single change functions of this
+                    module, e.g. ('add_ip_address', {'ip_version': 4, ...}).
+    """
+    with _iproute(namespace) as ip:
+        for operation, kwargs in changes:
+            _BATCH_OPERATIONS[operation](ip, namespace, **kwargs)
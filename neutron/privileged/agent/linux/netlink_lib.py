@@ -217,9 +217,17 @@ def _parse_entry(entry, ipversion, zone):
         (ipversion, protocol, sport, dport, src_ip, dst_ip, zone)
     example: (4, 'tcp', '1', '2', '1.1.1.1', '2.2.2.2', 1)
     The attributes are ordered to be easy to compare with other entries
-    and compare with firewall rule
+    and compare with firewall rule. The entries of the protocols missing
+    from ATTR_POSITIONS only have their first src and dst parsed, in format
+        (ipversion, protocol, None, None, src_ip, dst_ip, zone)
+    they can't be deleted with delete_entries.
     """
     protocol = entry[1]
+    if protocol not in ATTR_POSITIONS:
+        addresses = dict(attr.partition('=')[::2] for attr in reversed(entry)
+                         if attr.startswith(('src=', 'dst=')))
+        return (ipversion, protocol, None, None, addresses.get('src'),
+                addresses.get('dst'), zone)
     parsed_entry = [ipversion, protocol]
     for attr, position in ATTR_POSITIONS[protocol]:
         val = entry[position].partition('=')[2]
@@ -242,6 +250,7 @@ def list_entries(zone):
               (4, 'tcp', '1', '2', '1.1.1.1', '2.2.2.2')]
     """
     parsed_entries = []
+    other_entries = []
     for ipversion in IP_VERSIONS:
         with ConntrackManager(nl_constants.IPVERSION_SOCKET[ipversion]) \
                 as conntrack:
@@ -252,9 +261,12 @@ def list_entries(zone):
         for raw_entry in raw_entries:
             _entry = raw_entry.split()
             parsed_entry = _parse_entry(_entry, ipversion, zone)
-            parsed_entries.append(parsed_entry)
-    # sort by dest port
-    return sorted(parsed_entries, key=lambda x: x[3])
+            if _entry[1] in ATTR_POSITIONS:
+                parsed_entries.append(parsed_entry)
+            else:
+                other_entries.append(parsed_entry)
+    # sort by dest port, the entries of the other protocols have none
+    return sorted(parsed_entries, key=lambda x: x[3]) + other_entries
 
 
 @privileged.default.entrypoint
@@ -17,6 +17,7 @@ from neutron_lib.plugins import directory
 from oslo_config import cfg
 from oslo_log import log
 from oslo_utils import excutils
+import sqlalchemy as sa
 from sqlalchemy import exc as sql_exc
 from sqlalchemy.orm import session as se
 
@@ -54,6 +55,46 @@ def _count_resource(context, collection_name, tenant_id):
         'No plugins that support counting %s found.' % collection_name)
 
 
+def count_used_tracked_resources(context, tenant_id, resources):
+    """Return the current usage count for multiple tracked resources.
+
+    This is equivalent to calling count_used on every resource without
+    resyncing their usage, but the usage data of all the resources are
+    loaded with a single query and the resources whose usage is out of sync
+    are counted with a single query.
+
+    :param context: The request context.
+    :param tenant_id: The ID of the tenant
+    :param resources: An iterable of TrackedResource instances.
+    :returns: a dictionary mapping resource names to usage counts.
+    """
+    resources = dict((resource.name, resource) for resource in resources)
+    usage_infos = quota_api.get_quota_usage_by_resources_and_tenant(
+        context, resources.keys(), tenant_id)
+    out_of_sync = [
+        resource for name, resource in resources.items()
+        if resource.is_out_of_sync(tenant_id, usage_infos.get(name))]
+    used = dict((name, usage_info.used)
+                for name, usage_info in usage_infos.items())
+    if not out_of_sync:
+        return used
+
+    LOG.debug(("Usage trackers for resources:%(resources)s and tenant:"
+               "%(tenant_id)s are out of sync, need to count used quota"),
+              {'resources': ",".join(sorted(r.name for r in out_of_sync)),
+               'tenant_id': tenant_id})
+    queries = [resource.get_count_query(context, tenant_id)
+               for resource in out_of_sync]
+    query = queries[0].union_all(*queries[1:]) if queries[1:] else queries[0]
+    in_use = dict((r.name, 0) for r in out_of_sync)
+    in_use.update(query.all())
+    used.update(in_use)
+    LOG.debug("Quota usage for %(resources)s was recalculated. Used quota: "
+              "%(used)s.", {'resources': ",".join(sorted(in_use)),
+                            'used': in_use})
+    return used
+
+
 class BaseResource(object):
     """Describe a single resource for quota checking."""
 
@@ -223,6 +264,28 @@ class TrackedResource(BaseResource):
         return quota_api.set_quota_usage(
             context, self.name, tenant_id, in_use=in_use)
 
+    def is_out_of_sync(self, tenant_id, usage_info):
+        """Whether the usage info of a tenant must be recalculated.
+
+        :param tenant_id: The ID of the tenant
+        :param usage_info: The QuotaUsageInfo of the tenant for this resource
+                           or None if there is none.
+        """
+        return (tenant_id in self._dirty_tenants or
+                not usage_info or usage_info.dirty)
+
+    def get_count_query(self, context, tenant_id):
+        """Return a query counting the resources of a tenant.
+
+        The query returns a single (resource name, count) row, so that the
+        queries of different resources can be combined with a union.
+        """
+        return context.session.query(
+            sa.literal(self.name).label('resource'),
+            sa.func.count().label('in_use')).select_from(
+                self._model_class).filter(
+                    self._model_class.tenant_id == tenant_id)
+
     def _resync(self, context, tenant_id, in_use):
         # Update quota usage
         usage_info = self._set_quota_usage(context, tenant_id, in_use)
@@ -263,8 +326,7 @@ class TrackedResource(BaseResource):
         # assumption is generally valid, but if the database is tampered with,
         # or if data migrations do not take care of usage counters, the
         # assumption will not hold anymore
-        if (tenant_id in self._dirty_tenants or
-            not usage_info or usage_info.dirty):
+        if self.is_out_of_sync(tenant_id, usage_info):
             LOG.debug(("Usage tracker for resource:%(resource)s and tenant:"
                        "%(tenant_id)s is out of sync, need to count used "
                        "quota"), {'resource': self.name,
@@ -31,6 +31,10 @@ from neutron.scheduler import base_scheduler
 
 LOG = logging.getLogger(__name__)
 
+# number of network bindings written in a single transaction when several
+# networks are scheduled at once
+NETWORK_BINDING_BATCH_SIZE = 100
+
 
 class AutoScheduler(object):
 
@@ -94,6 +98,72 @@ class AutoScheduler(object):
             self.resource_filter.bind(context, [agent], net_id)
         return True
 
+    def schedule_networks(self, plugin, context, networks):
+        """Schedule several unhosted networks at once.
+
+        The DHCP agents, the bindings of the networks and the hosts with
+        access to them are loaded once and the networks are assigned to the
+        agents in memory, the load of an agent being increased as networks
+        are assigned to it. The bindings are then written in batches.
+
+        :return: a list of (agent, network ids) tuples, one per agent the
+                 networks were bound to.
+        """
+        agents_per_network = cfg.CONF.dhcp_agents_per_network
+        dhcp_agents = plugin.get_agent_objects(
+            context, filters={'agent_type': [constants.AGENT_TYPE_DHCP]})
+        agents_by_id = {agent.id: agent for agent in dhcp_agents}
+        active_agents = [agent for agent in dhcp_agents
+                         if agent.admin_state_up and
+                         plugin.is_eligible_agent(context, True, agent)]
+        if not active_agents:
+            LOG.warning('No more DHCP agents')
+            return []
+        hosted_agent_ids = collections.defaultdict(set)
+        bindings = network.NetworkDhcpAgentBinding.get_objects(
+            context, network_id=[net['id'] for net in networks])
+        for binding in bindings:
+            hosted_agent_ids[binding.network_id].add(binding.dhcp_agent_id)
+        reachable_hosts = plugin.filter_hosts_with_networks_access(
+            context,
+            [net['id'] for net in networks if 'candidate_hosts' not in net],
+            set(agent.host for agent in active_agents))
+
+        agent_network_ids = collections.OrderedDict()
+        for net in networks:
+            hosted_ids = hosted_agent_ids[net['id']]
+            n_agents = agents_per_network - len(hosted_ids)
+            if n_agents <= 0:
+                LOG.debug('Network %s is already hosted by enough agents.',
+                          net['id'])
+                continue
+            az_hints = (net.get(az_def.AZ_HINTS) or
+                        cfg.CONF.default_availability_zones)
+            if 'candidate_hosts' in net:
+                hosts = net['candidate_hosts']
+            else:
+                hosts = reachable_hosts[net['id']]
+            hostable_agents = [
+                agent for agent in active_agents
+                if agent.id not in hosted_ids and agent.host in hosts and
+                (not az_hints or agent.availability_zone in az_hints)]
+            n_agents = min(len(hostable_agents), n_agents)
+            if n_agents <= 0:
+                continue
+            hosted_agents = [agents_by_id[agent_id]
+                             for agent_id in hosted_ids]
+            chosen_agents = self.select(plugin, context, hostable_agents,
+                                        hosted_agents, n_agents)
+            for agent in chosen_agents:
+                # accounted right away for the next networks to be spread
+                # over the agents, it is saved along with the bindings
+                agent.load += 1
+                hosted_ids.add(agent.id)
+                agent_network_ids.setdefault(agent.id, []).append(net['id'])
+        return self.resource_filter.bind_networks(
+            context, [(agents_by_id[agent_id], network_ids)
+                      for agent_id, network_ids in agent_network_ids.items()])
+
 
 class ChanceScheduler(base_scheduler.BaseChanceScheduler, AutoScheduler):
 
@@ -188,6 +258,51 @@ class DhcpFilter(base_resource_filter.BaseResourceFilter):
                        'agent_id': agent_id})
         super(DhcpFilter, self).bind(context, bound_agents, network_id)
 
+    def bind_networks(self, context, agent_networks):
+        """Bind networks to agents, in batches.
+
+        :param agent_networks: a list of (agent, network ids) tuples, the
+                               load of the agents already accounting for the
+                               networks. It is decreased by the networks
+                               found bound concurrently before being saved.
+        :return: the list of (agent, network ids) tuples of the networks
+                 actually bound.
+        """
+        bound_agent_networks = []
+        for agent, network_ids in agent_networks:
+            agent_id = agent.id
+            bound_network_ids = []
+            for i in range(0, len(network_ids), NETWORK_BINDING_BATCH_SIZE):
+                batch = network_ids[i:i + NETWORK_BINDING_BATCH_SIZE]
+                try:
+                    with context.session.begin(subtransactions=True):
+                        for network_id in batch:
+                            network.NetworkDhcpAgentBinding(
+                                context, dhcp_agent_id=agent_id,
+                                network_id=network_id).create()
+                    bound_network_ids.extend(batch)
+                except exceptions.NeutronDbObjectDuplicateEntry:
+                    # some networks of the batch were bound concurrently,
+                    # the others are bound one by one
+                    for network_id in batch:
+                        try:
+                            network.NetworkDhcpAgentBinding(
+                                context, dhcp_agent_id=agent_id,
+                                network_id=network_id).create()
+                            bound_network_ids.append(network_id)
+                        except exceptions.NeutronDbObjectDuplicateEntry:
+                            LOG.info('Agent %s already present', agent_id)
+            agent.load -= len(network_ids) - len(bound_network_ids)
+            if not bound_network_ids:
+                continue
+            LOG.debug('Networks %(network_ids)s are scheduled to be hosted '
+                      'by DHCP agent %(agent_id)s',
+                      {'network_ids': bound_network_ids,
+                       'agent_id': agent_id})
+            agent.update()
+            bound_agent_networks.append((agent, bound_network_ids))
+        return bound_agent_networks
+
     def filter_agents(self, plugin, context, network):
         """Return the agents that can host the network.
 
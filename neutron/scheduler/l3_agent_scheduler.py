@@ -37,6 +37,10 @@ from neutron.objects import l3agent as rb_obj
 LOG = logging.getLogger(__name__)
 cfg.CONF.register_opts(l3_hamode_db.L3_HA_OPTS)
 
+# number of router bindings written in a single transaction when the routers
+# are scheduled to an agent at once
+ROUTER_BINDING_BATCH_SIZE = 100
+
 
 @six.add_metaclass(abc.ABCMeta)
 class L3Scheduler(object):
@@ -52,15 +56,6 @@ class L3Scheduler(object):
         return self._schedule_router(
             plugin, context, router_id, candidates=candidates)
 
-    def _router_has_binding(self, context, router_id, l3_agent_id):
-        router_binding_model = rb_model.RouterL3AgentBinding
-
-        query = context.session.query(router_binding_model)
-        query = query.filter(router_binding_model.router_id == router_id,
-                             router_binding_model.l3_agent_id == l3_agent_id)
-
-        return query.count() > 0
-
     def _get_routers_can_schedule(self, plugin, context, routers, l3_agent):
         """Get the subset of routers that can be scheduled on the L3 agent."""
         ids_to_discard = set()
@@ -96,9 +91,16 @@ class L3Scheduler(object):
             plugin, context)
         target_routers = self._get_routers_can_schedule(
             plugin, context, underscheduled_routers, l3_agent)
-
-        for router in target_routers:
-            self.schedule(plugin, context, router['id'], candidates=[l3_agent])
+        if not target_routers:
+            return
+        # the routers, their bindings and the agent are all known here: the
+        # routers are bound to the agent directly rather than each of them
+        # being looked up and scheduled on its own
+        supported_router_ids = set(plugin.routers_supporting_scheduling(
+            context, [router['id'] for router in target_routers]))
+        target_routers = [router for router in target_routers
+                          if router['id'] in supported_router_ids]
+        self._bind_routers(plugin, context, target_routers, l3_agent)
 
     def _get_underscheduled_routers(self, plugin, context):
         underscheduled_routers = []
@@ -145,15 +147,46 @@ class L3Scheduler(object):
             return candidates
 
     def _bind_routers(self, plugin, context, routers, l3_agent):
+        hosted_router_ids = {
+            binding.router_id for binding in
+            rb_obj.RouterL3AgentBinding.get_objects(
+                context, l3_agent_id=l3_agent.id)}
+        router_ids = []
         for router in routers:
+            if router['id'] in hosted_router_ids:
+                continue
             if router.get('ha'):
-                if not self._router_has_binding(context, router['id'],
-                                                l3_agent.id):
-                    self.create_ha_port_and_bind(
-                        plugin, context, router['id'],
-                        router['tenant_id'], l3_agent)
+                self.create_ha_port_and_bind(
+                    plugin, context, router['id'],
+                    router['tenant_id'], l3_agent)
             else:
-                self.bind_router(plugin, context, router['id'], l3_agent.id)
+                router_ids.append(router['id'])
+        for i in range(0, len(router_ids), ROUTER_BINDING_BATCH_SIZE):
+            self._bind_routers_batch(
+                plugin, context, router_ids[i:i + ROUTER_BINDING_BATCH_SIZE],
+                l3_agent.id)
+
+    def _bind_routers_batch(self, plugin, context, router_ids, agent_id):
+        """Bind non-HA routers to the l3 agent in a single transaction.
+
+        When a router of the batch was bound or removed concurrently, the
+        routers are bound one by one with bind_router.
+        """
+        try:
+            # the models are added to the session rather than created as
+            # objects, each of which would be created in its own savepoint
+            with context.session.begin(subtransactions=True):
+                for router_id in router_ids:
+                    context.session.add(rb_model.RouterL3AgentBinding(
+                        l3_agent_id=agent_id, router_id=router_id,
+                        binding_index=rb_model.LOWEST_BINDING_INDEX))
+        except (db_exc.DBDuplicateEntry, db_exc.DBReferenceError):
+            for router_id in router_ids:
+                self.bind_router(plugin, context, router_id, agent_id)
+            return
+        LOG.debug('Routers %(router_ids)s are scheduled to L3 agent '
+                  '%(agent_id)s',
+                  {'router_ids': router_ids, 'agent_id': agent_id})
 
     @db_api.retry_db_errors
     def bind_router(self, plugin, context, router_id, agent_id,
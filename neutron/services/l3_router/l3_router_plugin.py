@@ -137,6 +137,10 @@ class L3RouterPlugin(service_base.ServicePluginBase,
     def router_supports_scheduling(self, context, router_id):
         return self.l3_driver_controller.uses_scheduler(context, router_id)
 
+    def routers_supporting_scheduling(self, context, router_ids):
+        return self.l3_driver_controller.routers_using_scheduler(
+            context, router_ids)
+
     def create_floatingip(self, context, floatingip):
         """Create floating IP.
 
@@ -195,6 +195,23 @@ class DriverController(object):
         return (self.get_provider_for_router(context, router_id).
                 use_integrated_agent_scheduler)
 
+    def routers_using_scheduler(self, context, router_ids):
+        """Returns the ids of the routers using the integrated L3 scheduler.
+
+        The providers of the routers are looked up at once.
+        """
+        driver_names = self._stm.get_provider_names_by_resource_ids(
+            context, router_ids)
+        result = []
+        for router_id in router_ids:
+            if router_id in driver_names:
+                driver = self.drivers[driver_names[router_id]]
+            else:
+                driver = self.get_provider_for_router(context, router_id)
+            if driver.use_integrated_agent_scheduler:
+                result.append(router_id)
+        return result
+
 
 class _LegacyPlusProviderConfiguration(
     provider_configuration.ProviderConfiguration):
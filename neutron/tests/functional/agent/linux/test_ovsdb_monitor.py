@@ -79,10 +79,12 @@ class TestOvsdbMonitor(BaseMonitorTest):
 
 class TestSimpleInterfaceMonitor(BaseMonitorTest):
 
+    monitor_class = ovsdb_monitor.SimpleInterfaceMonitor
+
     def setUp(self):
         super(TestSimpleInterfaceMonitor, self).setUp()
 
-        self.monitor = ovsdb_monitor.SimpleInterfaceMonitor()
+        self.monitor = self.monitor_class()
         self.addCleanup(self.monitor.stop)
         self.monitor.start(block=True, timeout=60)
 
@@ -150,3 +152,8 @@ class TestSimpleInterfaceMonitor(BaseMonitorTest):
                         e['ofport'] != ovs_lib.UNASSIGNED_OFPORT):
                     return True
         utils.wait_until_true(p1_event_has_ofport)
+
+
+class TestSimpleInterfaceIdlMonitor(TestSimpleInterfaceMonitor):
+
+    monitor_class = ovsdb_monitor.SimpleInterfaceIdlMonitor
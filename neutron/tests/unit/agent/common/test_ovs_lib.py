@@ -389,6 +389,35 @@ class OVS_Lib_Test(base.BaseTestCase):
         ]
         self.execute.assert_has_calls(expected_calls)
 
+    def test_do_action_flows_bundle(self):
+        self.br.do_action_flows_bundle([
+            ('add', {'in_port': 5, 'actions': 'drop'}),
+            ('del', {'in_port': 6, 'priority': 2, 'strict': True}),
+            ('del', {'in_port': 7})])
+        cookie_spec = "cookie=%s" % self.br._default_cookie
+        self.assertEqual(
+            self._ofctl_args("add-flows", self.BR_NAME, '--bundle', '-'),
+            self.execute.call_args[0][0])
+        lines = self.execute.call_args[1]['process_input'].split('\n')
+        commands, flows = zip(*(line.split(' ', 1) for line in lines))
+        self.assertEqual(('add', 'delete_strict', 'delete'), commands)
+        self.assertEqual(
+            StringSetMatcher("hard_timeout=0,idle_timeout=0,priority=1,"
+                             "in_port=5,%s,actions=drop" % cookie_spec),
+            flows[0])
+        self.assertEqual(
+            StringSetMatcher("%s/-1,in_port=6,priority=2" % cookie_spec),
+            flows[1])
+        self.assertEqual(
+            StringSetMatcher("%s/-1,in_port=7" % cookie_spec), flows[2])
+
+    def test_do_action_flows_bundle_strict_add(self):
+        self.assertRaises(exceptions.InvalidInput,
+                          self.br.do_action_flows_bundle,
+                          [('add', {'in_port': 5, 'actions': 'drop',
+                                    'strict': True})])
+        self.assertFalse(self.execute.called)
+
     def test_mod_delete_flows_priority_without_strict(self):
         self.assertRaises(exceptions.InvalidInput,
                           self.br.delete_flows,
@@ -1130,6 +1159,24 @@ class TestDeferredOVSBridge(base.BaseTestCase):
             deferred_br.mod_flow(**self.mod_flow_dict2)
         self._verify_mock_call(expected_calls)
 
+    def test_apply_bundle(self):
+        expected_flows = [
+            ('add', self.add_flow_dict1),
+            ('del', self.del_flow_dict1),
+            ('mod', self.mod_flow_dict1),
+        ]
+
+        with ovs_lib.DeferredOVSBridge(self.br, full_ordered=True,
+                                       use_bundle=True) as deferred_br:
+            self.br.use_at_least_protocol.assert_called_once_with(
+                p_const.OPENFLOW14)
+            deferred_br.add_flow(**self.add_flow_dict1)
+            deferred_br.delete_flows(**self.del_flow_dict1)
+            deferred_br.mod_flow(**self.mod_flow_dict1)
+        self.br.do_action_flows_bundle.assert_called_once_with(
+            expected_flows)
+        self._verify_mock_call([])
+
     def test_getattr_unallowed_attr(self):
         with ovs_lib.DeferredOVSBridge(self.br) as deferred_br:
             self.assertEqual(self.br.add_port, deferred_br.add_port)
@@ -28,6 +28,7 @@ import oslo_messaging
 import testtools
 
 from neutron.agent.dhcp import agent as dhcp_agent
+from neutron.agent.dhcp import network_processing_queue as queue
 from neutron.agent import dhcp_agent as entry
 from neutron.agent.linux import dhcp
 from neutron.agent.linux import interface
@@ -251,6 +252,8 @@ class TestDhcpAgent(base.BaseTestCase):
         mock_start_ready = mock.patch.object(
             dhcp_agent.DhcpAgentWithStateReport, 'start_ready_ports_loop',
             autospec=True).start()
+        mock.patch.object(dhcp_agent.DhcpAgentWithStateReport,
+                          'start_process_loop', autospec=True).start()
         with mock.patch.object(dhcp_agent.DhcpAgentWithStateReport,
                                'periodic_resync',
                                autospec=True) as mock_periodic_resync:
@@ -280,11 +283,13 @@ class TestDhcpAgent(base.BaseTestCase):
             dhcp = dhcp_agent.DhcpAgent(HOSTNAME)
             attrs_to_mock = dict(
                 [(a, mock.DEFAULT) for a in
-                 ['periodic_resync', 'start_ready_ports_loop']])
+                 ['periodic_resync', 'start_ready_ports_loop',
+                  'start_process_loop']])
             with mock.patch.multiple(dhcp, **attrs_to_mock) as mocks:
                 dhcp.run()
                 mocks['periodic_resync'].assert_called_once_with()
                 mocks['start_ready_ports_loop'].assert_called_once_with()
+                mocks['start_process_loop'].assert_called_once_with()
 
     def test_call_driver(self):
         network = mock.Mock()
@@ -338,7 +343,8 @@ class TestDhcpAgent(base.BaseTestCase):
             expected_sync=False)
 
     def _test_sync_state_helper(self, known_net_ids, active_net_ids):
-        active_networks = set(mock.Mock(id=netid) for netid in active_net_ids)
+        active_networks = set(mock.Mock(id=netid, ports=[])
+                              for netid in active_net_ids)
 
         with mock.patch(DHCP_PLUGIN) as plug:
             mock_plugin = mock.Mock()
@@ -483,6 +489,19 @@ class TestDhcpAgent(base.BaseTestCase):
             self.assertEqual(dhcp.needs_resync_reasons[None],
                              ['Agent has just been revived'])
 
+    def test_report_state_sync_progress(self):
+        dhcp = dhcp_agent.DhcpAgentWithStateReport(HOSTNAME)
+        dhcp._sync_scheduler.total = 3
+        dhcp._sync_scheduler.done = 3
+        with mock.patch.object(dhcp.state_rpc,
+                               'report_state') as report_state,\
+                mock.patch.object(dhcp, "run"):
+            dhcp._report_state()
+            agent_state = report_state.call_args[0][1]
+            self.assertEqual(
+                {'networks': 3, 'configured': 3, 'threads': 4, 'eta': 0},
+                agent_state['configurations']['sync_progress'])
+
     def test_periodic_resync_helper(self):
         with mock.patch.object(dhcp_agent.eventlet, 'sleep') as sleep:
             dhcp = dhcp_agent.DhcpAgent(HOSTNAME)
@@ -623,6 +642,9 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
         cache_cls = self.cache_p.start()
         self.cache = mock.Mock()
         self.cache.is_port_message_stale.return_value = False
+        self.cache.is_subnet_message_stale.return_value = False
+        self.cache.is_network_message_stale.return_value = False
+        self.cache.get_subnet_by_id.return_value = None
         cache_cls.return_value = self.cache
         self.mock_makedirs_p = mock.patch("os.makedirs")
         self.mock_makedirs = self.mock_makedirs_p.start()
@@ -640,6 +662,10 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
         )
         self.external_process = self.external_process_p.start()
 
+    def _process_queue(self):
+        while len(self.dhcp._queue):
+            self.dhcp._process_network_update()
+
     def _process_manager_constructor_call(self, ns=FAKE_NETWORK_DHCP_NS):
         return mock.call(conf=cfg.CONF,
                          uuid=FAKE_NETWORK_UUID,
@@ -889,11 +915,48 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
             self.dhcp.network_create_end(None, payload)
             enable.assert_called_once_with(fake_network.id)
 
+    def test_networks_added_to_agent(self):
+        network_ids = [fake_network.id, FAKE_TENANT_ID]
+        self.dhcp.networks_added_to_agent(None, {'network_ids': network_ids})
+        self.schedule_resync.assert_has_calls(
+            [mock.call(mock.ANY, network_id) for network_id in network_ids])
+
     def test_network_update_end_admin_state_up(self):
         payload = dict(network=dict(id=fake_network.id, admin_state_up=True))
+        self.cache.get_network_by_id.return_value = None
+        with mock.patch.object(self.dhcp, 'enable_dhcp_helper') as enable:
+            self.dhcp.network_update_end(None, payload)
+            enable.assert_called_once_with(fake_network.id)
+
+    def test_network_update_end_applied_to_cache(self):
+        payload = dict(network=dict(id=fake_network.id, admin_state_up=True,
+                                    mtu=1400, subnets=[fake_subnet1.id,
+                                                       fake_subnet2.id]))
+        self.cache.get_network_by_id.return_value = fake_network
+        with mock.patch.object(self.dhcp, 'enable_dhcp_helper') as enable:
+            self.dhcp.network_update_end(None, payload)
+            self._process_queue()
+            self.assertFalse(enable.called)
+        self.cache.update_network.assert_called_once_with(payload['network'])
+        self.assertFalse(self.plugin.get_network_info.called)
+        self.call_driver.assert_called_once_with('restart', fake_network)
+
+    def test_network_update_end_subnets_changed(self):
+        payload = dict(network=dict(id=fake_network.id, admin_state_up=True,
+                                    subnets=[fake_subnet1.id]))
+        self.cache.get_network_by_id.return_value = fake_network
         with mock.patch.object(self.dhcp, 'enable_dhcp_helper') as enable:
             self.dhcp.network_update_end(None, payload)
             enable.assert_called_once_with(fake_network.id)
+        self.assertFalse(self.cache.update_network.called)
+
+    def test_network_update_end_stale(self):
+        payload = dict(network=dict(id=fake_network.id, admin_state_up=True))
+        self.cache.get_network_by_id.return_value = fake_network
+        self.cache.is_network_message_stale.return_value = True
+        self.dhcp.network_update_end(None, payload)
+        self.assertEqual(0, len(self.dhcp._queue))
+        self.assertFalse(self.cache.update_network.called)
 
     def test_network_update_end_admin_state_down(self):
         payload = dict(network=dict(id=fake_network.id, admin_state_up=False))
@@ -906,6 +969,7 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
 
         with mock.patch.object(self.dhcp, 'disable_dhcp_helper') as disable:
             self.dhcp.network_delete_end(None, payload)
+            self._process_queue()
             disable.assert_called_once_with(fake_network.id)
 
     def test_refresh_dhcp_helper_no_dhcp_enabled_networks(self):
@@ -952,6 +1016,7 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
         self.plugin.get_network_info.return_value = new_net
 
         self.dhcp.subnet_create_end(None, payload)
+        self._process_queue()
 
         self.cache.assert_has_calls([mock.call.put(new_net)])
         self.call_driver.assert_called_once_with('restart', new_net)
@@ -962,6 +1027,7 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
         self.plugin.get_network_info.return_value = fake_network
 
         self.dhcp.subnet_update_end(None, payload)
+        self._process_queue()
 
         self.cache.assert_has_calls([mock.call.put(fake_network)])
         self.call_driver.assert_called_once_with('reload_allocations',
@@ -970,6 +1036,42 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
         self.assertEqual({p.id for p in fake_network.ports},
                          self.dhcp.dhcp_ready_ports)
 
+    def test_subnet_update_end_applied_to_cache(self):
+        subnet = dict(fake_subnet1, dns_nameservers=['192.0.2.53'])
+        payload = dict(subnet=subnet)
+        self.cache.get_subnet_by_id.return_value = fake_subnet1
+        self.cache.get_network_by_id.return_value = fake_network
+
+        self.dhcp.subnet_update_end(None, payload)
+        self._process_queue()
+
+        self.cache.put_subnet.assert_called_once_with(subnet)
+        self.assertFalse(self.plugin.get_network_info.called)
+        self.call_driver.assert_called_once_with('reload_allocations',
+                                                 fake_network)
+
+    def test_subnet_update_end_gateway_changed(self):
+        payload = dict(subnet=dict(fake_subnet1, gateway_ip='172.9.9.254'))
+        self.cache.get_subnet_by_id.return_value = fake_subnet1
+        self.cache.get_network_by_id.return_value = fake_network
+        self.plugin.get_network_info.return_value = fake_network
+
+        self.dhcp.subnet_update_end(None, payload)
+        self._process_queue()
+
+        self.assertFalse(self.cache.put_subnet.called)
+        self.plugin.get_network_info.assert_called_once_with(fake_network.id)
+        self.cache.assert_has_calls([mock.call.put(fake_network)])
+
+    def test_subnet_update_end_stale(self):
+        payload = dict(subnet=dict(fake_subnet1))
+        self.cache.is_subnet_message_stale.return_value = True
+
+        self.dhcp.subnet_update_end(None, payload)
+
+        self.assertEqual(0, len(self.dhcp._queue))
+        self.assertFalse(self.cache.put_subnet.called)
+
     def test_subnet_update_end_restart(self):
         new_state = dhcp.NetModel(dict(id=fake_network.id,
                                   tenant_id=fake_network.tenant_id,
@@ -982,6 +1084,7 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
         self.plugin.get_network_info.return_value = new_state
 
         self.dhcp.subnet_update_end(None, payload)
+        self._process_queue()
 
         self.cache.assert_has_calls([mock.call.put(new_state)])
         self.call_driver.assert_called_once_with('restart',
@@ -1000,6 +1103,7 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
         self.plugin.get_network_info.return_value = fake_network
 
         self.dhcp.subnet_delete_end(None, payload)
+        self._process_queue()
 
         self.cache.assert_has_calls([
             mock.call.get_network_by_subnet_id(
@@ -1014,6 +1118,7 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
         self.cache.get_network_by_id.return_value = fake_network
         self.cache.get_port_by_id.return_value = fake_port2
         self.dhcp.port_update_end(None, payload)
+        self._process_queue()
         self.cache.assert_has_calls(
             [mock.call.get_network_by_id(fake_port2.network_id),
              mock.call.put_port(mock.ANY)])
@@ -1026,6 +1131,7 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
         self.cache.get_port_by_id.return_value = fake_port2
         with mock.patch('neutron.agent.dhcp.agent._net_lock') as nl:
             self.dhcp.port_update_end(None, payload)
+            self._process_queue()
             nl.assert_called_once_with(fake_port2.network_id)
 
     def test_port_update_change_ip_on_port(self):
@@ -1035,6 +1141,7 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
         updated_fake_port1.fixed_ips[0].ip_address = '172.9.9.99'
         self.cache.get_port_by_id.return_value = updated_fake_port1
         self.dhcp.port_update_end(None, payload)
+        self._process_queue()
         self.cache.assert_has_calls(
             [mock.call.get_network_by_id(fake_port1.network_id),
              mock.call.put_port(mock.ANY)])
@@ -1050,6 +1157,7 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
         payload['port']['fixed_ips'][0]['subnet_id'] = '77777-7777'
         payload['port']['device_id'] = device_id
         self.dhcp.port_update_end(None, payload)
+        self._process_queue()
         self.assertFalse(self.call_driver.called)
 
     def test_port_update_change_ip_on_dhcp_agents_port(self):
@@ -1061,6 +1169,7 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
         payload['port']['fixed_ips'][0]['ip_address'] = '172.9.9.99'
         payload['port']['device_id'] = device_id
         self.dhcp.port_update_end(None, payload)
+        self._process_queue()
         self.call_driver.assert_has_calls(
             [mock.call.call_driver('restart', fake_network)])
 
@@ -1073,6 +1182,7 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
         payload['port']['fixed_ips'][0]['ip_address'] = '172.9.9.99'
         payload['port']['device_id'] = device_id
         self.dhcp.port_update_end(None, payload)
+        self._process_queue()
         self.schedule_resync.assert_called_once_with(mock.ANY,
                                                      fake_port1.network_id)
 
@@ -1084,6 +1194,7 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
             payload['port']['network_id'], self.dhcp.conf.host)
         payload['port']['device_id'] = device_id
         self.dhcp.port_update_end(None, payload)
+        self._process_queue()
         self.call_driver.assert_has_calls(
             [mock.call.call_driver('reload_allocations', fake_network)])
 
@@ -1093,6 +1204,7 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
         self.cache.get_port_by_id.return_value = fake_port2
 
         self.dhcp.port_delete_end(None, payload)
+        self._process_queue()
         self.cache.assert_has_calls(
             [mock.call.get_port_by_id(fake_port2.id),
              mock.call.deleted_ports.add(fake_port2.id),
@@ -1107,6 +1219,7 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
         self.cache.get_port_by_id.return_value = None
 
         self.dhcp.port_delete_end(None, payload)
+        self._process_queue()
 
         self.cache.assert_has_calls([mock.call.get_port_by_id('unknown')])
         self.assertEqual(self.call_driver.call_count, 0)
@@ -1119,9 +1232,160 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
         self.cache.get_network_by_id.return_value = fake_network
         self.cache.get_port_by_id.return_value = port
         self.dhcp.port_delete_end(None, {'port_id': port.id})
+        self._process_queue()
         self.call_driver.assert_has_calls(
             [mock.call.call_driver('disable', fake_network)])
 
+    def test_port_update_end_burst_reloads_once(self):
+        self.cache.get_network_by_id.return_value = fake_network
+        self.cache.get_port_by_id.return_value = None
+        for port in (fake_port1, fake_port2):
+            self.dhcp.port_update_end(None, dict(port=port))
+        self.assertFalse(self.call_driver.called)
+        self._process_queue()
+        self.call_driver.assert_called_once_with('reload_allocations',
+                                                 fake_network)
+        self.assertEqual({fake_port1.id, fake_port2.id},
+                         self.dhcp.dhcp_ready_ports)
+
+    def test_dhcp_port_update_processed_first(self):
+        other_network = copy.deepcopy(fake_network)
+        other_network.id = 'other-network-id'
+        dhcp_port = copy.deepcopy(fake_port1)
+        dhcp_port.device_owner = const.DEVICE_OWNER_DHCP
+        self.cache.get_port_by_id.return_value = None
+        self.cache.get_network_by_id.side_effect = (
+            lambda net_id: other_network if net_id == other_network.id
+            else fake_network)
+        port = copy.deepcopy(fake_port2)
+        port.network_id = other_network.id
+        self.dhcp.port_update_end(None, dict(port=port))
+        self.dhcp.port_update_end(None, dict(port=dhcp_port))
+        self._process_queue()
+        self.assertEqual(
+            [mock.call('reload_allocations', fake_network),
+             mock.call('reload_allocations', other_network)],
+            self.call_driver.call_args_list)
+
+    def test_network_delete_end_supersedes_port_updates(self):
+        self.cache.get_network_by_id.return_value = fake_network
+        self.cache.get_port_by_id.return_value = None
+        self.dhcp.port_update_end(None, dict(port=fake_port2))
+        with mock.patch.object(self.dhcp, 'disable_dhcp_helper') as disable:
+            self.dhcp.network_delete_end(
+                None, dict(network_id=fake_network.id))
+            self._process_queue()
+            disable.assert_called_once_with(fake_network.id)
+        self.assertFalse(self.call_driver.called)
+
+    def test_process_update_refresh_and_restart(self):
+        self.cache.get_network_by_id.return_value = fake_network
+        update = queue.NetworkUpdate(fake_network.id,
+                                     queue.PRIORITY_NETWORK_UPDATE,
+                                     [queue.REFRESH, queue.RESTART,
+                                      queue.RELOAD_ALLOCATIONS])
+        with mock.patch.object(self.dhcp, 'refresh_dhcp_helper') as refresh:
+            self.dhcp._process_update(update)
+            refresh.assert_called_once_with(fake_network.id)
+        self.call_driver.assert_called_once_with('restart', fake_network)
+
+    def test_process_update_network_gone(self):
+        self.cache.get_network_by_id.return_value = None
+        update = queue.NetworkUpdate(fake_network.id,
+                                     queue.PRIORITY_NETWORK_UPDATE,
+                                     [queue.RELOAD_ALLOCATIONS], ['port-id'])
+        self.dhcp._process_update(update)
+        self.assertFalse(self.call_driver.called)
+        self.assertEqual(set(), self.dhcp.dhcp_ready_ports)
+
+
+class TestNetworkSyncScheduler(base.BaseTestCase):
+    def setUp(self):
+        super(TestNetworkSyncScheduler, self).setUp()
+        self.conf = mock.Mock(num_sync_threads=2, max_num_sync_threads=4)
+        self.scheduler = dhcp_agent.NetworkSyncScheduler(self.conf)
+
+    @staticmethod
+    def _network(net_id, *port_statuses):
+        return dhcp.NetModel({'id': net_id, 'subnets': [],
+                              'non_local_subnets': [],
+                              'ports': [{'id': '%s-%d' % (net_id, i),
+                                         'status': status}
+                                        for i, status in
+                                        enumerate(port_statuses)]})
+
+    def test_run_configures_networks_with_build_ports_first(self):
+        self.conf.num_sync_threads = 1
+        self.conf.max_num_sync_threads = 0
+        scheduler = dhcp_agent.NetworkSyncScheduler(self.conf)
+        networks = [self._network('a', const.PORT_STATUS_ACTIVE),
+                    self._network('b', const.PORT_STATUS_ACTIVE,
+                                  const.PORT_STATUS_BUILD),
+                    self._network('c'),
+                    self._network('d', const.PORT_STATUS_BUILD)]
+        configure = mock.Mock()
+        scheduler.run(networks, configure)
+        self.assertEqual(['b', 'd', 'a', 'c'],
+                         [c[0][0].id for c in configure.call_args_list])
+        self.assertEqual(1, scheduler.size)
+        self.assertEqual(
+            {'sync_progress': {'networks': 4, 'configured': 4,
+                               'threads': 1, 'eta': 0}},
+            scheduler.get_state())
+
+    def test_run_counts_failed_configurations(self):
+        configure = mock.Mock(side_effect=[Exception, None])
+        self.scheduler.run([self._network('a'), self._network('b')],
+                           configure)
+        self.assertEqual(2, configure.call_count)
+        self.assertEqual(2, self.scheduler.done)
+
+    def test_size_grows_while_latency_is_stable(self):
+        with mock.patch.object(self.scheduler.pool, 'resize') as resize:
+            for latency in (1.0, 1.2):
+                self.scheduler._adapt_size(latency)
+            self.assertEqual(3, self.scheduler.size)
+            resize.assert_called_once_with(3)
+            for latency in (1.3, 1.4, 1.5):
+                self.scheduler._adapt_size(latency)
+            self.assertEqual(4, self.scheduler.size)
+            for latency in (1.0, 1.0, 1.0, 1.0):
+                self.scheduler._adapt_size(latency)
+            # capped to max_num_sync_threads
+            self.assertEqual(4, self.scheduler.size)
+
+    def test_size_shrinks_when_latency_degrades(self):
+        for latency in (1.0, 1.0):
+            self.scheduler._adapt_size(latency)
+        self.assertEqual(3, self.scheduler.size)
+        for latency in (2.0, 2.0, 2.0):
+            self.scheduler._adapt_size(latency)
+        self.assertEqual(2, self.scheduler.size)
+        for latency in (2.0, 2.0):
+            self.scheduler._adapt_size(latency)
+        # bounded by num_sync_threads
+        self.assertEqual(2, self.scheduler.size)
+
+    def test_size_fixed_without_max_num_sync_threads(self):
+        self.conf.max_num_sync_threads = 0
+        scheduler = dhcp_agent.NetworkSyncScheduler(self.conf)
+        for latency in (1.0, 1.0, 1.0, 1.0):
+            scheduler._adapt_size(latency)
+        self.assertEqual(2, scheduler.size)
+
+    def test_get_state(self):
+        self.assertEqual({}, self.scheduler.get_state())
+        self.scheduler.total = 10
+        self.scheduler.started_at = 100
+        with mock.patch('time.time', return_value=130):
+            self.assertIsNone(
+                self.scheduler.get_state()['sync_progress']['eta'])
+            self.scheduler.done = 3
+            self.assertEqual(
+                {'sync_progress': {'networks': 10, 'configured': 3,
+                                   'threads': 2, 'eta': 70}},
+                self.scheduler.get_state())
+
 
 class TestDhcpPluginApiProxy(base.BaseTestCase):
     def _test_dhcp_api(self, method, **kwargs):
@@ -1182,8 +1446,7 @@ class TestNetworkCache(base.BaseTestCase):
     def test_put_network(self):
         nc = dhcp_agent.NetworkCache()
         nc.put(fake_network)
-        self.assertEqual(nc.cache,
-                         {fake_network.id: fake_network})
+        self.assertEqual([fake_network.id], list(nc.cache))
         self.assertEqual(nc.subnet_lookup,
                          {fake_subnet1.id: fake_network.id,
                           fake_subnet2.id: fake_network.id})
@@ -1198,8 +1461,7 @@ class TestNetworkCache(base.BaseTestCase):
 
             nc.put(fake_network)
             remove.assert_called_once_with(prev_network_info)
-        self.assertEqual(nc.cache,
-                         {fake_network.id: fake_network})
+        self.assertEqual([fake_network.id], list(nc.cache))
         self.assertEqual(nc.subnet_lookup,
                          {fake_subnet1.id: fake_network.id,
                           fake_subnet2.id: fake_network.id})
@@ -1222,7 +1484,20 @@ class TestNetworkCache(base.BaseTestCase):
         nc = dhcp_agent.NetworkCache()
         nc.put(fake_network)
 
-        self.assertEqual(nc.get_network_by_id(fake_network.id), fake_network)
+        network = nc.get_network_by_id(fake_network.id)
+        self.assertEqual(fake_network.id, network.id)
+        self.assertEqual(fake_network.subnets, network.subnets)
+        self.assertEqual([dhcp.PortModel(fake_port1)], network.ports)
+
+    def test_put_network_compacts_ports(self):
+        nc = dhcp_agent.NetworkCache()
+        nc.put(fake_network)
+
+        self.assertEqual([fake_port1], fake_network.ports)
+        port = nc.get_network_by_id(fake_network.id).ports[0]
+        self.assertIsInstance(port, dhcp.PortModel)
+        self.assertIsInstance(port.fixed_ips[0], dhcp.FixedIPModel)
+        self.assertNotIn('allocation_pools', port)
 
     def test_get_network_ids(self):
         nc = dhcp_agent.NetworkCache()
@@ -1234,15 +1509,15 @@ class TestNetworkCache(base.BaseTestCase):
         nc = dhcp_agent.NetworkCache()
         nc.put(fake_network)
 
-        self.assertEqual(nc.get_network_by_subnet_id(fake_subnet1.id),
-                         fake_network)
+        self.assertIs(nc.get_network_by_id(fake_network.id),
+                      nc.get_network_by_subnet_id(fake_subnet1.id))
 
     def test_get_network_by_port_id(self):
         nc = dhcp_agent.NetworkCache()
         nc.put(fake_network)
 
-        self.assertEqual(nc.get_network_by_port_id(fake_port1.id),
-                         fake_network)
+        self.assertIs(nc.get_network_by_id(fake_network.id),
+                      nc.get_network_by_port_id(fake_port1.id))
 
     def test_get_port_ids(self):
         fake_net = dhcp.NetModel(
@@ -1290,7 +1565,8 @@ class TestNetworkCache(base.BaseTestCase):
         nc.put(fake_net)
         nc.put_port(fake_port2)
         self.assertEqual(2, len(nc.port_lookup))
-        self.assertIn(fake_port2, fake_net.ports)
+        self.assertIn(dhcp.PortModel(fake_port2),
+                      nc.get_network_by_id(fake_net.id).ports)
 
     def test_put_port_existing(self):
         fake_net = dhcp.NetModel(
@@ -1303,7 +1579,8 @@ class TestNetworkCache(base.BaseTestCase):
         nc.put_port(fake_port2)
 
         self.assertEqual(2, len(nc.port_lookup))
-        self.assertIn(fake_port2, fake_net.ports)
+        self.assertIn(dhcp.PortModel(fake_port2),
+                      nc.get_network_by_id(fake_net.id).ports)
 
     def test_remove_port_existing(self):
         fake_net = dhcp.NetModel(
@@ -1316,12 +1593,57 @@ class TestNetworkCache(base.BaseTestCase):
         nc.remove_port(fake_port2)
 
         self.assertEqual(1, len(nc.port_lookup))
-        self.assertNotIn(fake_port2, fake_net.ports)
+        self.assertEqual([fake_port1.id],
+                         [p.id for p in nc.get_network_by_id(
+                             fake_net.id).ports])
 
     def test_get_port_by_id(self):
         nc = dhcp_agent.NetworkCache()
         nc.put(fake_network)
-        self.assertEqual(nc.get_port_by_id(fake_port1.id), fake_port1)
+        self.assertEqual(dhcp.PortModel(fake_port1),
+                         nc.get_port_by_id(fake_port1.id))
+
+    def test_get_subnet_by_id(self):
+        nc = dhcp_agent.NetworkCache()
+        nc.put(fake_network)
+        self.assertEqual(fake_subnet2, nc.get_subnet_by_id(fake_subnet2.id))
+        self.assertIsNone(nc.get_subnet_by_id('unknown'))
+
+    def test_put_subnet(self):
+        nc = dhcp_agent.NetworkCache()
+        nc.put(fake_network)
+        nc.put_subnet(dict(id=fake_subnet1.id, revision_number=2,
+                           dns_nameservers=['192.0.2.53']))
+        subnets = nc.get_network_by_id(fake_network.id).subnets
+        self.assertEqual([fake_subnet1.id, fake_subnet2.id],
+                         [s.id for s in subnets])
+        self.assertEqual(['192.0.2.53'], subnets[0].dns_nameservers)
+        self.assertEqual(fake_subnet1.cidr, subnets[0].cidr)
+        self.assertEqual([], fake_subnet1.dns_nameservers)
+
+    def test_stale_subnet_update_ignored(self):
+        nc = dhcp_agent.NetworkCache()
+        nc.put(fake_network)
+        nc.put_subnet(dict(id=fake_subnet1.id, revision_number=3))
+        self.assertTrue(nc.is_subnet_message_stale(
+            dict(id=fake_subnet1.id, revision_number=2)))
+        self.assertFalse(nc.is_subnet_message_stale(
+            dict(id=fake_subnet1.id, revision_number=3)))
+        self.assertFalse(nc.is_subnet_message_stale(
+            dict(id='unknown', revision_number=1)))
+
+    def test_update_network(self):
+        nc = dhcp_agent.NetworkCache()
+        nc.put(fake_network)
+        nc.update_network(dict(id=fake_network.id, mtu=1400,
+                               revision_number=5, subnets=[fake_subnet1.id]))
+        network = nc.get_network_by_id(fake_network.id)
+        self.assertEqual(1400, network.mtu)
+        self.assertEqual([fake_subnet1.id, fake_subnet2.id],
+                         [s.id for s in network.subnets])
+        self.assertTrue(nc.is_network_message_stale(
+            dict(id=fake_network.id, revision_number=4)))
+        self.assertNotIn('mtu', fake_network)
 
 
 class FakePort1(object):
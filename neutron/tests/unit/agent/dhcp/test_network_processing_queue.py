@@ -0,0 +1,103 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+
+from oslo_utils import uuidutils
+
+from neutron.agent.dhcp import network_processing_queue as queue
+from neutron.tests import base
+
+_uuid = uuidutils.generate_uuid
+FAKE_ID = _uuid()
+FAKE_ID_2 = _uuid()
+FAKE_ID_3 = _uuid()
+
+
+class TestNetworkUpdate(base.BaseTestCase):
+
+    def test__lt__(self):
+        earlier = datetime.datetime(2018, 1, 1)
+        later = datetime.datetime(2018, 1, 2)
+        high = queue.NetworkUpdate(FAKE_ID, queue.PRIORITY_DHCP_PORT,
+                                   timestamp=later)
+        low = queue.NetworkUpdate(FAKE_ID_2, queue.PRIORITY_NETWORK_UPDATE,
+                                  timestamp=earlier)
+        low_later = queue.NetworkUpdate(FAKE_ID_3,
+                                        queue.PRIORITY_NETWORK_UPDATE,
+                                        timestamp=later)
+        self.assertLess(high, low)
+        self.assertLess(low, low_later)
+
+
+class TestNetworkProcessingQueue(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestNetworkProcessingQueue, self).setUp()
+        self.queue = queue.NetworkProcessingQueue()
+
+    def _pop_all(self):
+        updates = []
+        while len(self.queue):
+            updates.append(self.queue.pop())
+        return updates
+
+    def test_pop_in_priority_order(self):
+        self.queue.add(queue.NetworkUpdate(
+            FAKE_ID, queue.PRIORITY_NETWORK_UPDATE,
+            [queue.RELOAD_ALLOCATIONS]))
+        self.queue.add(queue.NetworkUpdate(
+            FAKE_ID_2, queue.PRIORITY_DHCP_PORT, [queue.RESTART]))
+        self.queue.add(queue.NetworkUpdate(
+            FAKE_ID_3, queue.PRIORITY_NETWORK_DELETE,
+            [queue.DELETE_NETWORK]))
+        self.assertEqual([FAKE_ID_3, FAKE_ID_2, FAKE_ID],
+                         [u.id for u in self._pop_all()])
+
+    def test_updates_of_a_network_are_merged(self):
+        for port_id in ('port1', 'port2', 'port3'):
+            self.queue.add(queue.NetworkUpdate(
+                FAKE_ID, queue.PRIORITY_NETWORK_UPDATE,
+                [queue.RELOAD_ALLOCATIONS], [port_id]))
+        self.queue.add(queue.NetworkUpdate(
+            FAKE_ID, queue.PRIORITY_NETWORK_UPDATE, [queue.REFRESH]))
+        self.assertEqual(1, len(self.queue))
+        update = self.queue.pop()
+        self.assertEqual({queue.RELOAD_ALLOCATIONS, queue.REFRESH},
+                         update.actions)
+        self.assertEqual({'port1', 'port2', 'port3'}, update.ready_ports)
+        self.assertEqual(0, len(self.queue))
+
+    def test_merged_update_takes_highest_priority(self):
+        self.queue.add(queue.NetworkUpdate(
+            FAKE_ID, queue.PRIORITY_NETWORK_UPDATE,
+            [queue.RELOAD_ALLOCATIONS], ['port1']))
+        self.queue.add(queue.NetworkUpdate(
+            FAKE_ID_2, queue.PRIORITY_NETWORK_UPDATE,
+            [queue.RELOAD_ALLOCATIONS]))
+        self.queue.add(queue.NetworkUpdate(
+            FAKE_ID, queue.PRIORITY_NETWORK_DELETE, [queue.DELETE_NETWORK]))
+        updates = self._pop_all()
+        self.assertEqual([FAKE_ID, FAKE_ID_2], [u.id for u in updates])
+        self.assertEqual({queue.RELOAD_ALLOCATIONS, queue.DELETE_NETWORK},
+                         updates[0].actions)
+        self.assertEqual({'port1'}, updates[0].ready_ports)
+
+    def test_network_queued_again_once_popped(self):
+        self.queue.add(queue.NetworkUpdate(
+            FAKE_ID, queue.PRIORITY_NETWORK_UPDATE,
+            [queue.RELOAD_ALLOCATIONS]))
+        self.queue.pop()
+        self.queue.add(queue.NetworkUpdate(
+            FAKE_ID, queue.PRIORITY_NETWORK_UPDATE, [queue.RESTART]))
+        self.assertEqual([{queue.RESTART}],
+                         [u.actions for u in self._pop_all()])
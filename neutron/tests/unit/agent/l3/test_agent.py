@@ -14,6 +14,7 @@
 #    under the License.
 
 import copy
+import datetime
 from itertools import chain as iter_chain
 from itertools import combinations as iter_combinations
 
@@ -2446,9 +2447,11 @@ class TestBasicRouterOperations(BasicRouterOperationsFramework):
             agent._process_router_if_compatible.side_effect = (
                 oslo_messaging.MessagingTimeout)
         agent._queue = mock.Mock()
+        agent._queue.pop_updates_to_fetch.return_value = []
         agent._resync_router = mock.Mock()
         update = mock.Mock()
         update.router = None
+        self.plugin_api.get_routers.return_value = [{'id': update.id}]
         agent._queue.each_update_to_next_router.side_effect = [
             [(None, update)]]
         agent._process_router_update()
@@ -2485,6 +2488,52 @@ class TestBasicRouterOperations(BasicRouterOperationsFramework):
         agent._process_router_update()
         self.assertTrue(agent.plugin_rpc.get_routers.called)
 
+    def _queue_router_updates(self, agent, *router_ids, **kwargs):
+        timestamp = timeutils.utcnow()
+        for i, router_id in enumerate(router_ids):
+            agent._queue.add(router_processing_queue.RouterUpdate(
+                router_id, router_processing_queue.PRIORITY_RPC,
+                timestamp=timestamp + datetime.timedelta(seconds=i),
+                **kwargs))
+
+    def test_process_routers_update_fetches_pending_routers(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        agent._process_router_if_compatible = mock.Mock()
+        agent._safe_router_removed = mock.Mock(return_value=True)
+        self._queue_router_updates(agent, 'r1', 'r2', 'r3')
+        self._queue_router_updates(
+            agent, 'r4', action=router_processing_queue.DELETE_ROUTER)
+        routers = [{'id': 'r1'}, {'id': 'r2'}]
+        self.plugin_api.get_routers.return_value = routers
+
+        for i in range(4):
+            agent._process_router_update()
+
+        self.plugin_api.get_routers.assert_called_once_with(
+            agent.context, mock.ANY)
+        router_ids = self.plugin_api.get_routers.call_args[0][1]
+        self.assertEqual('r1', router_ids[0])
+        self.assertEqual({'r1', 'r2', 'r3'}, set(router_ids))
+        agent._process_router_if_compatible.assert_has_calls(
+            [mock.call(router) for router in routers])
+        # r3 was not returned by the server
+        agent._safe_router_removed.assert_has_calls(
+            [mock.call('r3'), mock.call('r4')], any_order=True)
+
+    def test_process_routers_update_fetch_failure_requeues_pending(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        agent._resync_router = mock.Mock()
+        self._queue_router_updates(agent, 'r1', 'r2')
+        self.plugin_api.get_routers.side_effect = (
+            oslo_messaging.MessagingTimeout)
+
+        agent._process_router_update()
+
+        self.assertEqual('r1', agent._resync_router.call_args[0][0].id)
+        pending = agent._queue.pop_updates_to_fetch(10)
+        self.assertEqual(['r2'], [update.id for update in pending])
+        self.assertIsNone(pending[0].router)
+
     def test_process_routers_update_rpc_timeout_on_get_ext_net(self):
         self._test_process_routers_update_rpc_timeout(ext_net_call=True,
                                                       ext_net_call_failed=True)
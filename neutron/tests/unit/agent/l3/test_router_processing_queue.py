@@ -109,3 +109,32 @@ class TestExclusiveRouterProcessor(base.BaseTestCase):
         self.assertFalse(update.hit_retry_limit())
         queue.add(update)
         self.assertTrue(update.hit_retry_limit())
+
+    def test_pop_updates_to_fetch(self):
+        queue = l3_queue.RouterProcessingQueue()
+        ts = datetime.datetime.utcnow()
+        updates = [
+            l3_queue.RouterUpdate(FAKE_ID, l3_queue.PRIORITY_RPC,
+                                  timestamp=ts),
+            l3_queue.RouterUpdate(_uuid(), l3_queue.PRIORITY_RPC,
+                                  action=l3_queue.DELETE_ROUTER,
+                                  timestamp=ts + datetime.timedelta(1)),
+            l3_queue.RouterUpdate(_uuid(), l3_queue.PRIORITY_RPC,
+                                  router={'id': 'fake'},
+                                  timestamp=ts + datetime.timedelta(2)),
+            l3_queue.RouterUpdate(FAKE_ID_2, l3_queue.PRIORITY_RPC,
+                                  timestamp=ts + datetime.timedelta(3)),
+            l3_queue.RouterUpdate(_uuid(), l3_queue.PRIORITY_RPC,
+                                  timestamp=ts + datetime.timedelta(4)),
+        ]
+        for update in updates:
+            queue.add(update)
+
+        self.assertEqual([updates[0], updates[3]],
+                         queue.pop_updates_to_fetch(2))
+        for update in updates[0], updates[3]:
+            queue.readd(update)
+            self.assertEqual(4, update.tries)
+        self.assertEqual(5, queue._queue.qsize())
+        self.assertEqual([updates[0], updates[3], updates[4]],
+                         queue.pop_updates_to_fetch(10))
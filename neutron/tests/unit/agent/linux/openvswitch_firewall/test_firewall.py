@@ -13,7 +13,11 @@
 #    under the License.
 
 import mock
+from neutron_lib.callbacks import events
+from neutron_lib.callbacks import registry
+from neutron_lib.callbacks import resources
 from neutron_lib import constants
+from oslo_config import cfg
 import testtools
 
 from neutron.agent.common import ovs_lib
@@ -322,6 +326,33 @@ class TestConjIPFlowManager(base.BaseTestCase):
                        dl_type=2048, nw_src='10.22.3.4/32', priority=73,
                        reg_net=self.vlan_tag, table=82)])
 
+    def test_update_flows_for_vlan_changed_conj_ids(self):
+        remote_group = self.driver.sg_port_map.get_sg.return_value
+        remote_group.get_ethertype_filtered_addresses.return_value = [
+            '10.22.3.4']
+        with mock.patch.object(self.manager.conj_id_map,
+                               'get_conj_id') as get_conj_id_mock:
+            get_conj_id_mock.return_value = self.conj_id
+            self.manager.add(self.vlan_tag, 'sg', 'remote_id',
+                             constants.INGRESS_DIRECTION, constants.IPv4, 0)
+            self.manager.flow_state[self.vlan_tag][(
+                constants.INGRESS_DIRECTION, constants.IPv4)] = {
+                    '10.22.3.4': [self.conj_id, self.conj_id + 6]}
+            self.manager.update_flows_for_vlan(self.vlan_tag)
+        # The flows of priority 70 are unchanged, only the ones of
+        # priority 73 have to go
+        self.driver._add_flow.assert_not_called()
+        self.driver.delete_flows_for_ip_addresses.assert_called_once_with(
+            set(), constants.INGRESS_DIRECTION, constants.IPv4,
+            self.vlan_tag)
+        self.assertEqual(self.driver._strict_delete_flow.call_args_list,
+            [mock.call(ct_state='+est-rel-rpl', dl_type=2048,
+                       nw_src='10.22.3.4/32', priority=73,
+                       reg_net=self.vlan_tag, table=82),
+             mock.call(ct_state='+new-est', dl_type=2048,
+                       nw_src='10.22.3.4/32', priority=73,
+                       reg_net=self.vlan_tag, table=82)])
+
     def test_sg_removed(self):
         with mock.patch.object(self.manager.conj_id_map,
                                'get_conj_id') as get_id_mock, \
@@ -544,8 +575,23 @@ class TestOVSFirewallDriver(base.BaseTestCase):
         self._prepare_security_group()
         self.firewall.prepare_port_filter(port_dict)
         self.assertFalse(self.mock_bridge.br.delete_flows.called)
+        self.mock_bridge.reset_mock()
+        with mock.patch.object(self.firewall,
+                               'delete_all_port_flows') as delete_mock:
+            self.firewall.prepare_port_filter(port_dict)
+        delete_mock.assert_called_once_with(
+            self.firewall.sg_port_map.ports['port-id'])
+        _, port_flows = self.firewall._port_flows['port-id']
+        self.assertEqual(len(port_flows),
+                         self.mock_bridge.br.add_flow.call_count)
+
+    def test_ovs_restarted_resets_port_flows(self):
+        port_dict = {'device': 'port-id',
+                     'security_groups': [1]}
+        self._prepare_security_group()
         self.firewall.prepare_port_filter(port_dict)
-        self.assertTrue(self.mock_bridge.br.delete_flows.called)
+        registry.notify(resources.AGENT, events.OVS_RESTARTED, mock.Mock())
+        self.assertEqual({}, self.firewall._port_flows)
 
     def test_update_port_filter(self):
         port_dict = {'device': 'port-id',
@@ -578,6 +624,72 @@ class TestOVSFirewallDriver(base.BaseTestCase):
         self.mock_bridge.br.add_flow.assert_has_calls(
             filter_rules, any_order=True)
 
+    def test_update_port_filter_installs_delta(self):
+        port_dict = {'device': 'port-id',
+                     'security_groups': [1]}
+        self._prepare_security_group()
+        self.firewall.prepare_port_filter(port_dict)
+        self.firewall.update_security_group_rules(1, [
+            {'ethertype': constants.IPv4,
+             'protocol': constants.PROTO_NAME_TCP,
+             'direction': constants.INGRESS_DIRECTION,
+             'port_range_min': 124,
+             'port_range_max': 124}])
+        self.mock_bridge.reset_mock()
+
+        self.firewall.update_port_filter(port_dict)
+        deleted_ports = {c[1]['tcp_dst'] for c in
+                         self.mock_bridge.br.delete_flows.call_args_list}
+        added_ports = {c[1]['tcp_dst'] for c in
+                       self.mock_bridge.br.add_flow.call_args_list}
+        self.assertEqual({'0x007b'}, deleted_ports)
+        self.assertEqual({'0x007c'}, added_ports)
+        for call in self.mock_bridge.br.delete_flows.call_args_list:
+            self.assertTrue(call[1]['strict'])
+
+    def test_update_port_filter_tag_changed_installs_all_flows(self):
+        port_dict = {'device': 'port-id',
+                     'security_groups': [1]}
+        self._prepare_security_group()
+        self.firewall.prepare_port_filter(port_dict)
+        self.mock_bridge.reset_mock()
+        self.mock_bridge.br.db_get_val.return_value = {'tag': 2}
+
+        self.firewall.update_port_filter(port_dict)
+        tag, port_flows = self.firewall._port_flows['port-id']
+        self.assertEqual(2, tag)
+        self.assertFalse(self.mock_bridge.br.delete_flows.called)
+        self.assertEqual(len(port_flows),
+                         self.mock_bridge.br.add_flow.call_count)
+
+    def test_update_port_filter_deferred(self):
+        port_dict = {'device': 'port-id',
+                     'security_groups': [2]}
+        port_dict2 = {'device': 'port-id2',
+                      'security_groups': [2]}
+        self._prepare_security_group()
+        with mock.patch.object(self.firewall.conj_ip_manager,
+                               'update_flows_for_vlan') as update_mock:
+            self.firewall.filter_defer_apply_on()
+            self.firewall.prepare_port_filter(port_dict)
+            self.firewall.prepare_port_filter(port_dict2)
+            self.assertFalse(update_mock.called)
+            self.assertFalse(self.mock_bridge.br.add_flow.called)
+            self.firewall.filter_defer_apply_off()
+        update_mock.assert_called_once_with(TESTING_VLAN_TAG)
+        self.assertTrue(self.mock_bridge.add_flow.called)
+        self.mock_bridge.apply_flows.assert_called_once_with()
+
+    def test__strict_delete_flow_bundle(self):
+        cfg.CONF.set_override('use_openflow_bundles', True, group='OVS')
+        self.firewall.filter_defer_apply_on()
+        self.firewall._strict_delete_flow(priority=100, table=0,
+                                          reg_port=1)
+        self.assertFalse(self.mock_bridge.br.delete_flows.called)
+        self.mock_bridge.delete_flows.assert_called_once_with(
+            strict=True, priority=100, table=0,
+            **{'reg{:d}'.format(ovsfw_consts.REG_PORT): 1})
+
     def test_update_port_filter_create_new_port_if_not_present(self):
         port_dict = {'device': 'port-id',
                      'security_groups': [1]}
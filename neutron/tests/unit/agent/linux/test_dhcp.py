@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
 import os
 
 import mock
@@ -1909,6 +1910,57 @@ class TestDnsmasq(TestBase):
             mock.call(exp_opt_name, exp_opt_data),
         ])
 
+    def _reload_allocations_twice(self, net, update_network):
+        ipath = '/dhcp/%s/interface' % net.id
+        self.useFixture(tools.OpenFixture(ipath, 'tapdancingmice'))
+        mock.patch.dict(dhcp.DhcpLocalProcess._config_file_digests,
+                        clear=True).start()
+        mock.patch('os.path.exists', return_value=True).start()
+        mock.patch.object(dhcp.Dnsmasq, '_release_unused_leases').start()
+        self._get_dnsmasq(net).reload_allocations()
+        self.safe.reset_mock()
+        self.external_process().enable.reset_mock()
+        update_network(net)
+        self._get_dnsmasq(net).reload_allocations()
+
+    def test_reload_allocations_unchanged(self):
+        self._reload_allocations_twice(FakeDualNetwork(), lambda net: None)
+        self.assertFalse(self.safe.called)
+        self.assertFalse(self.external_process().enable.called)
+
+    def test_reload_allocations_writes_changed_files_only(self):
+        (exp_host_name, exp_host_data,
+         exp_addn_name, exp_addn_data,
+         exp_opt_name, exp_opt_data,) = self._test_reload_allocation_data
+
+        def remove_port(net):
+            net.ports = [p for p in net.ports if p.device_id != 'fake_port1']
+
+        self._reload_allocations_twice(FakeDualNetwork(), remove_port)
+        written = {c[0][0] for c in self.safe.call_args_list}
+        self.assertIn(exp_host_name, written)
+        self.assertIn(exp_addn_name, written)
+        self.assertNotIn(exp_opt_name, written)
+        self.external_process().enable.assert_called_once_with(
+            reload_cfg=True)
+
+    def test_reload_allocations_dnsmasq_not_active(self):
+        self.external_process().active = False
+        self._reload_allocations_twice(FakeDualNetwork(), lambda net: None)
+        self.assertFalse(self.safe.called)
+        self.external_process().enable.assert_called_once_with(
+            reload_cfg=True)
+
+    def test_disable_forgets_config_files(self):
+        net = FakeDualNetwork()
+        mock.patch.dict(dhcp.DhcpLocalProcess._config_file_digests,
+                        {'/dhcp/%s/host' % net.id: 'digest',
+                         '/dhcp/other/host': 'digest'},
+                        clear=True).start()
+        self._get_dnsmasq(net).disable(retain_port=True)
+        self.assertEqual({'/dhcp/other/host': 'digest'},
+                         dhcp.DhcpLocalProcess._config_file_digests)
+
     def test_release_unused_leases(self):
         dnsmasq = self._get_dnsmasq(FakeDualNetwork())
 
@@ -2678,3 +2730,65 @@ class TestDictModel(base.BaseTestCase):
     def test_string_representation_network(self):
         net = dhcp.DictModel({'id': 'id', 'name': 'myname'})
         self.assertEqual('id=id, name=myname', str(net))
+
+
+class TestPortModel(base.BaseTestCase):
+
+    def _port_dict(self, **kwargs):
+        port = {'id': 'port-id', 'network_id': 'net-id',
+                'mac_address': 'aa:bb:cc:dd:ee:ff', 'device_owner': '',
+                'name': 'myport', 'security_groups': ['sg-id'],
+                'fixed_ips': [{'subnet_id': 'subnet-id',
+                               'ip_address': '10.0.0.2'}]}
+        port.update(kwargs)
+        return port
+
+    def test_fields(self):
+        port = dhcp.PortModel(self._port_dict())
+        self.assertEqual('port-id', port.id)
+        self.assertEqual('port-id', port['id'])
+        self.assertEqual('10.0.0.2', port.fixed_ips[0].ip_address)
+        self.assertEqual('subnet-id', port['fixed_ips'][0]['subnet_id'])
+        self.assertIsInstance(port.fixed_ips[0], dhcp.FixedIPModel)
+
+    def test_unknown_fields_dropped(self):
+        port = dhcp.PortModel(self._port_dict())
+        self.assertNotIn('name', port)
+        self.assertNotIn('security_groups', port.keys())
+
+    def test_missing_fields(self):
+        port = dhcp.PortModel(self._port_dict())
+        self.assertNotIn('dns_assignment', port)
+        self.assertIsNone(getattr(port, 'dns_assignment', None))
+        self.assertEqual(0, port.get('revision_number', 0))
+        self.assertRaises(KeyError, lambda: port['revision_number'])
+
+    def test_nested_models(self):
+        port = dhcp.PortModel(self._port_dict(
+            extra_dhcp_opts=[{'opt_name': 'tftp-server',
+                              'opt_value': '10.0.0.1', 'ip_version': 4}],
+            dns_assignment=[{'hostname': 'host', 'fqdn': 'host.local.',
+                             'ip_address': '10.0.0.2'}]))
+        self.assertEqual('tftp-server', port.extra_dhcp_opts[0].opt_name)
+        self.assertEqual('host.local.', port.dns_assignment[0].fqdn)
+
+    def test_values_interned(self):
+        ports = [dhcp.PortModel(self._port_dict(network_id=''.join('net-id')))
+                 for _i in range(2)]
+        self.assertIs(ports[0].network_id, ports[1].network_id)
+
+    def test_equality(self):
+        self.assertEqual(dhcp.PortModel(self._port_dict()),
+                         dhcp.PortModel(self._port_dict(name='other')))
+        self.assertNotEqual(dhcp.PortModel(self._port_dict()),
+                            dhcp.PortModel(self._port_dict(id='other')))
+
+    def test_copy(self):
+        port = dhcp.PortModel(self._port_dict())
+        port_copy = copy.deepcopy(port)
+        self.assertEqual(port, port_copy)
+        self.assertIsNot(port.fixed_ips[0], port_copy.fixed_ips[0])
+
+    def test_string_representation(self):
+        port = dhcp.PortModel({'id': 'id', 'network_id': 'net_id'})
+        self.assertEqual('id=id, network_id=net_id', str(port))
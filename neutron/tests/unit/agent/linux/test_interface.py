@@ -91,12 +91,12 @@ class TestABCDriver(TestBase):
         self.ip_dev.assert_has_calls(
             [mock.call('tap0', namespace=ns),
              mock.call().addr.list(),
-             mock.call().addr.delete('172.16.77.240/24'),
-             mock.call().addr.add('192.168.1.2/24'),
+             mock.call().addr.delete_multiple({'172.16.77.240/24'}),
+             mock.call().addr.add_multiple({'192.168.1.2/24'}),
              mock.call('tap0', namespace=ns),
              mock.call().route.list_onlink_routes(constants.IP_VERSION_4),
              mock.call().route.list_onlink_routes(constants.IP_VERSION_6),
-             mock.call().route.add_onlink_route('172.20.0.0/24')])
+             mock.call().route.add_onlink_routes({'172.20.0.0/24'})])
 
     def test_init_router_port_delete_onlink_routes(self):
         addresses = [dict(scope='global',
@@ -111,7 +111,7 @@ class TestABCDriver(TestBase):
         self.ip_dev.assert_has_calls(
             [mock.call().route.list_onlink_routes(constants.IP_VERSION_4),
              mock.call().route.list_onlink_routes(constants.IP_VERSION_6),
-             mock.call().route.delete_onlink_route('172.20.0.0/24')])
+             mock.call().route.delete_onlink_routes({'172.20.0.0/24'})])
 
     def test_l3_init_with_preserve(self):
         addresses = [dict(scope='global',
@@ -125,8 +125,8 @@ class TestABCDriver(TestBase):
         self.ip_dev.assert_has_calls(
             [mock.call('tap0', namespace=ns),
              mock.call().addr.list(),
-             mock.call().addr.add('192.168.1.2/24')])
-        self.assertFalse(self.ip_dev().addr.delete.called)
+             mock.call().addr.add_multiple({'192.168.1.2/24'})])
+        self.assertFalse(self.ip_dev().addr.delete_multiple.called)
         self.assertFalse(self.ip_dev().delete_addr_and_conntrack_state.called)
 
     def _test_l3_init_clean_connections(self, clean_connections):
@@ -168,13 +168,13 @@ class TestABCDriver(TestBase):
         expected_calls = (
             [mock.call('tap0', namespace=ns),
              mock.call().addr.list(),
-             mock.call().addr.delete('2001:db8:a::123/64'),
-             mock.call().addr.add('2001:db8:a::124/64')])
+             mock.call().addr.delete_multiple({'2001:db8:a::123/64'}),
+             mock.call().addr.add_multiple({'2001:db8:a::124/64'})])
         expected_calls += (
              [mock.call('tap0', namespace=ns),
               mock.call().route.list_onlink_routes(constants.IP_VERSION_4),
               mock.call().route.list_onlink_routes(constants.IP_VERSION_6),
-              mock.call().route.add_onlink_route('2001:db8:b::/64')])
+              mock.call().route.add_onlink_routes({'2001:db8:b::/64'})])
         self.ip_dev.assert_has_calls(expected_calls)
 
     def test_init_router_port_ext_gw_with_dual_stack(self):
@@ -192,13 +192,13 @@ class TestABCDriver(TestBase):
         self.ip_dev.assert_has_calls(
             [mock.call('tap0', namespace=ns),
              mock.call().addr.list(),
-             mock.call().addr.add('192.168.1.2/24'),
-             mock.call().addr.add('2001:db8:a::124/64'),
-             mock.call().addr.delete('172.16.77.240/24'),
-             mock.call().addr.delete('2001:db8:a::123/64'),
+             mock.call().addr.add_multiple({'192.168.1.2/24',
+                                            '2001:db8:a::124/64'}),
+             mock.call().addr.delete_multiple({'172.16.77.240/24',
+                                               '2001:db8:a::123/64'}),
              mock.call().route.list_onlink_routes(constants.IP_VERSION_4),
              mock.call().route.list_onlink_routes(constants.IP_VERSION_6),
-             mock.call().route.add_onlink_route('172.20.0.0/24')],
+             mock.call().route.add_onlink_routes({'172.20.0.0/24'})],
             any_order=True)
 
     def test_init_router_port_with_ipv6_delete_onlink_routes(self):
@@ -214,7 +214,7 @@ class TestABCDriver(TestBase):
         self.ip_dev.assert_has_calls(
             [mock.call().route.list_onlink_routes(constants.IP_VERSION_4),
              mock.call().route.list_onlink_routes(constants.IP_VERSION_6),
-             mock.call().route.delete_onlink_route(route)])
+             mock.call().route.delete_onlink_routes({route})])
 
     def test_l3_init_with_duplicated_ipv6(self):
         addresses = [dict(scope='global',
@@ -224,7 +224,7 @@ class TestABCDriver(TestBase):
         bc = BaseChild(self.conf)
         ns = '12345678-1234-5678-90ab-ba0987654321'
         bc.init_l3('tap0', ['2001:db8:a::123/64'], namespace=ns)
-        self.assertFalse(self.ip_dev().addr.add.called)
+        self.assertFalse(self.ip_dev().addr.add_multiple.called)
 
     def test_l3_init_with_duplicated_ipv6_uncompact(self):
         addresses = [dict(scope='global',
@@ -236,7 +236,7 @@ class TestABCDriver(TestBase):
         bc.init_l3('tap0',
                    ['2001:db8:a:0000:0000:0000:0000:0123/64'],
                    namespace=ns)
-        self.assertFalse(self.ip_dev().addr.add.called)
+        self.assertFalse(self.ip_dev().addr.add_multiple.called)
 
     def test_l3_init_with_duplicated_ipv6_dynamic(self):
         device_name = 'tap0'
@@ -251,8 +251,8 @@ class TestABCDriver(TestBase):
         self.ip_dev.assert_has_calls(
             [mock.call(device_name, namespace=ns),
              mock.call().addr.list(),
-             mock.call().addr.delete(cidr),
-             mock.call().addr.add(cidr)])
+             mock.call().addr.delete_multiple({cidr}),
+             mock.call().addr.add_multiple({cidr})])
 
     def test_l3_init_with_duplicated_ipv6_lla(self):
         device_name = 'tap0'
@@ -269,7 +269,7 @@ class TestABCDriver(TestBase):
              mock.call().addr.list()])
         # The above assert won't verify there were no extra calls right
         # after list()
-        self.assertFalse(self.ip_dev().addr.add.called)
+        self.assertFalse(self.ip_dev().addr.add_multiple.called)
 
     def test_l3_init_with_not_present_ipv6_lla(self):
         device_name = 'tap0'
@@ -281,7 +281,7 @@ class TestABCDriver(TestBase):
         self.ip_dev.assert_has_calls(
             [mock.call(device_name, namespace=ns),
              mock.call().addr.list(),
-             mock.call().addr.add(cidr)])
+             mock.call().addr.add_multiple({cidr})])
 
     def test_add_ipv6_addr(self):
         device_name = 'tap0'
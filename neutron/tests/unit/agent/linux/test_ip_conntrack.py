@@ -15,6 +15,7 @@
 import mock
 
 from neutron.agent.linux import ip_conntrack
+from neutron.privileged.agent.linux import netlink_lib
 from neutron.tests import base
 
 
@@ -39,3 +40,90 @@ class IPConntrackTestCase(base.BaseTestCase):
         dev_info_list = [dev_info for _ in range(10)]
         self.mgr._delete_conntrack_state(dev_info_list, rule)
         self.assertEqual(1, len(self.execute.mock_calls))
+
+    def _test_process_queue_netlink(self, entries, rule=None,
+                                    remote_ips=None):
+        dev_info = {'device': 'tapdevice', 'fixed_ips': ['1.2.3.4']}
+        with mock.patch.object(netlink_lib, 'list_entries',
+                               return_value=entries) as list_entries, \
+                mock.patch.object(netlink_lib,
+                                  'delete_entries') as delete_entries:
+            if rule:
+                self.mgr.delete_conntrack_state_by_rule([dev_info], rule)
+            self.mgr.delete_conntrack_state_by_remote_ips(
+                [dev_info], 'IPv4', remote_ips or ['5.6.7.8', '5.6.7.9'])
+            self.mgr._process_queue()
+        return list_entries, delete_entries
+
+    def test_process_queue_netlink(self):
+        entries = [(4, 'tcp', 1, 2, '5.6.7.8', '1.2.3.4', 100),
+                   (4, 'udp', 1, 2, '1.2.3.4', '5.6.7.9', 100),
+                   (4, 'icmp', 8, 0, '5.6.7.7', '1.2.3.4', 1, 100),
+                   (4, 'tcp', 1, 2, '5.6.7.8', '1.2.3.5', 100)]
+        list_entries, delete_entries = self._test_process_queue_netlink(
+            entries)
+        list_entries.assert_called_once_with(100)
+        delete_entries.assert_called_once_with(entries[:2])
+        self.assertFalse(self.execute.called)
+
+    def test_process_queue_netlink_rule_protocol(self):
+        rule = {'ethertype': 'IPv4', 'direction': 'ingress',
+                'protocol': '6'}
+        entries = [(4, 'tcp', 1, 2, '5.6.7.7', '1.2.3.4', 100),
+                   (4, 'udp', 1, 2, '5.6.7.7', '1.2.3.4', 100)]
+        list_entries, delete_entries = self._test_process_queue_netlink(
+            entries, rule=rule, remote_ips=['5.6.7.8'])
+        list_entries.assert_called_once_with(100)
+        delete_entries.assert_called_once_with(entries[:1])
+        self.assertFalse(self.execute.called)
+
+    def test_process_queue_netlink_unsupported_protocol(self):
+        rule = {'ethertype': 'IPv4', 'direction': 'ingress',
+                'protocol': 'sctp'}
+        list_entries, delete_entries = self._test_process_queue_netlink(
+            [], rule=rule)
+        self.execute.assert_called_once_with(
+            ['conntrack', '-D', '-p', 'sctp', '-f', 'ipv4', '-d',
+             '1.2.3.4', '-w', 100], run_as_root=True, check_exit_code=True,
+            extra_ok_codes=[1])
+        self.assertFalse(delete_entries.called)
+
+    def test_process_queue_netlink_other_protocol_entry(self):
+        rule = {'ethertype': 'IPv4', 'direction': 'ingress'}
+        entries = [(4, 'tcp', 1, 2, '5.6.7.7', '1.2.3.4', 100),
+                   (4, 'sctp', None, None, '5.6.7.7', '1.2.3.4', 100)]
+        dev_info = {'device': 'tapdevice', 'fixed_ips': ['1.2.3.4']}
+        with mock.patch.object(netlink_lib, 'list_entries',
+                               return_value=entries), \
+                mock.patch.object(netlink_lib,
+                                  'delete_entries') as delete_entries:
+            self.mgr.delete_conntrack_state_by_rule([dev_info], rule)
+            self.mgr._process_queue()
+        # only the conntrack command deletes the sctp entry
+        self.assertFalse(delete_entries.called)
+        self.execute.assert_called_once_with(
+            ['conntrack', '-D', '-f', 'ipv4', '-d', '1.2.3.4', '-w', 100],
+            run_as_root=True, check_exit_code=True, extra_ok_codes=[1])
+
+    def test_process_queue_netlink_failure(self):
+        dev_info = {'device': 'tapdevice', 'fixed_ips': ['1.2.3.4']}
+        rule = {'ethertype': 'IPv4', 'direction': 'ingress'}
+        with mock.patch.object(netlink_lib, 'list_entries',
+                               side_effect=OSError):
+            self.mgr.delete_conntrack_state_by_rule([dev_info], rule)
+            self.mgr._process_queue()
+        self.execute.assert_called_once_with(
+            ['conntrack', '-D', '-f', 'ipv4', '-d', '1.2.3.4', '-w', 100],
+            run_as_root=True, check_exit_code=True, extra_ok_codes=[1])
+
+    def test_process_queue_namespace(self):
+        mgr = ip_conntrack.IpConntrackManager(
+            self._get_rule_for_table, {}, {}, self.execute, namespace='ns',
+            zone_per_port=True)
+        rule = {'ethertype': 'IPv4', 'direction': 'ingress'}
+        dev_info = {'device': 'tapdevice', 'fixed_ips': ['1.2.3.4']}
+        with mock.patch.object(netlink_lib, 'list_entries') as list_entries:
+            mgr.delete_conntrack_state_by_rule([dev_info], rule)
+            mgr._process_queue()
+        self.assertFalse(list_entries.called)
+        self.assertEqual(1, len(self.execute.mock_calls))
@@ -19,6 +19,7 @@ import socket
 import mock
 import netaddr
 from neutron_lib import exceptions
+from oslo_config import cfg
 import pyroute2
 from pyroute2.netlink.rtnl import ndmsg
 from pyroute2 import NetlinkError
@@ -27,6 +28,7 @@ import testtools
 from neutron.agent.common import utils  # noqa
 from neutron.agent.linux import ip_lib
 from neutron.common import exceptions as n_exc
+from neutron.conf.agent import common as config
 from neutron import privileged
 from neutron.privileged.agent.linux import ip_lib as priv_lib
 from neutron.tests import base
@@ -1228,6 +1230,158 @@ class TestIPRoute(TestIpRouteCommand):
         pass
 
 
+class TestNetlinkIpCommands(base.BaseTestCase):
+    def setUp(self):
+        super(TestNetlinkIpCommands, self).setUp()
+        config.register_root_helper(cfg.CONF)
+        cfg.CONF.set_override('use_netlink_for_ip_lib', True, 'AGENT')
+        self.device = ip_lib.IPDevice('tap0', namespace='ns')
+        self.device._as_root = mock.Mock()
+        self.priv = mock.patch.object(ip_lib, 'privileged').start()
+        self.priv.NetworkInterfaceNotFound = (
+            priv_lib.NetworkInterfaceNotFound)
+
+    def test_command_classes(self):
+        self.assertIsInstance(self.device.link, ip_lib.NetlinkIpLinkCommand)
+        self.assertIsInstance(self.device.addr, ip_lib.NetlinkIpAddrCommand)
+        self.assertIsInstance(self.device.route.table(10),
+                              ip_lib.NetlinkIpRouteCommand)
+        self.assertIsInstance(ip_lib.IPRule('ns').rule,
+                              ip_lib.NetlinkIpRuleCommand)
+
+    def test_command_classes_disabled(self):
+        cfg.CONF.set_override('use_netlink_for_ip_lib', False, 'AGENT')
+        device = ip_lib.IPDevice('tap0')
+        self.assertIs(ip_lib.IpLinkCommand, type(device.link))
+        self.assertIs(ip_lib.IpAddrCommand, type(device.addr))
+        self.assertIs(ip_lib.IpRouteCommand, type(device.route))
+
+    def test_link_set_up(self):
+        self.device.link.set_up()
+        self.priv.set_link_attribute.assert_called_once_with(
+            'tap0', 'ns', state='up')
+
+    def test_link_set_name(self):
+        self.device.link.set_name('tap1')
+        self.priv.set_link_attribute.assert_called_once_with(
+            'tap0', 'ns', ifname='tap1')
+        self.assertEqual('tap1', self.device.name)
+
+    def test_link_attributes(self):
+        self.priv.get_link_attributes.return_value = {
+            'mtu': 1450, 'link/ether': 'fa:16:3e:00:00:01', 'alias': None}
+        self.assertEqual(1450, self.device.link.mtu)
+        self.assertEqual('fa:16:3e:00:00:01', self.device.link.address)
+        self.assertNotIn('alias', self.device.link.attributes)
+
+    def test_addr_add(self):
+        self.device.addr.add('192.168.0.10/24')
+        self.priv.add_ip_address.assert_called_once_with(
+            namespace='ns', ip_version=4, address='192.168.0.10',
+            prefixlen=24, device='tap0', scope='global',
+            broadcast='192.168.0.255')
+
+    def test_addr_add_multiple(self):
+        self.device.addr.add_multiple(['192.168.0.10/24', '2001:db8::1/64'])
+        self.priv.apply_ip_changes.assert_called_once_with('ns', [
+            ('add_ip_address', {'ip_version': 4, 'address': '192.168.0.10',
+                                'prefixlen': 24, 'device': 'tap0',
+                                'scope': 'global',
+                                'broadcast': '192.168.0.255'}),
+            ('add_ip_address', {'ip_version': 6, 'address': '2001:db8::1',
+                                'prefixlen': 64, 'device': 'tap0',
+                                'scope': 'global'})])
+        self.assertFalse(self.device._as_root.called)
+
+    def test_addr_add_cannot_find_device(self):
+        self.priv.add_ip_address.side_effect = (
+            priv_lib.NetworkInterfaceNotFound)
+        self.assertRaises(exceptions.DeviceNotFoundError,
+                          self.device.addr.add, '192.168.0.10/24')
+
+    def test_addr_add_multiple_cannot_find_device(self):
+        self.priv.apply_ip_changes.side_effect = (
+            priv_lib.NetworkInterfaceNotFound)
+        self.assertRaises(exceptions.DeviceNotFoundError,
+                          self.device.addr.add_multiple, ['192.168.0.10/24'])
+
+    def test_addr_delete_multiple_empty(self):
+        self.device.addr.delete_multiple([])
+        self.assertFalse(self.priv.apply_ip_changes.called)
+
+    def test_addr_get_devices_with_ip_to(self):
+        self.priv.get_ip_addresses.return_value = [
+            {'name': 'tap0', 'cidr': '192.168.0.10/24'},
+            {'name': 'tap1', 'cidr': '10.0.0.10/24'}]
+        self.assertEqual(
+            [{'name': 'tap1', 'cidr': '10.0.0.10/24'}],
+            self.device.addr.get_devices_with_ip(to='10.0.0.10'))
+        self.priv.get_ip_addresses.assert_called_once_with(
+            'ns', device=None, ip_version=None, scope=None)
+
+    def test_addr_get_devices_with_ip_filters_fall_back(self):
+        self.device._run = mock.Mock(return_value='')
+        self.device.addr.get_devices_with_ip(filters=['permanent'])
+        self.device._run.assert_called_once_with([], 'addr',
+                                                 ('show', 'permanent'))
+        self.assertFalse(self.priv.get_ip_addresses.called)
+
+    def test_route_add_onlink_routes(self):
+        self.device.route.add_onlink_routes(['10.0.0.0/24'])
+        self.priv.apply_ip_changes.assert_called_once_with('ns', [
+            ('add_ip_route', {'ip_version': 4, 'cidr': '10.0.0.0/24',
+                              'device': 'tap0', 'via': None, 'table': None,
+                              'scope': 'link'})])
+
+    def test_route_delete_gateway_cannot_find_device(self):
+        self.priv.delete_ip_route.side_effect = (
+            priv_lib.NetworkInterfaceNotFound)
+        self.assertRaises(exceptions.DeviceNotFoundError,
+                          self.device.route.delete_gateway, '10.0.0.1')
+
+    def test_route_add_route_unsupported_argument_falls_back(self):
+        self.device.route.add_route('10.0.0.0/24', src='10.0.0.1')
+        self.device._as_root.assert_called_once_with(
+            [4], 'route', ('replace', '10.0.0.0/24', 'dev', 'tap0',
+                           'src', '10.0.0.1'),
+            use_root_namespace=False)
+        self.assertFalse(self.priv.add_ip_route.called)
+
+    def test_route_get_gateway(self):
+        self.priv.list_ip_routes.return_value = [
+            {'cidr': '10.0.0.0/24', 'dev': 'tap0', 'scope': 'link'},
+            {'cidr': '0.0.0.0/0', 'dev': 'tap0', 'via': '10.0.0.1',
+             'metric': '10'}]
+        self.assertEqual({'gateway': '10.0.0.1', 'metric': 10},
+                         self.device.route.get_gateway())
+        self.priv.list_ip_routes.assert_called_once_with(
+            'ns', 4, device='tap0', table=None, scope=None)
+
+    def test_route_list_onlink_routes(self):
+        self.priv.list_ip_routes.return_value = [
+            {'cidr': '10.0.0.0/24', 'dev': 'tap0', 'src': '10.0.0.5'},
+            {'cidr': '10.0.1.0/24', 'dev': 'tap0'}]
+        self.assertEqual(
+            [{'cidr': '10.0.1.0/24', 'dev': 'tap0', 'scope': 'link'}],
+            self.device.route.list_onlink_routes(4))
+
+    def test_rule_add(self):
+        self.priv.list_ip_rules.return_value = [
+            {'priority': '0', 'from': 'all', 'table': 'local',
+             'type': 'unicast'}]
+        ip_lib.IPRule('ns').rule.add('10.0.0.5', table=100, priority=100)
+        self.priv.add_ip_rule.assert_called_once_with(
+            'ns', 4, {'from': '10.0.0.5', 'table': '100', 'priority': '100',
+                      'type': 'unicast'})
+
+    def test_rule_add_exists(self):
+        self.priv.list_ip_rules.return_value = [
+            {'priority': '100', 'from': '10.0.0.5', 'table': '100',
+             'type': 'unicast'}]
+        ip_lib.IPRule('ns').rule.add('10.0.0.5', table=100, priority=100)
+        self.assertFalse(self.priv.add_ip_rule.called)
+
+
 class TestIpNetnsCommand(TestIPCmdBase):
     def setUp(self):
         super(TestIpNetnsCommand, self).setUp()
@@ -1795,3 +1949,66 @@ class TestSysctl(base.BaseTestCase):
                                return_value=False):
             dev.disable_ipv6()
             self.assertFalse(self.execute.called)
+
+
+class TestPrivilegedIpChanges(base.BaseTestCase):
+    def setUp(self):
+        super(TestPrivilegedIpChanges, self).setUp()
+        self.addCleanup(privileged.default.set_client_mode, True)
+        privileged.default.set_client_mode(False)
+        self.netns = mock.patch.object(pyroute2, 'NetNS').start()
+        self.ip = self.netns.return_value.__enter__.return_value
+        self.ip.link_lookup.return_value = [5]
+
+    def test_apply_ip_changes(self):
+        priv_lib.apply_ip_changes('ns', [
+            ('add_ip_address', {'ip_version': 4, 'address': '10.0.0.5',
+                                'prefixlen': 24, 'device': 'tap0'}),
+            ('add_ip_route', {'ip_version': 4, 'cidr': '10.0.1.0/24',
+                              'device': 'tap0', 'scope': 'link'})])
+        self.netns.assert_called_once_with('ns', flags=0)
+        self.ip.addr.assert_called_once_with(
+            'add', index=5, address='10.0.0.5', mask=24,
+            family=socket.AF_INET, scope=0)
+        self.ip.route.assert_called_once_with(
+            'replace', family=socket.AF_INET, dst='10.0.1.0', dst_len=24,
+            oif=5, scope=253, proto='boot')
+
+    def test_apply_ip_changes_nonexistent_namespace(self):
+        self.netns.side_effect = OSError(errno.ENOENT, None)
+        self.assertRaises(priv_lib.NetworkNamespaceNotFound,
+                          priv_lib.apply_ip_changes, 'ns', [])
+
+    def test_add_ip_route_netlink_error(self):
+        self.ip.route.side_effect = NetlinkError(errno.EEXIST)
+        self.assertRaises(priv_lib.IpCommandFailed, priv_lib.add_ip_route,
+                          'ns', 4, '10.0.1.0/24', device='tap0')
+
+    def test_delete_ip_address_not_found(self):
+        self.ip.addr.side_effect = NetlinkError(errno.EADDRNOTAVAIL)
+        with testtools.ExpectedException(priv_lib.IpCommandFailed,
+                                         'Cannot assign requested address'):
+            priv_lib.delete_ip_address(4, '10.0.0.5', 24, 'tap0', 'ns')
+
+    def test_set_link_attribute_device_not_found(self):
+        self.ip.link_lookup.return_value = []
+        self.assertRaises(priv_lib.NetworkInterfaceNotFound,
+                          priv_lib.set_link_attribute, 'tap0', 'ns',
+                          state='up')
+
+    def test_make_rule_args(self):
+        self.assertEqual(
+            {'family': socket.AF_INET, 'action': 1, 'priority': 100,
+             'table': 255, 'iifname': 'qr-1', 'fwmark': 1,
+             'fwmask': 0xffffffff},
+            priv_lib._make_rule_args(4, {'from': '0.0.0.0/0',
+                                         'priority': '100',
+                                         'table': 'local',
+                                         'iif': 'qr-1',
+                                         'fwmark': '0x1/0xffffffff',
+                                         'type': 'unicast'}))
+        self.assertEqual(
+            {'family': socket.AF_INET6, 'action': 1, 'src': '2001:db8::1',
+             'src_len': 128, 'table': 10},
+            priv_lib._make_rule_args(6, {'from': '2001:db8::1',
+                                         'table': '10'}))
@@ -163,3 +163,99 @@ class IpsetManagerTestCase(BaseIpsetManagerTest):
         self.expect_destroy()
         self.ipset.destroy(TEST_SET_ID, ETHERTYPE)
         self.verify_mock_calls()
+
+
+class IpsetManagerBatchTestCase(base.BaseTestCase):
+    def setUp(self):
+        super(IpsetManagerBatchTestCase, self).setUp()
+        self.ipset = ipset_manager.IpsetManager()
+        self.execute = mock.patch.object(self.ipset, "execute").start()
+        self.execute.return_value = '\n'.join([
+            'create %s hash:net family inet hashsize 1024 maxelem 65536' %
+            TEST_SET_NAME,
+            'add %s 10.0.0.1' % TEST_SET_NAME,
+            'add %s 10.0.1.0/24' % TEST_SET_NAME,
+            'create %s hash:net family inet' % TEST_SET_NAME_NEW,
+            'add %s 10.0.0.9' % TEST_SET_NAME_NEW,
+            'create other hash:ip family inet',
+            'add other 10.0.0.2'])
+        self.ipset.load_system_sets()
+        self.execute.reset_mock()
+
+    def _assert_restore(self, lines):
+        self.execute.assert_called_once_with(
+            ['ipset', 'restore', '-exist'], process_input='\n'.join(lines),
+            run_as_root=True, check_exit_code=True)
+
+    def test_load_system_sets(self):
+        self.assertEqual({TEST_SET_NAME: ['10.0.0.1/32', '10.0.1.0/24']},
+                         self.ipset.ipset_sets)
+
+    def test_load_system_sets_failure(self):
+        ipset = ipset_manager.IpsetManager(
+            execute=mock.Mock(side_effect=RuntimeError))
+        ipset.load_system_sets()
+        self.assertEqual({}, ipset.ipset_sets)
+        self.assertFalse(ipset._is_missing_from_system(TEST_SET_NAME))
+
+    def test_set_members_existing_set(self):
+        self.ipset.set_members(TEST_SET_ID, ETHERTYPE,
+                               ['10.0.0.1', '10.0.1.0/24', '10.0.0.3'])
+        self.execute.assert_called_once_with(
+            ['ipset', 'add', '-exist', TEST_SET_NAME, '10.0.0.3/32'],
+            process_input=None, run_as_root=True, check_exit_code=True)
+
+    def test_set_members_missing_from_system(self):
+        self.ipset.set_members('other_sgid', ETHERTYPE, FAKE_IPS[:2])
+        name = self.ipset.get_name('other_sgid', ETHERTYPE)
+        self._assert_restore(['create %s hash:net family inet' % name,
+                              'add %s 10.0.0.1/32' % name,
+                              'add %s 10.0.0.2/32' % name])
+        self.assertTrue(self.ipset.set_name_exists(name))
+
+    def test_set_members_deferred(self):
+        name = self.ipset.get_name('other_sgid', 'IPv6')
+        self.ipset.defer_apply_on()
+        self.ipset.set_members(TEST_SET_ID, ETHERTYPE,
+                               ['10.0.0.1', '10.0.0.3'])
+        self.ipset.set_members('other_sgid', 'IPv6', ['2001:db8::1'])
+        self.assertFalse(self.execute.called)
+        self.assertTrue(self.ipset.set_name_exists(name))
+        self.ipset.defer_apply_off()
+        self._assert_restore(['add %s 10.0.0.3/32' % TEST_SET_NAME,
+                              'del %s 10.0.1.0/24' % TEST_SET_NAME,
+                              'create %s hash:net family inet6' % name,
+                              'add %s 2001:db8::1/128' % name])
+
+    def test_set_members_deferred_refresh(self):
+        self.ipset.defer_apply_on()
+        self.ipset.set_members(TEST_SET_ID, ETHERTYPE, FAKE_IPS[1:])
+        self.ipset.defer_apply_off()
+        self._assert_restore(
+            ['create %s hash:net family inet' % TEST_SET_NAME_NEW,
+             'flush %s' % TEST_SET_NAME_NEW] +
+            ['add %s %s/32' % (TEST_SET_NAME_NEW, ip) for ip in FAKE_IPS[1:]] +
+            ['swap %s %s' % (TEST_SET_NAME_NEW, TEST_SET_NAME),
+             'destroy %s' % TEST_SET_NAME_NEW])
+
+    def test_destroy_deferred_set(self):
+        name = self.ipset.get_name('other_sgid', ETHERTYPE)
+        self.ipset.defer_apply_on()
+        self.ipset.set_members(TEST_SET_ID, ETHERTYPE, FAKE_IPS[1:])
+        self.ipset.set_members('other_sgid', ETHERTYPE, ['10.0.0.3'])
+        self.ipset.destroy(TEST_SET_ID, ETHERTYPE)
+        self.execute.assert_called_once_with(
+            ['ipset', 'destroy', TEST_SET_NAME], process_input=None,
+            run_as_root=True, check_exit_code=False)
+        self.execute.reset_mock()
+        self.ipset.defer_apply_off()
+        self._assert_restore(['create %s hash:net family inet' % name,
+                              'add %s 10.0.0.3/32' % name])
+        self.assertFalse(self.ipset.set_name_exists(TEST_SET_NAME))
+
+    def test_set_members_deferred_failure(self):
+        self.execute.side_effect = RuntimeError
+        self.ipset.defer_apply_on()
+        self.ipset.set_members(TEST_SET_ID, ETHERTYPE, ['10.0.0.3'])
+        self.assertRaises(RuntimeError, self.ipset.defer_apply_off)
+        self.assertFalse(self.ipset.set_name_exists(TEST_SET_NAME))
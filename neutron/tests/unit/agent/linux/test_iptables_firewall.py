@@ -106,6 +106,8 @@ class BaseIptablesFirewallTestCase(base.BaseTestCase):
         self.firewall.ipconntrack = ip_conntrack.IpConntrackManager(
               get_rules_for_table_func, filtered_ports=filtered_ports,
               unfiltered_ports=dict())
+        # check the conntrack commands rather than the netlink requests
+        self.firewall.ipconntrack._use_netlink = False
 
     def _fake_port(self):
         return {'device': 'tapfake_dev',
@@ -1964,6 +1966,29 @@ class IptablesFirewallEnhancedIpsetTestCase(BaseIptablesFirewallTestCase):
         ]
         self.firewall.ipset.assert_has_calls(calls, any_order=True)
 
+    def test_update_security_group_members_deferred(self):
+        manager = mock.Mock()
+        manager.attach_mock(self.firewall.ipset, 'ipset')
+        manager.attach_mock(self.firewall.iptables, 'iptables')
+        with self.firewall.defer_apply():
+            self.firewall.update_security_group_members(
+                'fake_sgid', {'IPv4': ['10.0.0.1']})
+        # the sets are applied before the rules matching them
+        manager.assert_has_calls([
+            mock.call.ipset.defer_apply_on(),
+            mock.call.ipset.load_system_sets(),
+            mock.call.ipset.set_members('fake_sgid', 'IPv4', ['10.0.0.1']),
+            mock.call.ipset.defer_apply_off(),
+            mock.call.iptables.defer_apply_off()])
+
+    def test_filter_defer_apply_off_ipset_failure(self):
+        self.firewall.ipset.defer_apply_off.side_effect = RuntimeError
+        self.firewall.filter_defer_apply_on()
+        self.assertRaises(RuntimeError, self.firewall.filter_defer_apply_off)
+        self.firewall.iptables.defer_apply_off.assert_called_once_with()
+        self.assertIsNone(self.firewall._pre_defer_filtered_ports)
+        self.assertIsNone(self.firewall._pre_defer_unfiltered_ports)
+
     def _setup_fake_firewall_members_and_rules(self, firewall):
         firewall.sg_rules = self._fake_sg_rules()
         firewall.pre_sg_rules = self._fake_sg_rules()
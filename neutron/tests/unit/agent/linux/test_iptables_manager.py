@@ -1321,6 +1321,103 @@ class IptablesManagerStateFulTestCase(base.BaseTestCase):
 
         tools.verify_mock_calls(self.execute, expected_calls_and_values)
 
+    def _setup_full_resync_interval(self, interval=3600):
+        cfg.CONF.set_override('iptables_full_resync_interval', interval,
+                              'AGENT')
+        self.iptables = iptables_manager.IptablesManager()
+        self.execute = mock.patch.object(self.iptables, "execute").start()
+        self.execute.return_value = ''
+
+    def _get_save_calls(self):
+        return [c for c in self.execute.call_args_list
+                if c[0][0] == ['iptables-save']]
+
+    def test_apply_from_applied_rules(self):
+        self._setup_full_resync_interval()
+        self.iptables.ipv4['filter'].add_chain('filter')
+        self.iptables.apply()
+        self.assertEqual(1, len(self._get_save_calls()))
+
+        self.iptables.ipv4['filter'].add_rule('filter', '-j DROP')
+        self.iptables.apply()
+        self.assertEqual(1, len(self._get_save_calls()))
+        self.execute.assert_called_with(
+            ['iptables-restore', '-n'],
+            process_input=('# Generated by iptables_manager\n'
+                           '*filter\n'
+                           '-I %(bn)s-filter 1 -j DROP\n'
+                           'COMMIT\n'
+                           '# Completed by iptables_manager\n'
+                           % IPTABLES_ARG),
+            run_as_root=True, log_fail_as_error=False)
+
+        self.iptables.ipv4['filter'].remove_chain('filter')
+        self.iptables.apply()
+        self.assertEqual(1, len(self._get_save_calls()))
+        self.execute.assert_called_with(
+            ['iptables-restore', '-n'],
+            process_input=('# Generated by iptables_manager\n'
+                           '*filter\n'
+                           '-D %(bn)s-filter 1\n'
+                           '-X %(bn)s-filter\n'
+                           'COMMIT\n'
+                           '# Completed by iptables_manager\n'
+                           % IPTABLES_ARG),
+            run_as_root=True, log_fail_as_error=False)
+
+    def test_apply_without_full_resync_interval(self):
+        self._setup_full_resync_interval(0)
+        self.iptables.ipv4['filter'].add_chain('filter')
+        self.iptables.apply()
+        self.iptables.ipv4['filter'].add_rule('filter', '-j DROP')
+        self.iptables.apply()
+        self.assertEqual(2, len(self._get_save_calls()))
+        self.assertEqual({}, self.iptables._applied_rules)
+
+    def test_apply_full_resync_interval_expired(self):
+        self._setup_full_resync_interval(60)
+        with mock.patch.object(iptables_manager.time, 'time',
+                               return_value=1000):
+            self.iptables.apply()
+        self.iptables.ipv4['filter'].add_chain('filter')
+        with mock.patch.object(iptables_manager.time, 'time',
+                               return_value=1061):
+            self.iptables.apply()
+        self.assertEqual(2, len(self._get_save_calls()))
+
+    def test_apply_unowned_chain_triggers_full_resync(self):
+        self._setup_full_resync_interval()
+        self.iptables.apply()
+        self.iptables.ipv4['filter'].add_chain('unowned', wrap=False)
+        self.iptables.apply()
+        self.assertEqual(2, len(self._get_save_calls()))
+
+    def test_apply_restore_failure_triggers_full_resync(self):
+        self._setup_full_resync_interval()
+        self.iptables.apply()
+        self.iptables.ipv4['filter'].add_chain('filter')
+        self.execute.side_effect = [
+            linux_utils.ProcessExecutionError('failed', 1), '', None]
+        with mock.patch.object(iptables_manager.LOG, 'warning') as warning:
+            self.iptables.apply()
+        self.assertTrue(warning.called)
+        self.assertEqual(2, len(self._get_save_calls()))
+        self.assertIn(':%(bn)s-filter - [0:0]' % IPTABLES_ARG,
+                      self.execute.call_args[1]['process_input'])
+
+    def test_apply_restore_failure_keeps_pending_removals(self):
+        self._setup_full_resync_interval()
+        self.iptables.ipv4['filter'].add_chain('filter')
+        self.iptables.apply()
+        self.iptables.ipv4['filter'].remove_chain('filter')
+        self.execute.side_effect = [
+            linux_utils.ProcessExecutionError('failed', 1),
+            ('*filter\n:%(bn)s-filter - [0:0]\nCOMMIT\n' % IPTABLES_ARG),
+            None]
+        self.iptables.apply()
+        self.assertIn('-X %(bn)s-filter' % IPTABLES_ARG,
+                      self.execute.call_args[1]['process_input'])
+
 
 class IptablesManagerStateLessTestCase(base.BaseTestCase):
 
@@ -13,6 +13,7 @@
 #    under the License.
 
 import mock
+from ovs.db import idl
 
 from neutron.agent.common import ovs_lib
 from neutron.agent.linux import ovsdb_monitor
@@ -87,3 +88,70 @@ class TestSimpleInterfaceMonitor(base.BaseTestCase):
             self.monitor.process_events()
             self.assertEqual(self.monitor.new_events['added'][0]['ofport'],
                              ovs_lib.UNASSIGNED_OFPORT)
+
+
+class TestSimpleInterfaceIdlMonitor(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestSimpleInterfaceIdlMonitor, self).setUp()
+        self.monitor = ovsdb_monitor.SimpleInterfaceIdlMonitor()
+
+    @staticmethod
+    def _row_named(name, ofport=None, external_ids=None):
+        row = mock.Mock(ofport=[ofport] if ofport else [],
+                        external_ids=external_ids or {})
+        # name is an argument of the Mock constructor
+        row.name = name
+        return row
+
+    def test_has_updates_is_false_with_no_change(self):
+        self.assertFalse(self.monitor.has_updates)
+
+    def test_create_and_delete_reported(self):
+        external_ids = {'iface-id': 'port-id', 'attached-mac': 'mac'}
+        self.monitor._notify(idl.ROW_CREATE, self._row_named(
+            'tap1', ofport=5, external_ids=external_ids))
+        self.monitor._notify(idl.ROW_DELETE, self._row_named('tap2',
+                                                             ofport=6))
+        self.assertTrue(self.monitor.has_updates)
+        self.assertEqual(
+            {'added': [{'name': 'tap1', 'ofport': 5,
+                        'external_ids': external_ids}],
+             'removed': [{'name': 'tap2', 'ofport': 6,
+                          'external_ids': {}}]},
+            self.monitor.get_events())
+        self.assertFalse(self.monitor.has_updates)
+
+    def test_unassigned_ofport_updated(self):
+        self.monitor._notify(idl.ROW_CREATE, self._row_named('tap1'))
+        self.assertEqual(ovs_lib.UNASSIGNED_OFPORT,
+                         self.monitor.new_events['added'][0]['ofport'])
+        self.monitor._notify(idl.ROW_UPDATE,
+                             self._row_named('tap1', ofport=7), mock.Mock())
+        self.monitor._notify(idl.ROW_UPDATE,
+                             self._row_named('tap3', ofport=8), mock.Mock())
+        events = self.monitor.get_events()
+        self.assertEqual([('tap1', 7)],
+                         [(e['name'], e['ofport']) for e in events['added']])
+        self.assertEqual([], events['removed'])
+
+    def test_start_stop(self):
+        with mock.patch.object(ovsdb_monitor.n_connection,
+                               'monitor_idl_factory') as factory, \
+                mock.patch.object(ovsdb_monitor.connection,
+                                  'Connection') as conn_cls:
+            self.monitor.start(block=True)
+            self.monitor.start()
+            factory.assert_called_once_with(
+                'Interface', ['name', 'ofport', 'external_ids'],
+                self.monitor._notify)
+            conn_cls.assert_called_once_with(idl=factory.return_value,
+                                             timeout=mock.ANY)
+            conn_cls.return_value.start.assert_called_once_with()
+            self.assertTrue(self.monitor.is_active())
+
+            self.monitor._notify(idl.ROW_CREATE, self._row_named('tap1'))
+            self.monitor.stop()
+            conn_cls.return_value.stop.assert_called_once_with()
+            self.assertFalse(self.monitor.is_active())
+            self.assertFalse(self.monitor.has_updates)
@@ -13,8 +13,10 @@
 #    under the License.
 
 import mock
+from oslo_config import cfg
 
 from neutron.agent.common import base_polling
+from neutron.agent.linux import ovsdb_monitor
 from neutron.agent.linux import polling
 from neutron.agent.ovsdb.native import helpers
 from neutron.tests import base
@@ -46,6 +48,7 @@ class TestInterfacePollingMinimizer(base.BaseTestCase):
     def setUp(self):
         super(TestInterfacePollingMinimizer, self).setUp()
         mock.patch.object(helpers, 'enable_connection_uri').start()
+        cfg.CONF.set_override('ovsdb_interface', 'vsctl', 'OVS')
         self.pm = polling.InterfacePollingMinimizer()
 
     def test_start_calls_monitor_start(self):
@@ -69,3 +72,18 @@ class TestInterfacePollingMinimizer(base.BaseTestCase):
     def test__is_polling_required_returns_when_updates_are_present(self):
         with self.mock_has_updates(True):
             self.assertTrue(self.pm._is_polling_required())
+
+
+class TestInterfacePollingMinimizerNative(base.BaseTestCase):
+
+    def test_monitor_is_idl_monitor(self):
+        pm = polling.InterfacePollingMinimizer()
+        self.assertIsInstance(pm._monitor,
+                              ovsdb_monitor.SimpleInterfaceIdlMonitor)
+
+    def test_monitor_is_ovsdb_client_monitor_with_vsctl(self):
+        mock.patch.object(helpers, 'enable_connection_uri').start()
+        cfg.CONF.set_override('ovsdb_interface', 'vsctl', 'OVS')
+        pm = polling.InterfacePollingMinimizer()
+        self.assertIsInstance(pm._monitor,
+                              ovsdb_monitor.SimpleInterfaceMonitor)
@@ -110,6 +110,62 @@ class RemoteResourceCacheTestCase(base.BaseTestCase):
         self.assertItemsEqual([geese[3]],
                               self.rcache.get_resources('goose', is_small))
 
+    def test_get_resources_with_index(self):
+        self.rcache.add_index('goose', 'size')
+        self.rcache.add_index('goose', 'flocks')
+        geese = [OVOLikeThing(3, size='large', flocks=['a', 'b'], age=1),
+                 OVOLikeThing(5, size='medium', flocks=['b'], age=2),
+                 OVOLikeThing(4, size='large', flocks=[], age=2),
+                 OVOLikeThing(6, size='small', flocks=('a', 'c'), age=1)]
+        for goose in geese:
+            self.rcache.record_resource_update(self.ctx, 'goose', goose)
+        with mock.patch.object(self.rcache,
+                               'match_resources_with_func') as scan:
+            self.assertItemsEqual(
+                [geese[0], geese[2]],
+                self.rcache.get_resources('goose', {'size': ('large', )}))
+            self.assertItemsEqual(
+                [geese[0], geese[1], geese[3]],
+                self.rcache.get_resources('goose', {'flocks': ('a', 'b')}))
+            self.assertItemsEqual(
+                [geese[0]],
+                self.rcache.get_resources('goose', {'flocks': ('a', 'b'),
+                                                    'size': ('large', )}))
+            self.assertItemsEqual(
+                [geese[3]],
+                self.rcache.get_resources('goose', {'flocks': ('a', ),
+                                                    'age': (1, ),
+                                                    'size': ('small', )}))
+            self.assertEqual(
+                [], self.rcache.get_resources('goose', {'flocks': ('z', )}))
+        self.assertFalse(scan.called)
+        # unindexed filters fall back to a scan of the cache
+        self.assertItemsEqual(
+            [geese[1], geese[2]],
+            self.rcache.get_resources('goose', {'age': (2, )}))
+
+    def test_index_maintained_on_update_and_delete(self):
+        self.rcache.record_resource_update(
+            self.ctx, 'goose', OVOLikeThing(3, flocks=['a', 'b']))
+        # index declared after resources were cached
+        self.rcache.add_index('goose', 'flocks')
+        self.rcache.record_resource_update(
+            self.ctx, 'goose', OVOLikeThing(3, flocks=['b', 'c'],
+                                            revision_number=11))
+        self.rcache.record_resource_update(
+            self.ctx, 'goose', OVOLikeThing(4, flocks=['a']))
+        self.assertEqual(
+            [4], [g.id for g in self.rcache.get_resources(
+                'goose', {'flocks': ('a', )})])
+        self.assertEqual(
+            [3], [g.id for g in self.rcache.get_resources(
+                'goose', {'flocks': ('c', )})])
+        self.rcache.record_resource_delete(self.ctx, 'goose', 3)
+        self.assertEqual(
+            [], self.rcache.get_resources('goose', {'flocks': ('b', 'c')}))
+        self.assertEqual({'a': {4}},
+                         self.rcache._indexes_by_type['goose']['flocks'])
+
     def test_match_resources_with_func(self):
         geese = [OVOLikeThing(3, size='large'), OVOLikeThing(5, size='medium'),
                  OVOLikeThing(4, size='xlarge'), OVOLikeThing(6, size='small')]
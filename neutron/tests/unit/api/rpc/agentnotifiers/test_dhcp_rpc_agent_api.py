@@ -222,6 +222,16 @@ class TestDhcpAgentNotifyAPI(base.BaseTestCase):
         self.notifier._cast_message(mock.ANY, mock.ANY, mock.ANY)
         self.assertEqual(1, self.mock_cast.call_count)
 
+    def test_networks_added_to_agent(self):
+        with mock.patch.object(self.notifier, 'client') as client:
+            self.notifier.networks_added_to_agent(
+                mock.ANY, ['net1', 'net2'], 'host')
+        client.prepare.assert_called_once_with(
+            topic='dhcp_agent', server='host', version='1.1')
+        client.prepare.return_value.cast.assert_called_once_with(
+            mock.ANY, 'networks_added_to_agent',
+            payload={'network_ids': ['net1', 'net2']})
+
     def test__native_notification_unsubscribes(self):
         self.assertFalse(self.notifier._unsubscribed_resources)
         for res in (resources.PORT, resources.NETWORK, resources.SUBNET):
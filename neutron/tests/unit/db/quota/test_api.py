@@ -156,6 +156,35 @@ class TestQuotaDbApi(testlib_api.SqlTestCaseLight):
         self._verify_quota_usage(usage_info,
                                  expected_dirty=False)
 
+    def test_get_quota_usage_by_resources_and_tenant(self):
+        self._create_quota_usage('goals', 26)
+        self._create_quota_usage('assists', 11)
+        self._create_quota_usage('bookings', 3)
+        self._create_quota_usage('goals', 12, tenant_id='Callejon')
+        usage_infos = quota_api.get_quota_usage_by_resources_and_tenant(
+            self.context, ['goals', 'assists', 'saves'], self.tenant_id)
+        self.assertEqual({'goals', 'assists'}, set(usage_infos))
+        self._verify_quota_usage(usage_infos['goals'],
+                                 expected_resource='goals',
+                                 expected_used=26)
+        self._verify_quota_usage(usage_infos['assists'],
+                                 expected_resource='assists',
+                                 expected_used=11)
+
+    def test_get_quota_usage_by_resources_and_tenant_no_resources(self):
+        self._create_quota_usage('goals', 26)
+        self.assertEqual({}, quota_api.get_quota_usage_by_resources_and_tenant(
+            self.context, [], self.tenant_id))
+
+    def test_get_quota_generation_no_generation(self):
+        self.assertEqual(0, quota_api.get_quota_generation(self.context))
+
+    def test_bump_quota_generation(self):
+        quota_api.bump_quota_generation(self.context)
+        self.assertEqual(1, quota_api.get_quota_generation(self.context))
+        quota_api.bump_quota_generation(self.context)
+        self.assertEqual(2, quota_api.get_quota_generation(self.context))
+
     def _test_set_all_quota_usage_dirty(self, expected):
         self._create_quota_usage('goals', 26)
         self._create_quota_usage('goals', 12, tenant_id='Callejon')
@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import mock
 from neutron_lib import context
 from neutron_lib import exceptions as lib_exc
 
@@ -262,6 +263,33 @@ class TestDbQuotaDriver(testlib_api.SqlTestCase,
                           deltas,
                           self.plugin)
 
+    def test_make_reservation_tracked_resources(self):
+        resources = {RESOURCE: TestTrackedResource(RESOURCE,
+                                                   test_quota.MehModel),
+                     ALT_RESOURCE: TestTrackedResource(
+                         ALT_RESOURCE, test_quota.OtherMehModel)}
+        self.plugin.update_quota_limit(self.context, PROJECT, RESOURCE, 4)
+        self.plugin.update_quota_limit(self.context, PROJECT, ALT_RESOURCE, 4)
+        quota_api.set_quota_usage(self.context, RESOURCE, PROJECT, 2)
+        quota_api.set_quota_usage(self.context, ALT_RESOURCE, PROJECT, 1)
+        quota_driver = driver.DbQuotaDriver()
+        quota_driver.make_reservation(self.context, PROJECT, resources,
+                                      {RESOURCE: 1, ALT_RESOURCE: 1},
+                                      self.plugin)
+        with mock.patch.object(resource.TrackedResource,
+                               'count') as mock_count:
+            # 2 used and 1 reserved, no room for 2 more
+            self.assertRaises(lib_exc.OverQuota,
+                              quota_driver.make_reservation,
+                              self.context, PROJECT, resources,
+                              {RESOURCE: 2, ALT_RESOURCE: 2},
+                              self.plugin)
+            reservation = quota_driver.make_reservation(
+                self.context, PROJECT, resources,
+                {RESOURCE: 1, ALT_RESOURCE: 2}, self.plugin)
+            self.assertFalse(mock_count.called)
+        self.assertEqual({RESOURCE: 1, ALT_RESOURCE: 2}, reservation.deltas)
+
     def test_get_detailed_tenant_quotas_resource(self):
         res = {RESOURCE: TestTrackedResource(RESOURCE, test_quota.MehModel)}
 
@@ -306,3 +334,81 @@ class TestDbQuotaDriver(testlib_api.SqlTestCase,
         self.assertEqual(9, detailed_quota[resource_2]['limit'])
         self.assertEqual(7, detailed_quota[resource_2]['reserved'])
         self.assertEqual(3, detailed_quota[resource_2]['used'])
+
+
+class TestDbQuotaDriverLimitCache(TestDbQuotaDriver):
+
+    def setUp(self):
+        super(TestDbQuotaDriverLimitCache, self).setUp()
+        self.config(quota_limit_cache_ttl=60, group='QUOTAS')
+        self.cache = driver.QuotaLimitCache()
+        mock.patch.object(driver, '_LIMIT_CACHE', self.cache).start()
+        self.defaults = {RESOURCE: TestResource(RESOURCE, 4)}
+
+    def _get_tenant_quota(self):
+        return self.plugin.get_tenant_quotas(
+            self.context, self.defaults, PROJECT)[RESOURCE]
+
+    def _update_limit_from_other_server(self, limit):
+        quota = quota_obj.Quota.get_objects(
+            self.context, project_id=PROJECT, resource=RESOURCE)[0]
+        quota.limit = limit
+        quota.update()
+
+    def test_get_tenant_quotas_cached(self):
+        self.plugin.update_quota_limit(self.context, PROJECT, RESOURCE, 2)
+        self.assertEqual(2, self._get_tenant_quota())
+        with mock.patch.object(quota_obj.Quota, 'get_objects') as get_objs:
+            self.assertEqual(2, self._get_tenant_quota())
+            self.assertFalse(get_objs.called)
+
+    def test_cache_disabled(self):
+        self.plugin.update_quota_limit(self.context, PROJECT, RESOURCE, 2)
+        self.config(quota_limit_cache_ttl=0, group='QUOTAS')
+        self.assertEqual(2, self._get_tenant_quota())
+        self._update_limit_from_other_server(3)
+        self.assertEqual(3, self._get_tenant_quota())
+
+    def test_cache_entry_expires(self):
+        self.plugin.update_quota_limit(self.context, PROJECT, RESOURCE, 2)
+        with mock.patch.object(driver.time, 'time', return_value=1000):
+            self.assertEqual(2, self._get_tenant_quota())
+        self._update_limit_from_other_server(3)
+        with mock.patch.object(driver.time, 'time', return_value=1059):
+            self.assertEqual(2, self._get_tenant_quota())
+        with mock.patch.object(driver.time, 'time', return_value=1060):
+            self.assertEqual(3, self._get_tenant_quota())
+
+    def test_cache_invalidated_by_generation_change(self):
+        self.config(quota_limit_cache_generation_interval=10, group='QUOTAS')
+        self.plugin.update_quota_limit(self.context, PROJECT, RESOURCE, 2)
+        with mock.patch.object(driver.time, 'time', return_value=1000):
+            self.assertEqual(2, self._get_tenant_quota())
+        self._update_limit_from_other_server(3)
+        quota_api.bump_quota_generation(self.context)
+        # the generation is not checked again before the interval elapses
+        with mock.patch.object(driver.time, 'time', return_value=1009):
+            self.assertEqual(2, self._get_tenant_quota())
+        with mock.patch.object(driver.time, 'time', return_value=1010):
+            self.assertEqual(3, self._get_tenant_quota())
+
+    def test_stale_limits_not_cached(self):
+        limits, generation = self.cache.get(self.context, PROJECT)
+        self.assertIsNone(limits)
+        self.cache._generation += 1
+        self.cache.set(PROJECT, {RESOURCE: 2}, generation)
+        self.assertNotIn(PROJECT, self.cache._limits)
+
+    def test_update_quota_limit_bumps_generation(self):
+        self.plugin.update_quota_limit(self.context, PROJECT, RESOURCE, 2)
+        generation = quota_api.get_quota_generation(self.context)
+        self.plugin.update_quota_limit(self.context, PROJECT, RESOURCE, 3)
+        self.assertEqual(generation + 1,
+                         quota_api.get_quota_generation(self.context))
+
+    def test_delete_tenant_quota_bumps_generation(self):
+        self.plugin.update_quota_limit(self.context, PROJECT, RESOURCE, 2)
+        generation = quota_api.get_quota_generation(self.context)
+        self.plugin.delete_tenant_quota(self.context, PROJECT)
+        self.assertEqual(generation + 1,
+                         quota_api.get_quota_generation(self.context))
@@ -18,12 +18,15 @@ import copy
 import datetime
 
 import mock
+from neutron_lib.agent import constants as agent_consts
+from neutron_lib.callbacks import events
 from neutron_lib import constants
 from neutron_lib import context
 from neutron_lib import exceptions as n_exc
 from oslo_config import cfg
 from oslo_db import exception as exc
 from oslo_utils import timeutils
+from sqlalchemy import orm
 import testscenarios
 
 from neutron.db import agents_db
@@ -241,6 +244,167 @@ class TestAgentsDbMixin(TestAgentsDbBase):
         self.assertEqual(tracker.set_versions.call_count, 2)
 
 
+class TestAgentHeartbeatBuffer(TestAgentsDbBase):
+    def setUp(self):
+        super(TestAgentHeartbeatBuffer, self).setUp()
+        cfg.CONF.set_override('agent_heartbeat_flush_interval', 10)
+        self.looping_call = mock.patch.object(
+            agents_db.loopingcall, 'FixedIntervalLoopingCall').start()
+        self.notify = mock.patch.object(agents_db.registry, 'notify').start()
+        self.agent_status = dict(AGENT_STATUS, configurations={'a': 1})
+
+    def _report(self, agent_status=None):
+        return self.plugin.create_or_update_agent(
+            self.context, copy.deepcopy(agent_status or self.agent_status))
+
+    def _get_agent(self):
+        return self.plugin._get_agent_by_type_and_host(
+            self.context, self.agent_status['agent_type'],
+            self.agent_status['host'])
+
+    def test_unchanged_state_heartbeat_buffered(self):
+        self._report()
+        heartbeat = self._get_agent().heartbeat_timestamp
+        self.notify.reset_mock()
+
+        status, __ = self._report()
+
+        self.assertEqual(agent_consts.AGENT_ALIVE, status)
+        self.assertFalse(self.notify.called)
+        self.looping_call.return_value.start.assert_called_once_with(
+            interval=10, initial_delay=10)
+        self.assertEqual(heartbeat, self._get_agent().heartbeat_timestamp)
+        pending = dict(self.plugin._heartbeat_buffer._pending)
+        self.assertEqual(1, len(pending))
+
+        self.plugin._heartbeat_buffer.flush()
+
+        self.assertFalse(self.notify.called)
+        self.assertEqual(list(pending.values())[0][0].replace(microsecond=0),
+                         self._get_agent().heartbeat_timestamp.replace(
+                             microsecond=0))
+        self.assertEqual({}, self.plugin._heartbeat_buffer._pending)
+
+    def test_changed_state_written(self):
+        self._report()
+        self.notify.reset_mock()
+        agent_status = dict(self.agent_status, configurations={'a': 2})
+
+        self._report(agent_status)
+
+        self.assertTrue(self.notify.called)
+        self.assertEqual({'a': 2}, self.plugin.get_configuration_dict(
+            self._get_agent()))
+        self.assertEqual({}, self.plugin._heartbeat_buffer._pending)
+
+    def test_restarted_agent_written(self):
+        self._report()
+        self.notify.reset_mock()
+
+        self._report(dict(self.agent_status, start_flag=True))
+
+        self.assertTrue(self.notify.called)
+
+    def test_agent_down_for_buffer_written(self):
+        self._report()
+        self.notify.reset_mock()
+        agent_id, state, heartbeat = list(
+            self.plugin._heartbeat_buffer._agents.values())[0]
+        self.plugin._heartbeat_buffer._agents[
+            (state['agent_type'], state['host'])] = (
+            agent_id, state, heartbeat - datetime.timedelta(
+                seconds=cfg.CONF.agent_down_time))
+
+        self._report()
+
+        self.assertTrue(self.notify.called)
+
+    def test_flush_writes_deleted_agent(self):
+        self._report()
+        self._report()
+        self._get_agent().delete()
+        self.notify.reset_mock()
+
+        self.plugin._heartbeat_buffer.flush()
+
+        self.assertEqual({'a': 1}, self.plugin.get_configuration_dict(
+            self._get_agent()))
+        self.assertEqual(events.AFTER_CREATE, self.notify.call_args[0][1])
+
+    def test_flush_writes_state_changed_meanwhile(self):
+        self._report()
+        self._report()
+        # another server process wrote another state of the agent
+        agent = self._get_agent()
+        agent.configurations = {'a': 2}
+        agent.update()
+        self.notify.reset_mock()
+
+        self.plugin._heartbeat_buffer.flush()
+
+        self.assertEqual({'a': 1}, self.plugin.get_configuration_dict(
+            self._get_agent()))
+        self.assertEqual(events.AFTER_UPDATE, self.notify.call_args[0][1])
+        self.assertEqual({}, self.plugin._heartbeat_buffer._pending)
+
+    def test_flush_writes_heartbeats_in_single_statement(self):
+        agents_status = [self.agent_status,
+                         dict(self.agent_status, host='host2',
+                              availability_zone='az1'),
+                         dict(self.agent_status, host='host3')]
+        for agent_status in agents_status * 2:
+            self._report(agent_status)
+        # another server process wrote another state of the first agent
+        agent = self._get_agent()
+        agent.configurations = {'a': 2}
+        agent.update()
+        pending = dict(self.plugin._heartbeat_buffer._pending)
+        self.notify.reset_mock()
+
+        with mock.patch.object(orm.Session, 'execute', autospec=True,
+                               side_effect=orm.Session.execute) as execute:
+            self.plugin._heartbeat_buffer.flush()
+
+        executemany = [call for call in execute.call_args_list
+                       if isinstance(call[0][2], list)]
+        self.assertEqual(1, len(executemany))
+        self.assertEqual(3, len(executemany[0][0][2]))
+        for host in ('host2', 'host3'):
+            agent = self.plugin._get_agent_by_type_and_host(
+                self.context, self.agent_status['agent_type'], host)
+            self.assertEqual(
+                pending[agent.id][0].replace(microsecond=0),
+                agent.heartbeat_timestamp.replace(microsecond=0))
+        self.assertEqual({'a': 1}, self.plugin.get_configuration_dict(
+            self._get_agent()))
+        self.assertEqual(1, self.notify.call_count)
+
+    def test_delete_agent_forgets_agent(self):
+        self._report()
+        self.plugin.delete_agent(self.context, self._get_agent().id)
+
+        status, __ = self._report()
+
+        self.assertEqual(agent_consts.AGENT_NEW, status)
+
+    def test_flush_failure_keeps_heartbeats(self):
+        self._report()
+        self._report()
+        pending = dict(self.plugin._heartbeat_buffer._pending)
+        with mock.patch.object(agents_db.context, 'get_admin_context',
+                               side_effect=Exception):
+            self.plugin._heartbeat_buffer.flush()
+        self.assertEqual(pending, self.plugin._heartbeat_buffer._pending)
+
+    def test_disabled_by_default(self):
+        cfg.CONF.set_override('agent_heartbeat_flush_interval', 0)
+        self._report()
+        self.notify.reset_mock()
+        self._report()
+        self.assertTrue(self.notify.called)
+        self.assertFalse(self.looping_call.called)
+
+
 class TestAgentsDbGetAgents(TestAgentsDbBase):
     scenarios = [
         ('Get all agents', dict(agents=5, down_agents=2,
@@ -146,3 +146,20 @@ class TestStatusBarriers(testlib_api.SqlTestCase):
         pb.add_provisioning_component(self.ctx, net.id, 'NETWORK', 'ent')
         pb.provisioning_complete(self.ctx, net.id, 'NETWORK', 'ent')
         self.assertTrue(provisioned.called)
+
+    def test_provisioning_complete_bulk(self):
+        port2 = self._make_port()
+        port3 = self._make_port()
+        for port in (self.port, port2, port3):
+            pb.add_provisioning_component(self.ctx, port.id, resources.PORT,
+                                          'e1')
+        pb.add_provisioning_component(self.ctx, port3.id, resources.PORT,
+                                      'e2')
+        pb.provisioning_complete_bulk(
+            self.ctx, [self.port.id, port2.id, port3.id, 'someid'],
+            resources.PORT, 'e1')
+        self.assertEqual(
+            {self.port.id, port2.id},
+            {c[1]['object_id'] for c in self.provisioned.call_args_list})
+        self.assertTrue(pb.is_object_blocked(self.ctx, port3.id,
+                                             resources.PORT))
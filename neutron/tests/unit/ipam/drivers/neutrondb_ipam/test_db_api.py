@@ -13,10 +13,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import mock
+import netaddr
 from neutron_lib import context
+from oslo_db import exception as db_exc
 from oslo_utils import uuidutils
 
 from neutron.ipam.drivers.neutrondb_ipam import db_api
+from neutron.ipam.drivers.neutrondb_ipam import db_models
 from neutron.objects import ipam as ipam_obj
 from neutron.tests.unit import testlib_api
 
@@ -112,3 +116,84 @@ class TestIpamSubnetManager(testlib_api.SqlTestCase):
         alloc_exists = ipam_obj.IpamAllocation.objects_exist(
             self.ctx, ipam_subnet_id=self.ipam_subnet_id)
         self.assertFalse(alloc_exists)
+
+    def _get_free_ranges(self):
+        model = db_models.IpamFreeRange
+        ranges = self.ctx.session.query(model.first_ip, model.last_ip).filter(
+            model.ipam_subnet_id == self.ipam_subnet_id,
+            model.first_ip != db_api._INDEX_BUILT_KEY).order_by(
+                model.first_ip)
+        return [(str(netaddr.IPAddress(int(first, 16))),
+                 str(netaddr.IPAddress(int(last, 16))))
+                for first, last in ranges]
+
+    def _rebuild_free_ranges(self, allocated=()):
+        for ip_address in allocated:
+            self.subnet_manager.create_allocation(self.ctx, ip_address)
+        self.subnet_manager.rebuild_free_ranges(
+            self.ctx, [netaddr.IPRange(*pool) for pool in self.multi_pool])
+
+    def test_rebuild_free_ranges(self):
+        self._rebuild_free_ranges(allocated=['1.2.3.5', '1.2.3.15'])
+        self.assertEqual([('1.2.3.2', '1.2.3.4'), ('1.2.3.6', '1.2.3.12'),
+                          ('1.2.3.16', '1.2.3.24')], self._get_free_ranges())
+        self.assertEqual((int(netaddr.IPAddress('1.2.3.2')),
+                          int(netaddr.IPAddress('1.2.3.4'))),
+                         self.subnet_manager.get_first_free_range(self.ctx))
+
+    def test_get_first_free_range_not_built(self):
+        self.assertIsNone(self.subnet_manager.get_first_free_range(self.ctx))
+
+    def test_get_first_free_range_exhausted(self):
+        self.multi_pool = (('1.2.3.2', '1.2.3.2'),)
+        self._rebuild_free_ranges(allocated=['1.2.3.2'])
+        self.assertEqual((),
+                         self.subnet_manager.get_first_free_range(self.ctx))
+
+    def test_remove_from_free_ranges(self):
+        self._rebuild_free_ranges()
+        for ip_address in ('1.2.3.2', '1.2.3.12', '1.2.3.20'):
+            self.assertTrue(self.subnet_manager.remove_from_free_ranges(
+                self.ctx, ip_address))
+        self.assertFalse(self.subnet_manager.remove_from_free_ranges(
+            self.ctx, '1.2.3.13'))
+        self.assertEqual([('1.2.3.3', '1.2.3.11'), ('1.2.3.15', '1.2.3.19'),
+                          ('1.2.3.21', '1.2.3.24')], self._get_free_ranges())
+
+    def test_remove_from_free_ranges_single_address_range(self):
+        self.multi_pool = (('1.2.3.2', '1.2.3.2'),)
+        self._rebuild_free_ranges()
+        self.assertTrue(self.subnet_manager.remove_from_free_ranges(
+            self.ctx, '1.2.3.2'))
+        self.assertEqual([], self._get_free_ranges())
+
+    def test_remove_from_free_ranges_concurrent_update(self):
+        self._rebuild_free_ranges()
+        with mock.patch.object(self.subnet_manager, '_get_free_range_with_ip',
+                               return_value=('stale', 'stale')):
+            self.assertRaises(db_exc.RetryRequest,
+                              self.subnet_manager.remove_from_free_ranges,
+                              self.ctx, '1.2.3.2')
+
+    def test_add_to_free_ranges(self):
+        self._rebuild_free_ranges(
+            allocated=['1.2.3.2', '1.2.3.3', '1.2.3.4', '1.2.3.7', '1.2.3.8',
+                       '1.2.3.9'])
+        self.assertEqual([('1.2.3.5', '1.2.3.6'), ('1.2.3.10', '1.2.3.12'),
+                          ('1.2.3.15', '1.2.3.24')], self._get_free_ranges())
+        # no adjacent range
+        self.subnet_manager.add_to_free_ranges(self.ctx, '1.2.3.3')
+        # adjacent ranges on both sides
+        self.subnet_manager.add_to_free_ranges(self.ctx, '1.2.3.4')
+        # adjacent range on the right
+        self.subnet_manager.add_to_free_ranges(self.ctx, '1.2.3.9')
+        # adjacent range on the left
+        self.subnet_manager.add_to_free_ranges(self.ctx, '1.2.3.7')
+        self.assertEqual([('1.2.3.3', '1.2.3.7'), ('1.2.3.9', '1.2.3.12'),
+                          ('1.2.3.15', '1.2.3.24')], self._get_free_ranges())
+
+    def test_add_to_free_ranges_already_free(self):
+        self._rebuild_free_ranges()
+        self.subnet_manager.add_to_free_ranges(self.ctx, '1.2.3.4')
+        self.assertEqual([('1.2.3.2', '1.2.3.12'), ('1.2.3.15', '1.2.3.24')],
+                         self._get_free_ranges())
@@ -22,6 +22,7 @@ from neutron_lib.plugins import directory
 from oslo_utils import uuidutils
 
 from neutron.common import constants as n_const
+from neutron.ipam.drivers.neutrondb_ipam import db_models
 from neutron.ipam.drivers.neutrondb_ipam import driver
 from neutron.ipam import exceptions as ipam_exc
 from neutron.ipam import requests as ipam_req
@@ -435,3 +436,90 @@ class TestNeutronDbIpamSubnet(testlib_api.SqlTestCase,
         pools = [netaddr.IPRange('192.168.10.20', '192.168.10.41'),
                  netaddr.IPRange('192.168.10.50', '192.168.10.60')]
         self.assertTrue(self._test__no_pool_changes(pools))
+
+
+class TestNeutronDbIpamRangeSubnet(TestNeutronDbIpamSubnet):
+    """Test case for the free range indexed flavour of the IPAM subnet."""
+
+    def setUp(self):
+        super(TestNeutronDbIpamRangeSubnet, self).setUp()
+        self.ipam_pool = driver.NeutronDbRangePool(None, self.ctx)
+
+    def _allocate_all(self, ipam_subnet):
+        allocated = []
+        while True:
+            try:
+                allocated.append(ipam_subnet.allocate(
+                    ipam_req.PreferNextAddressRequest()))
+            except ipam_exc.IpAddressGenerationFailure:
+                return allocated
+
+    def test_allocate_next_address_does_not_list_allocations(self):
+        ipam_subnet = self._create_and_allocate_ipam_subnet('10.0.0.0/24')[0]
+        self.assertIsInstance(ipam_subnet, driver.NeutronDbRangeSubnet)
+        with mock.patch.object(ipam_subnet.subnet_manager,
+                               'list_allocations') as list_allocations:
+            self.assertEqual('10.0.0.2', ipam_subnet.allocate(
+                ipam_req.PreferNextAddressRequest()))
+            self.assertEqual('10.0.0.3', ipam_subnet.allocate(
+                ipam_req.PreferNextAddressRequest()))
+        self.assertFalse(list_allocations.called)
+
+    def test_allocate_specific_address_removed_from_free_ranges(self):
+        ipam_subnet = self._create_and_allocate_ipam_subnet(
+            '192.168.0.0/29')[0]
+        ipam_subnet.allocate(ipam_req.SpecificAddressRequest('192.168.0.3'))
+        self.assertEqual(['192.168.0.2', '192.168.0.4', '192.168.0.5',
+                          '192.168.0.6'], self._allocate_all(ipam_subnet))
+
+    def test_deallocated_address_is_reused(self):
+        ipam_subnet = self._create_and_allocate_ipam_subnet(
+            '192.168.0.0/29')[0]
+        allocated = self._allocate_all(ipam_subnet)
+        self.assertEqual(5, len(allocated))
+        ipam_subnet.deallocate('192.168.0.4')
+        self.assertEqual('192.168.0.4', ipam_subnet.allocate(
+            ipam_req.AnyAddressRequest))
+
+    def test_generate_ip_rebuilds_empty_index(self):
+        ipam_subnet = self._create_and_allocate_ipam_subnet(
+            '192.168.0.0/29')[0]
+        # Simulate a subnet created by the reference driver
+        with self.ctx.session.begin(subtransactions=True):
+            self.ctx.session.query(db_models.IpamFreeRange).delete()
+        ipam_subnet.subnet_manager.create_allocation(self.ctx, '192.168.0.2')
+        with mock.patch.object(
+                ipam_subnet.subnet_manager, 'rebuild_free_ranges',
+                wraps=ipam_subnet.subnet_manager.rebuild_free_ranges) as rb:
+            ip_address, _ = ipam_subnet._generate_ip(self.ctx,
+                                                     prefer_next=True)
+        self.assertEqual(1, rb.call_count)
+        self.assertEqual('192.168.0.3', ip_address)
+
+    def test_generate_ip_exhausted_subnet_does_not_rebuild_index(self):
+        ipam_subnet = self._create_and_allocate_ipam_subnet(
+            '192.168.0.0/29')[0]
+        self._allocate_all(ipam_subnet)
+        with mock.patch.object(ipam_subnet.subnet_manager,
+                               'rebuild_free_ranges') as rb:
+            self.assertRaises(ipam_exc.IpAddressGenerationFailure,
+                              ipam_subnet._generate_ip, self.ctx)
+        self.assertFalse(rb.called)
+
+    def test_generate_ip_skips_stale_free_addresses(self):
+        ipam_subnet = self._create_and_allocate_ipam_subnet(
+            '192.168.0.0/29')[0]
+        # Allocation done behind the back of the index
+        ipam_subnet.subnet_manager.create_allocation(self.ctx, '192.168.0.2')
+        ip_address, _ = ipam_subnet._generate_ip(self.ctx, prefer_next=True)
+        self.assertEqual('192.168.0.3', ip_address)
+
+    def test_update_allocation_pools_rebuilds_free_ranges(self):
+        cidr = '10.0.0.0/24'
+        ipam_subnet = self._create_and_allocate_ipam_subnet(cidr)[0]
+        ipam_subnet.allocate(ipam_req.SpecificAddressRequest('10.0.0.100'))
+        ipam_subnet.update_allocation_pools(
+            [netaddr.IPRange('10.0.0.100', '10.0.0.102')],
+            netaddr.IPNetwork(cidr))
+        self.assertEqual(['10.0.0.101', '10.0.0.102'],
+                         self._allocate_all(ipam_subnet))
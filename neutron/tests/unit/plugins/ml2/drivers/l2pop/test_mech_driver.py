@@ -23,6 +23,7 @@ from neutron_lib import context
 from neutron_lib import exceptions
 from neutron_lib.plugins import constants as plugin_constants
 from neutron_lib.plugins import directory
+from oslo_config import cfg
 from oslo_serialization import jsonutils
 import testtools
 
@@ -69,6 +70,7 @@ class TestL2PopulationRpcTestCase(test_plugin.Ml2PluginV2TestCase):
 
     def setUp(self):
         super(TestL2PopulationRpcTestCase, self).setUp()
+        cfg.CONF.set_override('notification_batch_interval', 0, 'l2pop')
 
         self.adminContext = context.get_admin_context()
 
@@ -476,6 +478,48 @@ class TestL2PopulationRpcTestCase(test_plugin.Ml2PluginV2TestCase):
                     self.mock_fanout.assert_called_with(
                         mock.ANY, 'add_fdb_entries', expected)
 
+    def test_fdb_add_and_remove_called_with_update_device_list(self):
+        self._register_ml2_agents()
+
+        with self.subnet(network=self._network) as subnet:
+            host_arg = {portbindings.HOST_ID: HOST}
+            with self.port(subnet=subnet,
+                           device_owner=DEVICE_OWNER_COMPUTE,
+                           arg_list=(portbindings.HOST_ID,),
+                           **host_arg) as port1:
+                with self.port(subnet=subnet,
+                               arg_list=(portbindings.HOST_ID,),
+                               **host_arg):
+                    p1 = port1['port']
+                    device = 'tap' + p1['id']
+
+                    self.mock_fanout.reset_mock()
+                    res = self.callbacks.update_device_list(
+                        self.adminContext, agent_id=HOST, host=HOST,
+                        devices_up=[device])
+                    self.assertEqual([device], res['devices_up'])
+
+                    p1_ips = [p['ip_address'] for p in p1['fixed_ips']]
+                    expected = {p1['network_id']:
+                                {'ports':
+                                 {'20.0.0.1': [constants.FLOODING_ENTRY,
+                                               l2pop_rpc.PortInfo(
+                                                   p1['mac_address'],
+                                                   p1_ips[0])]},
+                                 'network_type': 'vxlan',
+                                 'segment_id': 1}}
+                    self.mock_fanout.assert_called_with(
+                        mock.ANY, 'add_fdb_entries', expected)
+
+                    self.mock_fanout.reset_mock()
+                    res = self.callbacks.update_device_list(
+                        self.adminContext, agent_id=HOST, host=HOST,
+                        devices_down=[device])
+                    self.assertEqual([{'device': device, 'exists': True}],
+                                     res['devices_down'])
+                    self.mock_fanout.assert_called_with(
+                        mock.ANY, 'remove_fdb_entries', expected)
+
     def test_fdb_add_not_called_type_local(self):
         self._register_ml2_agents()
 
@@ -633,6 +677,51 @@ class TestL2PopulationRpcTestCase(test_plugin.Ml2PluginV2TestCase):
                     self.mock_fanout.assert_called_with(
                         mock.ANY, 'add_fdb_entries', expected2)
 
+    def test_fdb_sent_once_per_network_while_agent_boots(self):
+        self._register_ml2_agents()
+
+        with self.subnet(network=self._network) as subnet:
+            host_arg = {portbindings.HOST_ID: HOST_2}
+            with self.port(subnet=subnet,
+                           device_owner=DEVICE_OWNER_COMPUTE,
+                           arg_list=(portbindings.HOST_ID,),
+                           **host_arg) as port1:
+                host_arg = {portbindings.HOST_ID: HOST}
+                with self.port(subnet=subnet,
+                               device_owner=DEVICE_OWNER_COMPUTE,
+                               arg_list=(portbindings.HOST_ID,),
+                               **host_arg) as port2,\
+                        self.port(subnet=subnet,
+                                  device_owner=DEVICE_OWNER_COMPUTE,
+                                  arg_list=(portbindings.HOST_ID,),
+                                  **host_arg) as port3:
+                    self.callbacks.update_device_up(
+                        self.adminContext, agent_id=HOST_2,
+                        device='tap' + port1['port']['id'])
+                    self.mock_cast.reset_mock()
+                    self.mock_fanout.reset_mock()
+                    with mock.patch.object(l2pop_db, 'get_agent_uptime',
+                                           return_value=10):
+                        for port in (port2, port3):
+                            self.callbacks.update_device_up(
+                                self.adminContext, agent_id=HOST,
+                                device='tap' + port['port']['id'])
+
+                    self.mock_cast.assert_called_once_with(
+                        mock.ANY, 'add_fdb_entries', mock.ANY, HOST)
+                    # the other agents still learn about both ports
+                    self.assertEqual(2, self.mock_fanout.call_count)
+                    fdb_ports = [
+                        c[0][2][port['port']['network_id']]['ports'][
+                            '20.0.0.1']
+                        for c, port in zip(self.mock_fanout.call_args_list,
+                                           (port2, port3))]
+                    self.assertIn(constants.FLOODING_ENTRY, fdb_ports[0])
+                    self.assertEqual([l2pop_rpc.PortInfo(
+                        port3['port']['mac_address'],
+                        port3['port']['fixed_ips'][0]['ip_address'])],
+                        fdb_ports[1])
+
     def test_fdb_add_called_two_networks(self):
         self._register_ml2_agents()
 
@@ -1359,3 +1448,77 @@ class TestL2PopulationMechDriver(base.BaseTestCase):
         mech_driver = l2pop_mech_driver.L2populationMechanismDriver()
         with testtools.ExpectedException(exceptions.InvalidInput):
             mech_driver.update_port_precommit(ctx)
+
+
+class TestL2populationAgentNotifyAPI(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestL2populationAgentNotifyAPI, self).setUp()
+        self.notifier = l2pop_rpc.L2populationAgentNotifyAPI()
+        self.mock_fanout = mock.patch.object(
+            self.notifier, '_notification_fanout').start()
+        self.mock_cast = mock.patch.object(
+            self.notifier, '_notification_host').start()
+        self.spawn_after = mock.patch.object(l2pop_rpc.eventlet,
+                                             'spawn_after').start()
+
+    @staticmethod
+    def _fdb_entries(agent_ip, mac, ip, network_id='net1', segment_id=1):
+        return {network_id: {
+            'segment_id': segment_id, 'network_type': 'vxlan',
+            'ports': {agent_ip: [constants.FLOODING_ENTRY,
+                                 l2pop_rpc.PortInfo(mac, ip)]}}}
+
+    def _flush(self):
+        self.spawn_after.assert_called_once_with(
+            cfg.CONF.l2pop.notification_batch_interval, mock.ANY)
+        self.spawn_after.call_args[0][1]()
+
+    def test_consecutive_notifications_merged(self):
+        first = self._fdb_entries('20.0.0.1', 'mac1', '10.0.0.1')
+        self.notifier.add_fdb_entries('ctx', first)
+        self.notifier.add_fdb_entries(
+            'ctx', self._fdb_entries('20.0.0.1', 'mac2', '10.0.0.2'))
+        self.notifier.add_fdb_entries(
+            'ctx', self._fdb_entries('20.0.0.2', 'mac3', '10.0.0.3'))
+        self.assertFalse(self.mock_fanout.called)
+        self._flush()
+
+        expected = {'net1': {'segment_id': 1, 'network_type': 'vxlan',
+                             'ports': {'20.0.0.1': [
+                                 constants.FLOODING_ENTRY,
+                                 l2pop_rpc.PortInfo('mac1', '10.0.0.1'),
+                                 l2pop_rpc.PortInfo('mac2', '10.0.0.2')],
+                                 '20.0.0.2': [
+                                 constants.FLOODING_ENTRY,
+                                 l2pop_rpc.PortInfo('mac3', '10.0.0.3')]}}}
+        self.mock_fanout.assert_called_once_with('ctx', 'add_fdb_entries',
+                                                 expected)
+        self.assertEqual(2, len(first['net1']['ports']['20.0.0.1']))
+
+    def test_notifications_kept_in_order(self):
+        add = self._fdb_entries('20.0.0.1', 'mac1', '10.0.0.1')
+        remove = self._fdb_entries('20.0.0.1', 'mac2', '10.0.0.2')
+        other_segment = self._fdb_entries('20.0.0.1', 'mac3', '10.0.0.3',
+                                          segment_id=2)
+        self.notifier.add_fdb_entries('ctx', add)
+        self.notifier.add_fdb_entries('ctx', add, 'host1')
+        self.notifier.remove_fdb_entries('ctx', remove)
+        self.notifier.remove_fdb_entries('ctx', other_segment)
+        self._flush()
+
+        self.assertEqual([mock.call('ctx', 'add_fdb_entries', add),
+                          mock.call('ctx', 'remove_fdb_entries', remove),
+                          mock.call('ctx', 'remove_fdb_entries',
+                                    other_segment)],
+                         self.mock_fanout.call_args_list)
+        self.mock_cast.assert_called_once_with('ctx', 'add_fdb_entries',
+                                               add, 'host1')
+
+    def test_notifications_sent_at_once_without_interval(self):
+        cfg.CONF.set_override('notification_batch_interval', 0, 'l2pop')
+        fdb_entries = self._fdb_entries('20.0.0.1', 'mac1', '10.0.0.1')
+        self.notifier.remove_fdb_entries('ctx', fdb_entries)
+        self.mock_fanout.assert_called_once_with('ctx', 'remove_fdb_entries',
+                                                 fdb_entries)
+        self.assertFalse(self.spawn_after.called)
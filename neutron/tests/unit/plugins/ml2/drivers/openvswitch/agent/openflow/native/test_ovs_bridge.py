@@ -13,7 +13,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import itertools
+
+import eventlet
 import mock
+from oslo_utils import importutils
 
 from neutron.agent.common import ovs_lib
 from neutron.plugins.ml2.drivers.openvswitch.agent.openflow.native \
@@ -49,3 +53,101 @@ class OVSAgentBridgeTestCase(ovs_test_base.OVSRyuTestBase):
         # make sure that in case of any misconfiguration when no datapath is
         # found a proper exception, not a TypeError is raised
         self.assertRaises(RuntimeError, br._get_dp)
+
+
+class OVSAgentBridgeBundleTestCase(ovs_test_base.OVSRyuTestBase):
+    def setUp(self):
+        super(OVSAgentBridgeBundleTestCase, self).setUp()
+        self.br = self.br_int_cls('br-int')
+        self.dp = mock.Mock()
+        self.ofp = importutils.import_module('ryu.ofproto.ofproto_v1_3')
+        self.ofpp = importutils.import_module(
+            'ryu.ofproto.ofproto_v1_3_parser')
+        mock.patch.object(self.br, '_get_dp', autospec=True,
+                          return_value=(self.dp, self.ofp, self.ofpp)).start()
+        self.send_msg = mock.patch.object(self.br, '_send_msg').start()
+        mock.patch.object(ofswitch.OpenFlowSwitchMixin, '_bundle_ids',
+                          itertools.count(7)).start()
+        self.flags = self.ofp.ONF_BF_ATOMIC | self.ofp.ONF_BF_ORDERED
+
+    def _flow_mod(self, in_port):
+        return self.ofpp.OFPFlowMod(self.dp,
+                                    cookie=self.br.default_cookie,
+                                    instructions=[],
+                                    match=self.ofpp.OFPMatch(in_port=in_port),
+                                    priority=2,
+                                    table_id=0)
+
+    def _bundle_ctrl(self, type_):
+        return mock.call(
+            self.ofpp.ONFBundleCtrlMsg(self.dp, 7, type_, self.flags, []),
+            reply_cls=self.ofpp.ONFBundleCtrlMsg)
+
+    def _bundle_add(self, in_port):
+        return mock.call(self.ofpp.ONFBundleAddMsg(
+            self.dp, 7, self.flags, self._flow_mod(in_port), []))
+
+    def test_commit_bundle(self):
+        self.br.start_bundle()
+        self.br.drop_port(in_port=1)
+        self.br.drop_port(in_port=2)
+        self.send_msg.assert_not_called()
+
+        count, _elapsed = self.br.commit_bundle()
+        self.assertEqual(2, count)
+        self.assertEqual([
+            self._bundle_ctrl(self.ofp.ONF_BCT_OPEN_REQUEST),
+            self._bundle_ctrl(self.ofp.ONF_BCT_COMMIT_REQUEST),
+        ], self.send_msg.mock_calls)
+        # the adds are not waited for, the commit request is
+        self.assertEqual([self._bundle_add(1), self._bundle_add(2)],
+                         self.dp.send_msg.mock_calls)
+
+        # the flow mods are sent right away once the bundle is committed
+        self.send_msg.reset_mock()
+        self.br.drop_port(in_port=3)
+        self.send_msg.assert_called_once_with(self._flow_mod(3))
+
+    def test_commit_bundle_error(self):
+        self.send_msg.side_effect = [None, RuntimeError, None]
+        self.br.start_bundle()
+        self.br.drop_port(in_port=1)
+        self.br.drop_port(in_port=2)
+        self.assertRaises(RuntimeError, self.br.commit_bundle)
+        self.assertEqual([
+            self._bundle_ctrl(self.ofp.ONF_BCT_OPEN_REQUEST),
+            self._bundle_ctrl(self.ofp.ONF_BCT_COMMIT_REQUEST),
+            self._bundle_ctrl(self.ofp.ONF_BCT_DISCARD_REQUEST),
+        ], self.send_msg.mock_calls)
+
+    def test_commit_bundle_connection_closed(self):
+        self.dp.send_msg.return_value = False
+        self.br.start_bundle()
+        self.br.drop_port(in_port=1)
+        self.assertRaises(RuntimeError, self.br.commit_bundle)
+        self.assertEqual([
+            self._bundle_ctrl(self.ofp.ONF_BCT_OPEN_REQUEST),
+            self._bundle_ctrl(self.ofp.ONF_BCT_DISCARD_REQUEST),
+        ], self.send_msg.mock_calls)
+
+    def test_commit_empty_bundle(self):
+        self.br.start_bundle()
+        self.assertEqual((0, 0), self.br.commit_bundle())
+        self.send_msg.assert_not_called()
+
+    def test_discard_bundle(self):
+        self.br.start_bundle()
+        self.br.drop_port(in_port=1)
+        self.br.discard_bundle()
+        self.send_msg.assert_not_called()
+        self.br.drop_port(in_port=2)
+        self.send_msg.assert_called_once_with(self._flow_mod(2))
+
+    def test_bundle_other_greenthread_flow_mods(self):
+        self.br.start_bundle()
+        self.br.drop_port(in_port=1)
+        eventlet.spawn(self.br.drop_port, in_port=2).wait()
+        # the flow mods of other greenthreads are not part of the bundle
+        self.send_msg.assert_called_once_with(self._flow_mod(2))
+        self.br.discard_bundle()
+        self.send_msg.assert_called_once_with(self._flow_mod(2))
@@ -26,8 +26,8 @@ import testtools
 from neutron._i18n import _
 from neutron.agent.common import ovs_lib
 from neutron.agent.common import utils
-from neutron.agent.linux import async_process
 from neutron.agent.linux import ip_lib
+from neutron.agent.linux import ovsdb_monitor
 from neutron.common import rpc as n_rpc
 from neutron.plugins.ml2.drivers.l2pop import rpc as l2pop_rpc
 from neutron.plugins.ml2.drivers.openvswitch.agent.common import constants
@@ -1067,6 +1067,87 @@ class TestOvsNeutronAgent(object):
     def test_process_network_port_with_empty_port(self):
         self._test_process_network_ports({})
 
+    def _mock_bundle_bridges(self):
+        bridges = mock.Mock()
+        for name in ('int_br', 'tun_br', 'phys_br'):
+            getattr(bridges, name).commit_bundle.return_value = (0, 0)
+        mock.patch.object(self.agent, 'int_br', bridges.int_br).start()
+        mock.patch.object(self.agent, 'tun_br', bridges.tun_br).start()
+        mock.patch.object(self.agent, 'phys_brs',
+                          {'physnet1': bridges.phys_br}).start()
+        self.agent.enable_tunneling = True
+        return bridges
+
+    def test_process_network_ports_bundles(self):
+        cfg.CONF.set_override('use_openflow_bundles', True, group='OVS')
+        bridges = self._mock_bundle_bridges()
+        bridges.int_br.commit_bundle.return_value = (3, 0.5)
+        port_info = {'current': {'tap0'}, 'added': {'tap0'}}
+
+        def _setup_port_filters(added, updated):
+            # the flows are sent while the bundles are started
+            for br in (bridges.int_br, bridges.tun_br, bridges.phys_br):
+                br.start_bundle.assert_called_once_with()
+                br.commit_bundle.assert_not_called()
+
+        def _bind_devices(need_binding_devices):
+            # the ports are reported up once their flows are committed
+            for br in (bridges.int_br, bridges.tun_br, bridges.phys_br):
+                br.commit_bundle.assert_called_once_with()
+            return set()
+
+        with mock.patch.object(self.agent, 'treat_devices_added_or_updated',
+                               return_value=([], ['tap0'], set())),\
+                mock.patch.object(self.agent, '_add_port_tag_info'),\
+                mock.patch.object(self.agent.sg_agent, 'setup_port_filters',
+                                  side_effect=_setup_port_filters),\
+                mock.patch.object(self.agent, '_bind_devices',
+                                  side_effect=_bind_devices) as bind,\
+                mock.patch.object(ovs_agent.LOG, 'info') as log_info:
+            self.assertEqual({'added': set(), 'removed': set()},
+                             self.agent.process_network_ports(port_info,
+                                                              False))
+        bind.assert_called_once_with(['tap0'])
+        self.assertEqual(3, log_info.call_args[0][1]['flow_mods'])
+
+    def test_treat_devices_removed_bundles(self):
+        cfg.CONF.set_override('use_openflow_bundles', True, group='OVS')
+        bridges = self._mock_bundle_bridges()
+
+        def _update_device_list(*args):
+            # the ports are reported down once their flows are committed
+            bridges.int_br.commit_bundle.assert_called_once_with()
+            return {'failed_devices_down': []}
+
+        with mock.patch.object(self.agent.sg_agent, 'remove_devices_filter'),\
+                mock.patch.object(self.agent.plugin_rpc, 'update_device_list',
+                                  side_effect=_update_device_list) as update,\
+                mock.patch.object(self.agent, 'port_unbound'):
+            self.agent.treat_devices_removed(['tap0'])
+        self.assertTrue(update.called)
+
+    def test_process_network_ports_bundles_discarded_on_error(self):
+        cfg.CONF.set_override('use_openflow_bundles', True, group='OVS')
+        bridges = self._mock_bundle_bridges()
+        with mock.patch.object(self.agent, 'treat_devices_added_or_updated',
+                               side_effect=RuntimeError):
+            self.assertRaises(RuntimeError,
+                              self.agent.process_network_ports,
+                              {'current': set(), 'added': {'tap0'}}, False)
+        for br in (bridges.int_br, bridges.tun_br, bridges.phys_br):
+            br.commit_bundle.assert_not_called()
+            br.discard_bundle.assert_called_once_with()
+
+    def test_process_network_ports_no_bundles(self):
+        bridges = self._mock_bundle_bridges()
+        with mock.patch.object(self.agent, '_add_port_tag_info'),\
+                mock.patch.object(self.agent.sg_agent, 'setup_port_filters'),\
+                mock.patch.object(self.agent, '_bind_devices',
+                                  return_value=set()):
+            self.agent.process_network_ports({'current': set()}, False)
+        bridges.int_br.start_bundle.assert_not_called()
+        bridges.int_br.commit_bundle.assert_not_called()
+
     def test_hybrid_plug_flag_based_on_firewall(self):
         cfg.CONF.set_default(
             'firewall_driver',
@@ -1889,11 +1970,12 @@ class TestOvsNeutronAgent(object):
 
         self.agent.enable_tunneling = True
 
-        with mock.patch.object(async_process.AsyncProcess, "_spawn"),\
-                mock.patch.object(async_process.AsyncProcess, "start"),\
-                mock.patch.object(async_process.AsyncProcess,
+        with mock.patch.object(ovsdb_monitor.SimpleInterfaceIdlMonitor,
+                               "start"),\
+                mock.patch.object(ovsdb_monitor.SimpleInterfaceIdlMonitor,
                                   "is_active", return_value=True),\
-                mock.patch.object(async_process.AsyncProcess, "stop"),\
+                mock.patch.object(ovsdb_monitor.SimpleInterfaceIdlMonitor,
+                                  "stop"),\
                 mock.patch.object(log.KeywordArgumentAdapter,
                                   'exception') as log_exception,\
                 mock.patch.object(self.mod_agent.OVSNeutronAgent,
@@ -1973,11 +2055,12 @@ class TestOvsNeutronAgent(object):
                               constants.OVS_RESTARTED)
 
     def test_rpc_loop_fail_to_process_network_ports_keep_flows(self):
-        with mock.patch.object(async_process.AsyncProcess, "_spawn"),\
-                mock.patch.object(async_process.AsyncProcess, "start"),\
-                mock.patch.object(async_process.AsyncProcess,
+        with mock.patch.object(ovsdb_monitor.SimpleInterfaceIdlMonitor,
+                               "start"),\
+                mock.patch.object(ovsdb_monitor.SimpleInterfaceIdlMonitor,
                                   "is_active", return_value=True),\
-                mock.patch.object(async_process.AsyncProcess, "stop"),\
+                mock.patch.object(ovsdb_monitor.SimpleInterfaceIdlMonitor,
+                                  "stop"),\
                 mock.patch.object(
                     self.mod_agent.OVSNeutronAgent,
                     'process_network_ports') as process_network_ports,\
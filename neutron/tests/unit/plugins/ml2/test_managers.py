@@ -125,3 +125,30 @@ class TestMechManager(base.BaseTestCase):
 
     def test_port_precommit(self):
         self._check_resource('port')
+
+    def test_create_port_postcommit_bulk(self):
+        contexts = [mock.Mock(), mock.Mock()]
+        with mock.patch.object(mechanism_test.TestMechanismDriver,
+                               'create_port_postcommit') as postcommit:
+            self._manager.create_port_postcommit_bulk(contexts)
+        postcommit.assert_has_calls([mock.call(contexts[0]),
+                                     mock.call(contexts[1])])
+
+    def test_create_port_postcommit_bulk_driver_bulk_method(self):
+        contexts = [mock.Mock(), mock.Mock()]
+        with mock.patch.object(mechanism_test.TestMechanismDriver,
+                               'create_port_postcommit') as postcommit,\
+                mock.patch.object(mechanism_test.TestMechanismDriver,
+                                  'create_port_postcommit_bulk',
+                                  create=True) as bulk_postcommit:
+            self._manager.create_port_postcommit_bulk(contexts)
+        bulk_postcommit.assert_called_once_with(contexts)
+        self.assertFalse(postcommit.called)
+
+    def test_create_port_postcommit_bulk_failure(self):
+        with mock.patch.object(mechanism_test.TestMechanismDriver,
+                               'create_port_postcommit',
+                               side_effect=RuntimeError()):
+            self.assertRaises(ml2_exc.MechanismDriverError,
+                              self._manager.create_port_postcommit_bulk,
+                              [mock.Mock()])
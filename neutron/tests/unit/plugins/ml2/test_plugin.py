@@ -971,18 +971,101 @@ class TestMl2PortsV2(test_plugin.TestPortsV2, Ml2PluginV2TestCase):
         with self.network() as net:
             plugin = directory.get_plugin()
 
-            with mock.patch.object(plugin, '_bind_port_if_needed',
+            with mock.patch.object(plugin, '_bind_ports_if_needed',
                 side_effect=ml2_exc.MechanismDriverError(
-                    method='create_port_bulk')) as _bind_port_if_needed:
+                    method='create_port_bulk')) as _bind_ports_if_needed:
 
                 res = self._create_port_bulk(self.fmt, 2, net['network']['id'],
                                              'test', True, context=ctx)
 
-                self.assertTrue(_bind_port_if_needed.called)
+                self.assertTrue(_bind_ports_if_needed.called)
                 # We expect a 500 as we injected a fault in the plugin
                 self._validate_behavior_on_bulk_failure(
                     res, 'ports', webob.exc.HTTPServerError.code)
 
+    def test_create_ports_bulk_postcommit_failure(self):
+        ctx = context.get_admin_context()
+        with self.network() as net:
+            plugin = directory.get_plugin()
+
+            with mock.patch.object(plugin.mechanism_manager,
+                                   'create_port_postcommit_bulk',
+                                   side_effect=ml2_exc.MechanismDriverError(
+                                       method='create_port_postcommit')):
+                res = self._create_port_bulk(self.fmt, 2, net['network']['id'],
+                                             'test', True, context=ctx)
+                self._validate_behavior_on_bulk_failure(
+                    res, 'ports', webob.exc.HTTPServerError.code)
+
+    def test_create_ports_bulk_binds_ports_in_one_transaction(self):
+        ctx = context.get_admin_context()
+        plugin = directory.get_plugin()
+        with self.network() as net,\
+                mock.patch.object(plugin, '_commit_port_binding') as commit,\
+                mock.patch.object(plugin, '_bind_port_if_needed') as bind:
+            host = {portbindings.HOST_ID: 'host-ovs-no_filter'}
+            res = self._create_port_bulk(self.fmt, 3, net['network']['id'],
+                                         'test', True, context=ctx,
+                                         override={0: host, 1: host, 2: host})
+            ports = self.deserialize(self.fmt, res)['ports']
+            self.assertEqual(3, len(ports))
+            self.assertFalse(commit.called)
+            self.assertFalse(bind.called)
+        for port in ports:
+            port = self._show('ports', port['id'])['port']
+            self.assertEqual(portbindings.VIF_TYPE_OVS,
+                             port[portbindings.VIF_TYPE])
+
+    def test_create_ports_bulk_failed_binding_retried(self):
+        ctx = context.get_admin_context()
+        plugin = directory.get_plugin()
+        with self.network() as net,\
+                mock.patch.object(plugin, '_bind_port_if_needed',
+                                  wraps=plugin._bind_port_if_needed) as bind:
+            override = {0: {portbindings.HOST_ID: 'host-ovs-no_filter'},
+                        1: {portbindings.HOST_ID: 'host-fail'}}
+            res = self._create_port_bulk(self.fmt, 2, net['network']['id'],
+                                         'test', True, context=ctx,
+                                         override=override)
+            ports = self.deserialize(self.fmt, res)['ports']
+            self.assertEqual(1, bind.call_count)
+            self.assertEqual(ports[1]['id'],
+                             bind.call_args[0][0].current['id'])
+        port = self._show('ports', ports[1]['id'])['port']
+        self.assertEqual(portbindings.VIF_TYPE_BINDING_FAILED,
+                         port[portbindings.VIF_TYPE])
+
+    def test_create_ports_bulk_binding_commit_db_error_retried(self):
+        ctx = context.get_admin_context()
+        plugin = directory.get_plugin()
+        commit_port_binding_db = plugin._commit_port_binding_db
+        calls = []
+
+        def commit_with_deadlock(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise db_exc.DBDeadlock()
+            return commit_port_binding_db(*args)
+
+        with self.network() as net,\
+                mock.patch.object(plugin, '_commit_port_binding_db',
+                                  side_effect=commit_with_deadlock),\
+                mock.patch.object(plugin, '_bind_port_if_needed',
+                                  side_effect=lambda context, tries_done:
+                                  context) as bind:
+            host = {portbindings.HOST_ID: 'host-ovs-no_filter'}
+            res = self._create_port_bulk(self.fmt, 2, net['network']['id'],
+                                         'test', True, context=ctx,
+                                         override={0: host, 1: host})
+            ports = self.deserialize(self.fmt, res)['ports']
+            # the whole transaction was aborted, every port is retried
+            self.assertEqual(
+                [port['id'] for port in ports],
+                [call[0][0].current['id'] for call in bind.call_args_list])
+            # the aborted attempt counts towards the tries of each port
+            self.assertEqual([1, 1], [call[1]['tries_done']
+                                      for call in bind.call_args_list])
+
     def test_create_ports_bulk_with_sec_grp(self):
         ctx = context.get_admin_context()
         plugin = directory.get_plugin()
@@ -1869,6 +1952,25 @@ class TestMl2PortBinding(Ml2PluginV2TestCase,
                         # Successful binding should only be attempted once.
                         self.assertEqual(1, at_mock.call_count)
 
+    def test__bind_port_if_needed_tries_done(self):
+        plugin, port_context, bound_context = (
+            self._create_port_and_bound_context(
+                portbindings.VIF_TYPE_UNBOUND,
+                portbindings.VIF_TYPE_BINDING_FAILED))
+        with mock.patch(
+                'neutron.plugins.ml2.plugin.Ml2Plugin._bind_port',
+                return_value=bound_context),\
+                mock.patch('neutron.plugins.ml2.plugin.Ml2Plugin._commit_'
+                           'port_binding',
+                           return_value=(bound_context, True, False)),\
+                mock.patch('neutron.plugins.ml2.plugin.Ml2Plugin.'
+                           '_attempt_binding',
+                           side_effect=plugin._attempt_binding) as at_mock:
+            plugin._bind_port_if_needed(port_context, tries_done=1)
+            # the attempt already made is counted towards MAX_BIND_TRIES
+            self.assertEqual(ml2_plugin.MAX_BIND_TRIES - 1,
+                             at_mock.call_count)
+
     def test_port_binding_profile_not_changed(self):
         profile = {'e': 5}
         profile_arg = {portbindings.PROFILE: profile}
@@ -2386,6 +2488,27 @@ class TestMl2HostsNetworkAccess(Ml2PluginV2TestCase):
             self.context, 'fake_id', self.dhcp_hosts)
         self.assertEqual(self.dhcp_hosts, observeds)
 
+    def test_filter_hosts_with_networks_access(self):
+        net_ids = []
+        for physnet in ('physnet1', 'physnet2'):
+            net = self.driver.create_network(
+                self.context,
+                {'network': {'name': 'net1',
+                             pnet.NETWORK_TYPE: 'vlan',
+                             pnet.PHYSICAL_NETWORK: physnet,
+                             pnet.SEGMENTATION_ID: 1,
+                             'tenant_id': 'tenant_one',
+                             'admin_state_up': True,
+                             'shared': True}})
+            net_ids.append(net['id'])
+        with mock.patch.object(self.driver, 'get_agents',
+                               wraps=self.driver.get_agents) as get_agents:
+            observeds = self.driver.filter_hosts_with_networks_access(
+                self.context, net_ids, self.dhcp_hosts)
+        self.assertEqual({net_ids[0]: {self.dhcp_agent1.host},
+                          net_ids[1]: {self.dhcp_agent2.host}}, observeds)
+        self.assertEqual(1, get_agents.call_count)
+
 
 class DHCPOptsTestCase(test_dhcpopts.TestExtraDhcpOpt):
 
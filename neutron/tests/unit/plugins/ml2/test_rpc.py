@@ -20,6 +20,7 @@ Unit Tests for ml2 rpc
 import collections
 
 import mock
+from neutron_lib.api.definitions import portbindings
 from neutron_lib.callbacks import resources
 from neutron_lib import constants
 from neutron_lib.plugins import constants as plugin_constants
@@ -263,7 +264,9 @@ class RpcCallbacksTestCase(base.BaseTestCase):
         with mock.patch.object(self.callbacks, 'update_device_up',
                                side_effect=devices_up_side_effect) as f_up, \
             mock.patch.object(self.callbacks, 'update_device_down',
-                              side_effect=devices_down_side_effect) as f_down:
+                              side_effect=devices_down_side_effect) as f_down,\
+            mock.patch.object(self.callbacks, '_get_devices_bound_to_host',
+                              return_value={}):
             res = self.callbacks.update_device_list(
                 'fake_context', devices_up=devices_up,
                 devices_down=devices_down, **kwargs)
@@ -313,6 +316,151 @@ class RpcCallbacksTestCase(base.BaseTestCase):
             'fake_context', devices_up=[], devices_down=[], **kwargs)
         self.assertEqual(expected, res)
 
+    def _mock_bound_ports(self, devices):
+        bound = {}
+        for device in devices:
+            port_db = mock.Mock(id='port-%s' % device,
+                                device_owner='compute:nova')
+            port_db.port_binding.host = 'fake_host'
+            bound[device] = port_db
+        return mock.patch.object(self.callbacks,
+                                 '_get_devices_bound_to_host',
+                                 return_value=bound)
+
+    def test_update_device_list_up_bulk(self):
+        kwargs = {'host': 'fake_host', 'agent_id': 'fake_agent_id'}
+        with self._mock_bound_ports([1, 2, 3]),\
+                mock.patch.object(self.callbacks, 'update_device_up') as f_up,\
+                mock.patch.object(self.callbacks,
+                                  '_notify_l2pop_ports_wiring',
+                                  return_value={'port-2'}) as l2pop,\
+                mock.patch.object(provisioning_blocks,
+                                  'provisioning_complete_bulk') as pc:
+            res = self.callbacks.update_device_list(
+                'fake_context', devices_up=[1, 2, 3], **kwargs)
+        self.assertFalse(f_up.called)
+        pc.assert_called_once_with('fake_context', mock.ANY, resources.PORT,
+                                   provisioning_blocks.L2_AGENT_ENTITY)
+        self.assertEqual({'port-1', 'port-2', 'port-3'},
+                         set(pc.call_args[0][1]))
+        self.assertEqual({'port-1', 'port-2', 'port-3'},
+                         set(l2pop.call_args[0][1]))
+        self.assertEqual([1, 3], res['devices_up'])
+        self.assertEqual([2], res['failed_devices_up'])
+
+    def test_update_device_list_up_bulk_provisioning_failure(self):
+        kwargs = {'host': 'fake_host', 'agent_id': 'fake_agent_id'}
+        with self._mock_bound_ports([1, 2]),\
+                mock.patch.object(self.callbacks,
+                                  '_notify_l2pop_ports_wiring') as l2pop,\
+                mock.patch.object(provisioning_blocks,
+                                  'provisioning_complete_bulk',
+                                  side_effect=Exception):
+            res = self.callbacks.update_device_list(
+                'fake_context', devices_up=[1, 2], **kwargs)
+        self.assertFalse(l2pop.called)
+        self.assertEqual([], res['devices_up'])
+        self.assertEqual([1, 2], res['failed_devices_up'])
+
+    def test_update_device_list_up_bulk_mixed_with_unbound(self):
+        kwargs = {'host': 'fake_host', 'agent_id': 'fake_agent_id'}
+        with self._mock_bound_ports([1]),\
+                mock.patch.object(self.callbacks, 'update_device_up',
+                                  side_effect=Exception) as f_up,\
+                mock.patch.object(self.callbacks,
+                                  '_notify_l2pop_ports_wiring',
+                                  return_value=set()),\
+                mock.patch.object(provisioning_blocks,
+                                  'provisioning_complete_bulk'):
+            res = self.callbacks.update_device_list(
+                'fake_context', devices_up=[1, 2], **kwargs)
+        f_up.assert_called_once_with('fake_context', device=2,
+                                     devices_up=[1, 2], **kwargs)
+        self.assertEqual([1], res['devices_up'])
+        self.assertEqual([2], res['failed_devices_up'])
+
+    def test_update_device_list_down_bulk(self):
+        kwargs = {'host': 'fake_host', 'agent_id': 'fake_agent_id'}
+        self.plugin.update_port_statuses.return_value = {
+            'port-1': 'port-1', 'port-2': None, 'port-3': 'port-3'}
+        with self._mock_bound_ports([1, 2, 3]),\
+                mock.patch.object(self.callbacks,
+                                  'update_device_down') as f_down,\
+                mock.patch.object(self.callbacks,
+                                  '_notify_l2pop_ports_wiring',
+                                  return_value={'port-3'}) as l2pop:
+            res = self.callbacks.update_device_list(
+                'fake_context', devices_down=[1, 2, 3], **kwargs)
+        self.assertFalse(f_down.called)
+        self.plugin.update_port_statuses.assert_called_once_with(
+            'fake_context',
+            {'port-1': constants.PORT_STATUS_DOWN,
+             'port-2': constants.PORT_STATUS_DOWN,
+             'port-3': constants.PORT_STATUS_DOWN},
+            'fake_host')
+        l2pop.assert_called_once_with('fake_context', mock.ANY,
+                                      constants.PORT_STATUS_DOWN, 'fake_host')
+        self.assertEqual({'port-1', 'port-3'}, set(l2pop.call_args[0][1]))
+        self.assertEqual([{'device': 1, 'exists': True},
+                          {'device': 2, 'exists': False}],
+                         res['devices_down'])
+        self.assertEqual([3], res['failed_devices_down'])
+
+    def test_update_device_list_down_bulk_failure_retries_per_device(self):
+        kwargs = {'host': 'fake_host', 'agent_id': 'fake_agent_id'}
+        self.plugin.update_port_statuses.side_effect = Exception
+        with self._mock_bound_ports([1, 2]),\
+                mock.patch.object(
+                    self.callbacks, 'update_device_down',
+                    side_effect=[{'device': 1, 'exists': True},
+                                 Exception]) as f_down:
+            res = self.callbacks.update_device_list(
+                'fake_context', devices_down=[1, 2], **kwargs)
+        self.assertEqual(2, f_down.call_count)
+        self.assertEqual([{'device': 1, 'exists': True}],
+                         res['devices_down'])
+        self.assertEqual([2], res['failed_devices_down'])
+
+    def test__get_devices_bound_to_host(self):
+        self.plugin._device_to_port_id.side_effect = lambda ctx, d: d
+        ports = {}
+        for port_id, owner, host in (
+                ('p1', 'compute:nova', 'fake_host'),
+                ('p2', 'compute:nova', 'other_host'),
+                ('p3', constants.DEVICE_OWNER_DVR_INTERFACE, 'fake_host')):
+            port_db = mock.Mock(id=port_id, device_owner=owner)
+            port_db.port_binding.host = host
+            ports[port_id] = port_db
+        with mock.patch.object(ml2_db, 'partial_port_ids_to_full_ids',
+                               return_value={'p1': 'p1', 'p2': 'p2',
+                                             'p3': 'p3'}),\
+                mock.patch.object(ml2_db, 'get_port_db_objects',
+                                  return_value=ports) as get_ports:
+            res = self.callbacks._get_devices_bound_to_host(
+                'fake_context', ['p1', 'p2', 'p3', 'p4'], 'fake_host')
+        self.assertEqual(1, get_ports.call_count)
+        self.assertEqual({'p1': ports['p1']}, res)
+
+    def test__notify_l2pop_ports_wiring(self):
+        l2pop_driver = mock.Mock()
+        self.plugin.mechanism_manager.mech_drivers = {
+            'l2population': l2pop_driver}
+        contexts = {}
+        for port_id in ('p1', 'p2'):
+            contexts[port_id] = mock.Mock(current={
+                'id': port_id, 'device_owner': 'compute:nova',
+                'device_id': 'vm', portbindings.HOST_ID: 'fake_host'})
+        contexts['p3'] = None
+        self.plugin.get_bound_ports_contexts.return_value = contexts
+        l2pop_driver.obj.update_port_up.side_effect = [None, Exception]
+        failed = self.callbacks._notify_l2pop_ports_wiring(
+            'fake_context', ['p1', 'p2', 'p3'], constants.PORT_STATUS_ACTIVE,
+            'fake_host')
+        self.plugin.get_bound_ports_contexts.assert_called_once_with(
+            'fake_context', ['p1', 'p2', 'p3'])
+        self.assertEqual(2, l2pop_driver.obj.update_port_up.call_count)
+        self.assertEqual(1, len(failed))
+
 
 class RpcApiTestCase(base.BaseTestCase):
 
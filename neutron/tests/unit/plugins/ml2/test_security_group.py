@@ -24,6 +24,7 @@ from neutron_lib import constants as const
 from neutron_lib import context
 from neutron_lib import fixture
 from neutron_lib.plugins import directory
+from oslo_config import cfg
 
 from neutron.extensions import securitygroup as ext_sg
 from neutron.tests.unit.agent import test_securitygroups_rpc as test_sg_rpc
@@ -166,4 +167,81 @@ class TestMl2SecurityGroups(Ml2SecurityGroupsTestCase,
 class TestMl2SGServerRpcCallBack(
     Ml2SecurityGroupsTestCase,
     test_sg_rpc.SGServerRpcCallBackTestCase):
-    pass
+
+    def _get_sg_member_generation(self, ctx, sg_id):
+        plugin = directory.get_plugin()
+        return plugin._get_sg_member_generations(ctx, [sg_id])[sg_id]
+
+    def test_sg_member_generation_bumped_on_member_changes(self):
+        ctx = context.get_admin_context()
+        with self.network() as n, self.subnet(n), \
+                self.security_group() as sg:
+            sg_id = sg['security_group']['id']
+            self.assertEqual(0, self._get_sg_member_generation(ctx, sg_id))
+            port = self._make_port(self.fmt, n['network']['id'],
+                                   security_groups=[sg_id])['port']
+            self.assertEqual(1, self._get_sg_member_generation(ctx, sg_id))
+            self._update('ports', port['id'], {'port': {'name': 'foo'}})
+            self.assertEqual(1, self._get_sg_member_generation(ctx, sg_id))
+            self._update('ports', port['id'], {'port': {
+                'allowed_address_pairs': [{'ip_address': '10.0.1.0/24'}]}})
+            self.assertEqual(2, self._get_sg_member_generation(ctx, sg_id))
+            self._update('ports', port['id'],
+                         {'port': {'security_groups': []}})
+            self.assertEqual(3, self._get_sg_member_generation(ctx, sg_id))
+            self._update('ports', port['id'],
+                         {'port': {'security_groups': [sg_id]}})
+            self.assertEqual(4, self._get_sg_member_generation(ctx, sg_id))
+            self._delete('ports', port['id'])
+            self.assertEqual(5, self._get_sg_member_generation(ctx, sg_id))
+
+    def test_security_group_info_for_devices_member_ips_cache(self):
+        cfg.CONF.set_override('cache_sg_member_ips', True)
+        plugin = directory.get_plugin()
+        ctx = context.get_admin_context()
+        with self._port_with_addr_pairs_and_security_group() as port,\
+                mock.patch.object(
+                    plugin, '_select_ips_for_remote_group_from_db',
+                    wraps=plugin._select_ips_for_remote_group_from_db) as sel:
+            port_id = port['port']['id']
+            sg_id = port['port']['security_groups'][0]
+            self.rpc.security_group_info_for_devices(ctx, devices=[port_id])
+            sg_member_ips = self.rpc.security_group_info_for_devices(
+                ctx, devices=[port_id])['sg_member_ips']
+            self.assertIn('11.0.0.1', sg_member_ips[sg_id]['IPv4'])
+            # the member IPs were served from the cache
+            self.assertEqual(1, sel.call_count)
+
+            port2 = self._make_port(self.fmt, port['port']['network_id'],
+                                    security_groups=[sg_id])
+            port2_ip = port2['port']['fixed_ips'][0]['ip_address']
+            sg_member_ips = self.rpc.security_group_info_for_devices(
+                ctx, devices=[port_id])['sg_member_ips']
+            self.assertIn(port2_ip, sg_member_ips[sg_id]['IPv4'])
+            self.assertEqual(2, sel.call_count)
+
+            self._delete('ports', port2['port']['id'])
+            sg_member_ips = self.rpc.security_group_info_for_devices(
+                ctx, devices=[port_id])['sg_member_ips']
+            self.assertNotIn(port2_ip, sg_member_ips[sg_id]['IPv4'])
+            self.assertIn('11.0.0.1', sg_member_ips[sg_id]['IPv4'])
+            self.assertEqual(3, sel.call_count)
+            self._delete('ports', port_id)
+
+    def test_security_group_info_for_devices_member_ips_cache_outdated(self):
+        cfg.CONF.set_override('cache_sg_member_ips', True)
+        plugin = directory.get_plugin()
+        ctx = context.get_admin_context()
+        with self._port_with_addr_pairs_and_security_group() as port:
+            port_id = port['port']['id']
+            sg_id = port['port']['security_groups'][0]
+            self.rpc.security_group_info_for_devices(ctx, devices=[port_id])
+            # the members changed through another server process
+            plugin._sg_member_ips_cache[sg_id] = (
+                plugin._sg_member_ips_cache[sg_id][0] - 1,
+                frozenset(['192.168.0.1']))
+            sg_member_ips = self.rpc.security_group_info_for_devices(
+                ctx, devices=[port_id])['sg_member_ips']
+            self.assertNotIn('192.168.0.1', sg_member_ips[sg_id]['IPv4'])
+            self.assertIn('11.0.0.1', sg_member_ips[sg_id]['IPv4'])
+            self._delete('ports', port_id)
@@ -19,6 +19,7 @@ from neutron_lib import constants
 import testtools
 
 from neutron.common import exceptions
+from neutron import privileged
 from neutron.privileged.agent.linux import netlink_constants as nl_constants
 from neutron.privileged.agent.linux import netlink_lib as nl_lib
 from neutron.tests import base
@@ -74,6 +75,22 @@ class NetlinkLibTestCase(base.BaseTestCase):
         nl_lib.nfct.nfct_close.assert_called_once_with(nl_lib.nfct.nfct_open(
             nl_constants.CONNTRACK, nl_constants.NFNL_SUBSYS_CTNETLINK))
 
+    def test_list_entries_other_protocols(self):
+        raw_entries = [
+            '[1234.5] sctp 132 10 ESTABLISHED src=1.1.1.1 dst=2.2.2.2 '
+            'sport=1 dport=2 src=2.2.2.2 dst=1.1.1.1 sport=2 dport=1 zone=1',
+            '[1234.5] udp 17 10 src=1.1.1.1 dst=2.2.2.2 sport=1 dport=2 '
+            '[UNREPLIED] src=2.2.2.2 dst=1.1.1.1 sport=2 dport=1 mark=0 '
+            'zone=1 use=1']
+        self.addCleanup(privileged.default.set_client_mode, True)
+        privileged.default.set_client_mode(False)
+        with mock.patch.object(nl_lib.ConntrackManager, 'list_entries',
+                               side_effect=[raw_entries, []]):
+            entries = nl_lib.list_entries(1)
+        self.assertEqual([(4, 'udp', 1, 2, '1.1.1.1', '2.2.2.2', 1),
+                          (4, 'sctp', None, None, '1.1.1.1', '2.2.2.2', 1)],
+                         entries)
+
     def test_conntrack_new_failed(self):
         nl_lib.nfct.nfct_new.return_value = None
         with nl_lib.ConntrackManager() as conntrack:
@@ -328,6 +328,52 @@ class TestTrackedResource(testlib_api.SqlTestCase):
             mock_set_quota_usage.assert_called_once_with(
                 self.context, self.resource, self.tenant_id, in_use=2)
 
+    def _add_other_data(self, tenant_id=None):
+        session = db_api.get_writer_session()
+        with session.begin():
+            session.add(test_quota.OtherMehModel(
+                othermeh='meh_%s' % uuidutils.generate_uuid()[:3],
+                tenant_id=tenant_id or self.tenant_id))
+
+    def test_count_used_tracked_resources(self):
+        res = self._create_resource()
+        other_res = self._create_other_resource()
+        self._add_data()
+        self._add_other_data()
+        self._add_data('someone_else')
+        set_usage = 'neutron.db.quota.api.set_quota_usage'
+        with mock.patch(set_usage) as mock_set_usage:
+            self.assertEqual(
+                {self.resource: 2, self.other_resource: 1},
+                resource.count_used_tracked_resources(
+                    self.context, self.tenant_id, [res, other_res]))
+            self.assertFalse(mock_set_usage.called)
+        self.assertIn(self.tenant_id, res._dirty_tenants)
+        self.assertIn(self.tenant_id, other_res._dirty_tenants)
+
+    def test_count_used_tracked_resources_in_sync(self):
+        res = self._create_resource()
+        other_res = self._create_other_resource()
+        quota_api.set_quota_usage(
+            self.context, self.resource, self.tenant_id, in_use=5)
+        quota_api.set_quota_usage(
+            self.context, self.other_resource, self.tenant_id, in_use=3)
+        self.assertEqual(
+            {self.resource: 5, self.other_resource: 3},
+            resource.count_used_tracked_resources(
+                self.context, self.tenant_id, [res, other_res]))
+
+    def test_count_used_tracked_resources_counts_out_of_sync_only(self):
+        res = self._create_resource()
+        other_res = self._create_other_resource()
+        quota_api.set_quota_usage(
+            self.context, self.other_resource, self.tenant_id, in_use=3)
+        self._add_data()
+        self.assertEqual(
+            {self.resource: 2, self.other_resource: 3},
+            resource.count_used_tracked_resources(
+                self.context, self.tenant_id, [res, other_res]))
+
 
 class Test_CountResource(base.BaseTestCase):
 
@@ -415,20 +415,46 @@ class TestNetworksFailover(TestDhcpSchedulerBaseTestCase,
         self._test_schedule_bind_network([agents[1]], net_id)
         with mock.patch.object(self, 'remove_network_from_dhcp_agent') as rn,\
                 mock.patch.object(self,
-                                  'schedule_network',
-                                  return_value=[agents[1]]) as sch,\
+                                  'schedule_networks',
+                                  return_value=[(agents[1],
+                                                 [self.network_id])]) as sch,\
                 mock.patch.object(self,
-                                  'get_network',
+                                  'get_networks',
                                   create=True,
-                                  return_value={'id': self.network_id}):
+                                  return_value=[{'id': self.network_id}]):
             notifier = mock.MagicMock()
             self.agent_notifiers[constants.AGENT_TYPE_DHCP] = notifier
             self.remove_networks_from_down_agents()
             rn.assert_called_with(mock.ANY, agents[0].id, self.network_id,
                                   notify=False)
-            sch.assert_called_with(mock.ANY, {'id': self.network_id})
+            sch.assert_called_with(mock.ANY, [{'id': self.network_id}])
             notifier.network_added_to_agent.assert_called_with(
                 mock.ANY, self.network_id, agents[1].host)
+            self.assertFalse(notifier.networks_added_to_agent.called)
+
+    def test_reschedule_networks_from_down_agent_notified_at_once(self):
+        net_id = uuidutils.generate_uuid()
+        self._save_networks([net_id])
+        agents = self._create_and_set_agents_down(['host-a', 'host-b'], 1)
+        agents[1].configurations = {'bulk_network_notifications': True}
+        self._test_schedule_bind_network([agents[0]], self.network_id)
+        self._test_schedule_bind_network([agents[0]], net_id)
+        network_ids = [self.network_id, net_id]
+        with mock.patch.object(self, 'remove_network_from_dhcp_agent'),\
+                mock.patch.object(self,
+                                  'schedule_networks',
+                                  return_value=[(agents[1], network_ids)]),\
+                mock.patch.object(self,
+                                  'get_networks',
+                                  create=True,
+                                  return_value=[{'id': net_id}
+                                                for net_id in network_ids]):
+            notifier = mock.MagicMock()
+            self.agent_notifiers[constants.AGENT_TYPE_DHCP] = notifier
+            self.remove_networks_from_down_agents()
+            notifier.networks_added_to_agent.assert_called_once_with(
+                mock.ANY, network_ids, agents[1].host)
+            self.assertFalse(notifier.network_added_to_agent.called)
 
     def _test_failed_rescheduling(self, rn_side_effect=None):
         agents = self._create_and_set_agents_down(['host-a', 'host-b'], 1)
@@ -437,18 +463,18 @@ class TestNetworksFailover(TestDhcpSchedulerBaseTestCase,
                                'remove_network_from_dhcp_agent',
                                side_effect=rn_side_effect) as rn,\
                 mock.patch.object(self,
-                                  'schedule_network',
+                                  'schedule_networks',
                                   return_value=None) as sch,\
                 mock.patch.object(self,
-                                  'get_network',
+                                  'get_networks',
                                   create=True,
-                                  return_value={'id': self.network_id}):
+                                  return_value=[{'id': self.network_id}]):
             notifier = mock.MagicMock()
             self.agent_notifiers[constants.AGENT_TYPE_DHCP] = notifier
             self.remove_networks_from_down_agents()
             rn.assert_called_with(mock.ANY, agents[0].id, self.network_id,
                                   notify=False)
-            sch.assert_called_with(mock.ANY, {'id': self.network_id})
+            sch.assert_called_with(mock.ANY, [{'id': self.network_id}])
             self.assertFalse(notifier.network_added_to_agent.called)
 
     def test_reschedule_network_from_down_agent_failed(self):
@@ -550,6 +576,101 @@ class TestNetworksFailover(TestDhcpSchedulerBaseTestCase,
             self.assertFalse(rn.called)
 
 
+class TestScheduleNetworks(TestDhcpSchedulerBaseTestCase,
+                           sched_db.DhcpAgentSchedulerDbMixin,
+                           common_db_mixin.CommonDbMixin):
+    """Unit test scenarios for the scheduling of several networks at once."""
+
+    def setUp(self):
+        super(TestScheduleNetworks, self).setUp()
+        mock.patch.object(
+            self, 'filter_hosts_with_network_access', create=True,
+            side_effect=lambda context, network_id, hosts: hosts).start()
+        self.network_ids = [uuidutils.generate_uuid() for i in range(3)]
+        self._save_networks(self.network_ids)
+        self.networks = [{'id': network_id}
+                         for network_id in self.network_ids]
+
+    def _get_hosted_network_ids(self, agent):
+        return {binding.network_id for binding in
+                network_obj.NetworkDhcpAgentBinding.get_objects(
+                    self.ctx, dhcp_agent_id=agent.id)}
+
+    def test_schedule_networks_to_least_loaded_agents(self):
+        self.network_scheduler = dhcp_agent_scheduler.WeightScheduler()
+        agent_a = helpers.register_dhcp_agent('host-a', networks=2)
+        agent_b = helpers.register_dhcp_agent('host-b', networks=0)
+        agent_c = helpers.register_dhcp_agent('host-c', networks=1)
+        agent_networks = self.schedule_networks(self.ctx, self.networks)
+        self.assertEqual({agent_b.id: 2, agent_c.id: 1},
+                         {bound_agent.id: len(network_ids)
+                          for bound_agent, network_ids in agent_networks})
+        self.assertEqual(set(), self._get_hosted_network_ids(agent_a))
+        self.assertEqual(2, len(self._get_hosted_network_ids(agent_b)))
+        self.assertEqual(1, len(self._get_hosted_network_ids(agent_c)))
+        self.assertEqual(2, agent.Agent.get_object(self.ctx,
+                                                   id=agent_b.id).load)
+
+    def test_schedule_networks_across_availability_zones(self):
+        cfg.CONF.set_override('dhcp_agents_per_network', 2)
+        self.network_scheduler = (
+            dhcp_agent_scheduler.AZAwareWeightScheduler())
+        az1_agents = [helpers.register_dhcp_agent(host, az='az1')
+                      for host in ('host-a', 'host-b')]
+        az2_agent = helpers.register_dhcp_agent('host-c', az='az2')
+        self.schedule_networks(self.ctx, self.networks[:2])
+        self.assertEqual(set(self.network_ids[:2]),
+                         self._get_hosted_network_ids(az2_agent))
+        for az1_agent in az1_agents:
+            self.assertEqual(1,
+                             len(self._get_hosted_network_ids(az1_agent)))
+
+    def test_schedule_networks_skips_hosted_networks(self):
+        self.network_scheduler = dhcp_agent_scheduler.WeightScheduler()
+        agents = self._create_and_set_agents_down(['host-a', 'host-b'])
+        self._test_schedule_bind_network([agents[0]], self.network_ids[0])
+        agent_networks = self.schedule_networks(self.ctx, self.networks)
+        scheduled_ids = {network_id
+                         for bound_agent, network_ids in agent_networks
+                         for network_id in network_ids}
+        self.assertEqual(set(self.network_ids[1:]), scheduled_ids)
+
+    def test_schedule_networks_no_active_agents(self):
+        self.network_scheduler = dhcp_agent_scheduler.WeightScheduler()
+        self._create_and_set_agents_down(['host-a'], 1)
+        self.assertEqual([], self.schedule_networks(self.ctx, self.networks))
+
+    def test_schedule_networks_filters_hosts_once(self):
+        self.network_scheduler = dhcp_agent_scheduler.WeightScheduler()
+        agent_a = helpers.register_dhcp_agent('host-a', networks=0)
+        agent_b = helpers.register_dhcp_agent('host-b', networks=5)
+        with mock.patch.object(
+                self, 'filter_hosts_with_networks_access',
+                return_value={network_id: {'host-b'}
+                              for network_id in self.network_ids}) as f:
+            self.schedule_networks(self.ctx, self.networks)
+        f.assert_called_once_with(self.ctx, self.network_ids,
+                                  {'host-a', 'host-b'})
+        self.assertFalse(self.filter_hosts_with_network_access.called)
+        self.assertEqual(set(), self._get_hosted_network_ids(agent_a))
+        self.assertEqual(set(self.network_ids),
+                         self._get_hosted_network_ids(agent_b))
+
+    def test_bind_networks_concurrently_bound(self):
+        agents = self._create_and_set_agents_down(['host-a'])
+        self._test_schedule_bind_network(agents, self.network_ids[0])
+        load = agent.Agent.get_object(self.ctx, id=agents[0].id).load
+        agents[0].load = load + len(self.network_ids)
+        bound = dhcp_agent_scheduler.DhcpFilter().bind_networks(
+            self.ctx, [(agents[0], self.network_ids)])
+        self.assertEqual([(agents[0], self.network_ids[1:])], bound)
+        self.assertEqual(set(self.network_ids),
+                         self._get_hosted_network_ids(agents[0]))
+        # only the networks actually bound are accounted in the load
+        self.assertEqual(load + 2, agent.Agent.get_object(
+            self.ctx, id=agents[0].id).load)
+
+
 class DHCPAgentWeightSchedulerTestCase(test_plugin.Ml2PluginV2TestCase):
     """Unit test scenarios for WeightScheduler.schedule."""
 
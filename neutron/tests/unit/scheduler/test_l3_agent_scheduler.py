@@ -25,6 +25,7 @@ from neutron_lib.exceptions import l3 as l3_exc
 from neutron_lib.plugins import constants as plugin_constants
 from neutron_lib.plugins import directory
 from oslo_config import cfg
+from oslo_db import exception as db_exc
 from oslo_utils import importutils
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
@@ -148,24 +149,42 @@ class L3SchedulerBaseTestCase(base.BaseTestCase):
         self._test__get_routers_can_schedule(routers, None, [])
 
     def test__bind_routers_centralized(self):
-        routers = [{'id': 'foo_router'}]
+        routers = [{'id': 'foo_router'}, {'id': 'bar_router'}]
         agent = agent_obj.Agent(mock.ANY, id=uuidutils.generate_uuid())
-        with mock.patch.object(self.scheduler, 'bind_router') as mock_bind:
+        with mock.patch.object(rb_obj.RouterL3AgentBinding, 'get_objects',
+                               return_value=[]),\
+                mock.patch.object(self.scheduler,
+                                  '_bind_routers_batch') as mock_bind:
             self.scheduler._bind_routers(mock.ANY, mock.ANY, routers, agent)
         mock_bind.assert_called_once_with(mock.ANY, mock.ANY,
-                                          'foo_router', agent.id)
+                                          ['foo_router', 'bar_router'],
+                                          agent.id)
+
+    def test__bind_routers_centralized_in_batches(self):
+        routers = [{'id': 'router%d' % i} for i in range(
+            l3_agent_scheduler.ROUTER_BINDING_BATCH_SIZE + 1)]
+        agent = agent_obj.Agent(mock.ANY, id=uuidutils.generate_uuid())
+        with mock.patch.object(rb_obj.RouterL3AgentBinding, 'get_objects',
+                               return_value=[]),\
+                mock.patch.object(self.scheduler,
+                                  '_bind_routers_batch') as mock_bind:
+            self.scheduler._bind_routers(mock.ANY, mock.ANY, routers, agent)
+        self.assertEqual(
+            [l3_agent_scheduler.ROUTER_BINDING_BATCH_SIZE, 1],
+            [len(call[0][2]) for call in mock_bind.call_args_list])
 
     def _test__bind_routers_ha(self, has_binding):
         routers = [{'id': 'foo_router', 'ha': True, 'tenant_id': '42'}]
         agent = agent_obj.Agent(mock.ANY, id=uuidutils.generate_uuid())
-        with mock.patch.object(self.scheduler,
-                               '_router_has_binding',
-                               return_value=has_binding) as mock_has_binding,\
+        bindings = [mock.Mock(router_id='foo_router', l3_agent_id=agent.id)]
+        with mock.patch.object(rb_obj.RouterL3AgentBinding, 'get_objects',
+                               return_value=bindings if has_binding else []
+                               ) as mock_get_bindings,\
                 mock.patch.object(self.scheduler,
                                   'create_ha_port_and_bind') as mock_bind:
             self.scheduler._bind_routers(mock.ANY, mock.ANY, routers, agent)
-            mock_has_binding.assert_called_once_with(mock.ANY, 'foo_router',
-                                                     agent.id)
+            mock_get_bindings.assert_called_once_with(mock.ANY,
+                                                      l3_agent_id=agent.id)
             self.assertEqual(not has_binding, mock_bind.called)
 
     def test__bind_routers_ha_has_binding(self):
@@ -174,6 +193,17 @@ class L3SchedulerBaseTestCase(base.BaseTestCase):
     def test__bind_routers_ha_no_binding(self):
         self._test__bind_routers_ha(has_binding=False)
 
+    def test__bind_routers_batch_concurrently_bound(self):
+        context = mock.MagicMock()
+        context.session.begin.return_value.__exit__.side_effect = (
+            db_exc.DBDuplicateEntry())
+        with mock.patch.object(self.scheduler, 'bind_router') as mock_bind:
+            self.scheduler._bind_routers_batch(
+                mock.ANY, context, ['foo_router', 'bar_router'], 'agent')
+        mock_bind.assert_has_calls([
+            mock.call(mock.ANY, context, 'foo_router', 'agent'),
+            mock.call(mock.ANY, context, 'bar_router', 'agent')])
+
     def test__get_candidates_iterable_on_early_returns(self):
         plugin = mock.MagicMock()
         # non-distributed router already hosted
@@ -59,6 +59,20 @@ class TestDriverController(testlib_api.SqlTestCase):
         self.dc.drivers['dvrha'].use_integrated_agent_scheduler = False
         self.assertFalse(self.dc.uses_scheduler(self.ctx, router_id))
 
+    def test_routers_using_scheduler(self):
+        self._return_provider_for_flavor('dvrha')
+        flavor_id = uuidutils.generate_uuid()
+        router_ids = [uuidutils.generate_uuid() for i in range(2)]
+        for router_id in router_ids:
+            router = dict(id=router_id, flavor_id=flavor_id)
+            self.dc._set_router_provider('router', 'PRECOMMIT_CREATE', self,
+                                         self.ctx, router, mock.Mock())
+        self.assertEqual(router_ids,
+                         self.dc.routers_using_scheduler(self.ctx, router_ids))
+        self.dc.drivers['dvrha'].use_integrated_agent_scheduler = False
+        self.assertEqual([],
+                         self.dc.routers_using_scheduler(self.ctx, router_ids))
+
     def test_driver_owns_router(self):
         self._return_provider_for_flavor('dvrha')
         router_db = mock.Mock()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Benchmark the memory used by the network cache of the DHCP agent
+
+Networks with a given number of ports are generated as the dicts the
+get_active_networks_info RPC call returns, with the port fields the ML2
+plugin sends. They are then held in memory:
+
+ * as dhcp.NetModel instances, the way the cache held them before it
+   stored their ports as dhcp.PortModel records
+ * in a NetworkCache
+
+and the memory allocated by each is reported, along with the time taken to
+fill the NetworkCache and to look up every port in it.
+
+    python tools/dhcp_network_cache_benchmark.py --networks 100 --ports 50
+"""
+
+from __future__ import print_function
+
+import argparse
+import gc
+import time
+import uuid
+
+from oslo_serialization import jsonutils
+
+from neutron.agent.dhcp import agent as dhcp_agent
+from neutron.agent.linux import dhcp
+
+try:
+    import tracemalloc
+except ImportError:
+    # python 2.7
+    tracemalloc = None
+
+
+def _subnet_dict(network_id, index):
+    return {'id': str(uuid.uuid4()), 'network_id': network_id,
+            'name': 'subnet%d' % index, 'ip_version': 4,
+            'cidr': '10.%d.%d.0/24' % (index // 256, index % 256),
+            'gateway_ip': '10.%d.%d.1' % (index // 256, index % 256),
+            'enable_dhcp': True, 'dns_nameservers': [], 'host_routes': [],
+            'ipv6_ra_mode': None, 'ipv6_address_mode': None,
+            'tenant_id': 'tenant', 'project_id': 'tenant',
+            'allocation_pools': [], 'segment_id': None,
+            'subnetpool_id': None, 'description': '', 'tags': [],
+            'revision_number': 1, 'service_types': []}
+
+
+def _port_dict(network_id, subnet, index):
+    ip_address = subnet['cidr'].replace('0/24', str(index % 250 + 2))
+    port_id = str(uuid.uuid4())
+    return {'id': port_id, 'network_id': network_id,
+            'name': 'port%d' % index, 'admin_state_up': True,
+            'status': 'ACTIVE', 'mac_address': 'fa:16:3e:%02x:%02x:%02x' % (
+                index // 65536 % 256, index // 256 % 256, index % 256),
+            'fixed_ips': [{'subnet_id': subnet['id'],
+                           'ip_address': ip_address}],
+            'device_id': str(uuid.uuid4()), 'device_owner': 'compute:nova',
+            'tenant_id': 'tenant', 'project_id': 'tenant',
+            'security_groups': [str(uuid.uuid4())],
+            'allowed_address_pairs': [], 'extra_dhcp_opts': [],
+            'dns_name': '', 'dns_assignment': [
+                {'hostname': 'host-%s' % ip_address.replace('.', '-'),
+                 'ip_address': ip_address,
+                 'fqdn': 'host-%s.openstacklocal.' %
+                         ip_address.replace('.', '-')}],
+            'binding:host_id': 'compute%d' % (index % 100),
+            'binding:vif_type': 'ovs', 'binding:vnic_type': 'normal',
+            'binding:vif_details': {'port_filter': True,
+                                    'ovs_hybrid_plug': False},
+            'binding:profile': {}, 'port_security_enabled': True,
+            'qos_policy_id': None, 'description': '', 'tags': [],
+            'created_at': '2018-01-01T00:00:00Z',
+            'updated_at': '2018-01-01T00:00:00Z', 'revision_number': 3}
+
+
+def _network_dicts(networks, ports):
+    for net_index in range(networks):
+        network_id = str(uuid.uuid4())
+        subnet = _subnet_dict(network_id, net_index)
+        yield {'id': network_id, 'name': 'net%d' % net_index,
+               'tenant_id': 'tenant', 'project_id': 'tenant',
+               'admin_state_up': True, 'mtu': 1450,
+               'subnets': [subnet], 'non_local_subnets': [],
+               'ports': [_port_dict(network_id, subnet, i)
+                         for i in range(ports)]}
+
+
+def _measure_memory(build):
+    """Return what build() returns and the memory it left allocated."""
+    if not tracemalloc:
+        return build(), None
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, size
+
+
+def _format_size(size):
+    if size is None:
+        return 'n/a'
+    return '%.1f MiB' % (size / 1048576.0)
+
+
+def run_scenario(networks, ports):
+    net_dicts = list(_network_dicts(networks, ports))
+
+    def build_net_models():
+        # the json decoder shares no string between the RPC replies
+        return [dhcp.NetModel(jsonutils.loads(jsonutils.dumps(d)))
+                for d in net_dicts]
+
+    def build_cache():
+        cache = dhcp_agent.NetworkCache()
+        for d in net_dicts:
+            cache.put(dhcp.NetModel(jsonutils.loads(jsonutils.dumps(d))))
+        return cache
+
+    net_models, models_size = _measure_memory(build_net_models)
+    del net_models
+    start = time.time()
+    cache, cache_size = _measure_memory(build_cache)
+    fill_time = time.time() - start
+    port_ids = list(cache.get_port_ids())
+    start = time.time()
+    for port_id in port_ids:
+        cache.get_port_by_id(port_id)
+    lookup_time = time.time() - start
+
+    print('networks=%d ports=%d (%d ports in total)' %
+          (networks, ports, len(port_ids)))
+    print('    %-30s %12s' % ('NetModel networks', _format_size(models_size)))
+    print('    %-30s %12s' % ('NetworkCache', _format_size(cache_size)))
+    if models_size and cache_size:
+        print('    %-30s %11.1fx' %
+              ('reduction', models_size / float(cache_size)))
+    print('    %-30s %10.3f s' % ('fill the cache', fill_time))
+    print('    %-30s %10.3f s' % ('look up every port', lookup_time))
+    return models_size, cache_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--networks', type=int, nargs='+', default=[100],
+                        help='Number of networks of the scenarios')
+    parser.add_argument('--ports', type=int, nargs='+', default=[10, 50],
+                        help='Number of ports per network')
+    args = parser.parse_args()
+
+    for networks in args.networks:
+        for ports in args.ports:
+            run_scenario(networks, ports)
+
+
+if __name__ == "__main__":
+    main()
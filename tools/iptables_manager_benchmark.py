@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Benchmark the rule generation of the iptables manager
+
+The rules of a host with a given number of ports, each one having a given
+number of security group rules, are generated in memory the way the
+iptables firewall driver lays them out, with remote groups either expanded
+into one rule per member address or matched with ipsets. The output of
+iptables-save is faked from them, so neither root privileges nor iptables
+are needed.
+
+Every scenario then times, with one port having a new rule:
+
+ * _modify_rules, which builds the new table from the iptables-save output
+ * _generate_path_between_rules, which diffs the old and the new table
+ * _generate_chain_diff_iptables_commands, on the largest chain
+
+and reports the number of operations per second along with the peak memory
+allocated by one operation.
+
+    python tools/iptables_manager_benchmark.py --ports 50 200 --rules 20
+"""
+
+from __future__ import print_function
+
+import argparse
+import gc
+import timeit
+
+from neutron.agent.linux import iptables_manager
+
+try:
+    import tracemalloc
+except ImportError:
+    # python 2.7
+    tracemalloc = None
+
+BINARY_NAME = 'neutron-openvswi'
+SG_CHAIN = 'sg-chain'
+
+
+def _port_chain(direction, port_index):
+    return iptables_manager.get_chain_name(
+        '%s%010x' % (direction, port_index))
+
+
+def _add_port_rules(table, port_index, rules, remote_ips, ipset):
+    ingress = _port_chain('i', port_index)
+    egress = _port_chain('o', port_index)
+    device = 'tap%010x' % port_index
+    for chain in (ingress, egress):
+        table.add_chain(chain)
+        table.add_rule(chain, '-m state --state RELATED,ESTABLISHED '
+                              '-j RETURN')
+        table.add_rule(chain, '-m state --state INVALID -j DROP')
+    table.add_rule('FORWARD', '-m physdev --physdev-out %s '
+                              '--physdev-is-bridged -j $%s' %
+                   (device, SG_CHAIN))
+    table.add_rule(SG_CHAIN, '-m physdev --physdev-out %s '
+                             '--physdev-is-bridged -j $%s' %
+                   (device, ingress))
+    table.add_rule(SG_CHAIN, '-m physdev --physdev-in %s '
+                             '--physdev-is-bridged -j $%s' %
+                   (device, egress))
+    for rule in range(rules):
+        port = 1024 + rule
+        if ipset:
+            table.add_rule(ingress, '-p tcp -m set --match-set NIPv4sg%04d '
+                                    'src -m tcp --dport %d -j RETURN' %
+                           (rule, port))
+        else:
+            for member in range(remote_ips):
+                table.add_rule(ingress, '-s 10.%d.%d.%d/32 -p tcp -m tcp '
+                                        '--dport %d -j RETURN' %
+                               (rule % 256, member // 256, member % 256,
+                                port))
+    table.add_rule(ingress, '-j $sg-fallback')
+    table.add_rule(egress, '-j RETURN')
+
+
+def _build_manager(ports, rules, remote_ips, ipset):
+    manager = iptables_manager.IptablesManager(binary_name=BINARY_NAME)
+    table = manager.ipv4['filter']
+    table.add_chain(SG_CHAIN)
+    table.add_chain('sg-fallback')
+    table.add_rule('sg-fallback', '-j DROP')
+    for port_index in range(ports):
+        _add_port_rules(table, port_index, rules, remote_ips, ipset)
+    return manager
+
+
+def _fake_iptables_save(manager, table_name):
+    """Return the lines iptables-save outputs once the table is applied."""
+    table = manager.ipv4[table_name]
+    rules = manager._modify_rules([], table, table_name)
+    chains = sorted(line for line in rules if line.startswith(':'))
+    return (['# Generated by iptables-save', '*%s' % table_name] +
+            ['%s ACCEPT [0:0]' % c for c in
+             (':INPUT', ':FORWARD', ':OUTPUT')] +
+            ['%s - [0:0]' % c for c in chains] +
+            [line for line in rules if not line.startswith(':')] +
+            ['COMMIT', '# Completed'])
+
+
+def _measure(func, number, repeat):
+    gc.collect()
+    best = min(timeit.repeat(func, number=number, repeat=repeat))
+    ops = number / best if best else float('inf')
+    peak = None
+    if tracemalloc:
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return ops, peak
+
+
+def _format_peak(peak):
+    if peak is None:
+        return 'n/a'
+    return '%.1f KiB' % (peak / 1024.0)
+
+
+def run_scenario(ports, rules, remote_ips, ipset, number, repeat):
+    manager = _build_manager(ports, rules, remote_ips, ipset)
+    table = manager.ipv4['filter']
+    old_lines = _fake_iptables_save(manager, 'filter')
+    # a port gets a new rule, the typical incremental update
+    changed_chain = _port_chain('i', ports // 2)
+    table.add_rule(changed_chain, '-p udp -m udp --dport 53 -j RETURN',
+                   top=True)
+    # the lines of the table, as _apply_synchronized gives them to both
+    # _modify_rules and _generate_path_between_rules
+    start, end = manager._find_table(old_lines, 'filter')
+    old_rules = old_lines[start:end]
+    new_rules = manager._modify_rules(old_rules, table, 'filter')
+    old_by_chain = iptables_manager._get_rules_by_chain(old_rules)
+    new_by_chain = iptables_manager._get_rules_by_chain(new_rules)
+    largest = max(new_by_chain, key=lambda c: len(new_by_chain[c]))
+
+    results = [
+        ('_modify_rules',
+         _measure(lambda: manager._modify_rules(old_rules, table, 'filter'),
+                  number, repeat)),
+        ('_generate_path_between_rules',
+         _measure(lambda: iptables_manager._generate_path_between_rules(
+             old_rules, new_rules), number, repeat)),
+        ('_generate_chain_diff_iptables_commands',
+         _measure(lambda: (
+             iptables_manager._generate_chain_diff_iptables_commands(
+                 largest, old_by_chain[largest], new_by_chain[largest])),
+             number, repeat)),
+    ]
+    print('ports=%d rules=%d remote_ips=%d ipset=%s: %d lines, '
+          'largest chain %d rules' %
+          (ports, rules, remote_ips, ipset, len(old_lines),
+           len(new_by_chain[largest])))
+    for name, (ops, peak) in results:
+        print('    %-40s %12.2f ops/s  peak %s' %
+              (name, ops, _format_peak(peak)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--ports', type=int, nargs='+', default=[10, 100],
+                        help='Number of ports of the scenarios')
+    parser.add_argument('--rules', type=int, nargs='+', default=[10],
+                        help='Number of security group rules per port')
+    parser.add_argument('--remote-ips', type=int, default=10,
+                        help='Number of members of the remote group, used '
+                             'when ipsets are disabled')
+    parser.add_argument('--ipset', choices=['on', 'off', 'both'],
+                        default='both', help='Use ipsets for remote groups')
+    parser.add_argument('--number', type=int, default=3,
+                        help='Number of operations per measurement')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of measurements, the best one is kept')
+    args = parser.parse_args()
+
+    ipsets = {'on': [True], 'off': [False], 'both': [True, False]}[args.ipset]
+    for ipset in ipsets:
+        for ports in args.ports:
+            for rules in args.rules:
+                run_scenario(ports, rules, args.remote_ips, ipset,
+                             args.number, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Benchmark the scheduling of the routers to an L3 agent registering
+
+A given number of unscheduled legacy routers is created in an in-memory
+SQLite database along with a legacy L3 agent. The routers are then
+scheduled to the agent:
+
+ * one router at a time, the way auto_schedule_routers did it before it
+   bound the routers to the agent at once
+ * with auto_schedule_routers
+
+and the time taken and the number of SQL statements run by each are
+reported.
+
+    python tools/l3_auto_schedule_benchmark.py --routers 1000 5000 20000
+"""
+
+from __future__ import print_function
+
+import argparse
+import time
+
+from neutron_lib import constants
+from neutron_lib import context as n_context
+from neutron_lib.db import model_base
+from oslo_config import cfg
+from oslo_db import options as db_options
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+import sqlalchemy as sa
+
+from neutron.common import config as common_config
+from neutron.db import api as db_api
+from neutron.db import l3_hamode_db
+from neutron.db import l3_hascheduler_db
+from neutron.db.migration.models import head  # noqa
+from neutron.db.models import l3 as l3_models
+from neutron.db.models import l3_attrs
+from neutron.db.models import l3agent as rb_model
+from neutron.objects import agent as agent_obj
+from neutron.scheduler import l3_agent_scheduler
+
+HOST = 'l3-host'
+
+
+class L3Plugin(l3_hamode_db.L3_HA_NAT_db_mixin,
+               l3_hascheduler_db.L3_HA_scheduler_db_mixin):
+    pass
+
+
+class StatementCounter(object):
+
+    def __init__(self, engine):
+        self.count = 0
+        sa.event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args, **kwargs):
+        self.count += 1
+
+
+def _create_routers(context, routers):
+    with context.session.begin():
+        for index in range(routers):
+            router_id = uuidutils.generate_uuid()
+            context.session.add(l3_models.Router(
+                id=router_id, tenant_id='tenant', name='router%d' % index,
+                admin_state_up=True, status=constants.ACTIVE))
+            context.session.add(l3_attrs.RouterExtraAttributes(
+                router_id=router_id, ha=False, distributed=False))
+
+
+def _create_agent(context):
+    now = timeutils.utcnow()
+    agent = agent_obj.Agent(
+        context, agent_type=constants.AGENT_TYPE_L3, binary='neutron-l3-agent',
+        topic='l3_agent', host=HOST, admin_state_up=True,
+        availability_zone='nova', created_at=now, started_at=now,
+        heartbeat_timestamp=now, load=0,
+        configurations={'agent_mode': constants.L3_AGENT_MODE_LEGACY})
+    agent.create()
+    return agent
+
+
+def _unbind_routers(context):
+    with context.session.begin():
+        context.session.query(rb_model.RouterL3AgentBinding).delete()
+
+
+def _schedule_router_by_router(scheduler, plugin, context, host):
+    l3_agent = plugin.get_enabled_agent_on_host(
+        context, constants.AGENT_TYPE_L3, host)
+    routers = scheduler._get_underscheduled_routers(plugin, context)
+    for router in scheduler._get_routers_can_schedule(
+            plugin, context, routers, l3_agent):
+        scheduler.schedule(plugin, context, router['id'],
+                           candidates=[l3_agent])
+
+
+def _run(counter, schedule, context, agent):
+    _unbind_routers(context)
+    # the agent stays alive however long the previous run took
+    agent.heartbeat_timestamp = timeutils.utcnow()
+    agent.update()
+    counter.count = 0
+    start = time.time()
+    schedule()
+    elapsed = time.time() - start
+    bound = context.session.query(rb_model.RouterL3AgentBinding).count()
+    return elapsed, counter.count, bound
+
+
+def run_scenario(routers):
+    engine = db_api.context_manager.writer.get_engine()
+    model_base.BASEV2.metadata.drop_all(engine)
+    model_base.BASEV2.metadata.create_all(engine)
+    context = n_context.get_admin_context()
+    _create_routers(context, routers)
+    agent = _create_agent(context)
+    plugin = L3Plugin()
+    plugin.router_scheduler = l3_agent_scheduler.LeastRoutersScheduler()
+    scheduler = plugin.router_scheduler
+    counter = StatementCounter(engine)
+
+    print('routers=%d' % routers)
+    for name, schedule in (
+            ('router by router',
+             lambda: _schedule_router_by_router(
+                 scheduler, plugin, context, HOST)),
+            ('auto_schedule_routers',
+             lambda: scheduler.auto_schedule_routers(
+                 plugin, context, HOST))):
+        elapsed, statements, bound = _run(counter, schedule, context, agent)
+        print('    %-25s %9.3f s %9d statements %7d bound' %
+              (name, elapsed, statements, bound))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--routers', type=int, nargs='+',
+                        default=[1000, 5000],
+                        help='Number of unscheduled routers of the scenarios')
+    args = parser.parse_args()
+
+    common_config.init([])
+    db_options.set_defaults(cfg.CONF, connection='sqlite://')
+    for routers in args.routers:
+        run_scenario(routers)
+
+
+if __name__ == "__main__":
+    main()